@@ -16,7 +16,7 @@ from ..chain import CompositeResponseHandler, ExceptionHandler, Handler, Handler
 from ..client import parse_response, parse_service_exception
 from ..protocol.parser import RequestParser, create_parser
 from ..protocol.serializer import create_serializer
-from ..protocol.service_router import determine_aws_service_name
+from ..protocol.service_router import get_service_router
 from ..skeleton import Skeleton, create_skeleton
 from ..spec import load_service
 
@@ -29,7 +29,7 @@ class ServiceNameParser(Handler):
     """
 
     def __call__(self, chain: HandlerChain, context: RequestContext, response: Response):
-        service = determine_aws_service_name(context.request)
+        service = get_service_router().determine_service_name(context.request)
 
         if not service:
             return
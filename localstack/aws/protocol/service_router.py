@@ -1,6 +1,7 @@
 import logging
 import os
-from typing import NamedTuple, Optional, Set
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
 
 import botocore
 from werkzeug.http import parse_dict_header
@@ -12,6 +13,7 @@ from localstack.constants import LOCALHOST_HOSTNAME, PATH_USER_REQUEST
 from localstack.http import Request
 from localstack.services.s3.s3_utils import uses_host_addressing
 from localstack.services.sqs.utils import is_sqs_queue_url
+from localstack.utils.collections import PrefixTrie
 from localstack.utils.objects import singleton_factory
 from localstack.utils.strings import to_bytes
 from localstack.utils.urls import hostname_from_url
@@ -346,6 +348,16 @@ def determine_aws_service_name(
         if custom_host_match:
             return custom_host_match
 
+    return _determine_by_request_values(request, services, signing_name, candidates)
+
+
+def _determine_by_request_values(
+    request: Request, services: ServiceCatalog, signing_name: Optional[str], candidates: Set[str]
+) -> Optional[str]:
+    """
+    Last stages of the service name detection, which need to take the query / form-data (and therefore potentially the
+    body) of the request into account. These stages can not be cached based on the service indicators.
+    """
     # 5. check the query / form-data
     values = request.values
     if "Action" in values:
@@ -386,3 +398,161 @@ def determine_aws_service_name(
     if candidates:
         return candidates.pop()
     return None
+
+
+class _SigningNamePathRule:
+    """Compiled version of the rules of a single signing name in ``signing_name_path_prefix_rules``."""
+
+    def __init__(self, signing_name: str, rules: Dict[str, str]):
+        self.default = rules.get("*", signing_name)
+        self.prefixes = PrefixTrie(
+            (prefix, name) for prefix, name in rules.items() if prefix != "*"
+        )
+
+    def __call__(self, path: str) -> str:
+        return self.prefixes.first_match(path) or self.default
+
+
+class CompiledServiceRouter:
+    """
+    A service router which is compiled once from the ServiceCatalog index and yields the same results as
+    ``determine_aws_service_name``, but without the repeated linear scans:
+
+    - unique signing names and target prefixes are resolved with a single dict lookup,
+    - the custom signing name path rules and the endpoint prefixes are matched using prefix tries,
+    - the results of the stages which only depend on the signing name, target prefix, operation, or the host are
+      cached in bounded LRU caches (most of the requests are addressed to a handful of services),
+    - the query / form-data of the request (which potentially needs the body to be parsed) is only accessed if the
+      service could not be determined by the other indicators.
+    """
+
+    def __init__(self, services: ServiceCatalog, cache_size: int = 512):
+        self.services = services
+        index = services.index
+
+        self._unique_signing_names: Dict[str, str] = {
+            signing_name: service_names[0]
+            for signing_name, service_names in index.signing_name_index.items()
+            if len(service_names) == 1
+        }
+        self._unique_target_prefixes: Dict[str, str] = {
+            target_prefix: service_names[0]
+            for target_prefix, service_names in index.target_prefix_index.items()
+            if len(service_names) == 1
+        }
+        self._signing_name_path_rules: Dict[str, _SigningNamePathRule] = {
+            signing_name: _SigningNamePathRule(signing_name, rules)
+            for signing_name, rules in signing_name_path_prefix_rules.items()
+        }
+        self._endpoint_prefixes: PrefixTrie[List[str]] = PrefixTrie(
+            index.endpoint_prefix_index.items()
+        )
+
+        self._resolve_service_indicators = lru_cache(maxsize=cache_size)(
+            self._do_resolve_service_indicators
+        )
+        self._resolve_host = lru_cache(maxsize=cache_size)(self._do_resolve_host)
+
+    def __call__(self, request: Request) -> Optional[str]:
+        return self.determine_service_name(request)
+
+    def determine_service_name(self, request: Request) -> Optional[str]:
+        """
+        Tries to determine the name of the AWS service an incoming request is targeting.
+        :param request: to determine the target service name of
+        :return: service name string (or None if the targeting service could not be determined exactly)
+        """
+        signing_name, target_prefix, operation, host, path = _extract_service_indicators(request)
+
+        # 1. check the signing names (fast path)
+        if signing_name:
+            service = self._unique_signing_names.get(signing_name)
+            if service:
+                return service
+
+            signing_name_path_rule = self._signing_name_path_rules.get(signing_name)
+            if signing_name_path_rule:
+                return signing_name_path_rule(path)
+
+            custom_match = custom_signing_name_rules(signing_name, path)
+            if custom_match:
+                return custom_match
+
+        # 2. check the target prefix (fast path)
+        if target_prefix and operation:
+            service = self._unique_target_prefixes.get(target_prefix)
+            if service:
+                return service
+
+        service, candidates = self._resolve_service_indicators(
+            signing_name, target_prefix, operation
+        )
+        if service:
+            return service
+
+        # 3. check the path if it is set and not a trivial root path
+        # (not cached, the custom path rules depend on the account of the current request)
+        if path and path != "/":
+            custom_path_match = custom_path_addressing_rules(path)
+            if custom_path_match:
+                return custom_path_match
+
+        # 4. check the host
+        if host:
+            service, host_candidates = self._resolve_host(host)
+            if service:
+                return service
+            candidates = candidates | host_candidates
+
+        # 5. - 7. check the query / form-data and the legacy rules
+        return _determine_by_request_values(request, self.services, signing_name, set(candidates))
+
+    def _do_resolve_service_indicators(
+        self, signing_name: Optional[str], target_prefix: Optional[str], operation: Optional[str]
+    ) -> Tuple[Optional[str], FrozenSet[str]]:
+        """
+        Resolves the candidates for the given (ambiguous) signing name and target prefix.
+        :return: a tuple of the uniquely determined service name (or None) and the remaining candidates
+        """
+        services = self.services
+        candidates = set(services.by_signing_name(signing_name)) if signing_name else set()
+
+        if target_prefix and operation:
+            candidates.update(services.by_target_prefix(target_prefix))
+            # exclude services where the operation is not contained in the service spec
+            for service_name in list(candidates):
+                if operation not in services.get(service_name).operation_names:
+                    candidates.remove(service_name)
+        else:
+            # exclude services which have a target prefix (the current request does not have one)
+            for service_name in list(candidates):
+                if services.get(service_name).metadata.get("targetPrefix") is not None:
+                    candidates.remove(service_name)
+
+        if len(candidates) == 1:
+            return candidates.pop(), frozenset()
+
+        return None, frozenset(candidates)
+
+    def _do_resolve_host(self, host: str) -> Tuple[Optional[str], FrozenSet[str]]:
+        """
+        Resolves the service name or the candidates for the given host.
+        :return: a tuple of the uniquely determined service name (or None) and the candidates based on the host
+        """
+        candidates = set()
+        for services_per_prefix in self._endpoint_prefixes.matches(host):
+            if len(services_per_prefix) == 1:
+                return services_per_prefix[0], frozenset()
+            candidates.update(services_per_prefix)
+
+        custom_host_match = custom_host_addressing_rules(host)
+        if custom_host_match:
+            return custom_host_match, frozenset()
+
+        return None, frozenset(candidates)
+
+
+@singleton_factory
+def get_service_router() -> CompiledServiceRouter:
+    """Returns the CompiledServiceRouter built from the (cached) ServiceCatalog."""
+    return CompiledServiceRouter(get_service_catalog())
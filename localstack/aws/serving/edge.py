@@ -12,6 +12,7 @@ def serve_gateway(bind_address, port, use_ssl, asynchronous=False):
 
     from localstack.aws.app import LocalstackAwsGateway
     from localstack.aws.serving.asgi import AsgiGateway
+    from localstack.aws.transport import set_gateway
     from localstack.http.hypercorn import HypercornServer
     from localstack.logging.setup import setup_hypercorn_logger
     from localstack.services.generic_proxy import GenericProxy, install_predefined_cert_if_available
@@ -32,7 +33,10 @@ def serve_gateway(bind_address, port, use_ssl, asynchronous=False):
 
     # build gateway
     loop = asyncio.new_event_loop()
-    app = AsgiGateway(LocalstackAwsGateway(SERVICE_PLUGINS), event_loop=loop)
+    gateway = LocalstackAwsGateway(SERVICE_PLUGINS)
+    # make the gateway available to the in-process transport of internal clients
+    set_gateway(gateway)
+    app = AsgiGateway(gateway, event_loop=loop)
 
     # start serving gateway
     server = HypercornServer(app, config, loop)
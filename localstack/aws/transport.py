@@ -0,0 +1,226 @@
+"""
+In-process transports for internal boto clients. Internal service-to-service calls (e.g., SNS delivering messages to
+SQS, or the Lambda event source pollers) would otherwise serialize a full HTTP request, send it over the loopback
+interface to the edge port, and parse it again in the gateway. The transports in this module hand the request
+directly to the Gateway instead, or even dispatch the service request directly to the provider of the service.
+"""
+import logging
+import uuid
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+from botocore.awsrequest import AWSPreparedRequest, AWSResponse, HeadersDict
+from botocore.client import BaseClient
+
+from localstack import config
+from localstack.aws.api import RequestContext, ServiceException, ServiceResponse
+from localstack.aws.client import _ResponseStream, parse_response
+from localstack.aws.gateway import Gateway
+from localstack.aws.skeleton import Skeleton
+from localstack.http import Request, Response
+
+LOG = logging.getLogger(__name__)
+
+TRANSPORT_HTTP = "http"
+TRANSPORT_GATEWAY = "gateway"
+TRANSPORT_DISPATCH = "dispatch"
+
+_gateway: Optional[Gateway] = None
+
+
+def set_gateway(gateway: Optional[Gateway]):
+    """
+    Sets the Gateway which serves the requests of this LocalStack instance, and which is used by the in-process
+    transports.
+
+    :param gateway: the gateway (or None to disable the in-process transports)
+    """
+    global _gateway
+    _gateway = gateway
+
+
+def get_gateway() -> Optional[Gateway]:
+    return _gateway
+
+
+class _RawResponse(_ResponseStream):
+    """Makes a Response available as the "raw" (urllib3) response attribute of botocore's AWSResponse."""
+
+    def stream(self, **kwargs) -> Iterator[bytes]:
+        if self._buf:
+            yield self._buf
+            self._buf = None
+        yield from self.iterator
+
+
+class GatewayHttpSession:
+    """
+    A drop-in replacement for botocore's ``URLLib3Session`` (the ``http_session`` of a client's endpoint), which hands
+    the prepared requests directly to the Gateway instead of sending them over the network. If there is no gateway
+    serving requests in this process, the requests are sent with the original HTTP session.
+    """
+
+    def __init__(self, http_session: Any):
+        self.http_session = http_session
+
+    def send(self, request: AWSPreparedRequest) -> AWSResponse:
+        gateway = get_gateway()
+        if not gateway:
+            return self.http_session.send(request)
+
+        from localstack.aws.forwarder import create_http_request
+        from localstack.utils.aws.request_context import RequestContextSnapshot
+
+        response = Response()
+        # the handler chain resets the request context of the thread after processing the (nested) request
+        with RequestContextSnapshot().apply():
+            gateway.process(create_http_request(request), response)
+
+        return AWSResponse(
+            url=request.url,
+            status_code=response.status_code,
+            headers=HeadersDict(response.headers.items()),
+            raw=_RawResponse(response),
+        )
+
+    def close(self):
+        self.http_session.close()
+
+
+class DirectDispatcher:
+    """
+    Dispatches the API calls of a boto client directly to the Skeleton of the service's ASF provider, skipping the
+    serialization of the request and the response entirely.
+    Calls to services which are not implemented with ASF (or not loaded in this process) are not dispatched.
+    """
+
+    def __init__(self, client: BaseClient):
+        self.client = client
+        self.service_name = client.meta.service_model.service_name
+
+    def get_skeleton(self) -> Optional[Skeleton]:
+        from localstack.aws.proxy import AwsApiListener
+
+        gateway = get_gateway()
+        service_manager = getattr(gateway, "service_manager", None)
+        if not service_manager or not service_manager.exists(self.service_name):
+            return None
+
+        service = service_manager.require(self.service_name)
+        # same condition as in the ServiceLoader, other listeners might contain custom request handling logic
+        if type(service.listener) is not AwsApiListener:
+            return None
+        return service.listener.skeleton
+
+    def create_request_context(self, skeleton: Skeleton, operation_name: str) -> RequestContext:
+        from localstack.aws.accounts import get_aws_account_id
+        from localstack.utils.aws import aws_stack
+
+        region = self.client.meta.region_name
+        split_url = urlsplit(self.client.meta.endpoint_url)
+
+        context = RequestContext()
+        context.service = skeleton.service
+        context.operation = skeleton.service.operation_model(operation_name)
+        context.region = region
+        context.account_id = get_aws_account_id()
+        # some providers use the request (e.g., to determine the host of the URLs they return)
+        context.request = Request(
+            method="POST",
+            path="/",
+            headers=aws_stack.mock_aws_request_headers(
+                self.service_name, region_name=region, internal=True
+            ),
+            scheme=split_url.scheme,
+            server=(split_url.hostname, split_url.port),
+        )
+        return context
+
+    def dispatch(self, operation_name: str, api_params: Dict) -> Optional[ServiceResponse]:
+        """
+        Dispatches the given API call to the provider.
+
+        :param operation_name: the name of the operation to invoke
+        :param api_params: the parameters of the call (the ServiceRequest)
+        :return: the service response (like botocore would return it), or None if the call cannot be dispatched
+        :raises ClientError: if the provider raised a ServiceException
+        """
+        skeleton = self.get_skeleton()
+        if not skeleton or operation_name not in skeleton.dispatch_table:
+            return None
+
+        from localstack.utils.aws.request_context import THREAD_LOCAL, RequestContextSnapshot
+
+        context = self.create_request_context(skeleton, operation_name)
+        context.service_request = api_params
+        handler = skeleton.dispatch_table[operation_name]
+
+        with RequestContextSnapshot().apply():
+            THREAD_LOCAL.request_context = context.request
+            try:
+                result = handler(context, api_params) or {}
+            except NotImplementedError:
+                return None
+            except ServiceException as e:
+                raise self._create_client_error(e, operation_name)
+
+        if isinstance(result, Response):
+            # the provider returned a raw HTTP response, this needs to be parsed like any other response
+            result = parse_response(context.operation, result)
+            if "Error" in result:
+                error_code = result["Error"].get("Code")
+                raise self.client.exceptions.from_code(error_code)(result, operation_name)
+            return result
+
+        result = dict(result)
+        result["ResponseMetadata"] = {
+            "RequestId": str(uuid.uuid4()),
+            "HTTPStatusCode": 200,
+            "HTTPHeaders": {},
+            "RetryAttempts": 0,
+        }
+        return result
+
+    def _create_client_error(self, exception: ServiceException, operation_name: str) -> Exception:
+        parsed_response = {
+            "Error": {
+                "Code": exception.code,
+                "Message": exception.message,
+                "Type": "Sender" if exception.sender_fault else "Receiver",
+            },
+            "ResponseMetadata": {"HTTPStatusCode": exception.status_code},
+        }
+        return self.client.exceptions.from_code(exception.code)(parsed_response, operation_name)
+
+
+def install_in_process_transport(client: BaseClient, transport: str = None) -> BaseClient:
+    """
+    Modifies the given boto client to use the given in-process transport.
+
+    :param client: the boto client to modify
+    :param transport: one of "http" (no modification), "gateway", or "dispatch" (defaults to the configured transport
+        ``INTERNAL_CLIENT_TRANSPORT``)
+    :return: the modified client
+    """
+    transport = transport or config.INTERNAL_CLIENT_TRANSPORT
+    if transport not in (TRANSPORT_GATEWAY, TRANSPORT_DISPATCH):
+        return client
+
+    endpoint = client._endpoint
+    if not isinstance(endpoint.http_session, GatewayHttpSession):
+        endpoint.http_session = GatewayHttpSession(endpoint.http_session)
+
+    if transport == TRANSPORT_DISPATCH:
+        dispatcher = DirectDispatcher(client)
+        make_api_call = client._make_api_call
+
+        def _make_api_call(operation_name: str, api_params: Dict):
+            response = dispatcher.dispatch(operation_name, api_params)
+            if response is None:
+                return make_api_call(operation_name, api_params)
+            return response
+
+        # the generated client methods call self._make_api_call, which is shadowed by the instance attribute
+        client._make_api_call = _make_api_call
+
+    return client
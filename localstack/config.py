@@ -395,6 +395,14 @@ USE_SSL = is_env_true("USE_SSL")
 # whether to use the legacy edge proxy or the newer Gateway/HandlerChain framework
 LEGACY_EDGE_PROXY = is_env_true("LEGACY_EDGE_PROXY")
 
+# transport used by internal boto clients to call other services of this LocalStack instance:
+# - "http": requests are sent over the network to the edge port (default)
+# - "gateway": requests are handed to the gateway in-process, without using sockets
+# - "dispatch": like "gateway", but requests to ASF providers are dispatched directly (skipping the serialization)
+INTERNAL_CLIENT_TRANSPORT = (
+    os.environ.get("INTERNAL_CLIENT_TRANSPORT", "").strip().lower() or "http"
+)
+
 # whether legacy s3 is enabled
 # TODO change when asf becomes default: os.environ.get("PROVIDER_OVERRIDE_S3", "") == 'legacy'
 LEGACY_S3_PROVIDER = os.environ.get("PROVIDER_OVERRIDE_S3", "") != "asf"
@@ -571,6 +579,10 @@ SYNCHRONOUS_API_GATEWAY_EVENTS = is_env_not_false("SYNCHRONOUS_API_GATEWAY_EVENT
 SYNCHRONOUS_KINESIS_EVENTS = is_env_not_false("SYNCHRONOUS_KINESIS_EVENTS")
 SYNCHRONOUS_DYNAMODB_EVENTS = is_env_not_false("SYNCHRONOUS_DYNAMODB_EVENTS")
 
+# maximum interval (in seconds) in which buffered Firehose records are delivered, regardless of the
+# IntervalInSeconds buffering hints of the destinations (which are up to 900 seconds in AWS)
+FIREHOSE_MAX_BUFFER_INTERVAL = float(os.environ.get("FIREHOSE_MAX_BUFFER_INTERVAL") or 1)
+
 # randomly inject faults to Kinesis
 KINESIS_ERROR_PROBABILITY = float(os.environ.get("KINESIS_ERROR_PROBABILITY", "").strip() or 0.0)
 
@@ -601,6 +613,30 @@ SQS_PORT_EXTERNAL = int(os.environ.get("SQS_PORT_EXTERNAL") or 0)
 # Strategy used when creating SQS queue urls. can be "off", "domain", or "path"
 SQS_ENDPOINT_STRATEGY = os.environ.get("SQS_ENDPOINT_STRATEGY", "") or "off"
 
+# number of worker threads per protocol (sqs, lambda, http/https, ...) delivering SNS messages to subscriptions
+SNS_DELIVERY_WORKERS = int(os.environ.get("SNS_DELIVERY_WORKERS") or 8)
+
+# maximum number of pending SNS deliveries per protocol, publishers are blocked while the queue is full
+SNS_DELIVERY_QUEUE_SIZE = int(os.environ.get("SNS_DELIVERY_QUEUE_SIZE") or 10000)
+
+# number of worker threads per target type (sqs, kinesis, lambda, ...) delivering EventBridge events to targets
+EVENTS_DELIVERY_WORKERS = int(os.environ.get("EVENTS_DELIVERY_WORKERS") or 8)
+
+# maximum number of pending EventBridge deliveries per target type, PutEvents is blocked while the queue is full
+EVENTS_DELIVERY_QUEUE_SIZE = int(os.environ.get("EVENTS_DELIVERY_QUEUE_SIZE") or 10000)
+
+# archive of the events put to EventBridge, can be "segment-log" or "disabled" (enabled by default with DEBUG=1)
+EVENTS_ARCHIVE = os.environ.get("EVENTS_ARCHIVE", "").strip()
+
+# size in bytes after which the event archive starts a new segment file
+EVENTS_ARCHIVE_SEGMENT_SIZE = int(os.environ.get("EVENTS_ARCHIVE_SEGMENT_SIZE") or 16 * 1024 * 1024)
+
+# number of segment files of the event archive which are kept, older segments are deleted
+EVENTS_ARCHIVE_MAX_SEGMENTS = int(os.environ.get("EVENTS_ARCHIVE_MAX_SEGMENTS") or 16)
+
+# maximum number of resources of a CloudFormation stack which are deployed concurrently
+CFN_DEPLOYMENT_WORKERS = int(os.environ.get("CFN_DEPLOYMENT_WORKERS") or 8)
+
 # host under which the LocalStack services are available from Lambda Docker containers
 HOSTNAME_FROM_LAMBDA = os.environ.get("HOSTNAME_FROM_LAMBDA", "").strip()
 
@@ -709,6 +745,7 @@ MAIN_DOCKER_NETWORK = os.environ.get("MAIN_DOCKER_NETWORK", "") or LAMBDA_DOCKER
 # Note: do *not* include DATA_DIR in this list, as it is treated separately
 CONFIG_ENV_VARS = [
     "BUCKET_MARKER_LOCAL",
+    "CFN_DEPLOYMENT_WORKERS",
     "DEBUG",
     "DEFAULT_REGION",
     "DEVELOP",
@@ -734,12 +771,19 @@ CONFIG_ENV_VARS = [
     "ES_CUSTOM_BACKEND",
     "ES_ENDPOINT_STRATEGY",
     "ES_MULTI_CLUSTER",
+    "EVENTS_ARCHIVE",
+    "EVENTS_ARCHIVE_MAX_SEGMENTS",
+    "EVENTS_ARCHIVE_SEGMENT_SIZE",
+    "EVENTS_DELIVERY_QUEUE_SIZE",
+    "EVENTS_DELIVERY_WORKERS",
     "EXTRA_CORS_ALLOWED_HEADERS",
     "EXTRA_CORS_ALLOWED_ORIGINS",
     "EXTRA_CORS_EXPOSE_HEADERS",
+    "FIREHOSE_MAX_BUFFER_INTERVAL",
     "HOSTNAME",
     "HOSTNAME_EXTERNAL",
     "HOSTNAME_FROM_LAMBDA",
+    "INTERNAL_CLIENT_TRANSPORT",
     "KINESIS_ERROR_PROBABILITY",
     "KINESIS_INITIALIZE_STREAMS",
     "KINESIS_MOCK_PERSIST_INTERVAL",
@@ -774,6 +818,8 @@ CONFIG_ENV_VARS = [
     "SERVICES",
     "SKIP_INFRA_DOWNLOADS",
     "SKIP_SSL_CERT_DOWNLOAD",
+    "SNS_DELIVERY_QUEUE_SIZE",
+    "SNS_DELIVERY_WORKERS",
     "SQS_DELAY_PURGE_RETRY",
     "SQS_DELAY_RECENTLY_DELETED",
     "SQS_ENDPOINT_STRATEGY",
@@ -15,6 +15,10 @@ if t.TYPE_CHECKING:
 
 LOG = logging.getLogger(__name__)
 
+# a custom WSGI environment key which indicates that the application may return an async iterable as response body
+# (with ``direct_passthrough`` set), which is consumed on the event loop instead of blocking a thread of the executor
+ASYNC_RESPONSE_BODY = "asgi.async_response_body"
+
 
 def populate_wsgi_environment(environ: "WSGIEnvironment", scope: "HTTPScope"):
     """
@@ -364,6 +368,7 @@ class ASGIAdapter:
         environ[
             "wsgi.input_terminated"
         ] = True  # indicates that the stream is EOF terminated per request
+        environ[ASYNC_RESPONSE_BODY] = True
         return environ
 
     async def handle_http(
@@ -14,13 +14,14 @@ class Response(WerkzeugResponse):
     def update_from(self, other: WerkzeugResponse):
         """
         Updates this response object with the data from the given response object. It reads the status code,
-        the response data, and updates its own headers (overwrites existing headers, but does not remove ones not
-        present in the given object).
+        the response data (and whether it is passed through directly), and updates its own headers (overwrites
+        existing headers, but does not remove ones not present in the given object).
 
         :param other: the response object to read from
         """
         self.status_code = other.status_code
         self.response = other.response
+        self.direct_passthrough = other.direct_passthrough
         self.headers.update(other.headers)
 
     def set_json(self, doc: Dict):
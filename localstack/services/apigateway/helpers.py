@@ -25,12 +25,14 @@ from localstack.constants import (
     PATH_USER_REQUEST,
 )
 from localstack.services.apigateway.context import ApiInvocationContext
+from localstack.services.apigateway.route_table import RouteTable
 from localstack.services.generic_proxy import RegionBackend
 from localstack.utils import common
 from localstack.utils.aws import aws_stack
 from localstack.utils.aws.aws_responses import requests_error_response_json, requests_response
 from localstack.utils.aws.aws_stack import parse_arn
 from localstack.utils.aws.request_context import MARKER_APIGW_REQUEST_REGION, THREAD_LOCAL
+from localstack.utils.collections import remove_none_values_from_dict
 from localstack.utils.strings import long_uid
 from localstack.utils.time import TIMESTAMP_FORMAT_TZ, timestamp
 
@@ -88,6 +90,8 @@ class APIGatewayRegion(RegionBackend):
     vpc_links: Dict[str, Dict]
     # maps cert ID to client certificate details
     client_certificates: Dict[str, Dict]
+    # maps (API id) -> compiled route table of the API resources
+    route_tables: Dict[str, RouteTable]
     # maps resource ARN to tags
     TAGS: Dict[str, Dict[str, str]] = {}
 
@@ -105,6 +109,7 @@ class APIGatewayRegion(RegionBackend):
         self.base_path_mappings = {}
         self.vpc_links = {}
         self.client_certificates = {}
+        self.route_tables = {}
 
 
 class Resolver:
@@ -420,72 +425,47 @@ def get_cors_response(headers):
 
 def get_rest_api_paths(rest_api_id, region_name=None):
     apigateway = aws_stack.connect_to_service(service_name="apigateway", region_name=region_name)
-    resources = apigateway.get_resources(restApiId=rest_api_id, limit=100)
+    paginator = apigateway.get_paginator("get_resources")
+    resources = [
+        resource for page in paginator.paginate(restApiId=rest_api_id) for resource in page["items"]
+    ]
     resource_map = {}
-    for resource in resources["items"]:
+    for resource in resources:
         path = resource.get("path")
         # TODO: check if this is still required in the general case (can we rely on "path" being
         #  present?)
         path = path or aws_stack.get_apigateway_path_for_resource(
-            rest_api_id, resource["id"], region_name=region_name
+            rest_api_id, resource["id"], resources=resources, region_name=region_name
         )
         resource_map[path] = resource
     return resource_map
 
 
-# TODO: Extract this to a set of rules that have precedence and easy to test individually.
-#
-#  https://docs.aws.amazon.com/apigateway/latest/developerguide/api-gateway-method-settings
-#  -method-request.html
-#  https://docs.aws.amazon.com/apigateway/latest/developerguide/http-api-develop-routes.html
 def get_resource_for_path(path: str, path_map: Dict[str, Dict]) -> Optional[Tuple[str, dict]]:
-    matches = []
-    # creates a regex from the input path if there are parameters, e.g /foo/{bar}/baz -> /foo/[
-    # ^\]+/baz, otherwise is a direct match.
-    for api_path, details in path_map.items():
-        api_path_regex = re.sub(r"{[^+]+\+}", r"[^\?#]+", api_path)
-        api_path_regex = re.sub(r"{[^}]+}", r"[^/]+", api_path_regex)
-        if re.match(r"^%s$" % api_path_regex, path):
-            matches.append((api_path, details))
-
-    # if there are no matches, it's not worth to proceed, bail here!
-    if not matches:
+    route_table = RouteTable((api_path, api_path) for api_path in path_map)
+    route = route_table.match(path)
+    if not route:
         return None
+    return route.path, path_map[route.path]
+
+
+def get_route_table(api_id: str, region_name: str, account_id: str) -> Optional[RouteTable]:
+    """Returns the route table of the given REST API, which is compiled once and cached until the resources of the
+    API are modified."""
+    region = APIGatewayRegion.get(region_name, account_id)
+    route_table = region.route_tables.get(api_id)
+    if route_table is None:
+        rest_api = apigateway_backends[account_id][region_name].apis.get(api_id)
+        if not rest_api:
+            return None
+        resources = list(rest_api.resources.values())
+        route_table = RouteTable((resource.get_path(), resource.id) for resource in resources)
+        region.route_tables[api_id] = route_table
+    return route_table
 
-    # so we have matches and perhaps more than one, e.g
-    # /{proxy+} and /api/{proxy+} for inputs like /api/foo/bar
-    # /foo/{param1}/baz and /foo/{param1}/{param2} for inputs like /for/bar/baz
-    if len(matches) > 1:
-        # check if we have an exact match (exact matches take precedence)
-        for match in matches:
-            if match[0] == path:
-                return match
-
-        # not an exact match but parameters can fit in
-        for match in matches:
-            if path_matches_pattern(path, match[0]):
-                return match
-
-        # at this stage, we have more than one match but we have an eager example like
-        # /{proxy+} or /api/{proxy+}, so we pick the best match by sorting by length
-        sorted_matches = sorted(matches, key=lambda x: len(x[0]), reverse=True)
-        return sorted_matches[0]
-    return matches[0]
-
-
-def path_matches_pattern(path, api_path):
-    api_paths = api_path.split("/")
-    paths = path.split("/")
-    reg_check = re.compile(r"{(.*)}")
-    if len(api_paths) != len(paths):
-        return False
-    results = [
-        part == paths[indx]
-        for indx, part in enumerate(api_paths)
-        if reg_check.match(part) is None and part
-    ]
 
-    return len(results) > 0 and all(results)
+def invalidate_route_table(api_id: str, region_name: str, account_id: str):
+    APIGatewayRegion.get(region_name, account_id).route_tables.pop(api_id, None)
 
 
 def connect_api_gateway_to_sqs(gateway_name, stage_name, queue_arn, path, region_name=None):
@@ -754,19 +734,29 @@ def import_api_from_openapi_spec(rest_api: RestAPI, body: Dict, query_params: Di
             endpoint_config.setdefault("types", ["PRIVATE"])
         rest_api.endpoint_configuration = endpoint_config
 
+    invalidate_route_table(rest_api.id, rest_api.region_name, rest_api.account_id)
     return rest_api
 
 
 def get_target_resource_details(invocation_context: ApiInvocationContext) -> Tuple[str, Dict]:
     """Look up and return the API GW resource (path pattern + resource dict) for the given invocation context."""
-    path_map = get_rest_api_paths(
-        rest_api_id=invocation_context.api_id, region_name=invocation_context.region_name
-    )
+    region_name = invocation_context.region_name or aws_stack.get_region()
+    account_id = invocation_context.account_id or get_aws_account_id()
     relative_path = invocation_context.invocation_path.rstrip("/") or "/"
     try:
-        extracted_path, resource = get_resource_for_path(path=relative_path, path_map=path_map)
+        route_table = get_route_table(invocation_context.api_id, region_name, account_id)
+        route = route_table.match(relative_path)
+        if not route:
+            return None, None
+        rest_api = apigateway_backends[account_id][region_name].apis[invocation_context.api_id]
+        # return a copy of the resource, which has the same form as in the GetResources response
+        # (i.e., without null members, which are not part of the API responses)
+        resource = json.loads(
+            json.dumps(rest_api.resources[route.resource_id].to_dict()),
+            object_hook=remove_none_values_from_dict,
+        )
         invocation_context.resource = resource
-        return extracted_path, resource
+        return route.path, resource
     except Exception:
         return None, None
 
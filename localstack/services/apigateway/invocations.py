@@ -57,10 +57,16 @@ class AuthorizationError(Exception):
 class RequestValidator:
     __slots__ = ["context", "apigateway_client"]
 
-    def __init__(self, context: ApiInvocationContext, apigateway_client):
+    def __init__(self, context: ApiInvocationContext, apigateway_client=None):
         self.context = context
         self.apigateway_client = apigateway_client
 
+    def _get_client(self):
+        # the client is only required (and created) for methods with a request validator
+        if self.apigateway_client is None:
+            self.apigateway_client = aws_stack.connect_to_service("apigateway")
+        return self.apigateway_client
+
     def is_request_valid(self) -> bool:
         # make all the positive checks first
         if self.context.resource is None or "resourceMethods" not in self.context.resource:
@@ -76,7 +82,7 @@ class RequestValidator:
             return True
 
         # check if there is a validator for this request
-        validator = self.apigateway_client.get_request_validator(
+        validator = self._get_client().get_request_validator(
             restApiId=self.context.api_id, requestValidatorId=resource["requestValidatorId"]
         )
         if validator is None:
@@ -101,7 +107,7 @@ class RequestValidator:
             return False
 
         schema_name = resource["requestModels"].get(APPLICATION_JSON)
-        model = self.apigateway_client.get_model(
+        model = self._get_client().get_model(
             restApiId=self.context.api_id,
             modelName=schema_name,
         )
@@ -253,7 +259,7 @@ def invoke_rest_api(invocation_context: ApiInvocationContext):
         return make_error_response("Unable to find path %s" % invocation_context.path, 404)
 
     # validate request
-    validator = RequestValidator(invocation_context, aws_stack.connect_to_service("apigateway"))
+    validator = RequestValidator(invocation_context)
     if not validator.is_request_valid():
         return make_error_response("Invalid request body", 400)
 
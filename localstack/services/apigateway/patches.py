@@ -13,6 +13,7 @@ from localstack.services.apigateway.helpers import (
     TAG_KEY_CUSTOM_ID,
     apply_json_patch_safe,
     import_api_from_openapi_spec,
+    invalidate_route_table,
 )
 from localstack.utils.collections import ensure_list
 from localstack.utils.common import DelSafeDict, str_to_bool, to_str
@@ -135,6 +136,7 @@ def apply_patches():
             if not isinstance(resource.__dict__, DelSafeDict):
                 resource.__dict__ = DelSafeDict(resource.__dict__)
             result = _patch_api_gateway_entity(self, resource.__dict__)
+            invalidate_route_table(function_id, self.backend.region_name, self.backend.account_id)
             if result is not None:
                 return result
             return 200, {}, json.dumps(resource.to_dict())
@@ -409,6 +411,29 @@ def apply_patches():
             raise NoIntegrationDefined()
         return resource_method["methodIntegration"]
 
+    # invalidate the route tables of the APIs whenever their resources, methods, or deployments change
+    def _patch_route_table_invalidation(method_name: str):
+        backend_method_orig = getattr(apigateway_models.APIGatewayBackend, method_name)
+
+        def backend_method(self, function_id, *args, **kwargs):
+            try:
+                return backend_method_orig(self, function_id, *args, **kwargs)
+            finally:
+                invalidate_route_table(function_id, self.region_name, self.account_id)
+
+        setattr(apigateway_models.APIGatewayBackend, method_name, backend_method)
+
+    for backend_method_name in [
+        "create_resource",
+        "delete_resource",
+        "put_method",
+        "delete_method",
+        "create_deployment",
+        "delete_deployment",
+        "delete_rest_api",
+    ]:
+        _patch_route_table_invalidation(backend_method_name)
+
     # TODO: put_rest_api now available upstream - see if we can leverage some synergies
     apigateway_response_restapis_individual_orig = APIGatewayResponse.restapis_individual
     APIGatewayResponse.restapis_individual = apigateway_response_restapis_individual
@@ -0,0 +1,84 @@
+"""
+Route table which resolves the paths of REST API invocations to the resources of the API.
+
+The resource paths of an API are compiled into a trie of path segments. A path is resolved level by level, where a
+literal segment (e.g., ``/pets``) takes precedence over a path parameter (e.g., ``/{petId}``), which in turn takes
+precedence over a greedy path parameter (e.g., ``/{proxy+}``) matching all remaining segments of the path. If the more
+specific branch does not match the rest of the path, the next branch is tried.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Route(NamedTuple):
+    path: str
+    resource_id: str
+
+
+class RouteNode:
+    __slots__ = ["literals", "parameter", "routes", "greedy_routes"]
+
+    def __init__(self):
+        # child nodes of the literal segments
+        self.literals: Dict[str, RouteNode] = {}
+        # child node of the path parameters, which is shared by parameters with different names
+        self.parameter: Optional[RouteNode] = None
+        # routes which end at this node
+        self.routes: List[Route] = []
+        # routes with a greedy path parameter after this node
+        self.greedy_routes: List[Route] = []
+
+
+def split_path(path: str) -> List[str]:
+    path = path.strip("/")
+    return path.split("/") if path else []
+
+
+def is_path_parameter(segment: str) -> bool:
+    return segment.startswith("{") and segment.endswith("}")
+
+
+def is_greedy_path_parameter(segment: str) -> bool:
+    return is_path_parameter(segment) and segment.endswith("+}")
+
+
+class RouteTable:
+    def __init__(self, routes: Iterable[Tuple[str, str]] = ()):
+        self.root = RouteNode()
+        for path, resource_id in routes:
+            self.add(path, resource_id)
+
+    def add(self, path: str, resource_id: str):
+        route = Route(path, resource_id)
+        segments = split_path(path)
+        node = self.root
+        for index, segment in enumerate(segments):
+            if is_greedy_path_parameter(segment) and index == len(segments) - 1:
+                node.greedy_routes.append(route)
+                return
+            if is_path_parameter(segment):
+                node.parameter = node.parameter or RouteNode()
+                node = node.parameter
+            else:
+                node = node.literals.setdefault(segment, RouteNode())
+        node.routes.append(route)
+
+    def match(self, path: str) -> Optional[Route]:
+        """Returns the route of the resource which matches the given invocation path, or None."""
+        return self._match(self.root, split_path(path), 0)
+
+    def _match(self, node: RouteNode, segments: List[str], index: int) -> Optional[Route]:
+        if index == len(segments):
+            return node.routes[0] if node.routes else None
+        segment = segments[index]
+        child = node.literals.get(segment)
+        if child:
+            route = self._match(child, segments, index + 1)
+            if route:
+                return route
+        if node.parameter and segment:
+            route = self._match(node.parameter, segments, index + 1)
+            if route:
+                return route
+        if node.greedy_routes:
+            return node.greedy_routes[0]
+        return None
@@ -1,11 +1,14 @@
 import datetime
+import json
 from typing import Dict, List, Optional
 
 from localstack.services.awslambda.event_source_listeners.stream_event_source_listener import (
     StreamEventSourceListener,
 )
 from localstack.services.awslambda.lambda_api import get_event_sources
+from localstack.services.dynamodbstreams import dynamodbstreams_api
 from localstack.utils.aws import aws_stack
+from localstack.utils.json import BytesEncoder
 from localstack.utils.threads import FuncThread
 
 
@@ -37,12 +40,35 @@ class DynamoDBEventSourceListener(StreamEventSourceListener):
             StreamArn=stream_arn, ShardId=shard_id, ShardIteratorType=iterator_type
         )["ShardIterator"]
 
+    def _get_records(self, stream_client, shard_iterator, limit):
+        # the records are read directly from the stream log, without a round trip through the API
+        records, next_shard_iterator = dynamodbstreams_api.get_records(shard_iterator, limit)
+        return {"Records": records, "NextShardIterator": next_shard_iterator}
+
+    def _wait_for_records(self, shard_iterator, timeout=None):
+        timeout = self._POLL_INTERVAL_SEC if timeout is None else timeout
+        dynamodbstreams_api.wait_for_records(shard_iterator, timeout)
+
+    def _get_partition_key(self, record):
+        keys = record.get("dynamodb", {}).get("Keys") or {}
+        return json.dumps(keys, sort_keys=True, cls=BytesEncoder)
+
+    def _get_arrival_time(self, record):
+        creation_time = record.get("dynamodb", {}).get("ApproximateCreationDateTime")
+        if isinstance(creation_time, datetime.datetime):
+            return creation_time.timestamp()
+        return creation_time
+
     def _create_lambda_event_payload(self, stream_arn, records, shard_id=None):
         record_payloads = []
         for record in records:
-            creation_time = record.get("dynamodb", {}).get("ApproximateCreationDateTime", None)
+            # the records are shared with the stream log, hence they are copied before they are modified
+            ddb_record = dict(record.get("dynamodb", {}))
+            creation_time = ddb_record.get("ApproximateCreationDateTime", None)
+            if isinstance(creation_time, datetime.datetime):
+                creation_time = creation_time.timestamp()
             if creation_time is not None:
-                record["dynamodb"]["ApproximateCreationDateTime"] = creation_time.timestamp() * 1000
+                ddb_record["ApproximateCreationDateTime"] = creation_time * 1000
             record_payloads.append(
                 {
                     "eventID": record["eventID"],
@@ -51,7 +77,7 @@ class DynamoDBEventSourceListener(StreamEventSourceListener):
                     "eventName": record["eventName"],
                     "eventSourceARN": stream_arn,
                     "eventSource": "aws:dynamodb",
-                    "dynamodb": record["dynamodb"],
+                    "dynamodb": ddb_record,
                 }
             )
         return {"Records": record_payloads}
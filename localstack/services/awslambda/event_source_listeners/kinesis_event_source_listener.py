@@ -69,6 +69,13 @@ class KinesisEventSourceListener(StreamEventSourceListener):
             )
         return {"Records": record_payloads}
 
+    def _get_partition_key(self, record):
+        return record["PartitionKey"]
+
+    def _get_arrival_time(self, record):
+        arrival_time = record.get("ApproximateArrivalTimestamp")
+        return arrival_time.timestamp() if arrival_time else None
+
     def _get_starting_and_ending_sequence_numbers(self, first_record, last_record):
         return first_record["SequenceNumber"], last_record["SequenceNumber"]
 
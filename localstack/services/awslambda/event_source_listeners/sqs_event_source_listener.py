@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 import time
 from typing import Dict, List
 
@@ -23,68 +24,202 @@ from localstack.utils.threads import FuncThread
 
 LOG = logging.getLogger(__name__)
 
+# maximum number of messages per ReceiveMessage call
+SQS_MAX_RECEIVE_MESSAGES = 10
+# wait time of the long polling receive calls
+SQS_LONG_POLL_SECONDS = 20
+# number of seconds to wait after a failed receive call
+SQS_POLL_ERROR_BACKOFF = 1
+# maximum number of seconds a poller waits for the invocation of a batch (the maximum Lambda timeout)
+SQS_INVOCATION_TIMEOUT = 15 * 60
+# default maximum number of concurrent pollers (and thereby Lambda invocations) per event source mapping
+SQS_MAX_POLLER_CONCURRENCY = 5
+
+
+class SqsMappingPoller:
+    """
+    Polls the SQS queue of an event source mapping, and invokes the mapped Lambda function with the received batches.
+    The poller uses long polling, such that it is woken up as soon as messages arrive in the queue. The number of
+    concurrent workers scales with the backlog of the queue: a worker which receives a full batch starts another worker
+    (up to the maximum concurrency of the mapping), and additional workers stop once the queue is drained.
+    The configuration of the mapping (e.g., BatchSize and MaximumBatchingWindowInSeconds) is read for every batch.
+    """
+
+    def __init__(self, listener: "SQSEventSourceListener", mapping: Dict):
+        self.listener = listener
+        self.mapping = mapping
+        self.queue_arn = mapping["EventSourceArn"]
+        self.region_name = extract_region_from_arn(self.queue_arn)
+        self.queue_url = None
+        self.workers = 0
+        self.mutex = threading.Lock()
+        self.running = False
+
+    @property
+    def max_concurrency(self) -> int:
+        scaling_config = self.mapping.get("ScalingConfig") or {}
+        return scaling_config.get("MaximumConcurrency") or SQS_MAX_POLLER_CONCURRENCY
+
+    def start(self):
+        with self.mutex:
+            self.running = True
+            self._start_worker()
+
+    def stop(self):
+        self.running = False
+
+    def _start_worker(self):
+        self.workers += 1
+        FuncThread(self._run_worker).start()
+
+    def _scale_up(self):
+        with self.mutex:
+            if self.running and self.workers < self.max_concurrency:
+                LOG.debug(
+                    "Scaling up the pollers of SQS queue %s to %s", self.queue_arn, self.workers + 1
+                )
+                self._start_worker()
+
+    def _scale_down(self) -> bool:
+        with self.mutex:
+            if self.workers > 1 or not self.running:
+                self.workers -= 1
+                return True
+            return False
+
+    def _run_worker(self, *args):
+        while True:
+            if not self.running:
+                with self.mutex:
+                    self.workers -= 1
+                return
+            try:
+                messages = self.receive_batch()
+            except Exception as e:
+                if "NonExistentQueue" in str(e):
+                    # the queue might be re-created with a different URL
+                    self.queue_url = None
+                else:
+                    LOG.debug("Unable to poll SQS messages for queue %s: %s", self.queue_arn, e)
+                time.sleep(SQS_POLL_ERROR_BACKOFF)
+                continue
+
+            if not messages:
+                if self._scale_down():
+                    return
+                continue
+            if not self.running:
+                # the mapping has been deleted or disabled in the meantime, release the messages
+                self._release(messages)
+                continue
+            if len(messages) >= self._get_batch_size():
+                # there is a backlog of messages, process the next batch concurrently
+                self._scale_up()
+            try:
+                self.listener._process_messages_for_event_source(self.mapping, messages)
+            except Exception as e:
+                LOG.warning("Unable to process SQS messages of queue %s: %s", self.queue_arn, e)
+
+    def _get_batch_size(self) -> int:
+        return max(self.mapping.get("BatchSize") or 10, 1)
+
+    def _get_client(self):
+        return aws_stack.connect_to_service("sqs", region_name=self.region_name)
+
+    def _get_queue_url(self) -> str:
+        if not self.queue_url:
+            self.queue_url = aws_stack.sqs_queue_url_for_arn(self.queue_arn)
+        return self.queue_url
+
+    def _receive(self, max_messages: int, wait_time_seconds: int) -> List[Dict]:
+        result = self._get_client().receive_message(
+            QueueUrl=self._get_queue_url(),
+            AttributeNames=["All"],
+            MessageAttributeNames=["All"],
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=wait_time_seconds,
+        )
+        return result.get("Messages") or []
+
+    def receive_batch(self) -> List[Dict]:
+        """
+        Receives the next batch of messages. Waits up to ``SQS_LONG_POLL_SECONDS`` for the first messages, and then
+        gathers more messages until the batch size is reached or the batching window of the mapping has passed.
+
+        :return: the received messages (an empty list if no messages arrived)
+        """
+        batch_size = self._get_batch_size()
+        messages = self._receive(min(batch_size, SQS_MAX_RECEIVE_MESSAGES), SQS_LONG_POLL_SECONDS)
+        if not messages:
+            return messages
+
+        window = self.mapping.get("MaximumBatchingWindowInSeconds") or 0
+        deadline = time.time() + window
+        while len(messages) < batch_size and self.running:
+            remaining = deadline - time.time()
+            # the wait time of a receive call is an integer, this may exceed the window by up to half a second
+            wait_time_seconds = max(0, min(SQS_LONG_POLL_SECONDS, round(remaining)))
+            received = self._receive(
+                min(batch_size - len(messages), SQS_MAX_RECEIVE_MESSAGES), wait_time_seconds
+            )
+            messages.extend(received)
+            if not received and not wait_time_seconds:
+                break
+            if remaining <= 0 and len(received) < SQS_MAX_RECEIVE_MESSAGES:
+                # without a batching window, only continue while there is a backlog
+                break
+        return messages
+
+    def _release(self, messages: List[Dict]):
+        entries = [
+            {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"], "VisibilityTimeout": 0}
+            for i, message in enumerate(messages)
+        ]
+        try:
+            for i in range(0, len(entries), SQS_MAX_RECEIVE_MESSAGES):
+                self._get_client().change_message_visibility_batch(
+                    QueueUrl=self._get_queue_url(),
+                    Entries=entries[i : i + SQS_MAX_RECEIVE_MESSAGES],
+                )
+        except Exception as e:
+            LOG.debug("Unable to release SQS messages of queue %s: %s", self.queue_arn, e)
+
 
 class SQSEventSourceListener(EventSourceListener):
-    # SQS listener thread settings
-    SQS_LISTENER_THREAD: Dict = {}
-    SQS_POLL_INTERVAL_SEC: float = 1
+    # maps the UUIDs of the event source mappings to their pollers
+    SQS_POLLERS: Dict[str, SqsMappingPoller] = {}
+    SQS_POLLERS_LOCK = threading.RLock()
 
     @staticmethod
     def source_type():
         return "sqs"
 
     def start(self):
-        if self.SQS_LISTENER_THREAD:
-            return
-
-        LOG.debug("Starting SQS message polling thread for Lambda API")
-        self.SQS_LISTENER_THREAD["_thread_"] = thread = FuncThread(self._listener_loop)
-        thread.start()
+        """
+        Synchronizes the pollers with the SQS event source mappings. This is called whenever an event source mapping
+        is created, updated, or deleted.
+        """
+        with self.SQS_POLLERS_LOCK:
+            sources = {
+                source["UUID"]: source
+                for source in self.get_matching_event_sources()
+                if source.get("State", "Enabled") == "Enabled"
+            }
+            for uuid, poller in list(self.SQS_POLLERS.items()):
+                if sources.get(uuid) is not poller.mapping:
+                    LOG.debug("Stopping SQS poller for event source mapping %s", uuid)
+                    poller.stop()
+                    self.SQS_POLLERS.pop(uuid)
+
+            for uuid, source in sources.items():
+                if uuid not in self.SQS_POLLERS:
+                    LOG.debug("Starting SQS poller for event source mapping %s", uuid)
+                    poller = self.SQS_POLLERS[uuid] = SqsMappingPoller(self, source)
+                    poller.start()
 
     def get_matching_event_sources(self) -> List[Dict]:
         return get_event_sources(source_arn=r".*:sqs:.*")
 
-    def _listener_loop(self, *args):
-        while True:
-            try:
-                sources = self.get_matching_event_sources()
-                if not sources:
-                    # Temporarily disable polling if no event sources are configured
-                    # anymore. The loop will get restarted next time a message
-                    # arrives and if an event source is configured.
-                    self.SQS_LISTENER_THREAD.pop("_thread_")
-                    return
-
-                for source in sources:
-                    queue_arn = source["EventSourceArn"]
-                    region_name = extract_region_from_arn(queue_arn)
-                    sqs_client = aws_stack.connect_to_service("sqs", region_name=region_name)
-                    batch_size = max(min(source.get("BatchSize", 1), 10), 1)
-
-                    try:
-                        queue_url = aws_stack.sqs_queue_url_for_arn(queue_arn)
-                        result = sqs_client.receive_message(
-                            QueueUrl=queue_url,
-                            AttributeNames=["All"],
-                            MessageAttributeNames=["All"],
-                            MaxNumberOfMessages=batch_size,
-                        )
-                        messages = result.get("Messages")
-                        if not messages:
-                            continue
-
-                        self._process_messages_for_event_source(source, messages)
-
-                    except Exception as e:
-                        if "NonExistentQueue" not in str(e):
-                            # TODO: remove event source if queue does no longer exist?
-                            LOG.debug("Unable to poll SQS messages for queue %s: %s", queue_arn, e)
-
-            except Exception:
-                pass
-            finally:
-                time.sleep(self.SQS_POLL_INTERVAL_SEC)
-
     def _process_messages_for_event_source(self, source, messages) -> bool:
         lambda_arn = source["FunctionArn"]
         queue_arn = source["EventSourceArn"]
@@ -165,7 +300,10 @@ class SQSEventSourceListener(EventSourceListener):
                 ]
 
             try:
-                sqs_client.delete_message_batch(QueueUrl=queue_url, Entries=entries)
+                for i in range(0, len(entries), SQS_MAX_RECEIVE_MESSAGES):
+                    sqs_client.delete_message_batch(
+                        QueueUrl=queue_url, Entries=entries[i : i + SQS_MAX_RECEIVE_MESSAGES]
+                    )
             except Exception as e:
                 LOG.info(
                     "Unable to delete Lambda events from SQS queue "
@@ -215,18 +353,28 @@ class SQSEventSourceListener(EventSourceListener):
             return True
 
         event = {"Records": records}
+        invocation_done = threading.Event()
+
+        def on_invocation_done(*args, **kwargs):
+            try:
+                delete_messages(*args, **kwargs)
+            finally:
+                invocation_done.set()
 
         res = run_lambda(
             func_arn=lambda_arn,
             event=event,
             context={},
             asynchronous=True,
-            callback=delete_messages,
+            callback=on_invocation_done,
         )
         if isinstance(res, InvocationResult):
             status_code = getattr(res.result, "status_code", 0)
             if status_code >= 400:
                 return False
+            if res.result is None:
+                # the poller processes the next batch once the (asynchronous) invocation has finished
+                invocation_done.wait(SQS_INVOCATION_TIMEOUT)
         return True
 
 
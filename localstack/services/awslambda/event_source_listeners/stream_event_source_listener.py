@@ -2,6 +2,8 @@ import logging
 import math
 import threading
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 
 from localstack import config
@@ -11,12 +13,11 @@ from localstack.services.awslambda.event_source_listeners.event_source_listener
 )
 from localstack.services.awslambda.lambda_api import run_lambda
 from localstack.services.awslambda.lambda_executors import InvocationResult
-from localstack.services.awslambda.lambda_utils import (
-    filter_stream_records,
-    get_lambda_event_filters_for_arn,
-)
+from localstack.services.awslambda.lambda_utils import filter_stream_records
+from localstack.services.kinesis import engine as kinesis_engine
 from localstack.utils.aws.aws_stack import extract_region_from_arn
 from localstack.utils.aws.message_forwarding import send_event_to_target
+from localstack.utils.cloudwatch.cloudwatch_util import publish_lambda_metric
 from localstack.utils.common import long_uid, timestamp_millis
 from localstack.utils.threads import FuncThread
 
@@ -41,6 +42,15 @@ class StreamEventSourceListener(EventSourceListener):
     ] = {}  # Threads for listening to stream shards and forwarding data to mapped Lambdas
     _POLL_INTERVAL_SEC: float = 1
     _FAILURE_PAYLOAD_DETAILS_FIELD_NAME = ""  # To be defined by inheriting classes
+    # maximum number of concurrent invocations of the batches of parallelized shards, across all mappings
+    _MAX_PARALLEL_INVOCATIONS = 64
+    _EXECUTOR: Optional[ThreadPoolExecutor] = None
+    _EXECUTOR_LOCK = threading.Lock()
+    # age (in milliseconds) of the last record processed by each shard listener
+    _ITERATOR_AGES: Dict[str, float] = {}
+    # minimum interval between two IteratorAge metrics published for a shard listener
+    _METRICS_INTERVAL_SEC: float = 10
+    _METRICS_PUBLISHED: Dict[str, float] = {}
 
     @staticmethod
     def source_type() -> Optional[str]:
@@ -79,6 +89,13 @@ class StreamEventSourceListener(EventSourceListener):
         """
         raise NotImplementedError
 
+    def _get_records(self, stream_client, shard_iterator: str, limit: int) -> Dict:
+        """
+        :returns: The records response object returned by the client's get_records method, which contains the
+                  ``Records`` and the ``NextShardIterator``
+        """
+        return stream_client.get_records(ShardIterator=shard_iterator, Limit=limit)
+
     def _create_lambda_event_payload(
         self, stream_arn: str, records: List[Dict], shard_id: Optional[str] = None
     ) -> Dict:
@@ -110,6 +127,21 @@ class StreamEventSourceListener(EventSourceListener):
         """
         raise NotImplementedError
 
+    def _get_partition_key(self, record: Dict) -> str:
+        """
+        to be implemented by subclasses
+        :returns: the key which determines the order of the given record, i.e., records with the same key are
+                  processed in order when the shard is processed in parallel
+        """
+        raise NotImplementedError
+
+    def _get_arrival_time(self, record: Dict) -> Optional[float]:
+        """
+        to be implemented by subclasses
+        :returns: the time the given record entered the source stream, in seconds since the epoch
+        """
+        raise NotImplementedError
+
     def start(self):
         """
         Spawn coordinator thread for listening to relevant new/removed event source mappings
@@ -156,85 +188,195 @@ class StreamEventSourceListener(EventSourceListener):
         This function is intended to be invoked as a FuncThread. Because FuncThreads can only take a single argument,
         we pack the numerous arguments needed to invoke this method into a single dictionary.
         :param params: Dictionary containing the following elements needed to execute this method:
-            * function_arn: ARN of the Lambda function to invoke
+            * source: the event source mapping. It is read for every batch (and replaced by the coordinator thread),
+                      hence updates of the mapping (e.g., of the batch size or the function) take effect right away
             * stream_arn: ARN of the stream associated with the shard to listen on
-            * batch_size: number of records to pass to the Lambda function per invocation
-            * parallelization_factor: parallelization factor for executing lambda funcs asynchronously
             * lock_discriminator: discriminator for checking semaphore on lambda function execution. Also used for
                                   checking if this listener loops should continue to run.
             * shard_id: ID of the shard to listen on
             * stream_client: AWS service client for communicating with the stream API
             * shard_iterator: shard iterator object for iterating over records in stream
-            * max_num_retries: maximum number of times to attempt invoking a batch against the Lambda before giving up
-                               and moving on
-            * failure_destination: Optional destination config for sending record metadata to if Lambda invocation fails
-                                   more than max_num_retries
-        """
-        # TODO: These values will never get updated if the event source mapping configuration changes :(
-        function_arn = params["function_arn"]
-        stream_arn = params["stream_arn"]
-        batch_size = params["batch_size"]
-        parallelization_factor = params["parallelization_factor"]
+        """
         lock_discriminator = params["lock_discriminator"]
-        shard_id = params["shard_id"]
         stream_client = params["stream_client"]
         shard_iterator = params["shard_iterator"]
-        failure_destination = params["failure_destination"]
-        max_num_retries = params["max_num_retries"]
-        num_invocation_failures = 0
 
-        while lock_discriminator in self._STREAM_LISTENER_THREADS:
-            records_response = stream_client.get_records(
-                ShardIterator=shard_iterator, Limit=batch_size
+        while shard_iterator is not None and lock_discriminator in self._STREAM_LISTENER_THREADS:
+            source = params["source"]
+            records, shard_iterator = self._get_batch(
+                stream_client,
+                shard_iterator,
+                source.get("BatchSize") or 10,
+                source.get("MaximumBatchingWindowInSeconds") or 0,
             )
-            records = records_response.get("Records")
-            event_filter_criterias = get_lambda_event_filters_for_arn(function_arn, stream_arn)
-            if len(event_filter_criterias) > 0:
-                records = filter_stream_records(records, event_filter_criterias)
-
-            should_get_next_batch = True
+            if not records:
+                # the backlog is drained, wait for new records
+                if shard_iterator is not None:
+                    self._wait_for_records(shard_iterator)
+                continue
+            self._report_iterator_age(source, lock_discriminator, records[-1])
+            if source.get("FilterCriteria"):
+                records = filter_stream_records(records, [source["FilterCriteria"]])
             if records:
-                payload = self._create_lambda_event_payload(stream_arn, records, shard_id=shard_id)
-                is_invocation_successful, status_code = self._invoke_lambda(
-                    function_arn, payload, lock_discriminator, parallelization_factor
+                self._process_batch(params, records)
+
+    def _get_batch(
+        self, stream_client, shard_iterator: str, batch_size: int, batching_window: float
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Reads the next batch of records from the shard. Records are read until the batch is full, or until the
+        batching window (in seconds) has passed since the first record of the batch has been read.
+        :returns: the records of the batch, and the shard iterator of the following records
+        """
+        records = []
+        deadline = None
+        while True:
+            records_response = self._get_records(
+                stream_client, shard_iterator, batch_size - len(records)
+            )
+            records.extend(records_response.get("Records") or [])
+            shard_iterator = records_response.get("NextShardIterator")
+            if not records or shard_iterator is None:
+                return records, shard_iterator
+            # the batching window starts with the first record of the batch
+            deadline = deadline or time.time() + batching_window
+            remaining = deadline - time.time()
+            if len(records) >= batch_size or remaining <= 0:
+                return records, shard_iterator
+            self._wait_for_records(shard_iterator, min(remaining, self._POLL_INTERVAL_SEC))
+
+    def _process_batch(self, params: Dict, records: List[Dict]):
+        """
+        Invokes the Lambda function with the given batch, and retries the records of failed invocations until the
+        maximum number of retries of the event source mapping has been reached.
+        """
+        lock_discriminator = params["lock_discriminator"]
+        num_invocation_failures = 0
+        while lock_discriminator in self._STREAM_LISTENER_THREADS:
+            source = params["source"]
+            records, status_code = self._invoke_lambda_in_parallel(params, records)
+            if not records:
+                return
+            num_invocation_failures += 1
+            max_num_retries = source.get("MaximumRetryAttempts", -1)
+            if max_num_retries < 0:
+                max_num_retries = math.inf
+            if num_invocation_failures >= max_num_retries:
+                failure_destination = (
+                    source.get("DestinationConfig", {}).get("OnFailure", {}).get("Destination")
                 )
-                if is_invocation_successful:
-                    should_get_next_batch = True
-                else:
-                    num_invocation_failures += 1
-                    if num_invocation_failures >= max_num_retries:
-                        should_get_next_batch = True
-                        if failure_destination:
-                            first_rec = records[0]
-                            last_rec = records[-1]
-                            (
-                                first_seq_num,
-                                last_seq_num,
-                            ) = self._get_starting_and_ending_sequence_numbers(first_rec, last_rec)
-                            (
-                                first_arrival_time,
-                                last_arrival_time,
-                            ) = self._get_first_and_last_arrival_time(first_rec, last_rec)
-                            self._send_to_failure_destination(
-                                shard_id,
-                                first_seq_num,
-                                last_seq_num,
-                                stream_arn,
-                                function_arn,
-                                num_invocation_failures,
-                                status_code,
-                                batch_size,
-                                first_arrival_time,
-                                last_arrival_time,
-                                failure_destination,
-                            )
-                    else:
-                        should_get_next_batch = False
-            if should_get_next_batch:
-                shard_iterator = records_response["NextShardIterator"]
-                num_invocation_failures = 0
+                if failure_destination:
+                    first_rec = records[0]
+                    last_rec = records[-1]
+                    first_seq_num, last_seq_num = self._get_starting_and_ending_sequence_numbers(
+                        first_rec, last_rec
+                    )
+                    first_arrival_time, last_arrival_time = self._get_first_and_last_arrival_time(
+                        first_rec, last_rec
+                    )
+                    self._send_to_failure_destination(
+                        params["shard_id"],
+                        first_seq_num,
+                        last_seq_num,
+                        params["stream_arn"],
+                        source["FunctionArn"],
+                        num_invocation_failures,
+                        status_code,
+                        source.get("BatchSize") or 10,
+                        first_arrival_time,
+                        last_arrival_time,
+                        failure_destination,
+                    )
+                return
+            # retry the failed records after the poll interval
             time.sleep(self._POLL_INTERVAL_SEC)
 
+    def _invoke_lambda_in_parallel(
+        self, params: Dict, records: List[Dict]
+    ) -> Tuple[List[Dict], int]:
+        """
+        Invokes the Lambda function with the given records. With a ParallelizationFactor greater than 1, the records
+        are split by their partition keys into concurrently processed batches, which keeps the records with the same
+        partition key in order.
+        :returns: the records of the failed invocations, and the status code of the last failed invocation
+        """
+        source = params["source"]
+        parallelization_factor = source.get("ParallelizationFactor") or 1
+        batches = self._partition_records(records, parallelization_factor)
+
+        def _invoke(batch: List[Dict]) -> Tuple[bool, int]:
+            payload = self._create_lambda_event_payload(
+                params["stream_arn"], batch, shard_id=params["shard_id"]
+            )
+            return self._invoke_lambda(
+                source["FunctionArn"],
+                payload,
+                params["lock_discriminator"],
+                parallelization_factor,
+            )
+
+        if len(batches) == 1:
+            results = [_invoke(batches[0])]
+        else:
+            results = list(self._get_executor().map(_invoke, batches))
+
+        failed_records = []
+        failed_status_code = 0
+        for batch, (is_invocation_successful, status_code) in zip(batches, results):
+            if not is_invocation_successful:
+                failed_records.extend(batch)
+                failed_status_code = status_code
+        return failed_records, failed_status_code
+
+    def _partition_records(
+        self, records: List[Dict], parallelization_factor: int
+    ) -> List[List[Dict]]:
+        """Splits the given records into at most ``parallelization_factor`` batches by their partition keys."""
+        if parallelization_factor <= 1 or len(records) <= 1:
+            return [records]
+        batches: Dict[int, List[Dict]] = {}
+        for record in records:
+            partition_key = self._get_partition_key(record)
+            index = zlib.crc32(partition_key.encode("utf-8")) % parallelization_factor
+            batches.setdefault(index, []).append(record)
+        return list(batches.values())
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._EXECUTOR_LOCK:
+            if not StreamEventSourceListener._EXECUTOR:
+                StreamEventSourceListener._EXECUTOR = ThreadPoolExecutor(
+                    max_workers=cls._MAX_PARALLEL_INVOCATIONS, thread_name_prefix="stream-esm"
+                )
+            return StreamEventSourceListener._EXECUTOR
+
+    def _report_iterator_age(self, source: Dict, lock_discriminator: str, last_record: Dict):
+        """
+        Records the age of the last record of a batch (i.e., how far the mapping lags behind the stream), and
+        publishes it as the IteratorAge metric of the function at most every _METRICS_INTERVAL_SEC seconds.
+        """
+        arrival_time = self._get_arrival_time(last_record)
+        if arrival_time is None:
+            return
+        iterator_age = max(time.time() - arrival_time, 0) * 1000
+        self._ITERATOR_AGES[lock_discriminator] = iterator_age
+        now = time.time()
+        if now - self._METRICS_PUBLISHED.get(lock_discriminator, 0) < self._METRICS_INTERVAL_SEC:
+            return
+        self._METRICS_PUBLISHED[lock_discriminator] = now
+        publish_lambda_metric("IteratorAge", iterator_age, {"func_arn": source["FunctionArn"]})
+
+    def _wait_for_records(self, shard_iterator: str, timeout: float = None):
+        """
+        Waits until new records may be available for the given shard iterator. The streams of the in-process Kinesis
+        engine notify the waiting listeners as soon as records are appended, other streams are polled.
+        """
+        timeout = self._POLL_INTERVAL_SEC if timeout is None else timeout
+        if kinesis_engine.is_enabled():
+            kinesis_engine.wait_for_records(shard_iterator, timeout)
+        else:
+            time.sleep(timeout)
+
     def _send_to_failure_destination(
         self,
         shard_id,
@@ -304,15 +446,6 @@ class StreamEventSourceListener(EventSourceListener):
                     stream_arn = source["EventSourceArn"]
                     region_name = extract_region_from_arn(stream_arn)
                     stream_client = self._get_stream_client(region_name)
-                    batch_size = source.get("BatchSize", 10)
-                    failure_destination = (
-                        source.get("DestinationConfig", {})
-                        .get("OnFailure", {})
-                        .get("Destination", None)
-                    )
-                    max_num_retries = source.get("MaximumRetryAttempts", -1)
-                    if max_num_retries < 0:
-                        max_num_retries = math.inf
                     stream_description = self._get_stream_description(stream_client, stream_arn)
                     if stream_description["StreamStatus"] not in {"ENABLED", "ACTIVE"}:
                         continue
@@ -321,35 +454,37 @@ class StreamEventSourceListener(EventSourceListener):
                     for shard_id in shard_ids:
                         lock_discriminator = f"{mapping_uuid}/{stream_arn}/{shard_id}"
                         mapped_shard_ids.add(lock_discriminator)
-                        if lock_discriminator not in self._STREAM_LISTENER_THREADS:
-                            shard_iterator = self._get_shard_iterator(
-                                stream_client,
-                                stream_arn,
-                                shard_id,
-                                source["StartingPosition"],
-                            )
-                            listener_thread = FuncThread(
-                                self._listen_to_shard_and_invoke_lambda,
-                                {
-                                    "function_arn": source["FunctionArn"],
-                                    "stream_arn": stream_arn,
-                                    "batch_size": batch_size,
-                                    "parallelization_factor": source["ParallelizationFactor"],
-                                    "lock_discriminator": lock_discriminator,
-                                    "shard_id": shard_id,
-                                    "stream_client": stream_client,
-                                    "shard_iterator": shard_iterator,
-                                    "failure_destination": failure_destination,
-                                    "max_num_retries": max_num_retries,
-                                },
-                            )
-                            self._STREAM_LISTENER_THREADS[lock_discriminator] = listener_thread
-                            listener_thread.start()
+                        listener_thread = self._STREAM_LISTENER_THREADS.get(lock_discriminator)
+                        if listener_thread:
+                            # the running listener picks up the current state of the mapping
+                            listener_thread.params["source"] = source
+                            continue
+                        shard_iterator = self._get_shard_iterator(
+                            stream_client,
+                            stream_arn,
+                            shard_id,
+                            source["StartingPosition"],
+                        )
+                        listener_thread = FuncThread(
+                            self._listen_to_shard_and_invoke_lambda,
+                            {
+                                "source": source,
+                                "stream_arn": stream_arn,
+                                "lock_discriminator": lock_discriminator,
+                                "shard_id": shard_id,
+                                "stream_client": stream_client,
+                                "shard_iterator": shard_iterator,
+                            },
+                        )
+                        self._STREAM_LISTENER_THREADS[lock_discriminator] = listener_thread
+                        listener_thread.start()
 
                 # stop any threads that are listening to a previously defined event source that no longer exists
                 orphaned_threads = set(self._STREAM_LISTENER_THREADS.keys()) - mapped_shard_ids
                 for thread_id in orphaned_threads:
                     self._STREAM_LISTENER_THREADS.pop(thread_id)
+                    self._ITERATOR_AGES.pop(thread_id, None)
+                    self._METRICS_PUBLISHED.pop(thread_id, None)
 
             except Exception as e:
                 LOG.exception(e)
@@ -50,6 +50,7 @@ from localstack.services.awslambda.lambda_utils import (
     get_zip_bytes,
     validate_filters,
 )
+from localstack.services.dynamodb.subscriptions import invalidate_table_subscriptions
 from localstack.services.generic_proxy import RegionBackend
 from localstack.services.install import INSTALL_DIR_STEPFUNCTIONS, install_go_lambda_runtime
 from localstack.utils.archives import unzip
@@ -102,11 +103,11 @@ BATCH_SIZE_RANGES = {
     "kafka": (100, 10000),
     "kinesis": (100, 10000),
     "dynamodb": (100, 1000),
-    "sqs": (
-        10,
-        10,
-    ),  # should be (10,10000) for normal SQS queues, (10,10) for FIFO https://docs.aws.amazon.com/lambda/latest/dg/API_CreateEventSourceMapping.html#SSS-CreateEventSourceMapping-request-BatchSize
+    # FIFO queues are limited to 10, see
+    # https://docs.aws.amazon.com/lambda/latest/dg/API_CreateEventSourceMapping.html#SSS-CreateEventSourceMapping-request-BatchSize
+    "sqs": (10, 10000),
 }
+SQS_FIFO_MAX_BATCH_SIZE = 10
 
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f+00:00"
 
@@ -203,15 +204,26 @@ def check_batch_size_range(source_arn, batch_size=None):
         raise ValueError(INVALID_PARAMETER_VALUE_EXCEPTION, "Unsupported event source type")
 
     batch_size = batch_size or batch_size_entry[0]
-    if batch_size > batch_size_entry[1]:
+    max_batch_size = batch_size_entry[1]
+    if source == "sqs" and source_arn.endswith(".fifo"):
+        max_batch_size = SQS_FIFO_MAX_BATCH_SIZE
+    if batch_size > max_batch_size:
         raise ValueError(
             INVALID_PARAMETER_VALUE_EXCEPTION,
-            "BatchSize {} exceeds the max of {}".format(batch_size, batch_size_entry[1]),
+            "BatchSize {} exceeds the max of {}".format(batch_size, max_batch_size),
         )
 
     return batch_size
 
 
+def check_batching_window(source_arn, batch_size, batching_window=None):
+    if source_arn.split(":")[2].lower() == "sqs" and batch_size > 10 and not batching_window:
+        raise ValueError(
+            INVALID_PARAMETER_VALUE_EXCEPTION,
+            "Maximum batch window in seconds must be greater than 0 if maximum batch size is greater than 10",
+        )
+
+
 def build_mapping_obj(data) -> Dict:
     mapping = {}
     function_name = data["FunctionName"]
@@ -236,6 +248,11 @@ def build_mapping_obj(data) -> Dict:
         mapping["StartingPosition"] = data.get("StartingPosition") or "LATEST"
     batch_size = check_batch_size_range(source_arn, batch_size)
     mapping["BatchSize"] = batch_size
+    if "MaximumBatchingWindowInSeconds" in data:
+        mapping["MaximumBatchingWindowInSeconds"] = data["MaximumBatchingWindowInSeconds"]
+    check_batching_window(source_arn, batch_size, mapping.get("MaximumBatchingWindowInSeconds"))
+    if data.get("ScalingConfig"):
+        mapping["ScalingConfig"] = data["ScalingConfig"]
 
     if data.get("DestinationConfig"):
         mapping["DestinationConfig"] = data.get("DestinationConfig")
@@ -270,6 +287,7 @@ def add_event_source(data):
     region = LambdaRegion.get()
     mapping = build_mapping_obj(data)
     region.event_source_mappings.append(mapping)
+    invalidate_table_subscriptions(mapping.get("EventSourceArn"))
     EventSourceListener.start_listeners(mapping)
     return mapping
 
@@ -292,11 +310,34 @@ def update_event_source(uuid_value, data):
                 batch_size = check_batch_size_range(
                     mapping["EventSourceArn"], batch_size or mapping["BatchSize"]
                 )
+            batching_window = data.get(
+                "MaximumBatchingWindowInSeconds", mapping.get("MaximumBatchingWindowInSeconds")
+            )
+            if "EventSourceArn" in mapping:
+                check_batching_window(mapping["EventSourceArn"], batch_size, batching_window)
             mapping["State"] = "Enabled" if enabled in [True, None] else "Disabled"
             mapping["LastModified"] = format_timestamp_for_event_source_mapping()
             mapping["BatchSize"] = batch_size
+            if batching_window is not None:
+                mapping["MaximumBatchingWindowInSeconds"] = batching_window
+            if data.get("ScalingConfig"):
+                mapping["ScalingConfig"] = data["ScalingConfig"]
+            if data.get("ParallelizationFactor"):
+                mapping["ParallelizationFactor"] = data["ParallelizationFactor"]
+            if data.get("MaximumRetryAttempts") is not None:
+                mapping["MaximumRetryAttempts"] = data["MaximumRetryAttempts"]
+            if data.get("DestinationConfig"):
+                mapping["DestinationConfig"] = data["DestinationConfig"]
+            if data.get("FilterCriteria"):
+                if not validate_filters(data["FilterCriteria"]):
+                    raise ValueError(
+                        INVALID_PARAMETER_VALUE_EXCEPTION, "Invalid filter pattern definition."
+                    )
+                mapping["FilterCriteria"] = data["FilterCriteria"]
             if "SourceAccessConfigurations" in (mapping and data):
                 mapping["SourceAccessConfigurations"] = data["SourceAccessConfigurations"]
+            invalidate_table_subscriptions(mapping.get("EventSourceArn"))
+            EventSourceListener.start_listeners(mapping)
             return mapping
     return {}
 
@@ -305,7 +346,11 @@ def delete_event_source(uuid_value):
     region = LambdaRegion.get()
     for i, m in enumerate(region.event_source_mappings):
         if uuid_value == m["UUID"]:
-            return region.event_source_mappings.pop(i)
+            mapping = region.event_source_mappings.pop(i)
+            invalidate_table_subscriptions(mapping.get("EventSourceArn"))
+            # stops the listeners of the mapping
+            EventSourceListener.start_listeners(mapping)
+            return mapping
     return {}
 
 
@@ -380,15 +380,21 @@ def filter_stream_record(filter_rule: Dict[str, any], record: Dict[str, any]) ->
     return all(filter_results)
 
 
+@lru_cache(maxsize=1024)
+def parse_filter_pattern(pattern: str) -> Dict:
+    """Parses the pattern of a filter rule. The parsed patterns are cached, and must not be modified."""
+    return json.loads(pattern)
+
+
 def filter_stream_records(records, filters: List[FilterCriteria]):
-    filtered_records = []
-    for record in records:
-        for filter in filters:
-            for rule in filter["Filters"]:
-                if filter_stream_record(json.loads(rule["Pattern"]), record):
-                    filtered_records.append(record)
-                    break
-    return filtered_records
+    patterns = [
+        parse_filter_pattern(rule["Pattern"]) for filter in filters for rule in filter["Filters"]
+    ]
+    return [
+        record
+        for record in records
+        if any(filter_stream_record(pattern, record) for pattern in patterns)
+    ]
 
 
 def contains_list(filter: Dict) -> bool:
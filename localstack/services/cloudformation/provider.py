@@ -153,6 +153,8 @@ class Stack:
         self.events = []
         # list of stack change sets
         self.change_sets = []
+        # cache of resolved references, used while the stack is being deployed
+        self.resolution_context = None
 
     def describe_details(self):
         attrs = [
@@ -217,6 +219,8 @@ class Stack:
         state["PreviousResourceStatus"] = state.get("ResourceStatus")
         state["ResourceStatus"] = status
         state["LastUpdatedTimestamp"] = timestamp_millis()
+        if self.resolution_context:
+            self.resolution_context.invalidate(resource_id)
         self.add_stack_event(resource_id, physical_res_id, status)
 
     def _set_resource_status_details(self, resource_id: str, physical_res_id: str = None):
@@ -217,8 +217,6 @@ def collect_metric_data(alarm_details: MetricAlarm, client: "CloudWatchClient")
     :param client: the cloudwatch client
     :return: list with data points
     """
-    metric_values = []
-
     evaluation_periods = alarm_details["EvaluationPeriods"]
     period = alarm_details["Period"]
 
@@ -228,20 +226,24 @@ def collect_metric_data(alarm_details: MetricAlarm, client: "CloudWatchClient")
     magic_number = max(math.floor(evaluation_periods / 3), 2)
     collected_periods = evaluation_periods + magic_number
 
-    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    end_time = datetime.utcnow().replace(tzinfo=timezone.utc, microsecond=0)
+    start_time = end_time - timedelta(seconds=period * collected_periods)
     metric_query = generate_metric_query(alarm_details)
 
-    # get_metric_data needs to be run in a loop, so we also collect empty data points on the right position
-    for i in range(0, collected_periods):
-        start_time = now - timedelta(seconds=period)
-        end_time = now
-        metric_data = client.get_metric_data(
-            MetricDataQueries=[metric_query], StartTime=start_time, EndTime=end_time
-        )["MetricDataResults"][0]
-        val = metric_data["Values"]
-        # oldest datapoint should be at the beginning of the list
-        metric_values.insert(0, val[0] if val else None)
-        now = start_time
+    # a single range query returns the datapoints of all periods, empty periods are filled with None
+    metric_data = client.get_metric_data(
+        MetricDataQueries=[metric_query],
+        StartTime=start_time,
+        EndTime=end_time,
+        ScanBy="TimestampAscending",
+    )["MetricDataResults"][0]
+    metric_values = [None] * collected_periods
+    for timestamp, value in zip(metric_data["Timestamps"], metric_data["Values"]):
+        # the timestamps are the start times of the periods, which may have been truncated to seconds
+        index = round((timestamp - start_time).total_seconds() / period)
+        if 0 <= index < collected_periods:
+            # oldest datapoint should be at the beginning of the list
+            metric_values[index] = value
     return metric_values
 
 
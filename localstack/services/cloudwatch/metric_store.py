@@ -0,0 +1,288 @@
+"""
+In-memory time-series store of the CloudWatch metrics, which serves GetMetricData and the evaluation of alarms.
+
+The datapoints of each metric (i.e., namespace, metric name, and set of dimensions) are kept in time-ordered columnar
+arrays, which hold the sample count, sum, minimum and maximum of every datapoint. A query computes all requested
+statistics for all periods of its time range in a single pass over the datapoints of the range, which are found by a
+binary search. Datapoints are downsampled to coarser resolutions as they age, following the retention periods of AWS.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from localstack.aws.api.cloudwatch import Dimensions, MetricDatum
+from localstack.services.generic_proxy import RegionBackend
+
+# (age in seconds, resolution in seconds): datapoints older than the age are merged into buckets of the resolution
+DOWNSAMPLING_TIERS = [
+    (63 * 24 * 60 * 60, 60 * 60),
+    (15 * 24 * 60 * 60, 5 * 60),
+    (3 * 60 * 60, 60),
+]
+# datapoints older than this are dropped
+RETENTION_SECONDS = 455 * 24 * 60 * 60
+# minimum interval between two downsampling passes over a metric
+DOWNSAMPLING_INTERVAL = 5 * 60
+
+STATISTICS = {
+    "samplecount": "SampleCount",
+    "sum": "Sum",
+    "average": "Average",
+    "minimum": "Minimum",
+    "maximum": "Maximum",
+}
+PERCENTILE_REGEX = re.compile(r"^p(\d{1,2}(?:\.\d+)?|100)$", re.IGNORECASE)
+
+MetricKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+def get_metric_key(namespace: str, metric_name: str, dimensions: Optional[Dimensions]) -> MetricKey:
+    dimension_set = tuple(sorted((d["Name"], d["Value"]) for d in dimensions or []))
+    return namespace, metric_name, dimension_set
+
+
+def normalize_statistic(stat: str) -> str:
+    """Returns the canonical name of the given statistic (e.g., "SampleCount" for "samplecount"), or raises a
+    ValueError for statistics which are not supported."""
+    statistic = STATISTICS.get(stat.lower())
+    if statistic:
+        return statistic
+    if PERCENTILE_REGEX.match(stat):
+        return stat.lower()
+    raise ValueError(f"Unsupported statistic {stat}")
+
+
+def to_epoch_seconds(timestamp) -> float:
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        if not timestamp.tzinfo:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class MetricSeries:
+    """
+    The datapoints of a single metric, in columnar arrays ordered by time. Every datapoint is an aggregate of one or
+    more samples, i.e., a single value is stored with a sample count of 1 and the value as sum, minimum, and maximum.
+    """
+
+    def __init__(self):
+        self.times = array("d")
+        self.counts = array("d")
+        self.sums = array("d")
+        self.minimums = array("d")
+        self.maximums = array("d")
+        self.last_downsampled = time.time()
+        # time up to which the datapoints have been merged into the resolution of each tier
+        self._downsampled_until: Dict[int, float] = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, timestamp: float, count: float, total: float, minimum: float, maximum: float):
+        if not self.times or timestamp >= self.times[-1]:
+            index = len(self.times)
+        else:
+            index = bisect.bisect_right(self.times, timestamp)
+        if index == len(self.times):
+            self.times.append(timestamp)
+            self.counts.append(count)
+            self.sums.append(total)
+            self.minimums.append(minimum)
+            self.maximums.append(maximum)
+        else:
+            self.times.insert(index, timestamp)
+            self.counts.insert(index, count)
+            self.sums.insert(index, total)
+            self.minimums.insert(index, minimum)
+            self.maximums.insert(index, maximum)
+
+    def get_statistics(
+        self, start: float, end: float, period: int, statistics: Iterable[str]
+    ) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        Computes the given statistics for the periods of the time range [start, end), and returns the start time and
+        the statistics of each period which contains datapoints, in ascending order.
+        """
+        lower = bisect.bisect_left(self.times, start)
+        upper = bisect.bisect_left(self.times, end)
+        if lower >= upper:
+            return []
+        statistics = set(statistics)
+        percentiles = [stat for stat in statistics if stat.startswith("p")]
+
+        num_periods = max(int(math.ceil((end - start) / period)), 1)
+        counts = [0.0] * num_periods
+        sums = [0.0] * num_periods
+        minimums = [math.inf] * num_periods
+        maximums = [-math.inf] * num_periods
+        samples: Dict[int, List[Tuple[float, float]]] = {}
+
+        # single pass over the datapoints of the time range, which aggregates all periods at once
+        times, point_counts, point_sums = self.times, self.counts, self.sums
+        point_minimums, point_maximums = self.minimums, self.maximums
+        for i in range(lower, upper):
+            index = int((times[i] - start) // period)
+            counts[index] += point_counts[i]
+            sums[index] += point_sums[i]
+            if point_minimums[i] < minimums[index]:
+                minimums[index] = point_minimums[i]
+            if point_maximums[i] > maximums[index]:
+                maximums[index] = point_maximums[i]
+            if percentiles and point_counts[i]:
+                # aggregated datapoints only contribute their average to the percentiles
+                value = (
+                    point_minimums[i]
+                    if point_minimums[i] == point_maximums[i]
+                    else point_sums[i] / point_counts[i]
+                )
+                samples.setdefault(index, []).append((value, point_counts[i]))
+
+        result = []
+        for index in range(num_periods):
+            count = counts[index]
+            if not count:
+                continue
+            values = {}
+            for stat in statistics:
+                if stat == "SampleCount":
+                    values[stat] = count
+                elif stat == "Sum":
+                    values[stat] = sums[index]
+                elif stat == "Average":
+                    values[stat] = sums[index] / count
+                elif stat == "Minimum":
+                    values[stat] = minimums[index]
+                elif stat == "Maximum":
+                    values[stat] = maximums[index]
+                else:
+                    values[stat] = _get_percentile(samples.get(index, []), float(stat[1:]))
+            result.append((start + index * period, values))
+        return result
+
+    def downsample(self, now: float):
+        """Drops the datapoints beyond the retention period, and merges old datapoints into coarser resolutions."""
+        self.last_downsampled = now
+        expired = bisect.bisect_left(self.times, now - RETENTION_SECONDS)
+        if expired:
+            for column in self._columns():
+                del column[:expired]
+        for age, resolution in DOWNSAMPLING_TIERS:
+            cutoff = math.floor((now - age) / resolution) * resolution
+            # the bucket which contains the previous cutoff may only be merged partially so far
+            previous = self._downsampled_until.get(resolution)
+            start = 0 if previous is None else math.floor(previous / resolution) * resolution
+            self._merge(start, cutoff, resolution)
+            self._downsampled_until[resolution] = cutoff
+
+    def _merge(self, start: float, end: float, resolution: int):
+        lower = bisect.bisect_left(self.times, start)
+        upper = bisect.bisect_left(self.times, end)
+        if upper - lower < 2:
+            return
+        merged = [array("d") for _ in range(5)]
+        for i in range(lower, upper):
+            bucket = math.floor(self.times[i] / resolution) * resolution
+            if merged[0] and merged[0][-1] == bucket:
+                merged[1][-1] += self.counts[i]
+                merged[2][-1] += self.sums[i]
+                merged[3][-1] = min(merged[3][-1], self.minimums[i])
+                merged[4][-1] = max(merged[4][-1], self.maximums[i])
+            else:
+                merged[0].append(bucket)
+                merged[1].append(self.counts[i])
+                merged[2].append(self.sums[i])
+                merged[3].append(self.minimums[i])
+                merged[4].append(self.maximums[i])
+        for column, values in zip(self._columns(), merged):
+            column[lower:upper] = values
+
+    def _columns(self) -> List[array]:
+        return [self.times, self.counts, self.sums, self.minimums, self.maximums]
+
+
+def _get_percentile(samples: List[Tuple[float, float]], percentile: float) -> Optional[float]:
+    if not samples:
+        return None
+    samples = sorted(samples)
+    rank = sum(count for _, count in samples) * percentile / 100
+    cumulative = 0.0
+    for value, count in samples:
+        cumulative += count
+        if cumulative >= rank:
+            return value
+    return samples[-1][0]
+
+
+class MetricStore(RegionBackend):
+    # maps the metric keys to the datapoints of the metrics
+    series: Dict[MetricKey, MetricSeries]
+
+    def __init__(self):
+        self.series = {}
+        self.mutex = threading.RLock()
+
+    def put_metric_data(self, namespace: str, metric_data: List[MetricDatum]):
+        now = time.time()
+        with self.mutex:
+            for datum in metric_data:
+                key = get_metric_key(namespace, datum["MetricName"], datum.get("Dimensions"))
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = MetricSeries()
+                timestamp = to_epoch_seconds(datum.get("Timestamp"))
+                if datum.get("StatisticValues"):
+                    stats = datum["StatisticValues"]
+                    series.add(
+                        timestamp,
+                        stats["SampleCount"],
+                        stats["Sum"],
+                        stats["Minimum"],
+                        stats["Maximum"],
+                    )
+                elif datum.get("Values"):
+                    counts = datum.get("Counts") or [1] * len(datum["Values"])
+                    for value, count in zip(datum["Values"], counts):
+                        series.add(timestamp, count, value * count, value, value)
+                else:
+                    value = datum.get("Value", 0)
+                    series.add(timestamp, 1, value, value, value)
+                if now - series.last_downsampled > DOWNSAMPLING_INTERVAL:
+                    series.downsample(now)
+
+    def get_statistics(
+        self,
+        key: MetricKey,
+        start: float,
+        end: float,
+        period: int,
+        statistics: Iterable[str],
+    ) -> List[Tuple[float, Dict[str, float]]]:
+        with self.mutex:
+            series = self.series.get(key)
+            if not series:
+                return []
+            return series.get_statistics(start, end, period, statistics)
+
+    def get_metric_values(
+        self,
+        key: MetricKey,
+        start: float,
+        end: float,
+        period: int,
+        statistic: str,
+    ) -> List[Optional[float]]:
+        """Returns the value of the statistic for every period of the time range, or None for empty periods."""
+        num_periods = max(int(math.ceil((end - start) / period)), 1)
+        values: List[Optional[float]] = [None] * num_periods
+        statistic = normalize_statistic(statistic)
+        for timestamp, stats in self.get_statistics(key, start, end, period, [statistic]):
+            values[int((timestamp - start) // period)] = stats[statistic]
+        return values
@@ -1,5 +1,6 @@
 import json
 import logging
+from datetime import datetime, timezone
 from xml.sax.saxutils import escape
 
 from moto.cloudwatch import cloudwatch_backends
@@ -13,9 +14,14 @@ from localstack.aws.api.cloudwatch import (
     CloudwatchApi,
     DescribeAlarmsInput,
     DescribeAlarmsOutput,
+    GetMetricDataInput,
+    GetMetricDataOutput,
     ListTagsForResourceOutput,
+    MetricDataResult,
     PutCompositeAlarmInput,
     PutMetricAlarmInput,
+    PutMetricDataInput,
+    ScanBy,
     StateValue,
     TagKeyList,
     TagList,
@@ -26,6 +32,12 @@ from localstack.constants import DEFAULT_AWS_ACCOUNT_ID
 from localstack.http import Request
 from localstack.services import moto
 from localstack.services.cloudwatch.alarm_scheduler import AlarmScheduler
+from localstack.services.cloudwatch.metric_store import (
+    MetricStore,
+    get_metric_key,
+    normalize_statistic,
+    to_epoch_seconds,
+)
 from localstack.services.edge import ROUTER
 from localstack.services.plugins import SERVICE_PLUGINS, ServiceLifecycleHook
 from localstack.utils.aws import aws_stack
@@ -135,6 +147,24 @@ def put_metric_alarm(
     )
 
 
+@patch(target=CloudWatchBackend.put_metric_data)
+def put_metric_data(target, self, namespace, metric_data):
+    # moto only stores single values, hence datums with Values and Counts are stored as one datum per sample
+    expanded = []
+    for metric in metric_data:
+        values = metric.get("Values.member")
+        if not values:
+            expanded.append(metric)
+            continue
+        counts = metric.get("Counts.member") or [1] * len(values)
+        for value, count in zip(values, counts):
+            datum = {key: val for key, val in metric.items() if not key.endswith(".member")}
+            datum["Dimensions.member"] = metric.get("Dimensions.member", [])
+            datum["Value"] = value
+            expanded.extend([datum] * int(float(count)))
+    target(self, namespace, expanded)
+
+
 def create_message_response_update_state(alarm, old_state):
     response = {
         "AWSAccountId": get_aws_account_id(),
@@ -267,6 +297,72 @@ class CloudwatchProvider(CloudwatchApi, ServiceLifecycleHook):
         ]
         return {"metrics": result}
 
+    @handler("PutMetricData", expand=False)
+    def put_metric_data(self, context: RequestContext, request: PutMetricDataInput) -> None:
+        # moto keeps serving ListMetrics and GetMetricStatistics, the store serves GetMetricData and the alarms
+        moto.call_moto(context)
+        store = MetricStore.get(context.region, context.account_id)
+        store.put_metric_data(request["Namespace"], request["MetricData"])
+
+    @handler("GetMetricData", expand=False)
+    def get_metric_data(
+        self, context: RequestContext, request: GetMetricDataInput
+    ) -> GetMetricDataOutput:
+        queries = request["MetricDataQueries"]
+        if not all(query.get("MetricStat") for query in queries):
+            # metric math expressions are not supported by the metric store
+            return moto.call_moto(context)
+
+        store = MetricStore.get(context.region, context.account_id)
+        start = to_epoch_seconds(request["StartTime"])
+        end = to_epoch_seconds(request["EndTime"])
+        descending = request.get("ScanBy", ScanBy.TimestampDescending) == ScanBy.TimestampDescending
+
+        # the statistics of the queries for the same metric and period are computed with a single pass
+        statistics = {}
+        for query in queries:
+            metric_stat = query["MetricStat"]
+            metric = metric_stat["Metric"]
+            key = get_metric_key(
+                metric["Namespace"], metric["MetricName"], metric.get("Dimensions")
+            )
+            try:
+                stat = normalize_statistic(metric_stat["Stat"])
+            except ValueError as e:
+                raise ValidationError(str(e))
+            statistics.setdefault((key, metric_stat["Period"]), set()).add(stat)
+        datapoints = {
+            (key, period): store.get_statistics(key, start, end, period, stats)
+            for (key, period), stats in statistics.items()
+        }
+
+        results = []
+        for query in queries:
+            if query.get("ReturnData") is False:
+                continue
+            metric_stat = query["MetricStat"]
+            metric = metric_stat["Metric"]
+            key = get_metric_key(
+                metric["Namespace"], metric["MetricName"], metric.get("Dimensions")
+            )
+            stat = normalize_statistic(metric_stat["Stat"])
+            points = datapoints[(key, metric_stat["Period"])]
+            if descending:
+                points = list(reversed(points))
+            results.append(
+                MetricDataResult(
+                    Id=query["Id"],
+                    Label=query.get("Label") or f"{metric['MetricName']} {metric_stat['Stat']}",
+                    Timestamps=[
+                        datetime.fromtimestamp(timestamp, tz=timezone.utc)
+                        for timestamp, _ in points
+                    ],
+                    Values=[values[stat] for _, values in points],
+                    StatusCode="Complete",
+                )
+            )
+        return GetMetricDataOutput(MetricDataResults=results, Messages=[])
+
     def list_tags_for_resource(
         self, context: RequestContext, resource_arn: AmazonResourceName
     ) -> ListTagsForResourceOutput:
@@ -1,4 +1,5 @@
 import copy
+import functools
 import json
 import logging
 import random
@@ -93,6 +94,10 @@ from localstack.http import Response
 from localstack.services.dynamodb import server
 from localstack.services.dynamodb.models import DynamoDBStore, dynamodb_stores
 from localstack.services.dynamodb.server import start_dynamodb, wait_for_dynamodb
+from localstack.services.dynamodb.subscriptions import (
+    TABLE_SUBSCRIPTIONS,
+    invalidate_table_subscriptions,
+)
 from localstack.services.dynamodb.utils import (
     ItemFinder,
     ItemSet,
@@ -100,9 +105,6 @@ from localstack.services.dynamodb.utils import (
     extract_table_name_from_partiql_update,
 )
 from localstack.services.dynamodbstreams import dynamodbstreams_api
-from localstack.services.dynamodbstreams.dynamodbstreams_api import (
-    get_and_increment_sequence_number_counter,
-)
 from localstack.services.edge import ROUTER
 from localstack.services.plugins import ServiceLifecycleHook
 from localstack.utils.aws import aws_stack
@@ -142,14 +144,9 @@ class EventForwarder:
     @classmethod
     def forward_to_targets(cls, records: List[Dict], background: bool = True):
         def _forward(*args):
-            # forward to kinesis stream
-            records_to_kinesis = copy.deepcopy(records)
-            cls.forward_to_kinesis_stream(records_to_kinesis)
-
-            # forward to lambda and ddb_streams
-            forward_records = cls.prepare_records_to_forward_to_ddb_stream(records)
-            records_to_ddb = copy.deepcopy(forward_records)
-            cls.forward_to_ddb_stream(records_to_ddb)
+            # the records are not modified by the targets, hence they can be shared without copying them
+            cls.forward_to_kinesis_stream(records)
+            cls.forward_to_ddb_stream(records)
 
         if background:
             return start_worker_thread(_forward)
@@ -173,40 +170,21 @@ class EventForwarder:
                 continue
             stream_arn = table_def["KinesisDataStreamDestinations"][-1]["StreamArn"]
             stream_name = stream_arn.split("/", 1)[-1]
-            record["tableName"] = table_name
-            record.pop("eventSourceARN", None)
-            record["dynamodb"].pop("StreamViewType", None)
+            kinesis_record = {
+                key: value for key, value in record.items() if key != "eventSourceARN"
+            }
+            kinesis_record["tableName"] = table_name
+            kinesis_record["dynamodb"] = {
+                key: value for key, value in record["dynamodb"].items() if key != "StreamViewType"
+            }
             hash_keys = list(filter(lambda key: key["KeyType"] == "HASH", table_def["KeySchema"]))
             partition_key = hash_keys[0]["AttributeName"]
             kinesis.put_record(
                 StreamName=stream_name,
-                Data=json.dumps(record, cls=BytesEncoder),
+                Data=json.dumps(kinesis_record, cls=BytesEncoder),
                 PartitionKey=partition_key,
             )
 
-    @classmethod
-    def prepare_records_to_forward_to_ddb_stream(cls, records):
-        # StreamViewType determines what information is written to the stream for the table
-        # When an item in the table is inserted, updated or deleted
-        for record in records:
-            ddb_record = record["dynamodb"]
-            stream_type = ddb_record.get("StreamViewType")
-            if not stream_type:
-                continue
-            if "SequenceNumber" not in ddb_record:
-                ddb_record["SequenceNumber"] = str(get_and_increment_sequence_number_counter())
-            # KEYS_ONLY  - Only the key attributes of the modified item are written to the stream
-            if stream_type == "KEYS_ONLY":
-                ddb_record.pop("OldImage", None)
-                ddb_record.pop("NewImage", None)
-            # NEW_IMAGE - The entire item, as it appears after it was modified, is written to the stream
-            elif stream_type == "NEW_IMAGE":
-                ddb_record.pop("OldImage", None)
-            # OLD_IMAGE - The entire item, as it appeared before it was modified, is written to the stream
-            elif stream_type == "OLD_IMAGE":
-                ddb_record.pop("NewImage", None)
-        return records
-
     @classmethod
     def is_kinesis_stream_exists(cls, stream_arn):
         kinesis = aws_stack.connect_to_service("kinesis")
@@ -431,6 +409,7 @@ class DynamoDBProvider(DynamodbApi, ServiceLifecycleHook):
 
         if "StreamSpecification" in table_definitions:
             create_dynamodb_stream(table_definitions, table_description.get("LatestStreamLabel"))
+        invalidate_table_subscriptions(aws_stack.dynamodb_table_arn(table_name))
 
         if "TableClass" in table_definitions:
             table_class = table_description.pop("TableClass", None) or table_definitions.pop(
@@ -463,6 +442,7 @@ class DynamoDBProvider(DynamodbApi, ServiceLifecycleHook):
         self.delete_all_event_source_mappings(table_arn)
         dynamodbstreams_api.delete_streams(table_arn)
         get_store(context).TABLE_TAGS.pop(table_arn, None)
+        invalidate_table_subscriptions(table_arn)
 
         return result
 
@@ -1027,6 +1007,7 @@ class DynamoDBProvider(DynamodbApi, ServiceLifecycleHook):
             }
         )
         table_def["KinesisDataStreamDestinationStatus"] = "ACTIVE"
+        invalidate_table_subscriptions(aws_stack.dynamodb_table_arn(table_name))
         return KinesisStreamingDestinationOutput(
             DestinationStatus="ACTIVE", StreamArn=stream_arn, TableName=table_name
         )
@@ -1053,6 +1034,7 @@ class DynamoDBProvider(DynamodbApi, ServiceLifecycleHook):
                         dest["DestinationStatus"] = "DISABLED"
                         dest["DestinationStatusDescription"] = ("Stream is disabled",)
                         table_def["KinesisDataStreamDestinationStatus"] = "DISABLED"
+                        invalidate_table_subscriptions(aws_stack.dynamodb_table_arn(table_name))
                         return KinesisStreamingDestinationOutput(
                             DestinationStatus="DISABLED",
                             StreamArn=stream_arn,
@@ -1362,26 +1344,32 @@ def has_event_sources_or_streams_enabled(table_name: str, cache: Dict = None):
     cached = cache.get(table_arn)
     if isinstance(cached, bool):
         return cached
+    result = TABLE_SUBSCRIPTIONS.get(
+        table_arn, functools.partial(_has_event_sources_or_streams_enabled, table_arn)
+    )
+    cache[table_arn] = result
+    return result
+
+
+def _has_event_sources_or_streams_enabled(table_arn: str) -> bool:
     lambda_client = aws_stack.connect_to_service("lambda")
     sources = lambda_client.list_event_source_mappings(EventSourceArn=table_arn)[
         "EventSourceMappings"
     ]
-    result = False
     if sources:
-        result = True
-    if not result and dynamodbstreams_api.get_stream_for_table(table_arn):
-        result = True
+        return True
+    if dynamodbstreams_api.get_stream_for_table(table_arn):
+        return True
 
     # if kinesis streaming destination is enabled
     # get table name from table_arn
     # since batch_write and transact write operations passing table_arn instead of table_name
     table_name = table_arn.split("/", 1)[-1]
     table_definitions: Dict = get_store().table_definitions
-    if not result and table_definitions.get(table_name):
+    if table_definitions.get(table_name):
         if table_definitions[table_name].get("KinesisDataStreamDestinationStatus") == "ACTIVE":
-            result = True
-    cache[table_arn] = result
-    return result
+            return True
+    return False
 
 
 def get_updated_records(table_name: str, existing_items: List) -> List:
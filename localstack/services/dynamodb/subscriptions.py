@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+LOG = logging.getLogger(__name__)
+
+
+class TableSubscriptionRegistry:
+    """
+    Caches for each table ARN whether item changes of the table need to be forwarded, i.e., whether the
+    table has event source mappings, a DynamoDB stream, or an active Kinesis streaming destination.
+
+    The entries are computed lazily on the first write to a table, and invalidated whenever one of these
+    subscriptions is created, updated, or deleted - the write path itself only performs a dict lookup.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, bool] = {}
+        # incremented with every invalidation, to discard results computed concurrently to an invalidation
+        self._version = 0
+        self._mutex = threading.Lock()
+
+    def get(self, table_arn: str, compute: Callable[[], bool]) -> bool:
+        result = self._entries.get(table_arn)
+        if result is not None:
+            return result
+        version = self._version
+        result = compute()
+        with self._mutex:
+            if version == self._version:
+                self._entries[table_arn] = result
+        return result
+
+    def invalidate(self, table_arn: str = None):
+        """Invalidates the entry of the given table ARN, or all entries if no ARN is given."""
+        with self._mutex:
+            self._version += 1
+            if table_arn:
+                self._entries.pop(table_arn, None)
+            else:
+                self._entries.clear()
+
+
+TABLE_SUBSCRIPTIONS = TableSubscriptionRegistry()
+
+
+def table_arn_from_source_arn(source_arn: str) -> Optional[str]:
+    """Returns the table ARN for a DynamoDB table or stream ARN, or None for ARNs of other services."""
+    if not source_arn or ":dynamodb:" not in source_arn:
+        return None
+    # stream ARNs have the format <table_arn>/stream/<label>
+    return source_arn.split("/stream/")[0]
+
+
+def invalidate_table_subscriptions(source_arn: str):
+    """Invalidates the cached subscriptions of the table with the given table or stream ARN."""
+    table_arn = table_arn_from_source_arn(source_arn)
+    if table_arn:
+        LOG.debug("Invalidating cached event subscriptions of table %s", table_arn)
+        TABLE_SUBSCRIPTIONS.invalidate(table_arn)
@@ -1,37 +1,37 @@
-import json
 import logging
-import threading
 import time
-from typing import Dict
-
-from localstack.aws.api.dynamodbstreams import StreamStatus, StreamViewType
+from typing import Dict, List, Tuple
+
+from localstack.aws.api.dynamodbstreams import (
+    ResourceNotFoundException,
+    StreamStatus,
+    StreamViewType,
+)
+from localstack.services.dynamodb.subscriptions import invalidate_table_subscriptions
+from localstack.services.dynamodbstreams.stream_log import (
+    ShardPosition,
+    StreamShard,
+    decode_shard_iterator,
+    encode_shard_iterator,
+    expired_iterator,
+    get_iterator_offset,
+)
 from localstack.services.generic_proxy import RegionBackend
 from localstack.utils.aws import aws_stack
 from localstack.utils.common import now_utc
-from localstack.utils.json import BytesEncoder
-
-DDB_KINESIS_STREAM_NAME_PREFIX = "__ddb_stream_"
 
 LOG = logging.getLogger(__name__)
 
-_SEQUENCE_MTX = threading.RLock()
-_SEQUENCE_NUMBER_COUNTER = 1
-
 
 class DynamoDBStreamsBackend(RegionBackend):
     # maps table names to DynamoDB stream descriptions
     ddb_streams: Dict[str, dict]
+    # maps table names to the shards which contain the records of the streams
+    shards: Dict[str, StreamShard]
 
     def __init__(self):
         self.ddb_streams = {}
-
-
-def get_and_increment_sequence_number_counter() -> int:
-    global _SEQUENCE_NUMBER_COUNTER
-    with _SEQUENCE_MTX:
-        cnt = _SEQUENCE_NUMBER_COUNTER
-        _SEQUENCE_NUMBER_COUNTER += 1
-        return cnt
+        self.shards = {}
 
 
 def add_dynamodb_stream(
@@ -39,9 +39,6 @@ def add_dynamodb_stream(
 ):
     if enabled:
         region = DynamoDBStreamsBackend.get()
-        # create kinesis stream as a backend
-        stream_name = get_kinesis_stream_name(table_name)
-        aws_stack.create_kinesis_stream(stream_name)
         latest_stream_label = latest_stream_label or "latest"
         stream = {
             "StreamArn": aws_stack.dynamodb_stream_arn(
@@ -49,52 +46,103 @@ def add_dynamodb_stream(
             ),
             "TableName": table_name,
             "StreamLabel": latest_stream_label,
-            "StreamStatus": StreamStatus.ENABLING,
+            # the records are stored in process, hence the stream is enabled right away
+            "StreamStatus": StreamStatus.ENABLED,
             "KeySchema": [],
             "Shards": [],
             "StreamViewType": view_type,
-            "shards_id_map": {},
         }
+        previous = region.shards.pop(table_name, None)
+        if previous:
+            previous.close()
         region.ddb_streams[table_name] = stream
+        region.shards[table_name] = StreamShard(shard_id("shardId-000000000000"))
+        invalidate_table_subscriptions(stream["StreamArn"])
 
 
 def get_stream_for_table(table_arn: str) -> dict:
-    region = DynamoDBStreamsBackend.get()
+    region = DynamoDBStreamsBackend.get(aws_stack.extract_region_from_arn(table_arn))
     table_name = table_name_from_stream_arn(table_arn)
     return region.ddb_streams.get(table_name)
 
 
-def forward_events(records: Dict) -> None:
-    kinesis = aws_stack.connect_to_service("kinesis")
+def get_stream_shard(stream_arn: str, shard_id: str = None) -> Tuple[dict, StreamShard]:
+    """Returns the description and the shard of the given stream, and raises an error if they do not exist."""
+    region = DynamoDBStreamsBackend.get(aws_stack.extract_region_from_arn(stream_arn))
+    table_name = table_name_from_stream_arn(stream_arn)
+    stream = region.ddb_streams.get(table_name)
+    shard = region.shards.get(table_name)
+    if not stream or not shard or stream["StreamArn"] != stream_arn:
+        raise ResourceNotFoundException(
+            f"Requested resource not found: Stream: {stream_arn} not found"
+        )
+    if shard_id and shard_id != shard.shard_id:
+        raise ResourceNotFoundException(
+            f"Requested resource not found: Shard does not exist: {shard_id}"
+        )
+    return stream, shard
+
+
+def forward_events(records: List[Dict]) -> None:
+    """Appends the given records of the DynamoDB provider to the streams of their tables, in bulk per stream."""
+    grouped: Dict[str, List[Dict]] = {}
     for record in records:
-        table_arn = record.pop("eventSourceARN", "")
-        stream = get_stream_for_table(table_arn)
-        if stream:
-            table_name = table_name_from_stream_arn(stream["StreamArn"])
-            stream_name = get_kinesis_stream_name(table_name)
-            kinesis.put_record(
-                StreamName=stream_name,
-                Data=json.dumps(record, cls=BytesEncoder),
-                PartitionKey="TODO",
-            )
+        grouped.setdefault(record.get("eventSourceARN", ""), []).append(record)
+    for table_arn, table_records in grouped.items():
+        region = DynamoDBStreamsBackend.get(aws_stack.extract_region_from_arn(table_arn))
+        table_name = table_name_from_table_arn(table_arn)
+        stream = region.ddb_streams.get(table_name)
+        shard = region.shards.get(table_name)
+        if stream and shard:
+            shard.append(table_records, stream["StreamViewType"])
+
+
+def get_shard_iterator(
+    stream_arn: str, shard_id: str, iterator_type: str, sequence_number: str = None
+) -> str:
+    _, shard = get_stream_shard(stream_arn, shard_id)
+    offset = get_iterator_offset(shard, iterator_type, sequence_number)
+    return encode_shard_iterator(ShardPosition(stream_arn, shard_id, offset))
+
+
+def get_records(shard_iterator: str, limit: int = None) -> Tuple[List[Dict], str]:
+    """
+    Returns the records at the position of the given shard iterator, and the iterator of the following records. The
+    returned records are the stored records, i.e., they must not be modified by the callers.
+    """
+    position = decode_shard_iterator(shard_iterator)
+    try:
+        _, shard = get_stream_shard(position.stream_arn, position.shard_id)
+    except ResourceNotFoundException:
+        raise expired_iterator(position)
+    records, next_offset = shard.read(position.offset, limit)
+    return records, encode_shard_iterator(position._replace(offset=next_offset))
+
+
+def wait_for_records(shard_iterator: str, timeout: float) -> bool:
+    """Blocks until records are available for the given shard iterator, or until the timeout has passed."""
+    shard = None
+    try:
+        position = decode_shard_iterator(shard_iterator)
+        _, shard = get_stream_shard(position.stream_arn, position.shard_id)
+    except Exception:
+        pass
+    if not shard:
+        time.sleep(timeout)
+        return False
+    return shard.log.wait(position.offset, timeout)
 
 
 def delete_streams(table_arn: str) -> None:
-    region = DynamoDBStreamsBackend.get()
+    region = DynamoDBStreamsBackend.get(aws_stack.extract_region_from_arn(table_arn))
     table_name = table_name_from_table_arn(table_arn)
     stream = region.ddb_streams.pop(table_name, None)
+    shard = region.shards.pop(table_name, None)
+    if shard:
+        # wakes up the pollers which wait for records of the stream
+        shard.close()
     if stream:
-        stream_name = get_kinesis_stream_name(table_name)
-        try:
-            aws_stack.connect_to_service("kinesis").delete_stream(StreamName=stream_name)
-            # sleep a bit, as stream deletion can take some time ...
-            time.sleep(1)
-        except Exception:
-            pass  # ignore "stream not found" errors
-
-
-def get_kinesis_stream_name(table_name: str) -> str:
-    return DDB_KINESIS_STREAM_NAME_PREFIX + table_name
+        invalidate_table_subscriptions(stream["StreamArn"])
 
 
 def table_name_from_stream_arn(stream_arn: str) -> str:
@@ -105,27 +153,8 @@ def table_name_from_table_arn(table_arn: str) -> str:
     return table_name_from_stream_arn(table_arn)
 
 
-def stream_name_from_stream_arn(stream_arn: str) -> str:
-    table_name = table_name_from_stream_arn(stream_arn)
-    return get_kinesis_stream_name(table_name)
-
-
 def shard_id(kinesis_shard_id: str) -> str:
     timestamp = str(int(now_utc()))
     timestamp = f"{timestamp[:-5]}00000000".rjust(20, "0")
     kinesis_shard_params = kinesis_shard_id.split("-")
     return f"{kinesis_shard_params[0]}-{timestamp}-{kinesis_shard_params[-1][:32]}"
-
-
-def kinesis_shard_id(dynamodbstream_shard_id: str) -> str:
-    shard_params = dynamodbstream_shard_id.rsplit("-")
-    return f"{shard_params[0]}-{shard_params[-1]}"
-
-
-def get_shard_id(stream: Dict, kinesis_shard_id: str) -> str:
-    ddb_stream_shard_id = stream.get("shards_id_map", {}).get(kinesis_shard_id)
-    if not ddb_stream_shard_id:
-        ddb_stream_shard_id = shard_id(kinesis_shard_id)
-        stream["shards_id_map"][kinesis_shard_id] = ddb_stream_shard_id
-
-    return ddb_stream_shard_id
@@ -0,0 +1,143 @@
+"""
+In-process log of the records of DynamoDB streams.
+
+The stream records of a table are appended in bulk to the log of the shard of its stream, which is the segmented shard
+log of the in-process Kinesis engine: records beyond the retention period of 24 hours are dropped a segment at a time,
+sequence numbers encode the offset of a record in the shard, and shard iterators are stateless tokens which encode the
+position in the log. The records are projected to the ``StreamViewType`` of the stream when they are appended, so
+GetRecords and the Lambda stream pollers return the stored records as they are.
+"""
+import base64
+import json
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from localstack.aws.api import CommonServiceException
+from localstack.aws.api.dynamodbstreams import ExpiredIteratorException, StreamViewType
+from localstack.services.kinesis.engine import ShardLog
+
+# period after which the records of a stream are dropped
+RETENTION_SECONDS = 24 * 60 * 60
+# maximum number of records returned by GetRecords
+MAX_RECORDS = 1000
+# number of digits of the record offset at the end of a sequence number
+OFFSET_DIGITS = 20
+
+# attributes of the stream records which are not written to streams of the given view type
+EXCLUDED_ATTRIBUTES = {
+    StreamViewType.KEYS_ONLY: ("OldImage", "NewImage"),
+    StreamViewType.NEW_IMAGE: ("OldImage",),
+    StreamViewType.OLD_IMAGE: ("NewImage",),
+    StreamViewType.NEW_AND_OLD_IMAGES: (),
+}
+
+
+class ValidationException(CommonServiceException):
+    def __init__(self, message: str):
+        super().__init__(code="ValidationException", status_code=400, message=message)
+
+
+class StreamRecord(NamedTuple):
+    record: Dict
+    arrival_time: float
+
+
+class StreamShard:
+    """The shard of a DynamoDB stream, with the log of its records."""
+
+    def __init__(self, shard_id: str, created: float = None):
+        self.shard_id = shard_id
+        self.log = ShardLog()
+        self._sequence_prefix = "%013d" % int((created or time.time()) * 1000)
+        self._mutex = threading.Lock()
+
+    @property
+    def starting_sequence_number(self) -> str:
+        # the sequence number of the first record is greater than the starting sequence number of the shard
+        return self.get_sequence_number(-1)
+
+    def get_sequence_number(self, offset: int) -> str:
+        return "%s%0*d" % (self._sequence_prefix, OFFSET_DIGITS, offset + 1)
+
+    def get_offset(self, sequence_number: str) -> int:
+        if not sequence_number or not sequence_number.startswith(self._sequence_prefix):
+            raise ValidationException(
+                f"Invalid SequenceNumber {sequence_number} for shard {self.shard_id}"
+            )
+        return int(sequence_number[-OFFSET_DIGITS:]) - 1
+
+    def append(self, records: List[Dict], view_type: str) -> List[Dict]:
+        """
+        Appends the given records of the DynamoDB provider to the log, and returns the stored records. The records
+        are not modified, the stored records only share the attribute values with them.
+        """
+        now = time.time()
+        excluded = EXCLUDED_ATTRIBUTES.get(view_type, ())
+        with self._mutex:
+            offset = self.log.end_offset
+            entries = []
+            for position, record in enumerate(records):
+                stream_record = {
+                    key: value
+                    for key, value in record["dynamodb"].items()
+                    if key not in excluded and key != "SequenceNumber"
+                }
+                stream_record["SequenceNumber"] = self.get_sequence_number(offset + position)
+                stored = {key: value for key, value in record.items() if key != "eventSourceARN"}
+                stored["dynamodb"] = stream_record
+                entries.append(StreamRecord(stored, now))
+            self.log.append(entries)
+        self.log.trim(now - RETENTION_SECONDS)
+        return [entry.record for entry in entries]
+
+    def read(self, offset: int, limit: int = None) -> Tuple[List[Dict], int]:
+        """Returns the stored records starting at the given offset, and the offset of the following record."""
+        entries, next_offset = self.log.read(offset, min(limit or MAX_RECORDS, MAX_RECORDS))
+        return [entry.record for entry in entries], next_offset
+
+    def to_dict(self) -> Dict:
+        return {
+            "ShardId": self.shard_id,
+            "SequenceNumberRange": {"StartingSequenceNumber": self.starting_sequence_number},
+        }
+
+    def close(self):
+        self.log.close()
+
+
+class ShardPosition(NamedTuple):
+    stream_arn: str
+    shard_id: str
+    offset: int
+
+
+def encode_shard_iterator(position: ShardPosition) -> str:
+    return base64.b64encode(json.dumps(list(position)).encode("utf-8")).decode("utf-8")
+
+
+def decode_shard_iterator(shard_iterator: str) -> ShardPosition:
+    try:
+        return ShardPosition(*json.loads(base64.b64decode(shard_iterator)))
+    except Exception:
+        raise ValidationException(f"Invalid ShardIterator: {shard_iterator}")
+
+
+def get_iterator_offset(
+    shard: StreamShard, iterator_type: str, sequence_number: Optional[str] = None
+) -> int:
+    if iterator_type == "TRIM_HORIZON":
+        return shard.log.start_offset
+    if iterator_type == "LATEST":
+        return shard.log.end_offset
+    if iterator_type == "AT_SEQUENCE_NUMBER":
+        return max(shard.get_offset(sequence_number), 0)
+    if iterator_type == "AFTER_SEQUENCE_NUMBER":
+        return shard.get_offset(sequence_number) + 1
+    raise ValidationException(f"Invalid ShardIteratorType {iterator_type}")
+
+
+def expired_iterator(position: ShardPosition) -> ExpiredIteratorException:
+    return ExpiredIteratorException(
+        f"Shard iterator for shard {position.shard_id} of stream {position.stream_arn} has expired"
+    )
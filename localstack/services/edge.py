@@ -11,7 +11,7 @@ from typing import Dict
 from requests.models import Response
 
 from localstack import config
-from localstack.aws.protocol.service_router import determine_aws_service_name
+from localstack.aws.protocol.service_router import get_service_router
 from localstack.constants import (
     HEADER_LOCALSTACK_ACCOUNT_ID,
     HEADER_LOCALSTACK_EDGE_URL,
@@ -96,7 +96,7 @@ class ProxyListenerEdge(ProxyListener):
         # re-create an HTTP request from the given parts
         request = create_request_from_parts(method, path, data, headers)
 
-        api = determine_aws_service_name(request)
+        api = get_service_router().determine_service_name(request)
         port = None
         if api:
             port = get_service_port_for_account(api, headers)
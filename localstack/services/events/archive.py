@@ -0,0 +1,293 @@
+"""
+Archive of the events put to EventBridge event buses. The events are appended to a log of size-rotated segment
+files by a background writer thread, which writes the events of many PutEvents calls with a single write. Every
+segment keeps a sparse in-memory index of the archive time of its records, which allows reading the events of a
+time range without scanning the whole log (e.g., to replay archived events).
+"""
+import bisect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from localstack import config
+from localstack.utils.common import TMP_FILES, mkdir
+from localstack.utils.objects import singleton_factory
+
+LOG = logging.getLogger(__name__)
+
+# directory in the tmp dir which contains the segments of the event archive
+EVENTS_ARCHIVE_DIR = "cw_events"
+
+ARCHIVE_SEGMENT_LOG = "segment-log"
+ARCHIVE_DISABLED = "disabled"
+
+# maximum number of records written with a single write
+WRITE_BATCH_SIZE = 1000
+# maximum number of records waiting for the writer, events are dropped from the archive once this is reached
+WRITE_QUEUE_SIZE = 100_000
+# number of bytes between two entries of the sparse index of a segment
+INDEX_INTERVAL = 64 * 1024
+
+
+class EventArchive:
+    """Stores the events put to the event buses, and reads them by the time they have been archived."""
+
+    def put(self, events: List[Dict]):
+        """Adds the given events, i.e., the PutEvents entries as ``event`` along with their ``uuid``."""
+
+    def read(self, start_time: float = None, end_time: float = None) -> Iterator[Dict]:
+        """
+        Returns the archived records in the order they have been archived. Each record has the attributes ``time``
+        (archive time in seconds since the epoch), ``id``, and ``event``.
+        """
+        return iter(())
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until all events put so far have been written, returns False if the timeout has been reached."""
+        return True
+
+    def close(self):
+        pass
+
+
+class Segment:
+    """A single file of the segment log, and the sparse index of its records."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # number of bytes of complete records in the file
+        self.size = 0
+        self.first_time: Optional[float] = None
+        self.last_time: Optional[float] = None
+        # (time, offset) of the first record of a write, at most every INDEX_INTERVAL bytes
+        self.index: List[Tuple[float, int]] = []
+
+    def add(self, first_time: float, last_time: float, length: int):
+        if not self.index or self.size - self.index[-1][1] >= INDEX_INTERVAL:
+            self.index.append((first_time, self.size))
+        if self.first_time is None:
+            self.first_time = first_time
+        self.last_time = last_time
+        self.size += length
+
+    def overlaps(self, start_time: Optional[float], end_time: Optional[float]) -> bool:
+        if self.first_time is None:
+            return False
+        if start_time is not None and self.last_time < start_time:
+            return False
+        return end_time is None or self.first_time <= end_time
+
+    def get_offset(self, start_time: Optional[float]) -> int:
+        """Returns the offset of the last indexed record which was archived before the given time."""
+        if start_time is None:
+            return 0
+        position = bisect.bisect_left(self.index, (start_time,)) - 1
+        return self.index[position][1] if position >= 0 else 0
+
+    def read(
+        self, start_time: Optional[float], end_time: Optional[float], size: int
+    ) -> Iterator[Dict]:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.get_offset(start_time))
+                # only read the records which have been completely written when the read started
+                while f.tell() < size:
+                    record = json.loads(f.readline())
+                    if start_time is not None and record["time"] < start_time:
+                        continue
+                    if end_time is not None and record["time"] > end_time:
+                        return
+                    yield record
+        except FileNotFoundError:
+            # the segment has been deleted by the rotation in the meantime
+            return
+
+    @classmethod
+    def load(cls, path: str) -> "Segment":
+        """Creates the index of an existing segment file."""
+        segment = cls(path)
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # incomplete record of an interrupted write
+                    break
+                record_time = json.loads(line)["time"]
+                segment.add(record_time, record_time, len(line))
+        return segment
+
+
+class SegmentLogEventArchive(EventArchive):
+    """
+    Appends the events to size-rotated segment files in the given directory. Only the most recent ``max_segments``
+    segments are kept, which bounds the disk usage of the archive to roughly ``max_segments * segment_size`` bytes.
+    """
+
+    def __init__(self, directory: str, segment_size: int, max_segments: int):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max(max_segments, 1)
+        self.segments: List[Segment] = []
+        self.dropped = 0
+        self._sequence = 0
+        self._last_time = 0.0
+        self._file = None
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._mutex = threading.RLock()
+        self._writer: Optional[threading.Thread] = None
+        self._load()
+
+    def _load(self):
+        mkdir(self.directory)
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".log"):
+                continue
+            try:
+                self.segments.append(Segment.load(os.path.join(self.directory, name)))
+                self._sequence = int(name[: -len(".log")]) + 1
+            except Exception as e:
+                LOG.info("Unable to load event archive segment %s: %s", name, e)
+        if self.segments and self.segments[-1].last_time is not None:
+            self._last_time = self.segments[-1].last_time
+
+    def _start_writer(self):
+        with self._mutex:
+            if self._writer:
+                return
+            self._writer = threading.Thread(
+                target=self._run, name="events-archive-writer", daemon=True
+            )
+            self._writer.start()
+
+    def put(self, events: List[Dict]):
+        if not events:
+            return
+        self._start_writer()
+        now = time.time()
+        for event in events:
+            try:
+                self._queue.put_nowait((now, event))
+            except queue.Full:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 10000 == 0:
+                    LOG.warning(
+                        "Event archive writer cannot keep up, %s events were not archived",
+                        self.dropped,
+                    )
+
+    def flush(self, timeout: float = None) -> bool:
+        if not self._writer:
+            return True
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < WRITE_BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in items if isinstance(item, tuple)]
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:
+                LOG.info("Unable to write %s events to the event archive: %s", len(records), e)
+            for item in items:
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, records: List[Tuple[float, Dict]]):
+        lines = []
+        times = []
+        for record_time, event in records:
+            # the archive time is monotonic, which keeps the records of the log sorted by time
+            record_time = self._last_time = max(record_time, self._last_time)
+            times.append(record_time)
+            lines.append(
+                json.dumps(
+                    {"time": record_time, "id": event.get("uuid"), "event": event.get("event")}
+                )
+            )
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        with self._mutex:
+            segment = self._get_segment()
+            self._file.write(data)
+            self._file.flush()
+            segment.add(times[0], times[-1], len(data))
+
+    def _get_segment(self) -> Segment:
+        """Returns the segment to append to, and rotates the log once the current segment is full."""
+        segment = self.segments[-1] if self.segments else None
+        if self._file and segment.size < self.segment_size:
+            return segment
+        if self._file:
+            self._file.close()
+        segment = Segment(os.path.join(self.directory, "%012d.log" % self._sequence))
+        self._sequence += 1
+        self._file = open(segment.path, "ab")
+        self.segments.append(segment)
+        while len(self.segments) > self.max_segments:
+            expired = self.segments.pop(0)
+            try:
+                os.remove(expired.path)
+            except OSError as e:
+                LOG.debug("Unable to remove event archive segment %s: %s", expired.path, e)
+        return segment
+
+    def read(self, start_time: float = None, end_time: float = None) -> Iterator[Dict]:
+        with self._mutex:
+            segments = [
+                (segment, segment.size)
+                for segment in self.segments
+                if segment.overlaps(start_time, end_time)
+            ]
+        for segment, size in segments:
+            yield from segment.read(start_time, end_time, size)
+
+    def close(self):
+        with self._mutex:
+            writer = self._writer
+            self._writer = None
+        if writer:
+            self._queue.put(None)
+            writer.join(timeout=5)
+        with self._mutex:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def get_events_archive_dir() -> str:
+    return os.path.join(config.dirs.tmp, EVENTS_ARCHIVE_DIR)
+
+
+def get_archive_type() -> str:
+    if config.EVENTS_ARCHIVE:
+        return config.EVENTS_ARCHIVE
+    # the archive is only enabled by default for debugging and testing
+    return ARCHIVE_SEGMENT_LOG if config.DEBUG or config.is_local_test_mode() else ARCHIVE_DISABLED
+
+
+@singleton_factory
+def get_event_archive() -> EventArchive:
+    archive_type = get_archive_type()
+    if archive_type == ARCHIVE_SEGMENT_LOG:
+        directory = get_events_archive_dir()
+        if not os.path.exists(directory):
+            TMP_FILES.append(directory)
+        return SegmentLogEventArchive(
+            directory, config.EVENTS_ARCHIVE_SEGMENT_SIZE, config.EVENTS_ARCHIVE_MAX_SEGMENTS
+        )
+    if archive_type != ARCHIVE_DISABLED:
+        LOG.warning("Unknown event archive type %s, the event archive is disabled", archive_type)
+    return EventArchive()
@@ -0,0 +1,475 @@
+"""
+Asynchronous delivery of EventBridge events to the targets of rules. PutEvents only queues the events for the targets
+of the matched rules, the deliveries are executed by the workers of a DeliveryPool. The events of each target are
+buffered in a queue of their own, and delivered in batches where the API of the target allows it (SQS
+SendMessageBatch, Kinesis PutRecords). Failed deliveries are retried according to the RetryPolicy of the target, and
+sent to the dead-letter queue of the target once all attempts have failed.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from botocore.exceptions import ClientError
+
+from localstack import config
+from localstack.services.sns.delivery import DeliveryBatcher, DeliveryPool, DeliveryTask
+from localstack.utils import collections
+from localstack.utils.aws import aws_stack
+from localstack.utils.aws.message_forwarding import send_event_to_target
+from localstack.utils.objects import singleton_factory
+from localstack.utils.strings import to_bytes, truncate
+
+LOG = logging.getLogger(__name__)
+
+# maps the service of target ARNs to the queue (and workers) which deliver their events
+TARGET_GROUPS = {
+    "sqs": "sqs",
+    "kinesis": "kinesis",
+    "lambda": "lambda",
+    "api-destination": "http",
+}
+DEFAULT_GROUP = "default"
+
+# AWS defaults of the RetryPolicy of a target
+DEFAULT_MAXIMUM_RETRY_ATTEMPTS = 185
+DEFAULT_MAXIMUM_EVENT_AGE = 86400
+
+# the delays of the retries grow exponentially from the base delay up to the maximum delay
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 300
+
+# limits of the batch APIs of the targets
+SQS_MAX_BATCH_SIZE = 10
+SQS_MAX_BATCH_BYTES = 262144
+KINESIS_MAX_BATCH_SIZE = 500
+KINESIS_MAX_BATCH_BYTES = 5 * 1024 * 1024
+# number of events a delivery task takes from the queue of a target without a batch API
+DEFAULT_BATCH_SIZE = 10
+
+
+class DispatchError(Exception):
+    """A failed entry of a batch delivery to a target."""
+
+    def __init__(self, code: str, message: str = None):
+        super().__init__(message or code)
+        self.code = code
+
+
+class TargetKey(NamedTuple):
+    rule_arn: str
+    target_id: str
+    target_arn: str
+
+
+class TargetRetryPolicy:
+    """
+    The ``RetryPolicy`` of a target, which limits the number of retries of failed deliveries and the age of the
+    events which are retried. See https://docs.aws.amazon.com/eventbridge/latest/userguide/eb-rule-dlq.html
+    """
+
+    def __init__(
+        self,
+        maximum_retry_attempts: int = DEFAULT_MAXIMUM_RETRY_ATTEMPTS,
+        maximum_event_age: int = DEFAULT_MAXIMUM_EVENT_AGE,
+    ):
+        self.maximum_retry_attempts = maximum_retry_attempts
+        self.maximum_event_age = maximum_event_age
+
+    @classmethod
+    def from_target(cls, target: Dict) -> "TargetRetryPolicy":
+        policy = target.get("RetryPolicy") or {}
+        return cls(
+            maximum_retry_attempts=policy.get(
+                "MaximumRetryAttempts", DEFAULT_MAXIMUM_RETRY_ATTEMPTS
+            ),
+            maximum_event_age=policy.get("MaximumEventAgeInSeconds", DEFAULT_MAXIMUM_EVENT_AGE),
+        )
+
+    def get_delay(self, retry: int) -> float:
+        """
+        Returns the delay before the given retry (exponential backoff with jitter).
+
+        :param retry: the number of the retry (starting with 1)
+        :return: the delay in seconds
+        """
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** min(retry - 1, 16))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def get_exhausted_condition(self, delivery: "TargetDelivery", delay: float) -> Optional[str]:
+        """
+        Returns the condition which prevents another retry of the given delivery, or None if it can be retried.
+
+        :param delivery: the failed delivery
+        :param delay: the delay before the next retry
+        :return: ``MaximumRetryAttempts``, ``MaximumEventAgeInSeconds``, or None
+        """
+        if delivery.attempts > self.maximum_retry_attempts:
+            return "MaximumRetryAttempts"
+        if time.time() + delay - delivery.created > self.maximum_event_age:
+            return "MaximumEventAgeInSeconds"
+        return None
+
+
+class TargetDelivery:
+    """The delivery of a single event to a target."""
+
+    __slots__ = ("target", "payload", "event_id", "created", "attempts")
+
+    def __init__(self, target: Dict, payload: Any, event_id: str):
+        """
+        :param target: the target of the rule
+        :param payload: the payload sent to the target (i.e., the event transformed by the Input or InputPath)
+        :param event_id: the ID of the event
+        """
+        self.target = target
+        self.payload = payload
+        self.event_id = event_id
+        self.created = time.time()
+        self.attempts = 0
+
+
+class TargetMetrics:
+    """Counters of the deliveries to a single target."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.pending = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        # whether the target has been removed, the metrics are removed once the pending deliveries have completed
+        self.removed = False
+
+    def to_dict(self) -> Dict:
+        completed = self.delivered + self.failed
+        return {
+            "submitted": self.submitted,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "pending": self.pending,
+            "latency_avg": self.latency_sum / completed if completed else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+def _get_target_group(target_arn: str) -> str:
+    if ":api-destination/" in target_arn or ":destination/" in target_arn:
+        return TARGET_GROUPS["api-destination"]
+    service = target_arn.split(":")[2] if target_arn.count(":") >= 2 else ""
+    return TARGET_GROUPS.get(service, DEFAULT_GROUP)
+
+
+def _get_error_code(error: Exception) -> str:
+    if isinstance(error, DispatchError):
+        return error.code
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") or type(error).__name__
+    return type(error).__name__
+
+
+class EventDispatcher:
+    """
+    Dispatches the events matched by PutEvents to the targets of the rules. Each target has a queue of its own, a
+    single delivery task per target is queued to the delivery pool at a time, which delivers the events that have
+    accumulated until it is executed.
+    """
+
+    def __init__(self, pool: DeliveryPool = None):
+        self.pool = pool or DeliveryPool(
+            num_workers=config.EVENTS_DELIVERY_WORKERS,
+            queue_size=config.EVENTS_DELIVERY_QUEUE_SIZE,
+            protocol_groups={group: group for group in TARGET_GROUPS.values()},
+            name="events-delivery",
+        )
+        self.batchers: Dict[str, DeliveryBatcher] = {
+            "sqs": DeliveryBatcher(
+                "sqs",
+                self._deliver_to_sqs,
+                max_batch_size=SQS_MAX_BATCH_SIZE,
+                max_batch_bytes=SQS_MAX_BATCH_BYTES,
+                entry_size=self._get_payload_size,
+                pool=self.pool,
+            ),
+            "kinesis": DeliveryBatcher(
+                "kinesis",
+                self._deliver_to_kinesis,
+                max_batch_size=KINESIS_MAX_BATCH_SIZE,
+                max_batch_bytes=KINESIS_MAX_BATCH_BYTES,
+                entry_size=self._get_payload_size,
+                pool=self.pool,
+            ),
+        }
+        for group in ["lambda", "http", DEFAULT_GROUP]:
+            self.batchers[group] = DeliveryBatcher(
+                group, self._deliver_individually, max_batch_size=DEFAULT_BATCH_SIZE, pool=self.pool
+            )
+        self.metrics: Dict[TargetKey, TargetMetrics] = {}
+        self.mutex = threading.Lock()
+
+    def start(self):
+        self.pool.start()
+
+    def close(self):
+        self.pool.close()
+
+    def dispatch(self, rule_arn: str, target: Dict, payload: Any, event_id: str):
+        """
+        Queues the delivery of an event to the given target of a rule.
+
+        :param rule_arn: the ARN of the rule which matched the event
+        :param target: the target of the rule
+        :param payload: the payload sent to the target
+        :param event_id: the ID of the event
+        :raises queue.Full: if the queue of the target type is still full after ``SUBMIT_TIMEOUT`` seconds
+        """
+        key = TargetKey(rule_arn, target["Id"], target["Arn"])
+        with self.mutex:
+            metrics = self.metrics.get(key)
+            if metrics is None:
+                metrics = self.metrics[key] = TargetMetrics()
+            metrics.removed = False
+            metrics.submitted += 1
+            metrics.pending += 1
+        self.batchers[_get_target_group(key.target_arn)].add(
+            key, TargetDelivery(target, payload, event_id)
+        )
+
+    def remove_targets(self, rule_arn: str, target_ids: List[str] = None):
+        """
+        Removes the metrics of the given targets of a rule, e.g., after the targets have been removed from the rule.
+        The metrics of targets with pending deliveries are removed once these deliveries have completed.
+
+        :param rule_arn: the ARN of the rule
+        :param target_ids: the IDs of the targets, or None to remove all targets of the rule (if it has been deleted)
+        """
+        with self.mutex:
+            for key in list(self.metrics):
+                if key.rule_arn != rule_arn or (
+                    target_ids is not None and key.target_id not in target_ids
+                ):
+                    continue
+                metrics = self.metrics[key]
+                metrics.removed = True
+                self._release_metrics(key, metrics)
+
+    @contextmanager
+    def deferred(self):
+        """
+        Context manager which defers the delivery of the events dispatched by the current thread until the end of the
+        block, such that all events of a PutEvents request are delivered with as few batches as possible.
+        """
+        with ExitStack() as stack:
+            for batcher in self.batchers.values():
+                stack.enter_context(batcher.deferred())
+            yield
+
+    def get_metrics(self) -> Dict:
+        """
+        Returns the metrics of the deliveries.
+
+        :return: a dict with the metrics of each target (including the lag, i.e., the age of the oldest queued
+            event), and the metrics of the delivery queues
+        """
+        now = time.time()
+        with self.mutex:
+            metrics = list(self.metrics.items())
+        targets = []
+        for key, target_metrics in metrics:
+            oldest = self.batchers[_get_target_group(key.target_arn)].peek(key)
+            with self.mutex:
+                result = target_metrics.to_dict()
+            targets.append(
+                {
+                    **key._asdict(),
+                    **result,
+                    "lag": now - oldest.created if oldest else 0.0,
+                }
+            )
+        return {"targets": targets, "queues": self.pool.get_metrics()}
+
+    # delivery functions, executed by the workers of the delivery pool
+
+    @staticmethod
+    def _get_payload_size(delivery: TargetDelivery) -> int:
+        return len(to_bytes(json.dumps(delivery.payload)))
+
+    def _deliver_to_sqs(self, key: TargetKey, deliveries: List[TargetDelivery]):
+        region = aws_stack.extract_region_from_arn(key.target_arn)
+        entries = []
+        for i, delivery in enumerate(deliveries):
+            entry = {"Id": str(i), "MessageBody": json.dumps(delivery.payload)}
+            group_id = collections.get_safe(delivery.target, "$.SqsParameters.MessageGroupId")
+            if group_id:
+                entry["MessageGroupId"] = group_id
+            entries.append(entry)
+        try:
+            sqs_client = aws_stack.connect_to_service("sqs", region_name=region)
+            response = sqs_client.send_message_batch(
+                QueueUrl=aws_stack.get_sqs_queue_url(key.target_arn), Entries=entries
+            )
+        except Exception as e:
+            for delivery in deliveries:
+                self._failed(key, delivery, e)
+            return
+
+        failed = {entry["Id"]: entry for entry in response.get("Failed") or []}
+        for i, delivery in enumerate(deliveries):
+            failure = failed.get(str(i))
+            if failure:
+                error = DispatchError(failure.get("Code"), failure.get("Message"))
+                self._failed(key, delivery, error)
+            else:
+                self._delivered(key, delivery)
+
+    def _deliver_to_kinesis(self, key: TargetKey, deliveries: List[TargetDelivery]):
+        region = aws_stack.extract_region_from_arn(key.target_arn)
+        records = []
+        for delivery in deliveries:
+            partition_key_path = collections.get_safe(
+                delivery.target, "$.KinesisParameters.PartitionKeyPath", default_value="$.id"
+            )
+            partition_key = collections.get_safe(
+                delivery.payload, partition_key_path, default_value=delivery.event_id
+            )
+            records.append(
+                {"Data": to_bytes(json.dumps(delivery.payload)), "PartitionKey": partition_key}
+            )
+        try:
+            kinesis_client = aws_stack.connect_to_service("kinesis", region_name=region)
+            response = kinesis_client.put_records(
+                StreamName=key.target_arn.split("/")[-1], Records=records
+            )
+        except Exception as e:
+            for delivery in deliveries:
+                self._failed(key, delivery, e)
+            return
+
+        for delivery, record in zip(deliveries, response.get("Records") or []):
+            if record.get("ErrorCode"):
+                error = DispatchError(record["ErrorCode"], record.get("ErrorMessage"))
+                self._failed(key, delivery, error)
+            else:
+                self._delivered(key, delivery)
+
+    def _deliver_individually(self, key: TargetKey, deliveries: List[TargetDelivery]):
+        for delivery in deliveries:
+            self._deliver(key, delivery)
+
+    def _deliver(self, key: TargetKey, delivery: TargetDelivery):
+        target = delivery.target
+        delivery.attempts += 1
+        try:
+            send_event_to_target(
+                key.target_arn,
+                delivery.payload,
+                aws_stack.get_events_target_attributes(target),
+                target=target,
+            )
+        except Exception as e:
+            self._failed(key, delivery, e)
+            return
+        self._delivered(key, delivery)
+
+    def _delivered(self, key: TargetKey, delivery: TargetDelivery):
+        latency = time.time() - delivery.created
+        with self.mutex:
+            metrics = self.metrics[key]
+            metrics.delivered += 1
+            metrics.pending -= 1
+            metrics.latency_sum += latency
+            metrics.latency_max = max(metrics.latency_max, latency)
+            self._release_metrics(key, metrics)
+
+    def _failed(self, key: TargetKey, delivery: TargetDelivery, error: Exception):
+        # the batch delivery functions do not count the attempts of the deliveries themselves
+        delivery.attempts = max(delivery.attempts, 1)
+        policy = TargetRetryPolicy.from_target(delivery.target)
+        delay = policy.get_delay(delivery.attempts)
+        exhausted_condition = policy.get_exhausted_condition(delivery, delay)
+        if exhausted_condition is None:
+            with self.mutex:
+                self.metrics[key].retried += 1
+            LOG.debug(
+                "Retrying delivery of event %s to target %s in %.1f seconds: %s",
+                delivery.event_id,
+                key.target_arn,
+                delay,
+                error,
+            )
+            # retries are delivered individually, the batch APIs of the targets are only used for new events
+            self.pool.submit_later(
+                DeliveryTask(_get_target_group(key.target_arn), self._deliver, (key, delivery)),
+                delay,
+            )
+            return
+
+        LOG.info(
+            "Unable to send event notification %s to target %s: %s",
+            truncate(delivery.payload),
+            delivery.target,
+            error,
+        )
+        latency = time.time() - delivery.created
+        with self.mutex:
+            metrics = self.metrics[key]
+            metrics.failed += 1
+            metrics.pending -= 1
+            metrics.latency_sum += latency
+            metrics.latency_max = max(metrics.latency_max, latency)
+            self._release_metrics(key, metrics)
+        self._send_to_dead_letter_queue(key, delivery, error, exhausted_condition)
+
+    def _send_to_dead_letter_queue(
+        self, key: TargetKey, delivery: TargetDelivery, error: Exception, exhausted_condition: str
+    ):
+        dlq_arn = collections.get_safe(delivery.target, "$.DeadLetterConfig.Arn")
+        if not dlq_arn:
+            return
+        attributes = {
+            "RULE_ARN": key.rule_arn,
+            "TARGET_ARN": key.target_arn,
+            "ERROR_CODE": _get_error_code(error),
+            "ERROR_MESSAGE": str(error),
+            "EXHAUSTED_RETRY_CONDITION": exhausted_condition,
+            "RETRY_ATTEMPTS": str(delivery.attempts - 1),
+        }
+        try:
+            sqs_client = aws_stack.connect_to_service(
+                "sqs", region_name=aws_stack.extract_region_from_arn(dlq_arn)
+            )
+            sqs_client.send_message(
+                QueueUrl=aws_stack.get_sqs_queue_url(dlq_arn),
+                MessageBody=json.dumps(delivery.payload),
+                MessageAttributes={
+                    name: {"DataType": "String", "StringValue": value}
+                    for name, value in attributes.items()
+                    if value
+                },
+            )
+        except Exception as e:
+            LOG.info("Unable to send failed event %s to DLQ %s: %s", delivery.event_id, dlq_arn, e)
+            return
+        with self.mutex:
+            metrics = self.metrics.get(key)
+            if metrics:
+                metrics.dead_lettered += 1
+
+    def _release_metrics(self, key: TargetKey, metrics: TargetMetrics):
+        """Removes the metrics of a removed target once it has no pending deliveries (must hold the mutex)."""
+        if metrics.removed and not metrics.pending:
+            del self.metrics[key]
+
+
+@singleton_factory
+def get_event_dispatcher() -> EventDispatcher:
+    """Returns the EventDispatcher which delivers the events of all event buses."""
+    return EventDispatcher()
@@ -0,0 +1,386 @@
+"""
+Compiled EventBridge event patterns.
+
+Event patterns are compiled once (when a rule is put) into an ``EventPatternMatcher``. The ``RuleIndex`` of a region
+additionally indexes the rules of each event bus by the ``source`` and ``detail-type`` values their patterns require,
+such that putting an event only evaluates the patterns of the rules which can possibly match the event.
+"""
+import ipaddress
+import json
+import logging
+import operator
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+LOG = logging.getLogger(__name__)
+
+# marker for fields which are not present in an event
+MISSING = object()
+
+NUMERIC_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    "=": operator.eq,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# top-level event fields the rules of an event bus are indexed by
+INDEXED_FIELDS = ("source", "detail-type")
+
+
+class InvalidEventPattern(ValueError):
+    pass
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compile_numeric(conditions: Any) -> Callable[[Any], bool]:
+    """Compiles a ``numeric`` condition, e.g., ``{"numeric": [">", 0, "<=", 150]}``."""
+    if not isinstance(conditions, list) or not conditions or len(conditions) % 2:
+        raise InvalidEventPattern(f"invalid numeric condition {conditions}")
+    comparisons = []
+    for i in range(0, len(conditions), 2):
+        compare = NUMERIC_OPERATORS.get(conditions[i])
+        operand = conditions[i + 1]
+        if not compare or not _is_number(operand):
+            raise InvalidEventPattern(f"invalid numeric condition {conditions}")
+        comparisons.append((compare, operand))
+
+    def _matches(value: Any) -> bool:
+        return _is_number(value) and all(
+            compare(value, operand) for compare, operand in comparisons
+        )
+
+    return _matches
+
+
+def _compile_anything_but(excluded: Any) -> Callable[[Any], bool]:
+    """Compiles an ``anything-but`` condition (a value, a list of values, or a prefix)."""
+    if isinstance(excluded, dict):
+        prefix = excluded.get("prefix")
+        if len(excluded) != 1 or not isinstance(prefix, str):
+            raise InvalidEventPattern(f"invalid anything-but condition {excluded}")
+        return lambda value: not (isinstance(value, str) and value.startswith(prefix))
+    if isinstance(excluded, list):
+        return lambda value: value not in excluded
+    return lambda value: value != excluded
+
+
+def _compile_cidr(cidr: Any) -> Callable[[Any], bool]:
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except (TypeError, ValueError):
+        raise InvalidEventPattern(f"invalid cidr condition {cidr}")
+
+    def _matches(value: Any) -> bool:
+        try:
+            return isinstance(value, str) and ipaddress.ip_address(value) in network
+        except ValueError:
+            return False
+
+    return _matches
+
+
+class FieldMatcher:
+    """
+    The compiled conditions of a pattern for a single field of an event. The field matches if any of the conditions
+    matches the value of the field (or, for arrays, any of the elements of the array).
+    """
+
+    def __init__(self, conditions: List[Any]):
+        self.exact: Set[Any] = set()
+        # exact values which cannot be hashed
+        self.exact_unhashable: List[Any] = []
+        self.exists: Set[bool] = set()
+        self.prefixes: List[str] = []
+        # compiled anything-but, numeric, and cidr conditions
+        self.predicates: List[Callable[[Any], bool]] = []
+
+        for condition in conditions:
+            self._add_condition(condition)
+
+    def _add_condition(self, condition: Any):
+        if not isinstance(condition, dict):
+            try:
+                self.exact.add(condition)
+            except TypeError:
+                self.exact_unhashable.append(condition)
+            return
+
+        if len(condition) != 1:
+            raise InvalidEventPattern(f"invalid content filter {condition}")
+        name, value = next(iter(condition.items()))
+        name = name.lower()
+        if name == "exists":
+            self.exists.add(bool(value))
+        elif name == "prefix":
+            if not isinstance(value, str):
+                raise InvalidEventPattern(f"invalid prefix condition {condition}")
+            self.prefixes.append(value)
+        elif name == "anything-but":
+            self.predicates.append(_compile_anything_but(value))
+        elif name == "numeric":
+            self.predicates.append(_compile_numeric(value))
+        elif name == "cidr":
+            self.predicates.append(_compile_cidr(value))
+        else:
+            raise InvalidEventPattern(f"unsupported content filter {condition}")
+
+    @property
+    def exact_values(self) -> Optional[Set[str]]:
+        """The exact string values this field needs to have, or None if the field has any other conditions."""
+        if self.exact_unhashable or self.exists or self.prefixes or self.predicates:
+            return None
+        if not self.exact or not all(isinstance(value, str) for value in self.exact):
+            return None
+        return self.exact
+
+    def matches(self, value: Any) -> bool:
+        if value is MISSING:
+            return False in self.exists
+        if True in self.exists:
+            return True
+        if isinstance(value, list):
+            return any(self._matches_value(element) for element in value)
+        return self._matches_value(value)
+
+    def _matches_value(self, value: Any) -> bool:
+        try:
+            if value in self.exact:
+                return True
+        except TypeError:
+            pass
+        if self.exact_unhashable and value in self.exact_unhashable:
+            return True
+        if self.prefixes and isinstance(value, str):
+            for prefix in self.prefixes:
+                if value.startswith(prefix):
+                    return True
+        for predicate in self.predicates:
+            if predicate(value):
+                return True
+        return False
+
+
+class EventPatternMatcher:
+    """
+    A compiled event pattern. An event matches the pattern if it matches the conditions of all fields of the pattern.
+    Fields of the pattern are matched against the fields of the event in a case-agnostic way.
+    """
+
+    def __init__(self, pattern: Dict[str, Any]):
+        if not isinstance(pattern, dict):
+            raise InvalidEventPattern(f"event pattern needs to be an object: {pattern}")
+        # list of (key, lower-case key, nested matcher or field matcher)
+        self.fields: List[Tuple[str, str, Any]] = []
+        for key, value in pattern.items():
+            if isinstance(value, str):
+                # nested patterns can be specified as JSON strings
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    raise InvalidEventPattern(f"invalid nested pattern for field {key}: {value}")
+            if isinstance(value, dict):
+                matcher = EventPatternMatcher(value)
+            else:
+                matcher = FieldMatcher(value if isinstance(value, list) else [value])
+            self.fields.append((key, key.lower(), matcher))
+
+    @staticmethod
+    def from_json(pattern: Optional[str]) -> "EventPatternMatcher":
+        return EventPatternMatcher(json.loads(pattern or "{}"))
+
+    def matches(self, event: Any) -> bool:
+        if not isinstance(event, dict):
+            return False
+        for key, lower_key, matcher in self.fields:
+            value = event.get(lower_key, MISSING)
+            if value is MISSING and lower_key != key:
+                value = event.get(key, MISSING)
+            if isinstance(matcher, EventPatternMatcher):
+                if value is MISSING or not matcher.matches(value):
+                    return False
+            elif not matcher.matches(value):
+                return False
+        return True
+
+    def get_exact_values(self, field: str) -> Optional[Set[str]]:
+        """Returns the exact string values the given top-level field needs to have to match the pattern, if any."""
+        for _, lower_key, matcher in self.fields:
+            if lower_key == field and isinstance(matcher, FieldMatcher):
+                return matcher.exact_values
+        return None
+
+
+class EventBusRuleIndex:
+    """
+    An inverted index from the ``source`` and ``detail-type`` of events to the rules of an event bus. Each rule is
+    indexed by the exact values of one of these fields its pattern requires. Only the patterns of the rules found in
+    the index (and those of rules that cannot be indexed) are evaluated for an event.
+    """
+
+    def __init__(self):
+        # rule name -> (position of the rule, rule, matcher - or None if the rule matches every event)
+        self.rules: Dict[str, Tuple[int, Any, Optional[EventPatternMatcher]]] = {}
+        # rules which are evaluated for every event
+        self.unindexed: Set[str] = set()
+        # field -> value -> rule names
+        self.index: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, position: int, rule: Any, matcher: Optional[EventPatternMatcher]):
+        self.rules[rule.name] = (position, rule, matcher)
+        if matcher is not None:
+            for field in INDEXED_FIELDS:
+                values = matcher.get_exact_values(field)
+                if values:
+                    for value in values:
+                        self.index[field].setdefault(value, set()).add(rule.name)
+                    return
+        self.unindexed.add(rule.name)
+
+    def remove(self, rule_name: str):
+        entry = self.rules.pop(rule_name, None)
+        if entry is None:
+            return
+        self.unindexed.discard(rule_name)
+        _, _, matcher = entry
+        if matcher is not None:
+            for field in INDEXED_FIELDS:
+                for value in matcher.get_exact_values(field) or []:
+                    names = self.index[field].get(value)
+                    if names:
+                        names.discard(rule_name)
+                        if not names:
+                            del self.index[field][value]
+
+    def match(self, event: Dict[str, Any]) -> List[Any]:
+        """Returns the rules whose pattern matches the given event, in the order in which they have been put."""
+        candidates = set(self.unindexed)
+        for field in INDEXED_FIELDS:
+            value = event.get(field)
+            try:
+                names = self.index[field].get(value)
+            except TypeError:
+                continue
+            if names:
+                candidates.update(names)
+
+        matches = []
+        for rule_name in candidates:
+            position, rule, matcher = self.rules[rule_name]
+            if matcher is None or matcher.matches(event):
+                matches.append((position, rule))
+        matches.sort(key=lambda match: match[0])
+        return [rule for _, rule in matches]
+
+
+class RuleIndex:
+    """
+    Holds the compiled patterns and the rule indexes of all event buses of a region. Every change of the rules of the
+    region (e.g., putting or deleting a rule) invalidates the index by incrementing its version, and the index is
+    synchronized with the rules of the (moto) events backend once per PutEvents call if it is outdated, where only the
+    patterns of new or replaced rules (moto replaces the rule object on every update) are compiled. Matching events
+    therefore does not iterate over the rules of the region.
+    """
+
+    def __init__(self):
+        self.buses: Dict[str, EventBusRuleIndex] = {}
+        # rule name -> (rule, event bus name)
+        self.rules: Dict[str, Tuple[Any, str]] = {}
+        # the version of the rules, and the version the index has been synchronized with
+        self.version = 0
+        self.synced_version = -1
+        self.mutex = threading.RLock()
+
+    def invalidate(self):
+        """Marks the index as outdated, e.g., after a rule has been put or deleted."""
+        with self.mutex:
+            self.version += 1
+
+    def sync(self, rules: Dict[str, Any]):
+        """
+        Synchronizes the index with the given rules, if it has been invalidated since it has last been synchronized.
+
+        :param rules: the rules of the backend, by name
+        """
+        with self.mutex:
+            if self.synced_version == self.version:
+                return
+            self.synced_version = self.version
+            self._sync(rules)
+
+    def match(self, event_bus_name: str, event: Dict[str, Any]) -> List[Any]:
+        """
+        Returns the rules of the given event bus which match the given event.
+
+        :param event_bus_name: the name of the event bus the event has been put to
+        :param event: the event (in the format it is delivered to targets)
+        :return: the matching rules
+        """
+        with self.mutex:
+            bus_index = self.buses.get(event_bus_name)
+            if not bus_index:
+                return []
+            return bus_index.match(event)
+
+    def has_rules(self, event_bus_name: str) -> bool:
+        """Returns whether the given event bus has any rules."""
+        with self.mutex:
+            return event_bus_name in self.buses
+
+    def _sync(self, rules: Dict[str, Any]):
+        for rule_name in [name for name in self.rules if name not in rules]:
+            _, event_bus_name = self.rules.pop(rule_name)
+            self.buses[event_bus_name].remove(rule_name)
+
+        for position, (rule_name, rule) in enumerate(rules.items()):
+            existing = self.rules.get(rule_name)
+            if existing and existing[0] is rule:
+                # keep the compiled pattern, only update the position of the rule
+                entry = self.buses[existing[1]].rules[rule_name]
+                self.buses[existing[1]].rules[rule_name] = (position, *entry[1:])
+                continue
+            if existing:
+                self.buses[existing[1]].remove(rule_name)
+            self.rules[rule_name] = (rule, rule.event_bus_name)
+            bus_index = self.buses.setdefault(rule.event_bus_name, EventBusRuleIndex())
+            bus_index.add(position, rule, compile_rule_pattern(rule))
+
+        for event_bus_name in [name for name, index in self.buses.items() if not index]:
+            del self.buses[event_bus_name]
+
+
+class _NoMatch:
+    """Used for rules with an invalid pattern, which do not match any event."""
+
+    def matches(self, event: Any) -> bool:
+        return False
+
+    def get_exact_values(self, field: str) -> Optional[Set[str]]:
+        return None
+
+
+NO_MATCH = _NoMatch()
+
+
+def compile_rule_pattern(rule: Any) -> Optional[EventPatternMatcher]:
+    """
+    Compiles the pattern of the given rule.
+
+    :param rule: the rule
+    :return: the compiled pattern, or None if the rule does not have a pattern (and therefore matches every event)
+    """
+    pattern = rule.event_pattern.get_pattern() if rule.event_pattern else None
+    if not pattern:
+        return None
+    try:
+        return EventPatternMatcher(pattern)
+    except InvalidEventPattern as e:
+        LOG.info("Unable to compile the event pattern of rule %s: %s", rule.name, e)
+        return NO_MATCH
@@ -1,80 +1,144 @@
+import abc
+import functools
 import logging
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
 
 from crontab import CronTab
 
 from localstack.utils.common import short_uid
-from localstack.utils.run import FuncThread
+from localstack.utils.scheduler import ScheduledTask, Scheduler
 
 LOG = logging.getLogger(__name__)
 
+# maximum number of scheduled rules which are run concurrently
+MAX_WORKERS = 16
 
-class Job:
-    def __init__(self, job_func, schedule, enabled):
-        self.job_func = job_func
+CRON_REGEX = re.compile(r"^\s*cron\s*\(([^\)]*)\)\s*$")
+RATE_REGEX = re.compile(r"^\s*rate\s*\(\s*(\d+)\s+(minutes?|hours?|days?)\s*\)\s*$")
+RATE_UNITS = {"minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+
+class Schedule(abc.ABC):
+    """A compiled schedule expression, which computes the times at which a rule is triggered."""
+
+    @abc.abstractmethod
+    def get_next_time(self, now: float) -> Optional[float]:
+        """Returns the first time after ``now`` at which the rule is triggered, or None if it is never triggered."""
+
+
+class RateSchedule(Schedule):
+    def __init__(self, period: float):
+        self.period = period
+
+    def get_next_time(self, now: float) -> Optional[float]:
+        return now + self.period
+
+
+class CronSchedule(Schedule):
+    def __init__(self, cron: str):
+        self.cron = CronTab(cron)
+
+    def get_next_time(self, now: float) -> Optional[float]:
+        delay = self.cron.next(now=now, default_utc=True)
+        return None if delay is None else now + delay
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_schedule(expression: str) -> Schedule:
+    """
+    Compiles a schedule expression like "cron(0 20 * * ? *)" or "rate(5 minutes)". Plain cron expressions are
+    accepted as well. The compiled schedules are cached, as many rules usually share the same expression.
+    """
+    match = RATE_REGEX.match(expression)
+    if match:
+        value, unit = match.groups()
+        return RateSchedule(int(value) * RATE_UNITS[unit.rstrip("s")])
+    if expression.strip().startswith("rate"):
+        raise ValueError("Unable to parse events schedule expression: %s" % expression)
+    match = CRON_REGEX.match(expression)
+    return CronSchedule(match.group(1) if match else expression)
+
+
+class Job(ScheduledTask):
+    """A scheduled rule, which is triggered at the times of its schedule as long as it is enabled."""
+
+    def __init__(self, job_func: Callable, schedule: str, enabled: bool):
+        super().__init__(job_func, period=0, on_error=self._on_error)
         self.schedule = schedule
+        self.compiled_schedule = compile_schedule(schedule)
         self.job_id = short_uid()
         self.is_enabled = enabled
 
-    def run(self):
-        try:
-            if self.should_run_now() and self.is_enabled:
-                self.do_run()
-        except Exception as e:
-            LOG.debug("Unable to run scheduled function %s: %s", self.job_func, e)
+    def __lt__(self, other: "Job") -> bool:
+        # orders jobs with the same deadline in the queue of the scheduler
+        return self.job_id < other.job_id
+
+    def set_next_deadline(self):
+        deadline = self.compiled_schedule.get_next_time(max(self.deadline or 0, time.time()))
+        if deadline is None:
+            # the schedule has no further runs
+            self.cancel()
+            raise ValueError("Schedule %s has no further runs" % self.schedule)
+        self.deadline = deadline
 
-    def should_run_now(self):
-        schedule = CronTab(self.schedule)
-        delay_secs = schedule.next()
-        return delay_secs is not None and delay_secs < 60
+    def run(self):
+        if self.is_enabled and not self.is_cancelled:
+            super().run()
 
-    def do_run(self):
-        FuncThread(self.job_func).start()
+    def _on_error(self, e: Exception):
+        LOG.debug("Unable to run scheduled function %s: %s", self.task, e)
 
 
 class JobScheduler:
+    """
+    Triggers the scheduled rules at the due times of their schedules. The jobs are kept in the priority queue of a
+    Scheduler (i.e., the cost of a run is logarithmic in the number of jobs), and are run by a bounded pool of workers.
+    """
 
     _instance = None
 
     def __init__(self):
-        # TODO: introduce RLock for mutating jobs list
-        self.jobs = []
+        self.jobs: Dict[str, Job] = {}
+        self.executor = ThreadPoolExecutor(MAX_WORKERS, thread_name_prefix="events-scheduler")
+        self.scheduler = Scheduler(executor=self.executor)
         self.thread = None
+        self.mutex = threading.Lock()
 
     def add_job(self, job_func, schedule, enabled=True):
         job = Job(job_func, schedule, enabled=enabled)
-        self.jobs.append(job)
+        job.deadline = time.time()
+        job.set_next_deadline()
+        with self.mutex:
+            self.jobs[job.job_id] = job
+        self.scheduler.add(job)
         return job.job_id
 
     def disable_job(self, job_id):
-        for job in self.jobs:
-            if job.job_id == job_id:
-                job.is_enabled = False
-                break
+        job = self.jobs.get(job_id)
+        if job:
+            job.is_enabled = False
 
     def cancel_job(self, job_id):
-        i = 0
-        while i < len(self.jobs):
-            if self.jobs[i].job_id == job_id:
-                del self.jobs[i]
-            else:
-                i += 1
-
-    def loop(self, *args):
-        while True:
-            try:
-                for job in list(self.jobs):
-                    job.run()
-            except Exception:
-                pass
-            # This is a simple heuristic to cause the loop to run apprx every minute
-            # TODO: we should keep track of jobs execution times, to avoid duplicate executions
-            time.sleep(59.9)
+        with self.mutex:
+            job = self.jobs.pop(job_id, None)
+        if job:
+            job.cancel()
 
     def start_loop(self):
-        self.thread = FuncThread(self.loop)
+        self.thread = threading.Thread(
+            target=self.scheduler.run, name="events-scheduler", daemon=True
+        )
         self.thread.start()
 
+    def close(self):
+        self.scheduler.close()
+        self.executor.shutdown(wait=False)
+        self.thread = None
+
     @classmethod
     def instance(cls):
         if not cls._instance:
@@ -87,3 +151,10 @@ class JobScheduler:
         if not instance.thread:
             instance.start_loop()
         return instance
+
+    @classmethod
+    def stop(cls):
+        # closes the running instance, a subsequent start creates a new one
+        instance, cls._instance = cls._instance, None
+        if instance:
+            instance.close()
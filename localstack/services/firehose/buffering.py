@@ -0,0 +1,239 @@
+"""
+Buffering of the records of Firehose delivery streams, which are delivered to their destinations in bulk.
+
+The records of each destination of a delivery stream are accumulated in a buffer, which is flushed by a background
+worker as soon as it reaches the size, or its oldest record reaches the age, of the buffering hints of the destination.
+Every flush delivers all buffered records with a single write to the destination (e.g., a single S3 object, or a single
+bulk request to a search domain), and PutRecord/PutRecordBatch calls only append to the buffers. The records are
+delivered with the request context (i.e., region and account) of the latest call which added records to the buffer.
+
+The buffers are delivered by a pool of workers, in order per buffer key, so a slow destination does not delay the
+deliveries to other destinations. Failed deliveries are retried, and then handed to the backup function of the buffer
+(e.g., to store them in the S3 backup of the destination) before the records are dropped.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from localstack import config
+from localstack.aws.api.firehose import BufferingHints
+from localstack.utils.aws.request_context import RequestContextSnapshot
+
+LOG = logging.getLogger(__name__)
+
+# default buffering hints of the destinations in AWS
+DEFAULT_BUFFER_SIZE_MB = 5
+DEFAULT_BUFFER_INTERVAL = 300
+
+# number of retries of a failed delivery, and the delay (multiplied by the number of attempts) before a retry
+DELIVERY_RETRIES = 3
+DELIVERY_RETRY_BACKOFF = 1
+# maximum number of buffers which are delivered concurrently
+MAX_DELIVERY_WORKERS = 8
+
+# delivers the given (processed) records, and the source records they have been created from, to a destination
+DeliverFunction = Callable[[List[Dict], List[Dict]], None]
+# backs up the given (processed) records, which could not be delivered after the given number of attempts
+BackupFunction = Callable[[List[Dict], int, Exception], None]
+
+
+def get_buffer_limits(buffering_hints: Optional[BufferingHints]) -> Tuple[int, float]:
+    """Returns the size (in bytes) and age (in seconds) at which a buffer with the given hints is flushed."""
+    buffering_hints = buffering_hints or {}
+    size = buffering_hints.get("SizeInMBs") or DEFAULT_BUFFER_SIZE_MB
+    interval = buffering_hints.get("IntervalInSeconds")
+    interval = DEFAULT_BUFFER_INTERVAL if interval is None else interval
+    return size * 1024 * 1024, min(interval, config.FIREHOSE_MAX_BUFFER_INTERVAL)
+
+
+def get_record_size(record: Dict) -> int:
+    """Returns the (approximate) size of the decoded data of the given record."""
+    data = record.get("Data") or record.get("data") or ""
+    return len(data) * 3 // 4
+
+
+class RecordBuffer:
+    def __init__(
+        self,
+        deliver: DeliverFunction,
+        size_limit: int,
+        interval: float,
+        backup: Optional[BackupFunction] = None,
+    ):
+        self.deliver = deliver
+        self.backup = backup
+        self.size_limit = size_limit
+        self.interval = interval
+        # the request context of the latest records added to the buffer, which is used to deliver them
+        self.request_context: Optional[RequestContextSnapshot] = None
+        self.records: List[Dict] = []
+        self.source_records: List[Dict] = []
+        self.size = 0
+        # time when the first record has been added to the buffer
+        self.created = time.time()
+
+    def is_due(self, now: float) -> bool:
+        return self.size >= self.size_limit or now - self.created >= self.interval
+
+    @property
+    def due_time(self) -> float:
+        return self.created + self.interval
+
+
+class BufferedDelivery:
+    def __init__(self):
+        # maps the buffer key (e.g., delivery stream and destination) to the records buffered for delivery
+        self._buffers: Dict[Hashable, RecordBuffer] = {}
+        self._mutex = threading.Lock()
+        # maps the key of the buffers which are being delivered to the buffers which are pending delivery. The buffers
+        # of a key are delivered one after the other by a single worker, to preserve the order of the records.
+        self._deliveries: Dict[Hashable, Deque[RecordBuffer]] = {}
+        self._delivered = threading.Condition(self._mutex)
+        self._workers = ThreadPoolExecutor(
+            max_workers=MAX_DELIVERY_WORKERS, thread_name_prefix="firehose-delivery"
+        )
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def put(
+        self,
+        key: Hashable,
+        records: List[Dict],
+        source_records: List[Dict],
+        deliver: DeliverFunction,
+        buffering_hints: Optional[BufferingHints] = None,
+        backup: Optional[BackupFunction] = None,
+    ):
+        """Appends the given records to the buffer with the given key, which is delivered by the given function (and
+        backed up by the given function if the delivery fails)."""
+        if not records and not source_records:
+            return
+        size_limit, interval = get_buffer_limits(buffering_hints)
+        request_context = RequestContextSnapshot()
+        self._start_flusher()
+        with self._mutex:
+            buffer = self._buffers.get(key)
+            created = buffer is None
+            if created:
+                buffer = self._buffers[key] = RecordBuffer(deliver, size_limit, interval, backup)
+            # use the latest configuration of the destination
+            buffer.deliver = deliver
+            buffer.backup = backup
+            buffer.size_limit = size_limit
+            buffer.interval = interval
+            buffer.request_context = request_context
+            buffer.records.extend(records)
+            buffer.source_records.extend(source_records)
+            buffer.size += sum(get_record_size(record) for record in records)
+            due = buffer.is_due(time.time())
+        if created or due:
+            # wake up the flusher to schedule the delivery of the buffer
+            self._wakeup.set()
+
+    def flush(self, matches: Callable[[Hashable], bool] = None):
+        """Delivers the records of all buffers (or of the buffers whose key matches), regardless of their limits, and
+        waits until all their records (including the ones of running deliveries) have been delivered."""
+        with self._mutex:
+            keys = [key for key in self._buffers if not matches or matches(key)]
+            buffers = {key: self._buffers.pop(key) for key in keys}
+        for key in self._schedule(buffers):
+            self._deliver_pending(key)
+        with self._delivered:
+            self._delivered.wait_for(
+                lambda: not any(not matches or matches(key) for key in self._deliveries)
+            )
+
+    def shutdown(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher:
+            self._flusher.join(timeout=5)
+        self.flush()
+        self._workers.shutdown(wait=True)
+
+    def _schedule(self, buffers: Dict[Hashable, RecordBuffer]) -> List[Hashable]:
+        """Appends the given buffers to the pending deliveries of their keys, and returns the keys which are not being
+        delivered yet (i.e., whose pending buffers need to be delivered by the caller)."""
+        idle_keys = []
+        with self._mutex:
+            for key, buffer in buffers.items():
+                pending = self._deliveries.get(key)
+                if pending is None:
+                    pending = self._deliveries[key] = deque()
+                    idle_keys.append(key)
+                pending.append(buffer)
+        return idle_keys
+
+    def _deliver_pending(self, key: Hashable):
+        """Delivers the pending buffers of the given key, until there are none left."""
+        while True:
+            with self._mutex:
+                pending = self._deliveries[key]
+                if not pending:
+                    del self._deliveries[key]
+                    self._delivered.notify_all()
+                    return
+                buffer = pending.popleft()
+            self._deliver(buffer)
+
+    def _deliver(self, buffer: RecordBuffer):
+        """Delivers the records of the given buffer, and retries the delivery (unless the buffers are shut down) if it
+        fails. The records which cannot be delivered are passed to the backup function of the buffer."""
+        attempts = 0
+        with buffer.request_context.apply():
+            while True:
+                attempts += 1
+                try:
+                    buffer.deliver(buffer.records, buffer.source_records)
+                    return
+                except Exception as e:
+                    error = e
+                if attempts > DELIVERY_RETRIES or self._stopped.is_set():
+                    break
+                LOG.debug("Retrying failed delivery of buffered Firehose records: %s", error)
+                self._stopped.wait(DELIVERY_RETRY_BACKOFF * attempts)
+
+            if buffer.backup:
+                try:
+                    buffer.backup(buffer.records, attempts, error)
+                    return
+                except Exception as e:
+                    LOG.warning("Unable to back up buffered Firehose records: %s", e)
+        LOG.warning(
+            "Unable to deliver %s buffered Firehose records after %s attempts, dropping them: %s",
+            len(buffer.records),
+            attempts,
+            error,
+        )
+
+    def _flush_due_buffers(self) -> Optional[float]:
+        """Schedules the delivery of the buffers which are due, and returns the time when the next buffer is due (if
+        any)."""
+        now = time.time()
+        with self._mutex:
+            due_keys = [key for key, buffer in self._buffers.items() if buffer.is_due(now)]
+            buffers = {key: self._buffers.pop(key) for key in due_keys}
+            next_due = min((buffer.due_time for buffer in self._buffers.values()), default=None)
+        for key in self._schedule(buffers):
+            self._workers.submit(self._deliver_pending, key)
+        return next_due
+
+    def _start_flusher(self):
+        if self._flusher:
+            return
+        with self._mutex:
+            if self._flusher:
+                return
+            self._flusher = threading.Thread(target=self._run, name="firehose-buffers", daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            next_due = self._flush_due_buffers()
+            timeout = None if next_due is None else max(next_due - time.time(), 0)
+            self._wakeup.wait(timeout)
@@ -0,0 +1,239 @@
+"""
+Processing of the records of Firehose delivery streams (e.g., by a Lambda function) before they are buffered for
+delivery, and storage of the records which failed to be processed or delivered in the error output prefix of the S3
+destination (or the S3 backup) of a destination.
+"""
+import json
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from localstack.aws.api.firehose import (
+    BufferingHints,
+    DestinationDescription,
+    Processor,
+    Record,
+    S3DestinationDescription,
+)
+from localstack.utils.aws import aws_stack
+from localstack.utils.aws.aws_stack import (
+    connect_to_resource,
+    extract_region_from_arn,
+    s3_bucket_name,
+)
+from localstack.utils.common import now_utc, timestamp, to_bytes, to_str, truncate
+
+LOG = logging.getLogger(__name__)
+
+# default buffering hints and number of retries of Lambda processors in AWS
+DEFAULT_PROCESSING_BUFFER_SIZE_MB = 1
+DEFAULT_PROCESSING_BUFFER_INTERVAL = 60
+DEFAULT_PROCESSING_RETRIES = 3
+# delay (multiplied by the number of attempts) before retrying the invocation of a Lambda processor
+PROCESSING_RETRY_BACKOFF = 0.5
+
+
+def get_processor_parameters(processor: Processor) -> Dict[str, str]:
+    parameters = processor.get("Parameters", [])
+    return {p["ParameterName"]: p["ParameterValue"] for p in parameters}
+
+
+def get_processors(destination: DestinationDescription) -> List[Processor]:
+    """Returns the processors of the enabled processing configuration of the given destination."""
+    proc_config = {}
+    for child in destination.values():
+        proc_config = (
+            isinstance(child, dict) and child.get("ProcessingConfiguration") or proc_config
+        )
+    if proc_config.get("Enabled") is False:
+        return []
+    return proc_config.get("Processors") or []
+
+
+def get_processing_buffering_hints(processors: List[Processor]) -> BufferingHints:
+    """Returns the buffering hints for the records which are processed by the given processors."""
+    size = DEFAULT_PROCESSING_BUFFER_SIZE_MB
+    interval = DEFAULT_PROCESSING_BUFFER_INTERVAL
+    for processor in processors:
+        parameters = get_processor_parameters(processor)
+        size = float(parameters.get("BufferSizeInMBs") or size)
+        interval = float(parameters.get("BufferIntervalInSeconds") or interval)
+    return BufferingHints(SizeInMBs=size, IntervalInSeconds=interval)
+
+
+def get_s3_destination_description(
+    destination: DestinationDescription,
+) -> Optional[S3DestinationDescription]:
+    """Returns the S3 destination, or the S3 backup configuration of the given destination."""
+    if destination.get("ExtendedS3DestinationDescription"):
+        return destination["ExtendedS3DestinationDescription"]
+    if destination.get("S3DestinationDescription"):
+        return destination["S3DestinationDescription"]
+    for child in destination.values():
+        if isinstance(child, dict) and child.get("S3DestinationDescription"):
+            return child["S3DestinationDescription"]
+
+
+def get_s3_object_path(stream_name: str, prefix: str) -> str:
+    # See https://aws.amazon.com/kinesis/data-firehose/faqs/#Data_delivery
+    # Path prefix pattern: myApp/YYYY/MM/DD/HH/
+    # Object name pattern: DeliveryStreamName-DeliveryStreamVersion-YYYY-MM-DD-HH-MM-SS-RandomString
+    if not prefix.endswith("/") and prefix != "":
+        prefix = prefix + "/"
+    pattern = "{pre}%Y/%m/%d/%H/{name}-%Y-%m-%d-%H-%M-%S-{rand}"
+    path = pattern.format(pre=prefix, name=stream_name, rand=str(uuid.uuid4()))
+    path = timestamp(format=path)
+    return path
+
+
+def preprocess_records(
+    processor: Processor, records: List[Record]
+) -> Tuple[List[Dict], List[Dict]]:
+    """Preprocess the list of records by calling the given processor (e.g., Lambda function), and return the
+    processed records, as well as the records which failed to be processed (with the error details)."""
+    proc_type = processor.get("Type")
+    if proc_type != "Lambda":
+        LOG.warning("Unsupported Firehose processor type '%s'", proc_type)
+        return records, []
+    parameters = get_processor_parameters(processor)
+    lambda_arn = parameters.get("LambdaArn")
+    retries = int(parameters.get("NumberOfRetries") or DEFAULT_PROCESSING_RETRIES)
+
+    # create the event records, identified by their position in the batch
+    event_records = []
+    for index, record in enumerate(records):
+        event_record = {
+            "recordId": str(index),
+            "approximateArrivalTimestamp": record.get("ApproximateArrivalTimestamp")
+            or record.get("approximateArrivalTimestamp"),
+            "data": to_str(record.get("Data") or record.get("data")),
+        }
+        metadata = record.get("KinesisRecordMetadata") or record.get("kinesisRecordMetadata")
+        if metadata:
+            event_record["kinesisRecordMetadata"] = metadata
+        event_records.append(event_record)
+    event = to_bytes(json.dumps({"records": event_records}))
+
+    client = aws_stack.connect_to_service("lambda", region_name=extract_region_from_arn(lambda_arn))
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            response = client.invoke(FunctionName=lambda_arn, Payload=event)
+            result = json.loads(to_str(response.get("Payload").read()) or "null")
+            if response.get("FunctionError"):
+                raise Exception(f"Function error: {truncate(result, max_length=300)}")
+            break
+        except Exception as e:
+            if attempts > retries:
+                LOG.info("Unable to invoke Firehose processor %s: %s", lambda_arn, e)
+                failed = [
+                    {
+                        "record": record,
+                        "attempts": attempts,
+                        "error_code": "Lambda.InvokeFailed",
+                        "error_message": str(e),
+                    }
+                    for record in records
+                ]
+                return [], failed
+            time.sleep(PROCESSING_RETRY_BACKOFF * attempts)
+
+    processed, failed = [], []
+    for output_record in (result or {}).get("records", []):
+        status = output_record.get("result") or "Ok"
+        if status == "Ok":
+            processed.append(output_record)
+        elif status == "ProcessingFailed":
+            record_id = output_record.get("recordId")
+            source = records[int(record_id)] if str(record_id).isdigit() else output_record
+            failed.append(
+                {
+                    "record": source,
+                    "attempts": attempts,
+                    "error_code": "Lambda.ProcessingFailed",
+                    "error_message": "The Lambda function returned ProcessingFailed",
+                }
+            )
+    return processed, failed
+
+
+def put_processing_failures(
+    delivery_stream_name: str,
+    destination: DestinationDescription,
+    processor: Processor,
+    failed_records: List[Dict],
+):
+    """Write the records which failed to be processed to the error output prefix of the S3 destination (or the
+    S3 backup of the destination)"""
+    put_failed_records(
+        delivery_stream_name,
+        get_s3_destination_description(destination),
+        "processing-failed",
+        failed_records,
+        lambdaArn=get_processor_parameters(processor).get("LambdaArn"),
+    )
+
+
+def put_delivery_failures(
+    delivery_stream_name: str,
+    s3_dest_desc: Optional[S3DestinationDescription],
+    destination_type: str,
+    default_prefix: str,
+    records: List[Dict],
+    attempts: int,
+    error: Exception,
+):
+    """Write the records which failed to be delivered to a destination to the error output prefix of the S3
+    backup of the destination"""
+    failed_records = [
+        {
+            "record": record,
+            "attempts": attempts,
+            "error_code": f"{destination_type}.DeliveryFailed",
+            "error_message": str(error),
+        }
+        for record in records
+    ]
+    put_failed_records(delivery_stream_name, s3_dest_desc, default_prefix, failed_records)
+
+
+def put_failed_records(
+    delivery_stream_name: str,
+    s3_dest_desc: Optional[S3DestinationDescription],
+    default_prefix: str,
+    failed_records: List[Dict],
+    **details,
+):
+    """Write the given failed records (with their error details) to the error output prefix (or the given default
+    prefix) of the given S3 destination"""
+    if not s3_dest_desc:
+        LOG.warning(
+            "Unable to store %s failed records of Firehose stream %s, no S3 destination configured",
+            len(failed_records),
+            delivery_stream_name,
+        )
+        return
+    bucket = s3_bucket_name(s3_dest_desc["BucketARN"])
+    prefix = s3_dest_desc.get("ErrorOutputPrefix") or default_prefix
+    lines = []
+    for failure in failed_records:
+        record = failure["record"]
+        lines.append(
+            json.dumps(
+                {
+                    "attemptsMade": failure["attempts"],
+                    "arrivalTimestamp": record.get("ApproximateArrivalTimestamp")
+                    or record.get("approximateArrivalTimestamp"),
+                    "errorCode": failure["error_code"],
+                    "errorMessage": failure["error_message"],
+                    "attemptEndingTimestamp": int(now_utc(millis=True)),
+                    "rawData": to_str(record.get("Data") or record.get("data")),
+                    **details,
+                }
+            )
+        )
+    obj_path = get_s3_object_path(delivery_stream_name, prefix)
+    s3 = connect_to_resource("s3")
+    s3.Object(bucket, obj_path).put(Body=to_bytes("\n".join(lines) + "\n"))
@@ -1,11 +1,16 @@
 import base64
+import functools
+import gzip
+import io
 import json
 import logging
 import threading
 import time
 import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import requests
 
@@ -15,6 +20,7 @@ from localstack.aws.api.firehose import (
     AmazonopensearchserviceDestinationConfiguration,
     AmazonopensearchserviceDestinationUpdate,
     BooleanObject,
+    CompressionFormat,
     CreateDeliveryStreamOutput,
     DeleteDeliveryStreamOutput,
     DeliveryStreamDescription,
@@ -43,6 +49,7 @@ from localstack.aws.api.firehose import (
     ListTagsForDeliveryStreamInputLimit,
     ListTagsForDeliveryStreamOutput,
     ListTagsForDeliveryStreamOutputTagList,
+    Processor,
     PutRecordBatchOutput,
     PutRecordBatchRequestEntryList,
     PutRecordBatchResponseEntry,
@@ -63,6 +70,7 @@ from localstack.aws.api.firehose import (
     UntagDeliveryStreamOutput,
     UpdateDestinationOutput,
 )
+from localstack.services.firehose.buffering import BufferedDelivery
 from localstack.services.firehose.mappers import (
     convert_es_config_to_desc,
     convert_es_update_to_desc,
@@ -76,7 +84,16 @@ from localstack.services.firehose.mappers import (
     convert_s3_update_to_desc,
     convert_source_config_to_desc,
 )
+from localstack.services.firehose.processing import (
+    get_processing_buffering_hints,
+    get_processors,
+    get_s3_object_path,
+    preprocess_records,
+    put_delivery_failures,
+    put_processing_failures,
+)
 from localstack.services.generic_proxy import RegionBackend
+from localstack.services.plugins import ServiceLifecycleHook
 from localstack.utils.aws import aws_stack
 from localstack.utils.aws.aws_stack import (
     connect_to_resource,
@@ -85,14 +102,13 @@ from localstack.utils.aws.aws_stack import (
     get_search_db_connection,
     s3_bucket_name,
 )
+from localstack.utils.aws.request_context import RequestContextSnapshot
 from localstack.utils.common import (
     TIMESTAMP_FORMAT_MICROS,
     first_char_to_lower,
-    keys_to_lower,
     now_utc,
     short_uid,
     timestamp,
-    to_bytes,
     to_str,
     truncate,
 )
@@ -108,6 +124,12 @@ SEQUENCE_NUMBER = 49546986683135544286507457936321625675700192471156785154
 SEQUENCE_NUMBER_MUTEX = threading.RLock()
 
 
+# maximum number of batches of records which are processed concurrently
+MAX_PROCESSING_WORKERS = 8
+# timeout (in seconds) of the requests which deliver records to HTTP endpoints
+HTTP_ENDPOINT_REQUEST_TIMEOUT = 30
+
+
 def next_sequence_number() -> int:
     """Increase and return the next global sequence number."""
     global SEQUENCE_NUMBER
@@ -116,6 +138,29 @@ def next_sequence_number() -> int:
         return SEQUENCE_NUMBER
 
 
+def compress_data(data: bytes, compression_format: Optional[str]) -> Tuple[bytes, str]:
+    """Compresses the given data with the compression format of an S3 destination, and returns the compressed data
+    and the extension of the object name."""
+    if not compression_format or compression_format == CompressionFormat.UNCOMPRESSED:
+        return data, ""
+    if compression_format == CompressionFormat.GZIP:
+        return gzip.compress(data), ".gz"
+    if compression_format == CompressionFormat.ZIP:
+        result = io.BytesIO()
+        with zipfile.ZipFile(result, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("data", data)
+        return result.getvalue(), ".zip"
+    if compression_format == CompressionFormat.Snappy:
+        try:
+            import snappy
+        except ImportError:
+            LOG.warning("Snappy compression requires the python-snappy package, storing raw data")
+            return data, ""
+        return snappy.compress(data), ".snappy"
+    LOG.warning("Unsupported compression format %s, storing raw data", compression_format)
+    return data, ""
+
+
 class FirehoseBackend(RegionBackend):
     # maps delivery stream names to DeliveryStreamDescription
     delivery_streams: Dict[str, DeliveryStreamDescription]
@@ -140,7 +185,21 @@ def _get_description_or_raise_not_found(
     return delivery_stream_description
 
 
-class FirehoseProvider(FirehoseApi):
+class FirehoseProvider(FirehoseApi, ServiceLifecycleHook):
+    def __init__(self):
+        super().__init__()
+        # records which are buffered for processing, and for delivery to the destinations
+        self.processing_buffers = BufferedDelivery()
+        self.buffers = BufferedDelivery()
+        self.processing_workers = ThreadPoolExecutor(
+            max_workers=MAX_PROCESSING_WORKERS, thread_name_prefix="firehose-processing"
+        )
+
+    def on_before_stop(self):
+        self.processing_buffers.shutdown()
+        self.processing_workers.shutdown(wait=True)
+        self.buffers.shutdown()
+
     def create_delivery_stream(
         self,
         context: RequestContext,
@@ -270,6 +329,13 @@ class FirehoseProvider(FirehoseApi):
             LOG.debug("Stopping kinesis listener for %s", delivery_stream_name)
             kinesis_process.stop()
 
+        # process and deliver the records which are still buffered for the stream
+        def _is_stream_buffer(key):
+            return key[:3] == (context.account_id, context.region, delivery_stream_name)
+
+        self.processing_buffers.flush(_is_stream_buffer)
+        self.buffers.flush(_is_stream_buffer)
+
         return DeleteDeliveryStreamOutput()
 
     def describe_delivery_stream(
@@ -451,76 +517,189 @@ class FirehoseProvider(FirehoseApi):
         # preprocess records, add any missing attributes
         self._add_missing_record_attributes(unprocessed_records)
 
+        account_id = get_aws_account_id()
+        region_name = aws_stack.get_region()
         for destination in delivery_stream_description.get("Destinations", []):
-
-            # apply processing steps to incoming items
-            proc_config = {}
-            for child in destination.values():
-                proc_config = (
-                    isinstance(child, dict) and child.get("ProcessingConfiguration") or proc_config
-                )
+            buffer_key = (
+                account_id,
+                region_name,
+                delivery_stream_name,
+                destination.get("DestinationId"),
+            )
             records = list(unprocessed_records)
-            if proc_config.get("Enabled") is not False:
-                for processor in proc_config.get("Processors", []):
-                    # TODO: run processors asynchronously, to avoid request timeouts on PutRecord API calls
-                    records = self._preprocess_records(processor, records)
-
-            if "ElasticsearchDestinationDescription" in destination:
-                self._put_to_search_db(
-                    "ElasticSearch",
-                    destination["ElasticsearchDestinationDescription"],
-                    delivery_stream_name,
-                    records,
-                    unprocessed_records,
+            processors = get_processors(destination)
+            if not processors:
+                self._buffer_for_delivery(
+                    buffer_key, delivery_stream_name, destination, records, unprocessed_records
                 )
-            if "AmazonopensearchserviceDestinationDescription" in destination:
-                self._put_to_search_db(
-                    "OpenSearch",
-                    destination["AmazonopensearchserviceDestinationDescription"],
+                continue
+
+            # buffer the records for processing (e.g., by a Lambda function) in the background, which are then
+            # buffered for delivery to the destination
+            def _process(
+                _records, _, _key=buffer_key, _destination=destination, _processors=processors
+            ):
+                # the records are processed with the request context of the buffer (applied by the flusher)
+                self.processing_workers.submit(
+                    self._process_and_buffer_records,
+                    RequestContextSnapshot(),
+                    _key,
                     delivery_stream_name,
-                    records,
-                    unprocessed_records,
+                    _destination,
+                    _processors,
+                    _records,
                 )
-            if "S3DestinationDescription" in destination:
-                s3_dest_desc = (
-                    destination["S3DestinationDescription"]
-                    or destination["ExtendedS3DestinationDescription"]
-                )
-                self._put_records_to_s3_bucket(delivery_stream_name, records, s3_dest_desc)
-            if "HttpEndpointDestinationDescription" in destination:
-                http_dest = destination["HttpEndpointDestinationDescription"]
-                end_point = http_dest["EndpointConfiguration"]
-                url = end_point["Url"]
-                record_to_send = {
-                    "requestId": str(uuid.uuid4()),
-                    "timestamp": (int(time.time())),
-                    "records": [],
-                }
-                for record in records:
-                    data = record.get("Data") or record.get("data")
-                    record_to_send["records"].append({"data": to_str(data)})
-                headers = {
-                    "Content-Type": "application/json",
-                }
-                try:
-                    requests.post(url, json=record_to_send, headers=headers)
-                except Exception as e:
-                    LOG.exception(f"Unable to put Firehose records to HTTP endpoint {url}.")
-                    raise e
+
+            self.processing_buffers.put(
+                buffer_key + ("Processing",),
+                records,
+                [],
+                _process,
+                get_processing_buffering_hints(processors),
+            )
         return [
             PutRecordBatchResponseEntry(RecordId=str(uuid.uuid4())) for _ in unprocessed_records
         ]
 
+    def _buffer_for_delivery(
+        self,
+        buffer_key: Tuple,
+        delivery_stream_name: str,
+        destination: DestinationDescription,
+        records: List[Dict],
+        source_records: List[Dict],
+    ):
+        """Buffer the records, which are delivered to the destination in the background"""
+        if "ElasticsearchDestinationDescription" in destination:
+            es_dest_desc = destination["ElasticsearchDestinationDescription"]
+            self.buffers.put(
+                buffer_key + ("ElasticSearch",),
+                records,
+                source_records,
+                functools.partial(
+                    self._put_to_search_db, "ElasticSearch", es_dest_desc, delivery_stream_name
+                ),
+                es_dest_desc.get("BufferingHints"),
+                functools.partial(
+                    put_delivery_failures,
+                    delivery_stream_name,
+                    es_dest_desc.get("S3DestinationDescription"),
+                    "Elasticsearch",
+                    "elasticsearch-failed",
+                ),
+            )
+        if "AmazonopensearchserviceDestinationDescription" in destination:
+            os_dest_desc = destination["AmazonopensearchserviceDestinationDescription"]
+            self.buffers.put(
+                buffer_key + ("OpenSearch",),
+                records,
+                source_records,
+                functools.partial(
+                    self._put_to_search_db, "OpenSearch", os_dest_desc, delivery_stream_name
+                ),
+                os_dest_desc.get("BufferingHints"),
+                functools.partial(
+                    put_delivery_failures,
+                    delivery_stream_name,
+                    os_dest_desc.get("S3DestinationDescription"),
+                    "AmazonOpenSearchService",
+                    "AmazonOpenSearchService-failed",
+                ),
+            )
+        if "S3DestinationDescription" in destination:
+            s3_dest_desc = (
+                destination["S3DestinationDescription"]
+                or destination["ExtendedS3DestinationDescription"]
+            )
+            self.buffers.put(
+                buffer_key + ("S3",),
+                records,
+                source_records,
+                lambda _records, _, _desc=s3_dest_desc: self._put_records_to_s3_bucket(
+                    delivery_stream_name, _records, _desc
+                ),
+                s3_dest_desc.get("BufferingHints"),
+            )
+        if "HttpEndpointDestinationDescription" in destination:
+            http_dest = destination["HttpEndpointDestinationDescription"]
+            self.buffers.put(
+                buffer_key + ("HttpEndpoint",),
+                records,
+                source_records,
+                lambda _records, _, _desc=http_dest: self._put_records_to_http_endpoint(
+                    _desc, _records
+                ),
+                http_dest.get("BufferingHints"),
+                functools.partial(
+                    put_delivery_failures,
+                    delivery_stream_name,
+                    http_dest.get("S3DestinationDescription"),
+                    "HttpEndpoint",
+                    "http-endpoint-failed",
+                ),
+            )
+
+    def _process_and_buffer_records(
+        self,
+        request_context: RequestContextSnapshot,
+        buffer_key: Tuple,
+        delivery_stream_name: str,
+        destination: DestinationDescription,
+        processors: List[Processor],
+        source_records: List[Dict],
+    ):
+        """Apply the processors of the destination to the given records (with the given request context), and buffer
+        the results for delivery"""
+        with request_context.apply():
+            records = source_records
+            try:
+                for processor in processors:
+                    records, failed_records = preprocess_records(processor, records)
+                    if failed_records:
+                        put_processing_failures(
+                            delivery_stream_name, destination, processor, failed_records
+                        )
+            except Exception as e:
+                LOG.warning(
+                    "Unable to process records of Firehose stream %s: %s", delivery_stream_name, e
+                )
+                return
+            self._buffer_for_delivery(
+                buffer_key, delivery_stream_name, destination, records, source_records
+            )
+
+    def _put_records_to_http_endpoint(self, http_dest: Dict, records: List[Dict]):
+        url = http_dest["EndpointConfiguration"]["Url"]
+        record_to_send = {
+            "requestId": str(uuid.uuid4()),
+            "timestamp": (int(time.time())),
+            "records": [],
+        }
+        for record in records:
+            data = record.get("Data") or record.get("data")
+            record_to_send["records"].append({"data": to_str(data)})
+        headers = {
+            "Content-Type": "application/json",
+        }
+        try:
+            response = requests.post(
+                url, json=record_to_send, headers=headers, timeout=HTTP_ENDPOINT_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+        except Exception as e:
+            LOG.exception(f"Unable to put Firehose records to HTTP endpoint {url}.")
+            raise e
+
     def _put_to_search_db(
         self, db_flavor, db_description, delivery_stream_name, records, unprocessed_records
     ):
         """
-        sends Firehose records to an ElasticSearch or Opensearch database
+        sends Firehose records to an ElasticSearch or Opensearch database, using a single bulk request
         """
         search_db_index = db_description["IndexName"]
         search_db_type = db_description.get("TypeName")
-        region = aws_stack.get_region()
         domain_arn = db_description.get("DomainARN")
+        region = extract_region_from_arn(domain_arn) if domain_arn else aws_stack.get_region()
         cluster_endpoint = db_description.get("ClusterEndpoint")
         if cluster_endpoint is None:
             cluster_endpoint = aws_stack.get_opensearch_endpoint(domain_arn)
@@ -542,9 +721,8 @@ class FirehoseProvider(FirehoseApi):
         elif db_description.get("S3BackupMode") == ElasticsearchS3BackupMode.FailedDocumentsOnly:
             # TODO support FailedDocumentsOnly as well
             LOG.warning("S3BackupMode FailedDocumentsOnly is set but currently not supported.")
+        bulk_lines = []
         for record in records:
-            obj_id = uuid.uuid4()
-
             data = "{}"
             # DirectPut
             if "Data" in record:
@@ -555,22 +733,37 @@ class FirehoseProvider(FirehoseApi):
 
             try:
                 body = json.loads(data)
-            except Exception as e:
-                LOG.warning(f"{db_flavor} only allows json input data!")
-                raise e
-
-            LOG.debug(
-                "Publishing to {} destination. Data: {}".format(
-                    db_flavor, truncate(data, max_length=300)
+            except Exception:
+                LOG.warning(
+                    "%s only allows json input data, skipping record: %s",
+                    db_flavor,
+                    truncate(data, max_length=300),
                 )
+                continue
+
+            action = {"_index": search_db_index, "_id": str(uuid.uuid4())}
+            if search_db_type:
+                action["_type"] = search_db_type
+            bulk_lines.append(json.dumps({"create": action}))
+            bulk_lines.append(json.dumps(body))
+        if not bulk_lines:
+            return
+
+        LOG.debug("Publishing %s records to %s destination", len(bulk_lines) // 2, db_flavor)
+        try:
+            result = db_connection.bulk(body="\n".join(bulk_lines) + "\n")
+        except Exception as e:
+            LOG.exception(f"Unable to put records to stream {delivery_stream_name}.")
+            raise e
+        if result.get("errors"):
+            failed = [item for item in result.get("items", []) if item["create"].get("error")]
+            LOG.warning(
+                "Unable to put %s records of stream %s to %s: %s",
+                len(failed),
+                delivery_stream_name,
+                db_flavor,
+                failed[0]["create"]["error"] if failed else result,
             )
-            try:
-                db_connection.create(
-                    index=search_db_index, doc_type=search_db_type, id=obj_id, body=body
-                )
-            except Exception as e:
-                LOG.exception(f"Unable to put record to stream {delivery_stream_name}.")
-                raise e
 
     def _add_missing_record_attributes(self, records: List[Dict]) -> None:
         def _get_entry(obj, key):
@@ -592,34 +785,6 @@ class FirehoseProvider(FirehoseApi):
                     "subsequenceNumber": "",
                 }
 
-    def _preprocess_records(self, processor: Dict, records: List[Record]) -> List[Dict]:
-        """Preprocess the list of records by calling the given processor (e.g., Lamnda function)."""
-        proc_type = processor.get("Type")
-        parameters = processor.get("Parameters", [])
-        parameters = {p["ParameterName"]: p["ParameterValue"] for p in parameters}
-        if proc_type == "Lambda":
-            lambda_arn = parameters.get("LambdaArn")
-            # TODO: add support for other parameters, e.g., NumberOfRetries, BufferSizeInMBs, BufferIntervalInSeconds, ...
-            records = keys_to_lower(records)
-            # Convert the record data to string (for json serialization)
-            for record in records:
-                if "data" in record:
-                    record["data"] = to_str(record["data"])
-                if "Data" in record:
-                    record["Data"] = to_str(record["Data"])
-            event = {"records": records}
-            event = to_bytes(json.dumps(event))
-            client = aws_stack.connect_to_service(
-                "lambda", region_name=extract_region_from_arn(lambda_arn)
-            )
-            response = client.invoke(FunctionName=lambda_arn, Payload=event)
-            result = response.get("Payload").read()
-            result = json.loads(to_str(result))
-            records = result.get("records", []) if result else []
-        else:
-            LOG.warning("Unsupported Firehose processor type '%s'", proc_type)
-        return records
-
     def _put_records_to_s3_bucket(
         self,
         stream_name: str,
@@ -631,22 +796,14 @@ class FirehoseProvider(FirehoseApi):
 
         s3 = connect_to_resource("s3")
         batched_data = b"".join([base64.b64decode(r.get("Data") or r.get("data")) for r in records])
+        batched_data, extension = compress_data(
+            batched_data, s3_destination_description.get("CompressionFormat")
+        )
 
-        obj_path = self._get_s3_object_path(stream_name, prefix)
+        obj_path = get_s3_object_path(stream_name, prefix) + extension
         try:
             LOG.debug("Publishing to S3 destination: %s. Data: %s", bucket, batched_data)
             s3.Object(bucket, obj_path).put(Body=batched_data)
         except Exception as e:
             LOG.exception(f"Unable to put records {records} to s3 bucket.")
             raise e
-
-    def _get_s3_object_path(self, stream_name, prefix):
-        # See https://aws.amazon.com/kinesis/data-firehose/faqs/#Data_delivery
-        # Path prefix pattern: myApp/YYYY/MM/DD/HH/
-        # Object name pattern: DeliveryStreamName-DeliveryStreamVersion-YYYY-MM-DD-HH-MM-SS-RandomString
-        if not prefix.endswith("/") and prefix != "":
-            prefix = prefix + "/"
-        pattern = "{pre}%Y/%m/%d/%H/{name}-%Y-%m-%d-%H-%M-%S-{rand}"
-        path = pattern.format(pre=prefix, name=stream_name, rand=str(uuid.uuid4()))
-        path = timestamp(format=path)
-        return path
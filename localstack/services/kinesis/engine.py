@@ -0,0 +1,283 @@
+"""
+In-process storage engine for Kinesis streams, used by the "local" Kinesis provider instead of an external
+kinesis-mock or kinesalite server.
+
+The records of each shard are kept in an append-only log of fixed-size segments. Sequence numbers encode the offset
+of a record in its shard, which makes the sequence number index a simple computation, and shard iterators are
+stateless tokens that encode the position in the log. Readers can block on a shard until new records have been
+appended (see ``wait_for_records``), which lets enhanced fan-out subscribers and stream pollers react to new records
+immediately instead of polling with a fixed interval.
+"""
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from localstack import config
+from localstack.aws.accounts import get_aws_account_id
+from localstack.aws.api.kinesis import (
+    ExpiredIteratorException,
+    InvalidArgumentException,
+    ResourceNotFoundException,
+)
+from localstack.services.generic_proxy import RegionBackend
+
+LOG = logging.getLogger(__name__)
+
+# number of records per segment of a shard log
+SEGMENT_SIZE = 1000
+MAX_HASH_KEY = 2**128 - 1
+DEFAULT_RETENTION_HOURS = 24
+# number of digits of the record offset at the end of a sequence number
+OFFSET_DIGITS = 20
+# prefix which gives the sequence numbers the length of the sequence numbers of AWS
+SEQUENCE_NUMBER_PREFIX = "49"
+
+
+class ShardRecord(NamedTuple):
+    data: bytes
+    partition_key: str
+    arrival_time: float
+
+
+class ShardLog:
+    """
+    Append-only log of the records of a shard. The log consists of segments of at most SEGMENT_SIZE records, so that
+    records beyond the retention period can be dropped a segment at a time.
+    """
+
+    def __init__(self):
+        self.segments: deque = deque()
+        # arrival time of the first record of each segment, to find the position of a timestamp
+        self.segment_times: deque = deque()
+        # offset of the first record which is still retained
+        self.start_offset = 0
+        # offset of the next record which is appended
+        self.end_offset = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def append(self, records: List[ShardRecord]) -> int:
+        """Appends the given records, and returns the offset of the first record."""
+        with self._condition:
+            offset = self.end_offset
+            for record in records:
+                if not self.segments or len(self.segments[-1]) >= SEGMENT_SIZE:
+                    self.segments.append([])
+                    self.segment_times.append(record.arrival_time)
+                self.segments[-1].append(record)
+            self.end_offset += len(records)
+            self._condition.notify_all()
+            return offset
+
+    def read(self, offset: int, limit: int) -> Tuple[List[ShardRecord], int]:
+        """Returns up to ``limit`` records starting at the given offset, and the offset of the following record."""
+        with self._condition:
+            offset = max(offset, self.start_offset)
+            end = min(offset + limit, self.end_offset)
+            records = []
+            position = offset - self.start_offset
+            while offset + len(records) < end:
+                index, start = divmod(position + len(records), SEGMENT_SIZE)
+                segment = self.segments[index]
+                records.extend(segment[start : start + end - offset - len(records)])
+            return records, offset + len(records)
+
+    def get_offset_at(self, timestamp: float) -> int:
+        """Returns the offset of the first record which arrived at or after the given time."""
+        with self._condition:
+            index = max(bisect.bisect_right(self.segment_times, timestamp) - 1, 0)
+            offset = self.start_offset + index * SEGMENT_SIZE
+            for segment in list(self.segments)[index:]:
+                for record in segment:
+                    if record.arrival_time >= timestamp:
+                        return offset
+                    offset += 1
+            return self.end_offset
+
+    def get_arrival_time(self, offset: int) -> Optional[float]:
+        records, _ = self.read(offset, 1)
+        return records[0].arrival_time if records else None
+
+    def wait(self, offset: int, timeout: float) -> bool:
+        """Blocks until records after the given offset have been appended, returns False after the timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.end_offset > offset or self.closed, timeout=timeout
+            )
+
+    def trim(self, before: float):
+        """Drops the segments which only contain records which arrived before the given time."""
+        with self._condition:
+            while len(self.segments) > 1 and self.segment_times[1] <= before:
+                self.segments.popleft()
+                self.segment_times.popleft()
+                self.start_offset += SEGMENT_SIZE
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class Shard:
+    def __init__(self, index: int, starting_hash_key: int, ending_hash_key: int, created: float):
+        self.index = index
+        self.shard_id = "shardId-%012d" % index
+        self.starting_hash_key = starting_hash_key
+        self.ending_hash_key = ending_hash_key
+        self.log = ShardLog()
+        self._sequence_prefix = "%s%013d%06d" % (SEQUENCE_NUMBER_PREFIX, int(created * 1000), index)
+
+    def get_sequence_number(self, offset: int) -> str:
+        return "%s%0*d" % (self._sequence_prefix, OFFSET_DIGITS, offset)
+
+    def get_offset(self, sequence_number: str) -> int:
+        if not sequence_number.startswith(self._sequence_prefix):
+            raise InvalidArgumentException(
+                f"Invalid StartingSequenceNumber {sequence_number} for shard {self.shard_id}"
+            )
+        return int(sequence_number[-OFFSET_DIGITS:])
+
+    def to_dict(self) -> Dict:
+        return {
+            "ShardId": self.shard_id,
+            "HashKeyRange": {
+                "StartingHashKey": str(self.starting_hash_key),
+                "EndingHashKey": str(self.ending_hash_key),
+            },
+            "SequenceNumberRange": {"StartingSequenceNumber": self.get_sequence_number(0)},
+        }
+
+
+class Stream:
+    def __init__(self, name: str, arn: str, shard_count: int, stream_mode: str = "PROVISIONED"):
+        self.name = name
+        self.arn = arn
+        self.stream_mode = stream_mode
+        self.created = time.time()
+        self.retention_hours = DEFAULT_RETENTION_HOURS
+        self.tags: Dict[str, str] = {}
+        self.shards: List[Shard] = []
+        span = (MAX_HASH_KEY + 1) // shard_count
+        for i in range(shard_count):
+            end = MAX_HASH_KEY if i == shard_count - 1 else (i + 1) * span - 1
+            self.shards.append(Shard(i, i * span, end, self.created))
+        self._shard_starts = [shard.starting_hash_key for shard in self.shards]
+        self._shards_by_id = {shard.shard_id: shard for shard in self.shards}
+
+    @property
+    def creation_timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.created, tz=timezone.utc)
+
+    def get_shard(self, shard_id: str) -> Shard:
+        shard = self._shards_by_id.get(shard_id)
+        if not shard:
+            raise ResourceNotFoundException(
+                f"Shard {shard_id} in stream {self.name} under account {get_aws_account_id()} "
+                f"does not exist"
+            )
+        return shard
+
+    def get_shard_for_key(self, partition_key: str, explicit_hash_key: str = None) -> Shard:
+        if explicit_hash_key:
+            hash_key = int(explicit_hash_key)
+            if not 0 <= hash_key <= MAX_HASH_KEY:
+                raise InvalidArgumentException(f"Invalid ExplicitHashKey {explicit_hash_key}")
+        else:
+            hash_key = int(hashlib.md5(partition_key.encode("utf-8")).hexdigest(), 16)
+        return self.shards[bisect.bisect_right(self._shard_starts, hash_key) - 1]
+
+    def put(self, entries: List[Tuple[bytes, str, Optional[str]]]) -> List[Tuple[Shard, str]]:
+        """Appends the given (data, partition key, explicit hash key) entries, returns shards and sequence numbers."""
+        now = time.time()
+        grouped: Dict[Shard, List[int]] = {}
+        for i, (_, partition_key, explicit_hash_key) in enumerate(entries):
+            grouped.setdefault(self.get_shard_for_key(partition_key, explicit_hash_key), []).append(
+                i
+            )
+
+        results: List[Optional[Tuple[Shard, str]]] = [None] * len(entries)
+        retention_start = now - self.retention_hours * 3600
+        for shard, indices in grouped.items():
+            records = [ShardRecord(entries[i][0], entries[i][1], now) for i in indices]
+            offset = shard.log.append(records)
+            for position, i in enumerate(indices):
+                results[i] = (shard, shard.get_sequence_number(offset + position))
+            shard.log.trim(retention_start)
+        return results
+
+    def close(self):
+        for shard in self.shards:
+            shard.log.close()
+
+
+class KinesisEngineBackend(RegionBackend):
+    # maps stream name to stream
+    streams: Dict[str, Stream]
+
+    def __init__(self):
+        self.streams = {}
+
+
+def get_stream(stream_name: str, region: str = None, account_id: str = None) -> Stream:
+    stream = KinesisEngineBackend.get(region, account_id).streams.get(stream_name)
+    if not stream:
+        account_id = account_id or get_aws_account_id()
+        raise ResourceNotFoundException(
+            f"Stream {stream_name} under account {account_id} not found."
+        )
+    return stream
+
+
+class ShardPosition(NamedTuple):
+    account_id: str
+    region: str
+    stream_name: str
+    shard_id: str
+    offset: int
+
+
+def encode_shard_iterator(position: ShardPosition) -> str:
+    return base64.b64encode(json.dumps(list(position)).encode("utf-8")).decode("utf-8")
+
+
+def decode_shard_iterator(shard_iterator: str) -> ShardPosition:
+    try:
+        return ShardPosition(*json.loads(base64.b64decode(shard_iterator)))
+    except Exception:
+        raise InvalidArgumentException(f"Invalid ShardIterator: {shard_iterator}")
+
+
+def get_shard_for_position(position: ShardPosition) -> Shard:
+    try:
+        stream = get_stream(position.stream_name, position.region, position.account_id)
+    except ResourceNotFoundException:
+        raise ExpiredIteratorException(f"Iterator for deleted stream {position.stream_name}")
+    return stream.get_shard(position.shard_id)
+
+
+def is_enabled() -> bool:
+    """Returns whether Kinesis is served by the "local" provider, i.e., whether the streams are kept in the engine."""
+    return config.SERVICE_PROVIDER_CONFIG.get_provider("kinesis") == "local"
+
+
+def wait_for_records(shard_iterator: str, timeout: float) -> bool:
+    """
+    Blocks until records are available for the given shard iterator, or until the timeout has passed. Returns
+    whether records are available. This is used by the pollers of streams to avoid polling with a fixed interval.
+    """
+    try:
+        position = decode_shard_iterator(shard_iterator)
+        shard = get_shard_for_position(position)
+    except Exception:
+        # the iterator does not belong to a stream of the engine
+        time.sleep(timeout)
+        return False
+    return shard.log.wait(position.offset, timeout)
@@ -89,6 +89,10 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
         starter.start_kinesis()
         starter.check_kinesis()
 
+    def _has_native_consumers(self) -> bool:
+        """Returns whether stream consumers and enhanced monitoring are managed by this provider."""
+        return config.KINESIS_PROVIDER == "kinesalite"
+
     def get_forward_url(self):
         """Return the URL of the backend Kinesis server to forward requests to"""
         return f"http://{LOCALHOST}:{starter.get_server().port}"
@@ -187,7 +191,7 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
     def register_stream_consumer(
         self, context: RequestContext, stream_arn: StreamARN, consumer_name: ConsumerName
     ) -> RegisterStreamConsumerOutput:
-        if config.KINESIS_PROVIDER == "kinesalite":
+        if self._has_native_consumers():
             prev_consumer = find_consumer(stream_arn=stream_arn, consumer_name=consumer_name)
             if prev_consumer:
                 raise ResourceInUseException(
@@ -215,7 +219,7 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
         consumer_arn: ConsumerARN = "",
     ) -> None:
         # TODO remove this method when deleting kinesalite support
-        if config.KINESIS_PROVIDER == "kinesalite":
+        if self._has_native_consumers():
 
             def consumer_filter(consumer: ConsumerDescription):
                 return not (
@@ -242,7 +246,7 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
         stream_creation_timestamp: Timestamp = None,
     ) -> ListStreamConsumersOutput:
         # TODO remove this method when deleting kinesalite support
-        if config.KINESIS_PROVIDER == "kinesalite":
+        if self._has_native_consumers():
             stream_consumers = KinesisBackend.get().stream_consumers
             consumers: List[Consumer] = []
             for consumer_description in stream_consumers:
@@ -266,7 +270,7 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
         consumer_arn: ConsumerARN = None,
     ) -> DescribeStreamConsumerOutput:
         # TODO remove this method when deleting kinesalite support
-        if config.KINESIS_PROVIDER == "kinesalite":
+        if self._has_native_consumers():
             consumer_to_locate = find_consumer(consumer_arn, consumer_name, stream_arn)
             if not consumer_to_locate:
                 raise ResourceNotFoundException(
@@ -281,7 +285,7 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
         self, context: RequestContext, stream_name: StreamName, shard_level_metrics: MetricsNameList
     ) -> EnhancedMonitoringOutput:
         # TODO remove this method when deleting kinesalite support
-        if config.KINESIS_PROVIDER == "kinesalite":
+        if self._has_native_consumers():
             stream_metrics = KinesisBackend.get().enhanced_metrics[stream_name]
             stream_metrics.update(shard_level_metrics)
             stream_metrics_list = list(stream_metrics)
@@ -298,7 +302,7 @@ class KinesisProvider(KinesisApi, ServiceLifecycleHook):
         self, context: RequestContext, stream_name: StreamName, shard_level_metrics: MetricsNameList
     ) -> EnhancedMonitoringOutput:
         # TODO remove this method when deleting kinesalite support
-        if config.KINESIS_PROVIDER == "kinesalite":
+        if self._has_native_consumers():
             region = KinesisBackend.get()
             region.enhanced_metrics[stream_name] = region.enhanced_metrics[stream_name] - set(
                 shard_level_metrics
@@ -0,0 +1,433 @@
+import logging
+import time
+from typing import Dict, List
+
+from localstack.aws.api import RequestContext
+from localstack.aws.api.kinesis import (
+    BooleanObject,
+    ConsumerARN,
+    Data,
+    DescribeLimitsOutput,
+    DescribeStreamInputLimit,
+    DescribeStreamOutput,
+    DescribeStreamSummaryOutput,
+    GetRecordsInputLimit,
+    GetRecordsOutput,
+    GetShardIteratorOutput,
+    HashKey,
+    InvalidArgumentException,
+    ListShardsInputLimit,
+    ListShardsOutput,
+    ListStreamsInputLimit,
+    ListStreamsOutput,
+    ListTagsForStreamInputLimit,
+    ListTagsForStreamOutput,
+    NextToken,
+    PartitionKey,
+    PositiveIntegerObject,
+    PutRecordOutput,
+    PutRecordsOutput,
+    PutRecordsRequestEntryList,
+    PutRecordsResultEntry,
+    ResourceInUseException,
+    RetentionPeriodHours,
+    SequenceNumber,
+    ShardFilter,
+    ShardId,
+    ShardIterator,
+    ShardIteratorType,
+    StartingPosition,
+    StreamModeDetails,
+    StreamName,
+    SubscribeToShardEvent,
+    SubscribeToShardEventStream,
+    SubscribeToShardOutput,
+    TagKey,
+    TagKeyList,
+    TagMap,
+    Timestamp,
+)
+from localstack.services.kinesis import engine
+from localstack.services.kinesis.engine import (
+    KinesisEngineBackend,
+    Shard,
+    ShardPosition,
+    Stream,
+    decode_shard_iterator,
+    encode_shard_iterator,
+    get_shard_for_position,
+    get_stream,
+)
+from localstack.services.kinesis.provider import (
+    MAX_SUBSCRIPTION_SECONDS,
+    KinesisBackend,
+    KinesisProvider,
+    find_consumer,
+)
+from localstack.utils.aws import aws_stack
+from localstack.utils.time import now_utc
+
+LOG = logging.getLogger(__name__)
+
+# maximum number of records returned by GetRecords
+MAX_GET_RECORDS = 10000
+# interval of the events of a shard subscription if no records are put
+SUBSCRIPTION_HEARTBEAT_SECONDS = 5
+MIN_RETENTION_HOURS = 24
+MAX_RETENTION_HOURS = 8760
+
+
+class LocalKinesisProvider(KinesisProvider):
+    """
+    Kinesis provider which keeps the streams in the in-process engine (see ``engine.py``), instead of forwarding the
+    requests to a kinesis-mock or kinesalite server. Shard operations (MergeShards, SplitShard, UpdateShardCount) and
+    stream encryption are not supported.
+    """
+
+    def on_before_start(self):
+        # there is no backend server to start
+        pass
+
+    def _has_native_consumers(self) -> bool:
+        return True
+
+    def create_stream(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        shard_count: PositiveIntegerObject = None,
+        stream_mode_details: StreamModeDetails = None,
+    ) -> None:
+        streams = KinesisEngineBackend.get().streams
+        if stream_name in streams:
+            raise ResourceInUseException(
+                f"Stream {stream_name} under account {context.account_id} already exists."
+            )
+        stream_mode = (stream_mode_details or {}).get("StreamMode") or "PROVISIONED"
+        # on-demand streams start with 4 shards
+        shard_count = shard_count or (4 if stream_mode == "ON_DEMAND" else 1)
+        arn = aws_stack.kinesis_stream_arn(stream_name, context.account_id, context.region)
+        streams[stream_name] = Stream(stream_name, arn, shard_count, stream_mode)
+
+    def delete_stream(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        enforce_consumer_deletion: BooleanObject = None,
+    ) -> None:
+        stream = get_stream(stream_name)
+        del KinesisEngineBackend.get().streams[stream_name]
+        # wakes up the readers waiting for records of the stream
+        stream.close()
+
+    def describe_stream(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        limit: DescribeStreamInputLimit = None,
+        exclusive_start_shard_id: ShardId = None,
+    ) -> DescribeStreamOutput:
+        stream = get_stream(stream_name)
+        shards = self._get_shards_page(stream, exclusive_start_shard_id)
+        limit = limit or 100
+        description = self._describe(stream)
+        description["Shards"] = [shard.to_dict() for shard in shards[:limit]]
+        description["HasMoreShards"] = len(shards) > limit
+        return DescribeStreamOutput(StreamDescription=description)
+
+    def describe_stream_summary(
+        self, context: RequestContext, stream_name: StreamName
+    ) -> DescribeStreamSummaryOutput:
+        stream = get_stream(stream_name)
+        summary = self._describe(stream)
+        summary["OpenShardCount"] = len(stream.shards)
+        summary["ConsumerCount"] = len(
+            [c for c in self._get_consumers() if c.get("StreamARN") == stream.arn]
+        )
+        return DescribeStreamSummaryOutput(StreamDescriptionSummary=summary)
+
+    def describe_limits(self, context: RequestContext) -> DescribeLimitsOutput:
+        streams = KinesisEngineBackend.get().streams.values()
+        return DescribeLimitsOutput(
+            ShardLimit=500,
+            OpenShardCount=sum(len(stream.shards) for stream in streams),
+            OnDemandStreamCount=len([s for s in streams if s.stream_mode == "ON_DEMAND"]),
+            OnDemandStreamCountLimit=50,
+        )
+
+    def list_streams(
+        self,
+        context: RequestContext,
+        limit: ListStreamsInputLimit = None,
+        exclusive_start_stream_name: StreamName = None,
+    ) -> ListStreamsOutput:
+        names = sorted(KinesisEngineBackend.get().streams)
+        if exclusive_start_stream_name:
+            names = [name for name in names if name > exclusive_start_stream_name]
+        limit = limit or 100
+        return ListStreamsOutput(StreamNames=names[:limit], HasMoreStreams=len(names) > limit)
+
+    def list_shards(
+        self,
+        context: RequestContext,
+        stream_name: StreamName = None,
+        next_token: NextToken = None,
+        exclusive_start_shard_id: ShardId = None,
+        max_results: ListShardsInputLimit = None,
+        stream_creation_timestamp: Timestamp = None,
+        shard_filter: ShardFilter = None,
+    ) -> ListShardsOutput:
+        if next_token:
+            stream_name, exclusive_start_shard_id = next_token.split("/", 1)
+        if not stream_name:
+            raise InvalidArgumentException("Either StreamName or NextToken must be provided.")
+        stream = get_stream(stream_name)
+        shards = self._get_shards_page(stream, exclusive_start_shard_id)
+        max_results = max_results or 1000
+        result = ListShardsOutput(Shards=[shard.to_dict() for shard in shards[:max_results]])
+        if len(shards) > max_results:
+            result["NextToken"] = f"{stream_name}/{shards[max_results - 1].shard_id}"
+        return result
+
+    def increase_stream_retention_period(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        retention_period_hours: RetentionPeriodHours,
+    ) -> None:
+        stream = get_stream(stream_name)
+        if not stream.retention_hours <= retention_period_hours <= MAX_RETENTION_HOURS:
+            raise InvalidArgumentException(
+                f"Invalid retention period {retention_period_hours} for stream {stream_name}"
+            )
+        stream.retention_hours = retention_period_hours
+
+    def decrease_stream_retention_period(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        retention_period_hours: RetentionPeriodHours,
+    ) -> None:
+        stream = get_stream(stream_name)
+        if not MIN_RETENTION_HOURS <= retention_period_hours <= stream.retention_hours:
+            raise InvalidArgumentException(
+                f"Invalid retention period {retention_period_hours} for stream {stream_name}"
+            )
+        stream.retention_hours = retention_period_hours
+
+    def add_tags_to_stream(
+        self, context: RequestContext, stream_name: StreamName, tags: TagMap
+    ) -> None:
+        get_stream(stream_name).tags.update(tags)
+
+    def remove_tags_from_stream(
+        self, context: RequestContext, stream_name: StreamName, tag_keys: TagKeyList
+    ) -> None:
+        stream = get_stream(stream_name)
+        for key in tag_keys:
+            stream.tags.pop(key, None)
+
+    def list_tags_for_stream(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        exclusive_start_tag_key: TagKey = None,
+        limit: ListTagsForStreamInputLimit = None,
+    ) -> ListTagsForStreamOutput:
+        tags = sorted(get_stream(stream_name).tags.items())
+        if exclusive_start_tag_key:
+            tags = [(key, value) for key, value in tags if key > exclusive_start_tag_key]
+        limit = limit or 50
+        return ListTagsForStreamOutput(
+            Tags=[{"Key": key, "Value": value} for key, value in tags[:limit]],
+            HasMoreTags=len(tags) > limit,
+        )
+
+    def put_record(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        data: Data,
+        partition_key: PartitionKey,
+        explicit_hash_key: HashKey = None,
+        sequence_number_for_ordering: SequenceNumber = None,
+    ) -> PutRecordOutput:
+        try:
+            # simulates throttling errors according to KINESIS_ERROR_PROBABILITY
+            return super().put_record(
+                context,
+                stream_name,
+                data,
+                partition_key,
+                explicit_hash_key,
+                sequence_number_for_ordering,
+            )
+        except NotImplementedError:
+            pass
+        stream = get_stream(stream_name)
+        [(shard, sequence_number)] = stream.put([(data, partition_key, explicit_hash_key)])
+        return PutRecordOutput(
+            ShardId=shard.shard_id, SequenceNumber=sequence_number, EncryptionType="NONE"
+        )
+
+    def put_records(
+        self, context: RequestContext, records: PutRecordsRequestEntryList, stream_name: StreamName
+    ) -> PutRecordsOutput:
+        try:
+            return super().put_records(context, records, stream_name)
+        except NotImplementedError:
+            pass
+        stream = get_stream(stream_name)
+        entries = [
+            (record["Data"], record["PartitionKey"], record.get("ExplicitHashKey"))
+            for record in records
+        ]
+        results = [
+            PutRecordsResultEntry(ShardId=shard.shard_id, SequenceNumber=sequence_number)
+            for shard, sequence_number in stream.put(entries)
+        ]
+        return PutRecordsOutput(FailedRecordCount=0, Records=results, EncryptionType="NONE")
+
+    def get_shard_iterator(
+        self,
+        context: RequestContext,
+        stream_name: StreamName,
+        shard_id: ShardId,
+        shard_iterator_type: ShardIteratorType,
+        starting_sequence_number: SequenceNumber = None,
+        timestamp: Timestamp = None,
+    ) -> GetShardIteratorOutput:
+        stream = get_stream(stream_name)
+        shard = stream.get_shard(shard_id)
+        offset = self._get_starting_offset(
+            shard, shard_iterator_type, starting_sequence_number, timestamp
+        )
+        position = ShardPosition(context.account_id, context.region, stream_name, shard_id, offset)
+        return GetShardIteratorOutput(ShardIterator=encode_shard_iterator(position))
+
+    def get_records(
+        self,
+        context: RequestContext,
+        shard_iterator: ShardIterator,
+        limit: GetRecordsInputLimit = None,
+    ) -> GetRecordsOutput:
+        position = decode_shard_iterator(shard_iterator)
+        shard = get_shard_for_position(position)
+        records, next_offset = shard.log.read(
+            position.offset, min(limit or MAX_GET_RECORDS, MAX_GET_RECORDS)
+        )
+        first_offset = next_offset - len(records)
+        return GetRecordsOutput(
+            Records=[
+                self._to_record(shard, first_offset + i, record) for i, record in enumerate(records)
+            ],
+            NextShardIterator=encode_shard_iterator(position._replace(offset=next_offset)),
+            MillisBehindLatest=self._get_millis_behind_latest(shard, next_offset),
+        )
+
+    def subscribe_to_shard(
+        self,
+        context: RequestContext,
+        consumer_arn: ConsumerARN,
+        shard_id: ShardId,
+        starting_position: StartingPosition,
+    ) -> SubscribeToShardOutput:
+        consumer = find_consumer(consumer_arn=consumer_arn) or {}
+        stream_arn = consumer.get("StreamARN") or consumer_arn.split("/consumer/")[0]
+        stream = get_stream(stream_arn.split("/")[-1])
+        shard = stream.get_shard(shard_id)
+        offset = self._get_starting_offset(
+            shard,
+            starting_position["Type"],
+            starting_position.get("SequenceNumber"),
+            starting_position.get("Timestamp"),
+        )
+
+        def event_generator():
+            position = offset
+            deadline = now_utc() + MAX_SUBSCRIPTION_SECONDS
+            while now_utc() < deadline and not shard.log.closed:
+                # blocks until records are appended, instead of polling the shard
+                shard.log.wait(position, SUBSCRIPTION_HEARTBEAT_SECONDS)
+                records, next_position = shard.log.read(position, MAX_GET_RECORDS)
+                first_offset = next_position - len(records)
+                position = next_position
+                yield SubscribeToShardEventStream(
+                    SubscribeToShardEvent=SubscribeToShardEvent(
+                        Records=[
+                            self._to_record(shard, first_offset + i, record)
+                            for i, record in enumerate(records)
+                        ],
+                        ContinuationSequenceNumber=shard.get_sequence_number(position),
+                        MillisBehindLatest=self._get_millis_behind_latest(shard, position),
+                        ChildShards=[],
+                    )
+                )
+            LOG.debug("Closing subscription of consumer %s to shard %s", consumer_arn, shard_id)
+
+        return SubscribeToShardOutput(EventStream=event_generator())
+
+    @staticmethod
+    def _get_consumers() -> List[Dict]:
+        return KinesisBackend.get().stream_consumers
+
+    @staticmethod
+    def _describe(stream: Stream) -> Dict:
+        return {
+            "StreamName": stream.name,
+            "StreamARN": stream.arn,
+            "StreamStatus": "ACTIVE",
+            "StreamModeDetails": {"StreamMode": stream.stream_mode},
+            "RetentionPeriodHours": stream.retention_hours,
+            "StreamCreationTimestamp": stream.creation_timestamp,
+            "EnhancedMonitoring": [{"ShardLevelMetrics": []}],
+            "EncryptionType": "NONE",
+        }
+
+    @staticmethod
+    def _get_shards_page(stream: Stream, exclusive_start_shard_id: str = None) -> List[Shard]:
+        if not exclusive_start_shard_id:
+            return stream.shards
+        return [shard for shard in stream.shards if shard.shard_id > exclusive_start_shard_id]
+
+    @staticmethod
+    def _get_starting_offset(
+        shard: Shard, iterator_type: str, sequence_number: str = None, timestamp=None
+    ) -> int:
+        if iterator_type == "TRIM_HORIZON":
+            return shard.log.start_offset
+        if iterator_type == "LATEST":
+            return shard.log.end_offset
+        if iterator_type in ("AT_SEQUENCE_NUMBER", "AFTER_SEQUENCE_NUMBER"):
+            if not sequence_number:
+                raise InvalidArgumentException(
+                    f"StartingSequenceNumber is required for iterator type {iterator_type}"
+                )
+            offset = shard.get_offset(sequence_number)
+            return offset + 1 if iterator_type == "AFTER_SEQUENCE_NUMBER" else offset
+        if iterator_type == "AT_TIMESTAMP":
+            if timestamp is None:
+                raise InvalidArgumentException(
+                    "Timestamp is required for iterator type AT_TIMESTAMP"
+                )
+            if not isinstance(timestamp, (int, float)):
+                timestamp = timestamp.timestamp()
+            return shard.log.get_offset_at(timestamp)
+        raise InvalidArgumentException(f"Invalid ShardIteratorType {iterator_type}")
+
+    @staticmethod
+    def _to_record(shard: Shard, offset: int, record: engine.ShardRecord) -> Dict:
+        return {
+            "SequenceNumber": shard.get_sequence_number(offset),
+            "ApproximateArrivalTimestamp": record.arrival_time,
+            "Data": record.data,
+            "PartitionKey": record.partition_key,
+            "EncryptionType": "NONE",
+        }
+
+    @staticmethod
+    def _get_millis_behind_latest(shard: Shard, offset: int) -> int:
+        arrival_time = shard.log.get_arrival_time(offset)
+        if arrival_time is None:
+            return 0
+        return max(int((time.time() - arrival_time) * 1000), 0)
@@ -0,0 +1,171 @@
+"""
+Metric filters of CloudWatch Logs, which turn matching log events into CloudWatch metrics.
+
+The filter patterns are compiled once, and only the filters of the log group of the incoming log events are applied.
+The values of the matching events are aggregated per metric and second, and a background thread periodically
+publishes the aggregated values to CloudWatch, with a single PutMetricData request per account, region, and
+namespace (made with the request context of the account).
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from localstack.utils.aws import aws_stack
+from localstack.utils.aws.request_context import RequestContextSnapshot
+from localstack.utils.common import is_number
+
+LOG = logging.getLogger(__name__)
+
+# interval (in seconds) in which the aggregated metric values are published to CloudWatch
+FLUSH_INTERVAL = 1
+# maximum number of datums of a PutMetricData request
+MAX_DATUMS_PER_REQUEST = 1000
+# maximum number of distinct values of a single datum
+MAX_VALUES_PER_DATUM = 150
+
+PatternMatcher = Callable[[str, Dict], bool]
+# account ID, region, namespace, metric name, unit, timestamp (in seconds)
+MetricBucket = Tuple[str, str, str, str, Optional[str], int]
+
+
+def get_metric_value(transformation: Dict) -> float:
+    value = transformation.get("metricValue") or "1"
+    if is_number(value):
+        return float(value)
+    LOG.info("Expression not yet supported for log filter metricValue: %s", value)
+    return 1
+
+
+class MetricFilterPipeline:
+    def __init__(
+        self,
+        get_matcher: Callable[[str], PatternMatcher],
+        publish: Callable[[str, str, List[Dict]], None] = None,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.get_matcher = get_matcher
+        self.publish = publish or publish_metric_data
+        self.flush_interval = flush_interval
+        # compiled pattern matchers, by filter pattern
+        self._matchers: Dict[str, PatternMatcher] = {}
+        # counts of the metric values, by metric and second
+        self._buckets: Dict[MetricBucket, Dict[float, int]] = {}
+        # the request context of the latest log events of each account, used to publish the metrics of the account
+        self._contexts: Dict[str, RequestContextSnapshot] = {}
+        self._mutex = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def process(
+        self,
+        account_id: str,
+        region: str,
+        log_group_name: str,
+        metric_filters: List[Dict],
+        log_events: List[Dict],
+    ):
+        """Applies the metric filters of the given log group to the log events, and buffers the metric values."""
+        filters = [f for f in metric_filters if f.get("logGroupName") == log_group_name]
+        if not filters or not log_events:
+            return
+        updates: Dict[MetricBucket, Dict[float, int]] = {}
+        for metric_filter in filters:
+            pattern = metric_filter.get("filterPattern") or ""
+            matches = self._get_matcher(pattern)
+            timestamps = [
+                int(event["timestamp"] // 1000) for event in log_events if matches(pattern, event)
+            ]
+            if not timestamps:
+                continue
+            for transformation in metric_filter.get("metricTransformations", []):
+                value = get_metric_value(transformation)
+                for timestamp in timestamps:
+                    bucket = (
+                        account_id,
+                        region,
+                        transformation["metricNamespace"],
+                        transformation["metricName"],
+                        transformation.get("unit"),
+                        timestamp,
+                    )
+                    counts = updates.setdefault(bucket, {})
+                    counts[value] = counts.get(value, 0) + 1
+        if not updates:
+            return
+
+        context = RequestContextSnapshot()
+        self._start_flusher()
+        with self._mutex:
+            self._contexts[account_id] = context
+            for bucket, counts in updates.items():
+                buffered = self._buckets.setdefault(bucket, {})
+                for value, count in counts.items():
+                    buffered[value] = buffered.get(value, 0) + count
+
+    def flush(self):
+        """Publishes all buffered metric values to CloudWatch."""
+        with self._mutex:
+            buckets, self._buckets = self._buckets, {}
+            contexts = dict(self._contexts)
+        metric_data: Dict[Tuple[str, str, str], List[Dict]] = {}
+        for (
+            account_id,
+            region,
+            namespace,
+            metric_name,
+            unit,
+            timestamp,
+        ), counts in buckets.items():
+            values = list(counts.items())
+            for i in range(0, len(values), MAX_VALUES_PER_DATUM):
+                chunk = values[i : i + MAX_VALUES_PER_DATUM]
+                datum = {
+                    "MetricName": metric_name,
+                    "Timestamp": datetime.fromtimestamp(timestamp, tz=timezone.utc),
+                    "Values": [value for value, _ in chunk],
+                    "Counts": [count for _, count in chunk],
+                }
+                if unit:
+                    datum["Unit"] = unit
+                metric_data.setdefault((account_id, region, namespace), []).append(datum)
+
+        for (account_id, region, namespace), datums in metric_data.items():
+            for i in range(0, len(datums), MAX_DATUMS_PER_REQUEST):
+                try:
+                    with contexts[account_id].apply():
+                        self.publish(region, namespace, datums[i : i + MAX_DATUMS_PER_REQUEST])
+                except Exception as e:
+                    LOG.info("Unable to put metric data for matching CloudWatch log events: %s", e)
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._flusher:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def _get_matcher(self, pattern: str) -> PatternMatcher:
+        matcher = self._matchers.get(pattern)
+        if matcher is None:
+            matcher = self._matchers[pattern] = self.get_matcher(pattern)
+        return matcher
+
+    def _start_flusher(self):
+        if self._flusher:
+            return
+        with self._mutex:
+            if self._flusher:
+                return
+            self._flusher = threading.Thread(
+                target=self._run, name="logs-metric-filters", daemon=True
+            )
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+
+def publish_metric_data(region: str, namespace: str, metric_data: List[Dict]):
+    client = aws_stack.connect_to_service("cloudwatch", region_name=region)
+    client.put_metric_data(Namespace=namespace, MetricData=metric_data)
@@ -23,11 +23,11 @@ from localstack.aws.api.logs import (
     PutLogEventsResponse,
     SequenceToken,
 )
+from localstack.services.logs.metric_filters import MetricFilterPipeline
 from localstack.services.moto import call_moto
 from localstack.services.plugins import ServiceLifecycleHook
 from localstack.utils.aws import aws_stack
 from localstack.utils.aws.aws_stack import extract_region_from_arn
-from localstack.utils.common import is_number
 from localstack.utils.patch import patch
 
 LOG = logging.getLogger(__name__)
@@ -36,7 +36,11 @@ LOG = logging.getLogger(__name__)
 class LogsProvider(LogsApi, ServiceLifecycleHook):
     def __init__(self):
         super().__init__()
-        self.cw_client = aws_stack.connect_to_service("cloudwatch")
+        # look up the pattern matcher on demand, as it may be patched by plugins
+        self.metric_filters = MetricFilterPipeline(lambda pattern: get_pattern_matcher(pattern))
+
+    def on_before_stop(self):
+        self.metric_filters.shutdown()
 
     def put_log_events(
         self,
@@ -46,30 +50,14 @@ class LogsProvider(LogsApi, ServiceLifecycleHook):
         log_events: InputLogEvents,
         sequence_token: SequenceToken = None,
     ) -> PutLogEventsResponse:
-        logs_backend = logs_backends[context.account_id][aws_stack.get_region()]
-        metric_filters = logs_backend.filters.metric_filters
-        for metric_filter in metric_filters:
-            pattern = metric_filter.get("filterPattern", "")
-            transformations = metric_filter.get("metricTransformations", [])
-            matches = get_pattern_matcher(pattern)
-            for log_event in log_events:
-                if matches(pattern, log_event):
-                    for tf in transformations:
-                        value = tf.get("metricValue") or "1"
-                        if "$size" in value:
-                            LOG.info(
-                                "Expression not yet supported for log filter metricValue", value
-                            )
-                        value = float(value) if is_number(value) else 1
-                        data = [{"MetricName": tf["metricName"], "Value": value}]
-                        try:
-                            self.cw_client.put_metric_data(
-                                Namespace=tf["metricNamespace"], MetricData=data
-                            )
-                        except Exception as e:
-                            LOG.info(
-                                "Unable to put metric data for matching CloudWatch log events", e
-                            )
+        logs_backend = logs_backends[context.account_id][context.region]
+        self.metric_filters.process(
+            context.account_id,
+            context.region,
+            log_group_name,
+            logs_backend.filters.metric_filters,
+            log_events,
+        )
         return call_moto(context)
 
 
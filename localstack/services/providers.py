@@ -173,6 +173,18 @@ def kinesis():
     )
 
 
+@aws_provider(api="kinesis", name="local")
+def kinesis_local():
+    from localstack.services.kinesis.provider_local import LocalKinesisProvider
+
+    provider = LocalKinesisProvider()
+    return Service(
+        "kinesis",
+        listener=AwsApiListener("kinesis", provider),
+        lifecycle_hook=provider,
+    )
+
+
 @aws_provider()
 def kms():
     if config.KMS_PROVIDER == "local-kms":
@@ -0,0 +1,695 @@
+"""
+Delivery of SNS messages to the endpoints of subscriptions. Deliveries are executed by a fixed number of worker threads
+per protocol, which take the delivery tasks from bounded per-protocol queues. This isolates the protocols from each
+other (e.g., slow HTTP endpoints do not delay the delivery to SQS queues), and applies backpressure to the publishers
+once the queues are full instead of spawning a thread for every published message.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from localstack import config
+from localstack.utils.objects import singleton_factory
+from localstack.utils.scheduler import TimerWheel
+
+LOG = logging.getLogger(__name__)
+
+# maps subscription protocols to the queue (and workers) which deliver their messages
+PROTOCOL_GROUPS = {
+    "sqs": "sqs",
+    "lambda": "lambda",
+    "http": "http",
+    "https": "http",
+    "sms": "sms",
+    "firehose": "firehose",
+}
+# queue for all other protocols (application, email, email-json), and for messages to platform endpoints
+DEFAULT_GROUP = "default"
+
+# number of seconds a publisher waits for space in a full delivery queue
+SUBMIT_TIMEOUT = 10
+
+# AWS limits of the healthyRetryPolicy of a DeliveryPolicy
+MAX_NUM_RETRIES = 100
+MAX_DELAY_TARGET = 3600
+
+
+class DeliveryError(Exception):
+    """
+    Raised by delivery functions if a delivery failed and may be retried according to the retry policy of the task.
+
+    :param message: the error message
+    :param dead_letter_message: the message body which is sent to the dead-letter queue of the subscription once all
+        attempts of the delivery have failed (None if the message should not be sent to the DLQ)
+    """
+
+    def __init__(self, message: str, dead_letter_message: str = None):
+        super().__init__(message)
+        self.dead_letter_message = dead_letter_message
+
+
+class RetryPolicy:
+    """
+    The ``healthyRetryPolicy`` of an SNS ``DeliveryPolicy``, which determines the number of retries of failed
+    deliveries, and the delay before each retry. See
+    https://docs.aws.amazon.com/sns/latest/dg/sns-message-delivery-retries.html
+    """
+
+    def __init__(
+        self,
+        num_retries: int = 3,
+        num_no_delay_retries: int = 0,
+        num_min_delay_retries: int = 0,
+        num_max_delay_retries: int = 0,
+        min_delay_target: float = 20,
+        max_delay_target: float = 20,
+        backoff_function: str = "linear",
+    ):
+        self.num_retries = min(num_retries, MAX_NUM_RETRIES)
+        self.num_no_delay_retries = num_no_delay_retries
+        self.num_min_delay_retries = num_min_delay_retries
+        self.num_max_delay_retries = num_max_delay_retries
+        self.min_delay_target = min(min_delay_target, MAX_DELAY_TARGET)
+        self.max_delay_target = max(min(max_delay_target, MAX_DELAY_TARGET), self.min_delay_target)
+        self.backoff_function = backoff_function
+
+    @classmethod
+    def from_delivery_policy(
+        cls, delivery_policy: Union[str, Dict, None]
+    ) -> Optional["RetryPolicy"]:
+        """
+        Creates the retry policy from the given (JSON encoded) DeliveryPolicy of a subscription.
+
+        :param delivery_policy: the delivery policy
+        :return: the retry policy, or None if the delivery policy does not define one (or cannot be parsed)
+        """
+        if not delivery_policy:
+            return None
+        try:
+            if isinstance(delivery_policy, str):
+                delivery_policy = json.loads(delivery_policy)
+            policy = delivery_policy.get("healthyRetryPolicy")
+            if not policy:
+                return None
+            return cls(
+                num_retries=int(policy.get("numRetries", 3)),
+                num_no_delay_retries=int(policy.get("numNoDelayRetries", 0)),
+                num_min_delay_retries=int(policy.get("numMinDelayRetries", 0)),
+                num_max_delay_retries=int(policy.get("numMaxDelayRetries", 0)),
+                min_delay_target=float(policy.get("minDelayTarget", 20)),
+                max_delay_target=float(policy.get("maxDelayTarget", 20)),
+                backoff_function=policy.get("backoffFunction", "linear"),
+            )
+        except (AttributeError, TypeError, ValueError) as e:
+            LOG.debug("Unable to parse SNS delivery policy %s: %s", delivery_policy, e)
+            return None
+
+    def get_delay(self, retry: int) -> float:
+        """
+        Returns the delay before the given retry. The retries go through a phase without delay, a phase with the
+        minimum delay, a backoff phase (in which the delay grows from the minimum to the maximum delay), and a phase
+        with the maximum delay.
+
+        :param retry: the number of the retry (starting with 1)
+        :return: the delay in seconds
+        """
+        if retry <= self.num_no_delay_retries:
+            return 0
+        retry -= self.num_no_delay_retries
+        if retry <= self.num_min_delay_retries:
+            return self.min_delay_target
+        retry -= self.num_min_delay_retries
+
+        num_backoff_retries = max(
+            0,
+            self.num_retries
+            - self.num_no_delay_retries
+            - self.num_min_delay_retries
+            - self.num_max_delay_retries,
+        )
+        if retry > num_backoff_retries:
+            return self.max_delay_target
+
+        low, high = self.min_delay_target, self.max_delay_target
+        if self.backoff_function == "geometric" and low > 0:
+            return low * (high / low) ** (retry / num_backoff_retries)
+        if self.backoff_function == "exponential":
+            fraction = (2**retry - 1) / (2**num_backoff_retries - 1)
+        elif self.backoff_function == "arithmetic":
+            fraction = (retry * (retry + 1)) / (num_backoff_retries * (num_backoff_retries + 1))
+        else:
+            fraction = retry / num_backoff_retries
+        return low + (high - low) * fraction
+
+
+class DeliveryTask:
+    """A single delivery of a message to the endpoint of a subscription (or a platform endpoint)."""
+
+    __slots__ = (
+        "protocol",
+        "function",
+        "args",
+        "retry_policy",
+        "on_failure",
+        "attempts",
+        "submitted",
+        "request_context",
+    )
+
+    def __init__(
+        self,
+        protocol: str,
+        function: Callable,
+        args: Tuple = (),
+        retry_policy: RetryPolicy = None,
+        on_failure: Callable[[Exception], None] = None,
+    ):
+        """
+        :param protocol: the protocol of the subscription, which determines the queue of the task
+        :param function: the function performing the delivery
+        :param args: the arguments of the function
+        :param retry_policy: the policy to retry the delivery if the function raises a DeliveryError
+        :param on_failure: called with the error once all attempts of the delivery have failed
+        """
+        self.protocol = protocol
+        self.function = function
+        self.args = args
+        self.retry_policy = retry_policy
+        self.on_failure = on_failure
+        self.attempts = 0
+        self.submitted = None
+        # the request context (i.e., region and account) of the publisher, captured when the task is submitted
+        self.request_context = None
+
+
+class DeliveryMetrics:
+    """Counters of the deliveries of a delivery queue."""
+
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.in_flight = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency: float, success: bool):
+        with self.mutex:
+            if success:
+                self.delivered += 1
+            else:
+                self.failed += 1
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def to_dict(self) -> Dict:
+        with self.mutex:
+            completed = self.delivered + self.failed
+            return {
+                "submitted": self.submitted,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "retried": self.retried,
+                "in_flight": self.in_flight,
+                "latency_avg": self.latency_sum / completed if completed else 0.0,
+                "latency_max": self.latency_max,
+            }
+
+
+class HttpSessionPool:
+    """
+    Keeps a requests Session (and thereby a pool of keep-alive connections) for each of the most recently used HTTP
+    endpoints (scheme and network location).
+    """
+
+    def __init__(self, max_endpoints: int = 256, max_connections: int = 10):
+        self.max_endpoints = max_endpoints
+        self.max_connections = max_connections
+        self.sessions: "OrderedDict[str, requests.Session]" = OrderedDict()
+        self.mutex = threading.Lock()
+
+    def get_session(self, url: str) -> requests.Session:
+        split_url = urlsplit(url)
+        key = f"{split_url.scheme}://{split_url.netloc}"
+        with self.mutex:
+            session = self.sessions.get(key)
+            if session is not None:
+                self.sessions.move_to_end(key)
+                return session
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.sessions[key] = session
+            if len(self.sessions) > self.max_endpoints:
+                _, evicted = self.sessions.popitem(last=False)
+                evicted.close()
+            return session
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.get_session(url).post(url, **kwargs)
+
+    def close(self):
+        with self.mutex:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+class DeliveryPool:
+    """
+    Executes the delivery tasks of SNS with a fixed number of worker threads per protocol group. Each group has a
+    bounded queue, publishers block while the queue of a group is full. Failed deliveries are retried according to
+    the retry policy of the task, the retries are scheduled with a TimerWheel.
+
+    The pool is also used by other services which deliver messages asynchronously (e.g., EventBridge), with their own
+    protocol groups.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = None,
+        queue_size: int = None,
+        timer_wheel: TimerWheel = None,
+        protocol_groups: Dict[str, str] = None,
+        name: str = "sns-delivery",
+    ):
+        self.num_workers = num_workers or config.SNS_DELIVERY_WORKERS
+        self.queue_size = queue_size or config.SNS_DELIVERY_QUEUE_SIZE
+        self.timer_wheel = timer_wheel or TimerWheel(resolution=0.05)
+        self.http_sessions = HttpSessionPool(max_connections=self.num_workers)
+        self.protocol_groups = PROTOCOL_GROUPS if protocol_groups is None else protocol_groups
+        self.name = name
+
+        groups = set(self.protocol_groups.values()) | {DEFAULT_GROUP}
+        self.queues: Dict[str, queue.Queue] = {
+            group: queue.Queue(maxsize=self.queue_size) for group in groups
+        }
+        self.metrics: Dict[str, DeliveryMetrics] = {group: DeliveryMetrics() for group in groups}
+        self.workers = []
+        self.mutex = threading.Lock()
+        self._worker_local = threading.local()
+        self._started = False
+        self._closed = False
+
+    def start(self):
+        with self.mutex:
+            if self._started:
+                return
+            self._started = True
+            self._closed = False
+            self.timer_wheel.start()
+            for group, task_queue in self.queues.items():
+                for i in range(self.num_workers):
+                    worker = threading.Thread(
+                        target=self._run_worker,
+                        args=(group, task_queue),
+                        name=f"{self.name}-{group}-{i}",
+                        daemon=True,
+                    )
+                    worker.start()
+                    self.workers.append(worker)
+
+    def close(self):
+        """Stops the workers once they have finished their current tasks. Queued tasks are discarded."""
+        with self.mutex:
+            if not self._started:
+                return
+            self._started = False
+            self._closed = True
+            for task_queue in self.queues.values():
+                with task_queue.mutex:
+                    task_queue.queue.clear()
+                    task_queue.not_full.notify_all()
+                for _ in range(self.num_workers):
+                    task_queue.put(None)
+            self.workers = []
+            self.timer_wheel.close()
+        self.http_sessions.close()
+
+    def submit(self, task: DeliveryTask):
+        """
+        Queues the given delivery task. Blocks while the queue of the task's protocol is full.
+
+        :param task: the task to execute
+        :raises queue.Full: if the queue is still full after ``SUBMIT_TIMEOUT`` seconds
+        """
+        group = self._prepare(task)
+        task_queue = self.queues[group]
+        try:
+            task_queue.put_nowait(task)
+            return
+        except queue.Full:
+            pass
+
+        if getattr(self._worker_local, "group", None) == group:
+            # a delivery of this group publishes another message (e.g., to a platform application), waiting for
+            # the other workers of the group could dead-lock the pool
+            self._execute(group, task)
+            return
+
+        LOG.debug("%s queue for %s is full, waiting for free capacity", self.name, group)
+        try:
+            task_queue.put(task, timeout=SUBMIT_TIMEOUT)
+        except queue.Full:
+            self._cancel(group)
+            raise
+
+    def offer(self, task: DeliveryTask) -> bool:
+        """
+        Queues the given delivery task if there is free capacity in the queue of the task's protocol. In contrast to
+        ``submit``, this neither blocks nor executes the task inline.
+
+        :param task: the task to execute
+        :return: True if the task has been queued, False if the queue is full
+        """
+        group = self._prepare(task)
+        try:
+            self.queues[group].put_nowait(task)
+            return True
+        except queue.Full:
+            self._cancel(group)
+            return False
+
+    def submit_later(self, task: DeliveryTask, delay: float):
+        """
+        Queues the given delivery task after the given delay. In contrast to ``submit``, this never blocks (the task
+        is queued as soon as there is free capacity), e.g., to retry deliveries from within a delivery task.
+
+        :param task: the task to execute
+        :param delay: the delay in seconds
+        """
+        group = self._prepare(task)
+        self.timer_wheel.schedule(time.time() + delay, self._requeue, group, task)
+
+    def _prepare(self, task: DeliveryTask) -> str:
+        from localstack.utils.aws.request_context import RequestContextSnapshot
+
+        if not self._started:
+            self.start()
+
+        group = self.protocol_groups.get(task.protocol, DEFAULT_GROUP)
+        task.submitted = time.time()
+        # the workers execute the task with the region and account of the publisher
+        task.request_context = RequestContextSnapshot()
+        metrics = self.metrics[group]
+        with metrics.mutex:
+            metrics.submitted += 1
+            metrics.in_flight += 1
+        return group
+
+    def _cancel(self, group: str):
+        """Reverts the metrics of a prepared task which could not be queued."""
+        metrics = self.metrics[group]
+        with metrics.mutex:
+            metrics.submitted -= 1
+            metrics.in_flight -= 1
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """
+        Returns the metrics of the delivery queues.
+
+        :return: a dict mapping the protocol groups to their queue depth and delivery counters
+        """
+        result = {}
+        for group, metrics in self.metrics.items():
+            result[group] = {"queue_depth": self.queues[group].qsize(), **metrics.to_dict()}
+        return result
+
+    def _run_worker(self, group: str, task_queue: queue.Queue):
+        self._worker_local.group = group
+        while True:
+            task = task_queue.get()
+            if task is None:
+                return
+            self._execute(group, task)
+
+    def _execute(self, group: str, task: DeliveryTask):
+        # tasks may be executed inline by a worker which is executing another task, which keeps its own context
+        with task.request_context.apply():
+            task.attempts += 1
+            try:
+                task.function(*task.args)
+                self._complete(group, task, True)
+            except DeliveryError as e:
+                if not self._retry(group, task):
+                    self._fail(group, task, e)
+            except Exception as e:
+                LOG.exception("Unexpected error in %s task: %s", self.name, e)
+                self._fail(group, task, e)
+
+    def _retry(self, group: str, task: DeliveryTask) -> bool:
+        policy = task.retry_policy
+        if not policy or task.attempts > policy.num_retries or self._closed:
+            return False
+        delay = policy.get_delay(task.attempts)
+        metrics = self.metrics[group]
+        with metrics.mutex:
+            metrics.retried += 1
+        LOG.debug(
+            "Retrying %s task in %.1f seconds (attempt %s)", self.name, delay, task.attempts + 1
+        )
+        self.timer_wheel.schedule(time.time() + delay, self._requeue, group, task)
+        return True
+
+    def _requeue(self, group: str, task: DeliveryTask):
+        if self._closed:
+            return
+        try:
+            self.queues[group].put_nowait(task)
+        except queue.Full:
+            # the timer wheel must not block, try again later
+            self.timer_wheel.schedule(time.time() + 1, self._requeue, group, task)
+
+    def _fail(self, group: str, task: DeliveryTask, error: Exception):
+        self._complete(group, task, False)
+        if task.on_failure:
+            try:
+                task.on_failure(error)
+            except Exception as e:
+                LOG.warning("Error while handling failed %s task: %s", self.name, e)
+
+    def _complete(self, group: str, task: DeliveryTask, success: bool):
+        metrics = self.metrics[group]
+        metrics.record(time.time() - task.submitted, success)
+        with metrics.mutex:
+            metrics.in_flight -= 1
+
+
+class _Batch:
+    __slots__ = ("entries", "scheduled")
+
+    def __init__(self):
+        self.entries = deque()
+        self.scheduled = False
+
+
+class DeliveryBatcher:
+    """
+    Coalesces the deliveries to the same destination (e.g., the same SQS queue) into batches. Entries are buffered
+    per destination key, and a single flush task per key is queued to the delivery pool at a time. The flush task
+    delivers the entries which have accumulated until it is executed (up to ``max_batch_size`` entries, and
+    ``max_batch_bytes`` bytes), and queues another flush task if there are remaining entries (or delivers the next
+    batch itself while the queue is full). If a flush task cannot be queued at all, the thread which added the entries
+    delivers them itself. Entries of the same key are therefore delivered in the order they were added, no entries are
+    left behind, and no latency is added if the pool is idle.
+    """
+
+    def __init__(
+        self,
+        protocol: str,
+        deliver_batch: Callable[[Hashable, List[Any]], None],
+        max_batch_size: int = 10,
+        max_batch_bytes: int = None,
+        entry_size: Callable[[Any], int] = None,
+        pool: DeliveryPool = None,
+    ):
+        """
+        :param protocol: the protocol of the deliveries, which determines the queue of the flush tasks
+        :param deliver_batch: delivers a batch of entries to the destination with the given key, and takes care of
+            failed entries itself
+        :param max_batch_size: the maximum number of entries per batch
+        :param max_batch_bytes: the maximum total size of the entries of a batch
+        :param entry_size: returns the size of an entry (required if max_batch_bytes is set)
+        :param pool: the pool executing the flush tasks (defaults to the global delivery pool)
+        """
+        self.protocol = protocol
+        self.deliver_batch = deliver_batch
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.entry_size = entry_size
+        self.pool = pool
+        self.batches: Dict[Hashable, _Batch] = {}
+        self.pending = 0
+        self.num_batches = 0
+        self.num_entries = 0
+        self.mutex = threading.Condition()
+        self._deferred = threading.local()
+
+    def get_pool(self) -> DeliveryPool:
+        return self.pool or get_delivery_pool()
+
+    def add(self, key: Hashable, entry: Any):
+        """
+        Adds an entry to the batch of the given destination. Outside of ``deferred`` blocks, this blocks while the
+        number of pending entries exceeds the queue size of the delivery pool.
+
+        :param key: the key of the destination
+        :param entry: the entry to deliver
+        :raises queue.Full: if there is still no capacity after ``SUBMIT_TIMEOUT`` seconds
+        """
+        max_pending = self.get_pool().queue_size
+        deferred = getattr(self._deferred, "keys", None)
+        with self.mutex:
+            # the entries of a deferred block are not flushed before the end of the block, waiting could dead-lock
+            if (
+                deferred is None
+                and self.pending >= max_pending
+                and not self.mutex.wait_for(
+                    lambda: self.pending < max_pending, timeout=SUBMIT_TIMEOUT
+                )
+            ):
+                raise queue.Full()
+            batch = self.batches.get(key)
+            if batch is None:
+                batch = self.batches[key] = _Batch()
+            batch.entries.append(entry)
+            self.pending += 1
+
+            if deferred is not None:
+                deferred.add(key)
+                return
+            if batch.scheduled:
+                return
+            batch.scheduled = True
+        self._submit_flush(key)
+
+    @contextmanager
+    def deferred(self):
+        """
+        Context manager which defers flushing the batches of the entries added by the current thread until the end of
+        the block, e.g., to deliver all messages of a PublishBatch request with as few batches as possible.
+        """
+        if getattr(self._deferred, "keys", None) is not None:
+            # nested block, the outermost block flushes the batches
+            yield
+            return
+        self._deferred.keys = set()
+        try:
+            yield
+        finally:
+            keys = self._deferred.keys
+            self._deferred.keys = None
+            wait = True
+            for key in keys:
+                with self.mutex:
+                    batch = self.batches.get(key)
+                    if batch is None or batch.scheduled:
+                        continue
+                    batch.scheduled = True
+                # once the pool is out of capacity, the remaining batches are delivered without waiting for it
+                if not self._submit_flush(key, wait=wait):
+                    wait = False
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Returns the oldest pending entry of the given destination, or None if there is none."""
+        with self.mutex:
+            batch = self.batches.get(key)
+            return batch.entries[0] if batch and batch.entries else None
+
+    def get_metrics(self) -> Dict:
+        with self.mutex:
+            return {
+                "pending": self.pending,
+                "batches": self.num_batches,
+                "entries": self.num_entries,
+            }
+
+    def _submit_flush(self, key: Hashable, wait: bool = True) -> bool:
+        """
+        Queues a flush task for the (scheduled) batch of the given key. If the queue of the pool is full (after
+        waiting for free capacity, or right away if ``wait`` is False), the batch is delivered by the current thread.
+
+        :return: True if the flush task has been queued, False if the batch has been delivered by the current thread
+        """
+        pool = self.get_pool()
+        try:
+            if wait:
+                pool.submit(self._flush_task(key))
+                return True
+            if pool.offer(self._flush_task(key)):
+                return True
+        except queue.Full:
+            pass
+        LOG.debug("%s delivery queue is full, delivering batch inline", self.protocol)
+        try:
+            self._flush(key)
+        except Exception as e:
+            LOG.warning("Unable to deliver %s batch: %s", self.protocol, e)
+        return False
+
+    def _take_batch(self, batch: _Batch) -> List[Any]:
+        entries = []
+        size = 0
+        while batch.entries and len(entries) < self.max_batch_size:
+            if self.max_batch_bytes is not None:
+                size += self.entry_size(batch.entries[0])
+                if entries and size > self.max_batch_bytes:
+                    break
+            entries.append(batch.entries.popleft())
+        return entries
+
+    def _flush(self, key: Hashable):
+        while True:
+            with self.mutex:
+                batch = self.batches[key]
+                entries = self._take_batch(batch)
+                self.pending -= len(entries)
+                self.num_batches += 1
+                self.num_entries += len(entries)
+                self.mutex.notify_all()
+
+            try:
+                self.deliver_batch(key, entries)
+            except Exception:
+                if self._has_remaining(key, batch):
+                    self.get_pool().submit_later(self._flush_task(key), 0)
+                raise
+
+            if not self._has_remaining(key, batch):
+                return
+            # hand the remaining entries over to a new flush task, to give the other destinations a turn. If the
+            # queue is full, the next batch is delivered right away instead (the pool would execute the new flush
+            # task inline, i.e., recursively for every batch).
+            if self.get_pool().offer(self._flush_task(key)):
+                return
+
+    def _has_remaining(self, key: Hashable, batch: _Batch) -> bool:
+        """Returns whether the given batch has remaining entries, and removes it otherwise."""
+        with self.mutex:
+            if batch.entries:
+                return True
+            batch.scheduled = False
+            del self.batches[key]
+            return False
+
+    def _flush_task(self, key: Hashable) -> DeliveryTask:
+        return DeliveryTask(self.protocol, self._flush, (key,))
+
+
+@singleton_factory
+def get_delivery_pool() -> DeliveryPool:
+    """Returns the DeliveryPool which delivers the messages of all SNS topics."""
+    return DeliveryPool()
@@ -0,0 +1,391 @@
+"""
+Compiled SNS subscription filter policies.
+
+Filter policies are compiled once (when a subscription is created, or its filter policy is changed) into a
+``FilterPolicyMatcher``. The ``SubscriptionFilterIndex`` of a topic additionally indexes the subscriptions by the
+attribute values their filter policies require (exact values, prefixes, and numeric ranges), such that publishing a
+message to a topic only evaluates the filter policies of the subscriptions which can possibly match the message.
+"""
+import ast
+import bisect
+import json
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from localstack.utils.collections import PrefixTrie
+
+LOG = logging.getLogger(__name__)
+
+
+def _to_number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def _parse_string_array(value: Any) -> List[Any]:
+    try:
+        values = json.loads(value)
+    except (TypeError, ValueError):
+        try:
+            values = ast.literal_eval(value)
+        except Exception:
+            LOG.debug("unable to parse String.Array attribute value %s", value)
+            return []
+    if isinstance(values, (list, tuple)):
+        return list(values)
+    return [values]
+
+
+class MessageAttributeValues:
+    """
+    The values of the attributes of a single message, which are parsed once per message and shared by the evaluation
+    of all filter policies.
+    """
+
+    def __init__(self, message_attributes: Optional[Dict]):
+        self.message_attributes = message_attributes or {}
+        self._values: Dict[str, List[Any]] = {}
+        self._numbers: Dict[str, List[Optional[float]]] = {}
+
+    def exists(self, name: str) -> bool:
+        return self.message_attributes.get(name) is not None
+
+    def values(self, name: str) -> List[Any]:
+        """
+        Returns the values of the given attribute a condition is evaluated against: the elements of a String.Array
+        attribute, the value of any other attribute, or ``[None]`` if the message does not have the attribute.
+        """
+        values = self._values.get(name)
+        if values is None:
+            attribute = self.message_attributes.get(name)
+            if attribute is None:
+                values = [None]
+            else:
+                data_type = attribute.get("DataType") or attribute.get("Type")
+                value = attribute.get("StringValue") or attribute.get("Value")
+                if data_type == "String.Array":
+                    values = _parse_string_array(value)
+                else:
+                    values = [value or None]
+            self._values[name] = values
+        return values
+
+    def numbers(self, name: str) -> List[Optional[float]]:
+        """Returns the numeric values of the given attribute (None for values that are not a number)."""
+        numbers = self._numbers.get(name)
+        if numbers is None:
+            numbers = self._numbers[name] = [
+                None if value is None else _to_number(value) for value in self.values(name)
+            ]
+        return numbers
+
+
+class NumericRange:
+    """A compiled ``numeric`` condition, e.g., ``{"numeric": [">", 0, "<=", 150]}``."""
+
+    __slots__ = ("low", "low_inclusive", "high", "high_inclusive")
+
+    def __init__(self, conditions: List):
+        self.low, self.low_inclusive = -math.inf, True
+        self.high, self.high_inclusive = math.inf, True
+
+        if len(conditions) % 2:
+            raise ValueError(f"invalid numeric condition {conditions}")
+
+        for i in range(0, len(conditions), 2):
+            operator = conditions[i]
+            operand = float(conditions[i + 1])
+            if operator in ("=", ">", ">="):
+                self._restrict_low(operand, operator != ">")
+            if operator in ("=", "<", "<="):
+                self._restrict_high(operand, operator != "<")
+
+    def _restrict_low(self, value: float, inclusive: bool):
+        if value > self.low or (value == self.low and not inclusive):
+            self.low, self.low_inclusive = value, inclusive
+
+    def _restrict_high(self, value: float, inclusive: bool):
+        if value < self.high or (value == self.high and not inclusive):
+            self.high, self.high_inclusive = value, inclusive
+
+    def contains(self, number: float) -> bool:
+        if number < self.low or (number == self.low and not self.low_inclusive):
+            return False
+        if number > self.high or (number == self.high and not self.high_inclusive):
+            return False
+        return True
+
+
+class AttributeFilter:
+    """
+    The compiled conditions a filter policy defines for a single message attribute. The attribute matches if any of
+    the conditions matches any of the attribute's values.
+    """
+
+    def __init__(self, name: str, conditions: Any):
+        self.name = name
+        self.exact: Set[Any] = set()
+        # exact values which cannot be hashed (e.g., nested lists)
+        self.exact_unhashable: List[Any] = []
+        self.exists: Set[bool] = set()
+        self.anything_but: List[Any] = []
+        self.prefixes: List[str] = []
+        self.numeric: List[NumericRange] = []
+
+        if type(conditions) is not list:
+            conditions = [conditions]
+
+        for condition in conditions:
+            self._add_condition(condition)
+
+    def _add_condition(self, condition: Any):
+        # the order of the checks corresponds to the precedence of the operators in a condition
+        if type(condition) is not dict:
+            try:
+                self.exact.add(condition)
+            except TypeError:
+                self.exact_unhashable.append(condition)
+        elif condition.get("exists") is not None:
+            self.exists.add(bool(condition["exists"]))
+        elif condition.get("anything-but"):
+            self.anything_but.append(condition["anything-but"])
+        elif condition.get("prefix"):
+            self.prefixes.append(condition["prefix"])
+        elif condition.get("numeric"):
+            try:
+                self.numeric.append(NumericRange(condition["numeric"]))
+            except (TypeError, ValueError):
+                LOG.warning("ignoring invalid numeric condition in filter policy: %s", condition)
+
+    @property
+    def indexable(self) -> bool:
+        """
+        Whether a message can only match this filter if the attribute has one of the exact values, one of the prefixes
+        or a number in one of the ranges of this filter.
+        """
+        return not (self.exists or self.anything_but or self.exact_unhashable)
+
+    def matches(self, attributes: MessageAttributeValues) -> bool:
+        values = attributes.values(self.name)
+        if not values:
+            return False
+
+        if self.exists and attributes.exists(self.name) in self.exists:
+            return True
+
+        for i, value in enumerate(values):
+            if self.exact or self.exact_unhashable:
+                try:
+                    if value in self.exact:
+                        return True
+                except TypeError:
+                    pass
+                if any(value == condition for condition in self.exact_unhashable):
+                    return True
+
+            if value is None:
+                # the remaining conditions require the value to not be None
+                continue
+
+            for anything_but in self.anything_but:
+                try:
+                    if value not in anything_but:
+                        return True
+                except TypeError:
+                    pass
+
+            if self.prefixes and isinstance(value, str):
+                for prefix in self.prefixes:
+                    if value.startswith(prefix):
+                        return True
+
+            if self.numeric:
+                number = attributes.numbers(self.name)[i]
+                if number is not None:
+                    for numeric_range in self.numeric:
+                        if numeric_range.contains(number):
+                            return True
+
+        return False
+
+
+class FilterPolicyMatcher:
+    """
+    A compiled filter policy. A message matches the policy if it matches the conditions of all attributes of the
+    policy.
+    """
+
+    def __init__(self, filter_policy: Optional[Dict]):
+        self.filters = [
+            AttributeFilter(name, conditions) for name, conditions in (filter_policy or {}).items()
+        ]
+
+    @staticmethod
+    def from_json(filter_policy: Optional[str]) -> "FilterPolicyMatcher":
+        return FilterPolicyMatcher(json.loads(filter_policy or "{}"))
+
+    def matches(self, attributes: MessageAttributeValues) -> bool:
+        for attribute_filter in self.filters:
+            if not attribute_filter.matches(attributes):
+                return False
+        return True
+
+    def get_index_filter(self) -> Optional[AttributeFilter]:
+        """
+        Returns the attribute filter which should be used to index the policy. Exact values are preferred, since they
+        are usually the most selective.
+
+        :return: an indexable attribute filter, or None if the policy cannot be indexed
+        """
+        candidates = [f for f in self.filters if f.indexable]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda f: (not f.exact, not f.numeric))
+
+
+class SubscriptionFilterIndex:
+    """
+    An inverted index from message attribute values to the (filtered) subscriptions of a topic. Each subscription is
+    indexed by the exact values, prefixes, or numeric ranges of a single attribute of its filter policy. Only the
+    filter policies of the subscriptions found in the index (and those of subscriptions that cannot be indexed) are
+    evaluated for a message.
+    """
+
+    def __init__(self, subscriptions: Iterable[Dict] = None):
+        self.counter = 0
+        # subscription ARN -> (insertion counter, subscription, matcher or None if the filter policy is invalid)
+        self.subscriptions: Dict[str, Tuple[int, Dict, Optional[FilterPolicyMatcher]]] = {}
+        # subscriptions which are evaluated for every message
+        self.unindexed: Set[str] = set()
+        # attribute name -> attribute value -> subscription ARNs
+        self.exact: Dict[str, Dict[Any, Set[str]]] = {}
+        # attribute name -> trie of prefixes, and prefix -> subscription ARNs
+        self.prefix_tries: Dict[str, PrefixTrie[str]] = {}
+        self.prefixes: Dict[str, Dict[str, Set[str]]] = {}
+        # attribute name -> ranges sorted by their lower bound (and the lower bounds for the binary search)
+        self.ranges: Dict[str, List[Tuple[NumericRange, str]]] = {}
+        self.range_bounds: Dict[str, List[float]] = {}
+
+        for subscription in subscriptions or []:
+            self.add(subscription)
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+    def add(self, subscription: Dict):
+        """
+        Adds the given subscription (or updates it, if its filter policy has changed).
+
+        :param subscription: the subscription to add
+        """
+        subscription_arn = subscription["SubscriptionArn"]
+        if subscription_arn in self.subscriptions:
+            self.remove(subscription_arn)
+
+        try:
+            matcher = FilterPolicyMatcher.from_json(subscription.get("FilterPolicy"))
+        except (AttributeError, ValueError):
+            LOG.warning(
+                "invalid filter policy of subscription %s: %s",
+                subscription_arn,
+                subscription.get("FilterPolicy"),
+            )
+            matcher = None
+
+        self.counter += 1
+        self.subscriptions[subscription_arn] = (self.counter, subscription, matcher)
+        if matcher is None:
+            # the subscription does not match any message
+            return
+
+        index_filter = matcher.get_index_filter()
+        if index_filter is None:
+            self.unindexed.add(subscription_arn)
+            return
+
+        name = index_filter.name
+        for value in index_filter.exact:
+            self.exact.setdefault(name, {}).setdefault(value, set()).add(subscription_arn)
+        for prefix in index_filter.prefixes:
+            self.prefix_tries.setdefault(name, PrefixTrie()).insert(prefix, prefix)
+            self.prefixes.setdefault(name, {}).setdefault(prefix, set()).add(subscription_arn)
+        for numeric_range in index_filter.numeric:
+            ranges = self.ranges.setdefault(name, [])
+            bounds = self.range_bounds.setdefault(name, [])
+            position = bisect.bisect_right(bounds, numeric_range.low)
+            ranges.insert(position, (numeric_range, subscription_arn))
+            bounds.insert(position, numeric_range.low)
+
+    def remove(self, subscription_arn: str):
+        """
+        Removes the subscription with the given ARN from the index.
+
+        :param subscription_arn: the ARN of the subscription to remove
+        """
+        if self.subscriptions.pop(subscription_arn, None) is None:
+            return
+
+        self.unindexed.discard(subscription_arn)
+        for values in self.exact.values():
+            for value in [value for value, arns in values.items() if subscription_arn in arns]:
+                values[value].discard(subscription_arn)
+                if not values[value]:
+                    del values[value]
+        for prefixes in self.prefixes.values():
+            for arns in prefixes.values():
+                arns.discard(subscription_arn)
+        for name, ranges in self.ranges.items():
+            positions = [i for i, (_, arn) in enumerate(ranges) if arn == subscription_arn]
+            for position in reversed(positions):
+                del ranges[position]
+                del self.range_bounds[name][position]
+
+    def match(self, message_attributes: Optional[Dict]) -> List[Dict]:
+        """
+        Returns the subscriptions whose filter policy matches the given message attributes.
+
+        :param message_attributes: the attributes of the published message
+        :return: the matching subscriptions (in the order in which they have been added)
+        """
+        attributes = MessageAttributeValues(message_attributes)
+
+        candidates = set(self.unindexed)
+        for name, values in self.exact.items():
+            for value in attributes.values(name):
+                try:
+                    arns = values.get(value)
+                except TypeError:
+                    continue
+                if arns:
+                    candidates.update(arns)
+
+        for name, trie in self.prefix_tries.items():
+            prefixes = self.prefixes[name]
+            for value in attributes.values(name):
+                if isinstance(value, str):
+                    for prefix in trie.matches(value):
+                        candidates.update(prefixes[prefix])
+
+        for name, ranges in self.ranges.items():
+            bounds = self.range_bounds[name]
+            for number in attributes.numbers(name):
+                if number is None:
+                    continue
+                # only the ranges with a lower bound <= the number can contain it
+                for numeric_range, subscription_arn in ranges[
+                    : bisect.bisect_right(bounds, number)
+                ]:
+                    if numeric_range.contains(number):
+                        candidates.add(subscription_arn)
+
+        matches = []
+        for subscription_arn in candidates:
+            counter, subscription, matcher = self.subscriptions[subscription_arn]
+            if matcher.matches(attributes):
+                matches.append((counter, subscription))
+        matches.sort(key=lambda match: match[0])
+        return [subscription for _, subscription in matches]
@@ -1,13 +1,13 @@
-import ast
-import asyncio
 import base64
 import datetime
+import functools
 import json
 import logging
+import queue
 import time
 import traceback
 import uuid
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Optional
 
 import botocore.exceptions
 import requests as requests
@@ -18,6 +18,7 @@ from moto.sns.models import MAXIMUM_MESSAGE_LENGTH
 from requests.models import Response
 
 from localstack import config
+from localstack.aws.accounts import get_aws_account_id
 from localstack.aws.api import RequestContext
 from localstack.aws.api.core import CommonServiceException
 from localstack.aws.api.sns import (
@@ -70,6 +71,7 @@ from localstack.aws.api.sns import (
     TagKeyList,
     TagList,
     TagResourceResponse,
+    ThrottledException,
     TooManyEntriesInBatchRequestException,
     TopicAttributesMap,
     UntagResourceResponse,
@@ -93,17 +95,29 @@ from localstack.aws.api.sns import (
 )
 from localstack.config import external_service_url
 from localstack.services.generic_proxy import RegionBackend
+from localstack.services.internal import get_internal_apis
 from localstack.services.moto import call_moto
 from localstack.services.plugins import ServiceLifecycleHook
+from localstack.services.sns.delivery import (
+    DeliveryBatcher,
+    DeliveryError,
+    DeliveryTask,
+    RetryPolicy,
+    get_delivery_pool,
+)
+from localstack.services.sns.filter import (
+    FilterPolicyMatcher,
+    MessageAttributeValues,
+    SubscriptionFilterIndex,
+)
 from localstack.utils.aws import aws_stack
 from localstack.utils.aws.aws_responses import create_sqs_system_attributes
 from localstack.utils.aws.aws_stack import extract_region_from_arn
 from localstack.utils.aws.dead_letter_queue import sns_error_to_dead_letter_queue
 from localstack.utils.cloudwatch.cloudwatch_util import store_cloudwatch_logs
 from localstack.utils.json import json_safe
-from localstack.utils.objects import not_none_or
+from localstack.utils.objects import not_none_or, singleton_factory
 from localstack.utils.strings import long_uid, md5, short_uid, to_bytes
-from localstack.utils.threads import start_thread
 from localstack.utils.time import timestamp_millis
 
 SNS_PROTOCOLS = [
@@ -123,10 +137,18 @@ LOG = logging.getLogger(__name__)
 
 GCM_URL = "https://fcm.googleapis.com/fcm/send"
 
+# maximum total size of the message bodies of a SendMessageBatch request
+SQS_MAX_BATCH_BYTES = 262144
+
+# internal endpoint exposing the metrics of the SNS delivery queues
+DELIVERY_METRICS_ENDPOINT = "/sns/delivery-metrics"
+
 
 class SNSBackend(RegionBackend):
     # maps topic ARN to list of subscriptions
     sns_subscriptions: Dict[str, List[Dict]]
+    # maps topic ARN to the index of the filter policies of its subscriptions
+    subscription_filters: Dict[str, SubscriptionFilterIndex]
     # maps subscription ARN to subscription status
     subscription_status: Dict[str, Dict]
     # maps topic ARN to list of tags
@@ -139,6 +161,7 @@ class SNSBackend(RegionBackend):
 
     def __init__(self):
         self.sns_subscriptions = {}
+        self.subscription_filters = {}
         self.subscription_status = {}
         self.sns_tags = {}
         self.platform_endpoint_messages = {}
@@ -163,30 +186,26 @@ def publish_message(
         message_structure = req_data.get("MessageStructure", [None])[0]
         LOG.debug("Publishing message to Endpoint: %s | Message: %s", target_arn, message)
 
-        start_thread(
-            lambda _: message_to_endpoint(
-                target_arn,
-                message,
-                message_structure,
-                endpoint_attributes,
-                platform_app,
+        submit_delivery(
+            DeliveryTask(
+                "application",
+                message_to_endpoint,
+                (target_arn, message, message_structure, endpoint_attributes, platform_app),
             )
         )
         return message_id
 
     LOG.debug("Publishing message to TopicArn: %s | Message: %s", topic_arn, message)
-    start_thread(
-        lambda _: message_to_subscribers(
-            message_id,
-            message,
-            topic_arn,
-            # TODO: check
-            req_data,
-            headers,
-            subscription_arn,
-            skip_checks,
-            message_attributes,
-        )
+    message_to_subscribers(
+        message_id,
+        message,
+        topic_arn,
+        # TODO: check
+        req_data,
+        headers,
+        subscription_arn,
+        skip_checks,
+        message_attributes,
     )
 
     return message_id
@@ -283,7 +302,7 @@ def send_message_to_GCM(app_attributes, endpoint_attributes, message):
     data["to"] = token
     headers = {"Authorization": f"key={server_key}", "Content-type": "application/json"}
 
-    response = requests.post(
+    response = get_delivery_pool().http_sessions.post(
         GCM_URL,
         headers=headers,
         data=json.dumps(data),
@@ -291,7 +310,30 @@ def send_message_to_GCM(app_attributes, endpoint_attributes, message):
     return response
 
 
+class SnsDeliveryMetricsResource:
+    """
+    Provides the queue depth, latency, and failure metrics of the SNS delivery queues (per protocol).
+
+    This is registered as a LocalStack internal HTTP resource.
+    """
+
+    def on_get(self, request):
+        return {
+            "queues": get_delivery_pool().get_metrics(),
+            "sqs_batches": get_sqs_delivery_batcher().get_metrics(),
+        }
+
+
 class SnsProvider(SnsApi, ServiceLifecycleHook):
+    def on_after_init(self):
+        get_internal_apis().add(DELIVERY_METRICS_ENDPOINT, SnsDeliveryMetricsResource())
+
+    def on_before_start(self):
+        get_delivery_pool().start()
+
+    def on_before_stop(self):
+        get_delivery_pool().close()
+
     def add_permission(
         self,
         context: RequestContext,
@@ -480,30 +522,32 @@ class SnsProvider(SnsApi, ServiceLifecycleHook):
             )
 
         response = {"Successful": [], "Failed": []}
-        for entry in publish_batch_request_entries:
-            message_id = str(uuid.uuid4())
-            data = {}
-            data["TopicArn"] = [topic_arn]
-            data["Message"] = [entry["Message"]]
-            data["Subject"] = [entry.get("Subject")]
-            if ".fifo" in topic_arn:
-                data["MessageGroupId"] = [entry.get("MessageGroupId")]
-                data["MessageDeduplicationId"] = [entry.get("MessageDeduplicationId")]
-            # TODO: implement SNS MessageDeduplicationId and ContentDeduplication checks
-
-            message_attributes = entry.get("MessageAttributes", {})
-            try:
-                message_to_subscribers(
-                    message_id,
-                    entry["Message"],
-                    topic_arn,
-                    data,
-                    context.request.headers,
-                    message_attributes=message_attributes,
-                )
-                response["Successful"].append({"Id": entry["Id"], "MessageId": message_id})
-            except Exception:
-                response["Failed"].append({"Id": entry["Id"]})
+        # deliver the messages of the batch to the same SQS queues with as few batches as possible
+        with get_sqs_delivery_batcher().deferred():
+            for entry in publish_batch_request_entries:
+                message_id = str(uuid.uuid4())
+                data = {}
+                data["TopicArn"] = [topic_arn]
+                data["Message"] = [entry["Message"]]
+                data["Subject"] = [entry.get("Subject")]
+                if ".fifo" in topic_arn:
+                    data["MessageGroupId"] = [entry.get("MessageGroupId")]
+                    data["MessageDeduplicationId"] = [entry.get("MessageDeduplicationId")]
+                # TODO: implement SNS MessageDeduplicationId and ContentDeduplication checks
+
+                message_attributes = entry.get("MessageAttributes", {})
+                try:
+                    message_to_subscribers(
+                        message_id,
+                        entry["Message"],
+                        topic_arn,
+                        data,
+                        context.request.headers,
+                        message_attributes=message_attributes,
+                    )
+                    response["Successful"].append({"Id": entry["Id"], "MessageId": message_id})
+                except Exception:
+                    response["Failed"].append({"Id": entry["Id"]})
 
         return PublishBatchResponse(**response)
 
@@ -518,6 +562,10 @@ class SnsProvider(SnsApi, ServiceLifecycleHook):
         if not sub:
             raise NotFoundException("Subscription does not exist")
         sub[attribute_name] = attribute_value
+        if attribute_name == "FilterPolicy":
+            filter_index = SNSBackend.get().subscription_filters.get(sub["TopicArn"])
+            if filter_index:
+                filter_index.add(sub)
 
     def confirm_subscription(
         self,
@@ -638,6 +686,9 @@ class SnsProvider(SnsApi, ServiceLifecycleHook):
             sns_backend.sns_subscriptions[topic_arn] = [
                 sub for sub in existing_subs if should_be_kept(sub, subscription_arn)
             ]
+            filter_index = sns_backend.subscription_filters.get(topic_arn)
+            if filter_index:
+                filter_index.remove(subscription_arn)
 
     def get_subscription_attributes(
         self, context: RequestContext, subscription_arn: subscriptionARN
@@ -775,6 +826,10 @@ class SnsProvider(SnsApi, ServiceLifecycleHook):
         if attributes:
             subscription.update(attributes)
         topic_subs.append(subscription)
+        filter_index = sns_backend.subscription_filters.get(topic_arn)
+        if filter_index:
+            # compile the filter policy of the new subscription right away (instead of rebuilding the index)
+            filter_index.add(subscription)
 
         if subscription_arn not in sns_backend.subscription_status:
             sns_backend.subscription_status[subscription_arn] = {}
@@ -837,6 +892,7 @@ class SnsProvider(SnsApi, ServiceLifecycleHook):
         call_moto(context)
         sns_backend = SNSBackend.get()
         sns_backend.sns_subscriptions.pop(topic_arn, None)
+        sns_backend.subscription_filters.pop(topic_arn, None)
         sns_backend.sns_tags.pop(topic_arn, None)
 
     def create_topic(
@@ -877,31 +933,176 @@ def message_to_subscribers(
         topic_arn = req_data.get("TargetArn")
     sns_backend = SNSBackend.get()
     subscriptions = sns_backend.sns_subscriptions.get(topic_arn, [])
-
-    async def wait_for_messages_sent():
-        subs = [
-            message_to_subscriber(
-                message_id,
-                message,
-                topic_arn,
-                req_data,
-                headers,
-                subscription_arn,
-                skip_checks,
-                sns_backend,
-                subscriber,
-                subscriptions,
+    if skip_checks:
+        subscribers = list(subscriptions)
+    else:
+        subscribers = get_subscription_filter_index(sns_backend, topic_arn).match(
+            message_attributes
+        )
+        if LOG.isEnabledFor(logging.DEBUG) and len(subscribers) < len(subscriptions):
+            LOG.debug(
+                "SNS filter policies of %s subscriptions do not match attributes %s",
+                len(subscriptions) - len(subscribers),
                 message_attributes,
             )
-            for subscriber in list(subscriptions)
-        ]
-        if subs:
-            await asyncio.wait(subs)
 
-    asyncio.run(wait_for_messages_sent())
+    for subscriber in subscribers:
+        if subscription_arn not in [None, subscriber["SubscriptionArn"]]:
+            continue
+        protocol = subscriber["Protocol"]
+        if protocol == "sqs":
+            queue_sqs_delivery(
+                subscriber, message_id, message, req_data, headers, message_attributes
+            )
+            continue
+        retry_policy = None
+        if protocol in ["http", "https"]:
+            # AWS only applies the delivery policy to HTTP/S endpoints
+            retry_policy = RetryPolicy.from_delivery_policy(subscriber.get("DeliveryPolicy"))
+        submit_delivery(
+            DeliveryTask(
+                protocol,
+                message_to_subscriber,
+                (
+                    message_id,
+                    message,
+                    topic_arn,
+                    req_data,
+                    headers,
+                    subscription_arn,
+                    skip_checks,
+                    sns_backend,
+                    subscriber,
+                    subscriptions,
+                    message_attributes,
+                ),
+                retry_policy=retry_policy,
+                on_failure=functools.partial(on_delivery_failure, subscriber),
+            )
+        )
+
+
+def submit_delivery(task: DeliveryTask):
+    """Queues the given delivery task, raises a ThrottledException if the delivery queue stays full."""
+    try:
+        get_delivery_pool().submit(task)
+    except queue.Full:
+        raise ThrottledException("Rate exceeded")
+
+
+class SqsDelivery(NamedTuple):
+    """A message which is delivered to the SQS queue of a subscription as part of a SendMessageBatch call."""
+
+    subscriber: Dict
+    message_id: str
+    message: str
+    message_body: str
+    message_attributes: Dict
+    message_system_attributes: Dict
+    message_group_id: Optional[str]
+    message_deduplication_id: Optional[str]
+
+
+@singleton_factory
+def get_sqs_delivery_batcher() -> DeliveryBatcher:
+    """Returns the batcher which coalesces the deliveries to the same SQS queue into SendMessageBatch calls."""
+    return DeliveryBatcher(
+        "sqs",
+        deliver_to_sqs_queue,
+        max_batch_size=10,
+        max_batch_bytes=SQS_MAX_BATCH_BYTES,
+        entry_size=lambda delivery: len(to_bytes(delivery.message_body)),
+    )
+
+
+def queue_sqs_delivery(subscriber, message_id, message, req_data, headers, message_attributes):
+    delivery = SqsDelivery(
+        subscriber=subscriber,
+        message_id=message_id,
+        message=message,
+        message_body=create_sns_message_body(subscriber, req_data, message_id, message_attributes),
+        message_attributes=create_sqs_message_attributes(subscriber, message_attributes),
+        message_system_attributes=create_sqs_system_attributes(headers),
+        message_group_id=req_data.get("MessageGroupId", [""])[0],
+        message_deduplication_id=req_data.get("MessageDeduplicationId", [""])[0],
+    )
+    # batches are delivered with the region and account of the publisher, they must not mix them
+    key = (subscriber["Endpoint"], aws_stack.get_region(), get_aws_account_id())
+    try:
+        get_sqs_delivery_batcher().add(key, delivery)
+    except queue.Full:
+        raise ThrottledException("Rate exceeded")
+
+
+def deliver_to_sqs_queue(key, deliveries: List[SqsDelivery]):
+    """
+    Delivers a batch of messages to the SQS queue of a subscription endpoint with a single SendMessageBatch call.
+    Failed entries are sent to the dead-letter queue of their subscription.
+    """
+    entries = []
+    for i, delivery in enumerate(deliveries):
+        entry = {
+            "Id": str(i),
+            "MessageBody": delivery.message_body,
+            "MessageAttributes": delivery.message_attributes,
+            "MessageSystemAttributes": delivery.message_system_attributes,
+        }
+        if delivery.message_group_id:
+            entry["MessageGroupId"] = delivery.message_group_id
+        if delivery.message_deduplication_id:
+            entry["MessageDeduplicationId"] = delivery.message_deduplication_id
+        entries.append(entry)
+
+    try:
+        queue_url = get_subscriber_queue_url(deliveries[0].subscriber)
+        sqs_client = aws_stack.connect_to_service("sqs")
+        response = sqs_client.send_message_batch(QueueUrl=queue_url, Entries=entries)
+    except Exception as exc:
+        LOG.info("Unable to forward SNS message to SQS: %s %s", exc, traceback.format_exc())
+        for delivery in deliveries:
+            sqs_delivery_failed(delivery, str(exc))
+        if "NonExistentQueue" in str(exc):
+            LOG.debug("The SQS queue endpoint does not exist anymore")
+            # todo: if the queue got deleted, even if we recreate a queue with the same name/url
+            #  AWS won't send to it anymore. Would need to unsub/resub.
+            #  We should mark this subscription as "broken"
+        return
+
+    failed = {entry["Id"]: entry for entry in response.get("Failed", [])}
+    for i, delivery in enumerate(deliveries):
+        failure = failed.get(str(i))
+        if failure:
+            LOG.info("Unable to forward SNS message to SQS: %s", failure.get("Message"))
+            sqs_delivery_failed(delivery, failure.get("Message") or failure.get("Code"))
+        else:
+            store_delivery_log(delivery.subscriber, True, delivery.message, delivery.message_id)
+
+
+def sqs_delivery_failed(delivery: SqsDelivery, error: str):
+    subscriber = delivery.subscriber
+    store_delivery_log(subscriber, False, delivery.message, delivery.message_id)
+    msg_attrs = delivery.message_attributes if is_raw_message_delivery(subscriber) else {}
+    sns_error_to_dead_letter_queue(subscriber, delivery.message_body, error, msg_attrs=msg_attrs)
+
+
+def get_subscriber_queue_url(subscriber: Dict) -> str:
+    endpoint = subscriber["Endpoint"]
+    if "sqs_queue_url" in subscriber:
+        return subscriber["sqs_queue_url"]
+    if "://" in endpoint:
+        return endpoint
+    queue_url = subscriber["sqs_queue_url"] = aws_stack.get_sqs_queue_url(endpoint)
+    return queue_url
+
+
+def on_delivery_failure(subscriber: Dict, error: Exception):
+    """Called once all attempts of a delivery to the given subscriber have failed."""
+    dead_letter_message = getattr(error, "dead_letter_message", None)
+    if dead_letter_message is not None:
+        sns_error_to_dead_letter_queue(subscriber, dead_letter_message, str(error))
 
 
-async def message_to_subscriber(
+def message_to_subscriber(
     message_id,
     message,
     topic_arn,
@@ -914,17 +1115,11 @@ async def message_to_subscriber(
     subscriptions,
     message_attributes,
 ):
-
-    if subscription_arn not in [None, subscriber["SubscriptionArn"]]:
-        return
-
-    filter_policy = json.loads(subscriber.get("FilterPolicy") or "{}")
-
-    if not skip_checks and not check_filter_policy(filter_policy, message_attributes):
-        LOG.info(
-            "SNS filter policy %s does not match attributes %s", filter_policy, message_attributes
-        )
-        return
+    """
+    Delivers the message to the given subscriber, this is executed by the workers of the delivery pool. Failed
+    deliveries to HTTP/S endpoints raise a DeliveryError, such that they are retried according to the delivery
+    policy of the subscription (and eventually sent to the DLQ by ``on_delivery_failure``).
+    """
     # todo: Message attributes are sent only when the message structure is String, not JSON.
     if subscriber["Protocol"] == "sms":
         event = {
@@ -952,57 +1147,6 @@ async def message_to_subscriber(
         store_delivery_log(subscriber, True, message, message_id, delivery)
         return
 
-    elif subscriber["Protocol"] == "sqs":
-        queue_url = None
-        message_body = create_sns_message_body(subscriber, req_data, message_id, message_attributes)
-        try:
-            endpoint = subscriber["Endpoint"]
-
-            if "sqs_queue_url" in subscriber:
-                queue_url = subscriber.get("sqs_queue_url")
-            elif "://" in endpoint:
-                queue_url = endpoint
-            else:
-                queue_url = aws_stack.get_sqs_queue_url(endpoint)
-                subscriber["sqs_queue_url"] = queue_url
-
-            message_group_id = req_data.get("MessageGroupId", [""])[0]
-
-            message_deduplication_id = req_data.get("MessageDeduplicationId", [""])[0]
-
-            sqs_client = aws_stack.connect_to_service("sqs")
-
-            kwargs = {}
-            if message_group_id:
-                kwargs["MessageGroupId"] = message_group_id
-            if message_deduplication_id:
-                kwargs["MessageDeduplicationId"] = message_deduplication_id
-
-            sqs_client.send_message(
-                QueueUrl=queue_url,
-                MessageBody=message_body,
-                MessageAttributes=create_sqs_message_attributes(subscriber, message_attributes),
-                MessageSystemAttributes=create_sqs_system_attributes(headers),
-                **kwargs,
-            )
-            store_delivery_log(subscriber, True, message, message_id)
-        except Exception as exc:
-            LOG.info("Unable to forward SNS message to SQS: %s %s", exc, traceback.format_exc())
-            store_delivery_log(subscriber, False, message, message_id)
-
-            if is_raw_message_delivery(subscriber):
-                msg_attrs = create_sqs_message_attributes(subscriber, message_attributes)
-            else:
-                msg_attrs = {}
-
-            sns_error_to_dead_letter_queue(subscriber, message_body, str(exc), msg_attrs=msg_attrs)
-            if "NonExistentQueue" in str(exc):
-                LOG.debug("The SQS queue endpoint does not exist anymore")
-                # todo: if the queue got deleted, even if we recreate a queue with the same name/url
-                #  AWS won't send to it anymore. Would need to unsub/resub.
-                #  We should mark this subscription as "broken"
-        return
-
     elif subscriber["Protocol"] == "lambda":
         try:
             external_url = external_service_url("sns")
@@ -1075,7 +1219,7 @@ async def message_to_subscriber(
             elif msg_type == "Notification" and is_raw_message_delivery(subscriber):
                 message_headers["x-amz-sns-rawdelivery"] = "true"
 
-            response = requests.post(
+            response = get_delivery_pool().http_sessions.post(
                 subscriber["Endpoint"],
                 headers=message_headers,
                 data=message_body,
@@ -1090,13 +1234,13 @@ async def message_to_subscriber(
 
             response.raise_for_status()
         except Exception as exc:
-            LOG.info(
-                "Received error on sending SNS message, putting to DLQ (if configured): %s", exc
-            )
+            LOG.info("Received error on sending SNS message to %s: %s", subscriber["Endpoint"], exc)
             store_delivery_log(subscriber, False, message, message_id)
             # AWS doesn't send to the DLQ if there's an error trying to deliver a UnsubscribeConfirmation msg
-            if msg_type != "UnsubscribeConfirmation":
-                sns_error_to_dead_letter_queue(subscriber, message_body, str(exc))
+            raise DeliveryError(
+                str(exc),
+                dead_letter_message=message_body if msg_type != "UnsubscribeConfirmation" else None,
+            ) from exc
         return
 
     elif subscriber["Protocol"] == "application":
@@ -1217,6 +1361,21 @@ def process_sns_notification_to_lambda(
     return None
 
 
+def get_subscription_filter_index(
+    sns_backend: SNSBackend, topic_arn: str
+) -> SubscriptionFilterIndex:
+    """
+    Returns the filter index of the subscriptions of the given topic, which is built on first use. Every change of the
+    subscriptions of the topic has to be applied to the index (or has to remove the index from the backend).
+    """
+    filter_index = sns_backend.subscription_filters.get(topic_arn)
+    if filter_index is None:
+        subscriptions = sns_backend.sns_subscriptions.get(topic_arn, [])
+        filter_index = SubscriptionFilterIndex(subscriptions)
+        sns_backend.subscription_filters[topic_arn] = filter_index
+    return filter_index
+
+
 def get_subscription_by_arn(sub_arn):
     sns_backend = SNSBackend.get()
     # TODO maintain separate map instead of traversing all items
@@ -1341,105 +1500,11 @@ def create_unsubscribe_url(external_url, subscription_arn):
     return f"{external_url}/?Action=Unsubscribe&SubscriptionArn={subscription_arn}"
 
 
-def is_number(x):
-    try:
-        float(x)
-        return True
-    except ValueError:
-        return False
-
-
-def evaluate_numeric_condition(conditions, value):
-    if not is_number(value):
-        return False
-
-    for i in range(0, len(conditions), 2):
-        value = float(value)
-        operator = conditions[i]
-        operand = float(conditions[i + 1])
-
-        if operator == "=":
-            if value != operand:
-                return False
-        elif operator == ">":
-            if value <= operand:
-                return False
-        elif operator == "<":
-            if value >= operand:
-                return False
-        elif operator == ">=":
-            if value < operand:
-                return False
-        elif operator == "<=":
-            if value > operand:
-                return False
-
-    return True
-
-
-def evaluate_exists_condition(conditions, message_attributes, criteria):
-    # support for exists: false was added in april 2021
-    # https://aws.amazon.com/about-aws/whats-new/2021/04/amazon-sns-grows-the-set-of-message-filtering-operators/
-    if conditions:
-        return message_attributes.get(criteria) is not None
-    else:
-        return message_attributes.get(criteria) is None
-
-
-def evaluate_condition(value, condition, message_attributes, criteria):
-    if type(condition) is not dict:
-        return value == condition
-    elif condition.get("exists") is not None:
-        return evaluate_exists_condition(condition.get("exists"), message_attributes, criteria)
-    elif value is None:
-        # the remaining conditions require the value to not be None
-        return False
-    elif condition.get("anything-but"):
-        return value not in condition.get("anything-but")
-    elif condition.get("prefix"):
-        prefix = condition.get("prefix")
-        return value.startswith(prefix)
-    elif condition.get("numeric"):
-        return evaluate_numeric_condition(condition.get("numeric"), value)
-    return False
-
-
 def check_filter_policy(filter_policy, message_attributes):
     if not filter_policy:
         return True
-
-    for criteria in filter_policy:
-        conditions = filter_policy.get(criteria)
-        attribute = message_attributes.get(criteria)
-
-        if (
-            evaluate_filter_policy_conditions(conditions, attribute, message_attributes, criteria)
-            is False
-        ):
-            return False
-
-    return True
-
-
-def evaluate_filter_policy_conditions(conditions, attribute, message_attributes, criteria):
-    if type(conditions) is not list:
-        conditions = [conditions]
-
-    tpe = attribute.get("DataType") or attribute.get("Type") if attribute else None
-    val = attribute.get("StringValue") or attribute.get("Value") if attribute else None
-    if attribute is not None and tpe == "String.Array":
-        values = ast.literal_eval(val)
-        for value in values:
-            for condition in conditions:
-                if evaluate_condition(value, condition, message_attributes, criteria):
-                    return True
-    else:
-        for condition in conditions:
-            value = val or None
-            if evaluate_condition(value, condition, message_attributes, criteria):
-                return True
-
-    return False
+    matcher = FilterPolicyMatcher(filter_policy)
+    return matcher.matches(MessageAttributeValues(message_attributes))
 
 
 def store_delivery_log(
@@ -1497,3 +1562,6 @@ def unsubscribe_sqs_queue(queue_url):
             sub_url = subscriber.get("sqs_queue_url") or subscriber["Endpoint"]
             if queue_url == sub_url:
                 subscriptions.remove(subscriber)
+                filter_index = sns_backend.subscription_filters.get(topic_arn)
+                if filter_index:
+                    filter_index.remove(subscriber["SubscriptionArn"])
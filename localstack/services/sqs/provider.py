@@ -1,5 +1,5 @@
+import asyncio
 import base64
-import copy
 import hashlib
 import heapq
 import inspect
@@ -9,8 +9,10 @@ import logging
 import re
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future
 from queue import Empty, PriorityQueue
-from typing import Dict, List, NamedTuple, Optional, Set
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set
 
 from moto.sqs.models import BINARY_TYPE_FIELD_INDEX, STRING_TYPE_FIELD_INDEX
 from moto.sqs.models import Message as MotoMessage
@@ -64,16 +66,17 @@ from localstack.aws.api.sqs import (
     TagMap,
     Token,
 )
+from localstack.aws.protocol.serializer import create_serializer
 from localstack.aws.spec import load_service
 from localstack.config import external_service_url
+from localstack.http import Response
+from localstack.http.asgi import ASYNC_RESPONSE_BODY
 from localstack.services.generic_proxy import RegionBackend
 from localstack.services.plugins import ServiceLifecycleHook
 from localstack.utils.aws.aws_stack import parse_arn
 from localstack.utils.objects import singleton_factory
-from localstack.utils.run import FuncThread
-from localstack.utils.scheduler import Scheduler
+from localstack.utils.scheduler import Timer, TimerWheel
 from localstack.utils.strings import long_uid, md5
-from localstack.utils.threads import start_thread
 from localstack.utils.time import now
 
 LOG = logging.getLogger(__name__)
@@ -202,6 +205,27 @@ class Permission(NamedTuple):
 
 
 class SqsMessage:
+    """
+    A message stored in a queue. The message content (body, attributes, and their MD5 digests) is created once when
+    the message is sent, and is shared with all views that are returned when the message is received. It must
+    therefore not be modified once the message has been put into a queue.
+    """
+
+    __slots__ = (
+        "message",
+        "created",
+        "visibility_timeout",
+        "receive_times",
+        "delay_seconds",
+        "receipt_handles",
+        "last_received",
+        "first_received",
+        "visibility_deadline",
+        "deleted",
+        "priority",
+        "sequence_number",
+    )
+
     message: Message
     created: float
     visibility_timeout: int
@@ -231,6 +255,8 @@ class SqsMessage:
         self.receipt_handles = set()
 
         self.delay_seconds = None
+        self.visibility_timeout = None
+        self.visibility_deadline = None
         self.last_received = None
         self.first_received = None
         self.deleted = False
@@ -246,7 +272,7 @@ class SqsMessage:
             attributes["SequenceNumber"] = sequence_number
 
         if self.message.get("Attributes"):
-            self.message["Attributes"].update(attributes)
+            self.message["Attributes"] = {**self.message["Attributes"], **attributes}
         else:
             self.message["Attributes"] = attributes
 
@@ -316,6 +342,167 @@ class SqsMessage:
         return self.message["MessageId"].__hash__()
 
 
+class ReceivedMessage:
+    """
+    A lightweight view of an SqsMessage for a single receive of the message. It holds the state that is specific to
+    this receive, and shares the message content with the queued message instead of copying it.
+    """
+
+    __slots__ = ("sqs_message", "receipt_handle", "receive_count", "first_received")
+
+    sqs_message: SqsMessage
+    receipt_handle: str
+    receive_count: int
+    first_received: float
+
+    def __init__(
+        self,
+        sqs_message: SqsMessage,
+        receipt_handle: str,
+        receive_count: int,
+        first_received: float,
+    ):
+        self.sqs_message = sqs_message
+        self.receipt_handle = receipt_handle
+        self.receive_count = receive_count
+        self.first_received = first_received
+
+    def to_message(
+        self,
+        attribute_names: AttributeNameList = None,
+        message_attribute_names: MessageAttributeNameList = None,
+    ) -> Message:
+        """
+        Creates the message as it is returned to the receiver, containing only the requested attributes.
+
+        :param attribute_names: the system attribute names/filters
+        :param message_attribute_names: the message attribute names/filters
+        :return: a (shallow) copy of the message content
+        """
+        content = self.sqs_message.message
+        message = Message(content)
+        message["ReceiptHandle"] = self.receipt_handle
+        message["Attributes"] = {
+            **content["Attributes"],
+            MessageSystemAttributeName.ApproximateReceiveCount: str(self.receive_count),
+            MessageSystemAttributeName.ApproximateFirstReceiveTimestamp: str(
+                int(self.first_received * 1000)
+            ),
+        }
+
+        # the filters never modify the shared attribute dicts of the message content
+        message_filter_attributes(message, attribute_names)
+        message_filter_message_attributes(message, message_attribute_names)
+
+        message_attributes = message.get("MessageAttributes")
+        if not message_attributes:
+            # delete the value that was computed when creating the message
+            message.pop("MD5OfMessageAttributes", None)
+        elif message_attributes is not content.get("MessageAttributes"):
+            # only a subset of the attributes is returned, the precomputed digest cannot be used
+            message["MD5OfMessageAttributes"] = _create_message_attribute_hash(message_attributes)
+
+        return message
+
+
+class MessagePriorityQueue(PriorityQueue):
+    """
+    A PriorityQueue of SqsMessages which supports removing arbitrary messages in O(1). Removed messages are only
+    marked as removed (lazy deletion) and are discarded once they reach the top of the heap. Putting a message that is
+    already in the queue replaces the existing entry.
+    """
+
+    queue: List[list]
+    entries: Dict[SqsMessage, list]
+
+    def _init(self, maxsize):
+        self.queue = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def _qsize(self):
+        return len(self.entries)
+
+    def _put(self, message: SqsMessage):
+        self._invalidate(message)
+        # the counter keeps the order of messages with the same priority stable
+        entry = [message.priority, next(self.counter), message]
+        self.entries[message] = entry
+        heapq.heappush(self.queue, entry)
+
+    def _get(self) -> SqsMessage:
+        while True:
+            message = heapq.heappop(self.queue)[-1]
+            if message is not None:
+                del self.entries[message]
+                return message
+
+    def get_many(self, max_messages: int) -> List[SqsMessage]:
+        """
+        Removes and returns up to the given number of messages from the queue without blocking.
+
+        :param max_messages: the maximum number of messages to return
+        :return: the messages in priority order (can be empty)
+        """
+        with self.mutex:
+            messages = []
+            while self.entries and len(messages) < max_messages:
+                messages.append(self._get())
+            return messages
+
+    def _invalidate(self, message: SqsMessage) -> bool:
+        entry = self.entries.pop(message, None)
+        if entry is None:
+            return False
+        entry[-1] = None
+        return True
+
+    def remove(self, message: SqsMessage) -> bool:
+        """
+        Removes the given message from the queue.
+
+        :param message: the message to remove
+        :return: True if the message was in the queue, False otherwise
+        """
+        with self.mutex:
+            if not self._invalidate(message):
+                return False
+
+            # compact the heap once the removed entries outweigh the remaining ones
+            if len(self.queue) > 2 * len(self.entries) + 64:
+                self.queue = [entry for entry in self.queue if entry[-1] is not None]
+                heapq.heapify(self.queue)
+            return True
+
+    def clear(self):
+        with self.mutex:
+            self.queue.clear()
+            self.entries.clear()
+
+
+@singleton_factory
+def get_message_timer_wheel() -> TimerWheel:
+    """
+    Returns the TimerWheel shared by all queues, which re-queues inflight and delayed messages once their visibility
+    timeout has expired or their delay deadline has been reached.
+    """
+    return TimerWheel(resolution=0.05)
+
+
+class ReceiveWaiter:
+    """
+    An asynchronous long poll waiting for messages of a queue.
+    """
+
+    __slots__ = ("future", "max_messages", "visibility_timeout", "timer")
+
+    def __init__(self, max_messages: int, visibility_timeout: Optional[int]):
+        self.future: Future = Future()
+        self.max_messages = max_messages
+        self.visibility_timeout = visibility_timeout
+        self.timer: Optional[Timer] = None
+
+
 class SqsQueue:
     name: str
     region: str
@@ -328,10 +515,12 @@ class SqsQueue:
     purge_in_progress: bool
     purge_timestamp: Optional[float]
 
-    visible: PriorityQueue
+    visible: MessagePriorityQueue
     delayed: Set[SqsMessage]
     inflight: Set[SqsMessage]
     receipts: Dict[str, SqsMessage]
+    timers: Dict[SqsMessage, Timer]
+    waiters: Deque[ReceiveWaiter]
 
     def __init__(self, name: str, region: str, account_id: str, attributes=None, tags=None) -> None:
         self.name = name
@@ -341,10 +530,11 @@ class SqsQueue:
         self._assert_queue_name(name)
         self.tags = tags or {}
 
-        self.visible = PriorityQueue()
+        self.visible = MessagePriorityQueue()
         self.delayed = set()
         self.inflight = set()
         self.receipts = {}
+        self.timers = {}
 
         self.attributes = self.default_attributes()
         if attributes:
@@ -355,6 +545,10 @@ class SqsQueue:
 
         self.permissions = set()
         self.mutex = threading.RLock()
+        # signalled whenever messages become visible
+        self.messages_available = threading.Condition(self.mutex)
+        # asynchronous long polls, which are served before the blocked receivers
+        self.waiters = deque()
 
     def default_attributes(self) -> QueueAttributeMap:
         return {
@@ -464,8 +658,15 @@ class SqsQueue:
                 )
                 # Terminating the visibility timeout for a message
                 # https://docs.aws.amazon.com/AWSSimpleQueueService/latest/SQSDeveloperGuide/sqs-visibility-timeout.html#terminating-message-visibility-timeout
+                self._cancel_timer(standard_message)
                 self.inflight.remove(standard_message)
-                self.visible.put_nowait(standard_message)
+                self.put_visible(standard_message)
+            else:
+                self._schedule_timer(
+                    standard_message.visibility_deadline,
+                    self._on_visibility_timeout,
+                    standard_message,
+                )
 
     def remove(self, receipt_handle: str):
         with self.mutex:
@@ -493,14 +694,13 @@ class SqsQueue:
             standard_message.receipt_handles.clear()
 
             # remove in-flight message
+            self._cancel_timer(standard_message)
             try:
                 self.inflight.remove(standard_message)
             except KeyError:
-                # this means the message was re-queued in the meantime
-                # TODO: remove this message from the visible queue if it exists: a message can be removed with an old
-                #  receipt handle that was issued before the message was put back in the visible queue.
-                self.visible.queue.remove(standard_message)
-                heapq.heapify(self.visible.queue)
+                # this means the message was re-queued in the meantime (a message can be removed with an old receipt
+                # handle that was issued before the message was put back in the visible queue)
+                self.visible.remove(standard_message)
 
     def put(
         self,
@@ -512,26 +712,146 @@ class SqsQueue:
     ) -> SqsMessage:
         raise NotImplementedError
 
-    def get(self, block=True, timeout=None, visibility_timeout: int = None) -> SqsMessage:
-        start = time.time()
-        while True:
-            standard_message: SqsMessage = self.visible.get(block=block, timeout=timeout)
-            LOG.debug(
-                "de-queued message %s from %s", standard_message.message["MessageId"], self.arn
+    def put_visible(self, message: SqsMessage):
+        """
+        Puts the given message into the visible messages, and serves a waiting asynchronous long poll or wakes up a
+        receiver waiting for messages.
+
+        :param message: the message that became visible
+        """
+        with self.mutex:
+            self.visible.put_nowait(message)
+            if self.waiters:
+                self._serve_waiters()
+            self.messages_available.notify()
+
+    def get(self, block=True, timeout=None, visibility_timeout: int = None) -> ReceivedMessage:
+        messages = self.receive(
+            1, wait_time_seconds=timeout if block else 0, visibility_timeout=visibility_timeout
+        )
+        if not messages:
+            raise Empty
+        return messages[0]
+
+    def receive(
+        self,
+        max_messages: int = 1,
+        wait_time_seconds: Optional[float] = 0,
+        visibility_timeout: int = None,
+    ) -> List[ReceivedMessage]:
+        """
+        Receives up to the given number of visible messages. If there are no visible messages, the call waits up to
+        the given time until messages become visible.
+
+        :param max_messages: the maximum number of messages to receive
+        :param wait_time_seconds: the maximum time to wait for messages (0 to return immediately, None to wait
+            indefinitely)
+        :param visibility_timeout: the visibility timeout of the received messages (defaults to the queue attribute)
+        :return: the received messages, empty if no messages became visible within the wait time
+        """
+        deadline = None if wait_time_seconds is None else time.time() + wait_time_seconds
+
+        with self.mutex:
+            while True:
+                messages = self._receive_visible(max_messages, visibility_timeout)
+                if messages:
+                    if self.waiters:
+                        # messages may have been requeued (with a visibility timeout of 0)
+                        self._serve_waiters()
+                    return messages
+
+                if deadline is None:
+                    self.messages_available.wait()
+                    continue
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return messages
+                self.messages_available.wait(remaining)
+
+    def receive_async(
+        self,
+        max_messages: int = 1,
+        wait_time_seconds: float = 0,
+        visibility_timeout: int = None,
+    ) -> "Future[List[ReceivedMessage]]":
+        """
+        Like ``receive``, but instead of blocking the calling thread, the long poll is registered with the queue and
+        the returned future is completed once messages become visible, or with an empty list once the wait time is
+        over. The future may be completed by the thread that makes the messages visible, so its callbacks should
+        return quickly.
+
+        :param max_messages: the maximum number of messages to receive
+        :param wait_time_seconds: the maximum time to wait for messages
+        :param visibility_timeout: the visibility timeout of the received messages (defaults to the queue attribute)
+        :return: a future of the received messages
+        """
+        waiter = ReceiveWaiter(max_messages, visibility_timeout)
+
+        with self.mutex:
+            messages = self._receive_visible(max_messages, visibility_timeout)
+            if messages or not wait_time_seconds:
+                waiter.future.set_result(messages)
+                if self.waiters:
+                    self._serve_waiters()
+                return waiter.future
+
+            self.waiters.append(waiter)
+            waiter.timer = get_message_timer_wheel().schedule(
+                time.time() + wait_time_seconds, self._expire_waiter, waiter
             )
+            return waiter.future
+
+    def _serve_waiters(self):
+        """Serves the waiting asynchronous long polls with the visible messages. Needs to be called while holding the
+        mutex."""
+        while self.waiters and not self.visible.empty():
+            waiter = self.waiters.popleft()
+            messages = self._receive_visible(waiter.max_messages, waiter.visibility_timeout)
+            if not messages:
+                # only deleted messages were left in the visible messages
+                self.waiters.appendleft(waiter)
+                return
+            waiter.timer.cancel()
+            waiter.future.set_result(messages)
+
+    def _expire_waiter(self, waiter: ReceiveWaiter):
+        with self.mutex:
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                # the waiter has been served in the meantime
+                return
+        waiter.future.set_result([])
+
+    def _receive_visible(
+        self, max_messages: int, visibility_timeout: Optional[int]
+    ) -> List[ReceivedMessage]:
+        """
+        Takes up to the given number of messages from the visible messages and marks them as received. Needs to be
+        called while holding the mutex.
+        """
+        if visibility_timeout is None:
+            visibility_timeout = self.visibility_timeout
+
+        received = []
+        # messages with a visibility timeout of 0 are put back after the batch is complete, otherwise the same message
+        # would be received multiple times in the same batch
+        requeue = []
+        while len(received) < max_messages:
+            messages = self.visible.get_many(max_messages - len(received))
+            if not messages:
+                break
 
-            with self.mutex:
+            for standard_message in messages:
                 if standard_message.deleted:
-                    # TODO: check what the behavior of AWS is here. should we return a deleted message?
-                    timeout -= time.time() - start
-                    if timeout < 0:
-                        timeout = 0
                     continue
+                LOG.debug(
+                    "de-queued message %s from %s", standard_message.message["MessageId"], self.arn
+                )
 
                 # update message attributes
-                standard_message.visibility_timeout = (
-                    self.visibility_timeout if visibility_timeout is None else visibility_timeout
-                )
+                standard_message.visibility_timeout = visibility_timeout
                 standard_message.receive_times += 1
                 standard_message.set_last_received(time.time())
                 if standard_message.first_received is None:
@@ -543,28 +863,40 @@ class SqsQueue:
                 self.receipts[receipt_handle] = standard_message
 
                 if standard_message.visibility_timeout == 0:
-                    self.visible.put_nowait(standard_message)
+                    requeue.append(standard_message)
                 else:
                     self.inflight.add(standard_message)
+                    self._schedule_timer(
+                        standard_message.visibility_deadline,
+                        self._on_visibility_timeout,
+                        standard_message,
+                    )
+
+                received.append(
+                    ReceivedMessage(
+                        standard_message,
+                        receipt_handle,
+                        standard_message.receive_times,
+                        standard_message.first_received,
+                    )
+                )
 
-            # prepare message for receiver
-            copied_message = copy.deepcopy(standard_message)
-            copied_message.message["Attributes"][
-                MessageSystemAttributeName.ApproximateReceiveCount
-            ] = str(standard_message.receive_times)
-            copied_message.message["Attributes"][
-                MessageSystemAttributeName.ApproximateFirstReceiveTimestamp
-            ] = str(int(standard_message.first_received * 1000))
-            copied_message.message["ReceiptHandle"] = receipt_handle
+        for standard_message in requeue:
+            self.visible.put_nowait(standard_message)
+        if requeue:
+            self.messages_available.notify(len(requeue))
 
-            return copied_message
+        return received
 
     def clear(self):
         """
         Calls clear on all internal datastructures that hold messages and data related to them.
         """
         with self.mutex:
-            self.visible.queue.clear()
+            for timer in self.timers.values():
+                timer.cancel()
+            self.timers.clear()
+            self.visible.clear()
             self.inflight.clear()
             self.delayed.clear()
             self.receipts.clear()
@@ -572,35 +904,54 @@ class SqsQueue:
     def create_receipt_handle(self, message: SqsMessage) -> str:
         return encode_receipt_handle(self.arn, message)
 
-    def requeue_inflight_messages(self):
-        if not self.inflight:
-            return
+    def add_delayed_message(self, message: SqsMessage):
+        """
+        Adds the given message to the delayed messages, and schedules its release into the visible queue once the
+        delay deadline has been reached.
 
+        :param message: the delayed message
+        """
         with self.mutex:
-            messages = [message for message in self.inflight if message.is_visible]
-            for standard_message in messages:
-                LOG.debug(
-                    "re-queueing inflight messages %s into queue %s",
-                    standard_message.message["MessageId"],
-                    self.arn,
-                )
-                self.inflight.remove(standard_message)
-                self.visible.put_nowait(standard_message)
+            self.delayed.add(message)
+            self._schedule_timer(
+                message.created + message.delay_seconds, self._on_delay_expired, message
+            )
 
-    def enqueue_delayed_messages(self):
-        if not self.delayed:
-            return
+    def _schedule_timer(self, deadline: float, callback, message: SqsMessage):
+        # a message can only have one pending timer (it's either delayed or inflight)
+        self._cancel_timer(message)
+        self.timers[message] = get_message_timer_wheel().schedule(deadline, callback, message)
+
+    def _cancel_timer(self, message: SqsMessage):
+        timer = self.timers.pop(message, None)
+        if timer:
+            timer.cancel()
 
+    def _on_visibility_timeout(self, message: SqsMessage):
         with self.mutex:
-            messages = [message for message in self.delayed if not message.is_delayed]
-            for standard_message in messages:
-                LOG.debug(
-                    "enqueueing delayed messages %s into queue %s",
-                    standard_message.message["MessageId"],
-                    self.arn,
-                )
-                self.delayed.remove(standard_message)
-                self.visible.put_nowait(standard_message)
+            if message not in self.inflight or not message.is_visible:
+                return
+            LOG.debug(
+                "re-queueing inflight message %s into queue %s",
+                message.message["MessageId"],
+                self.arn,
+            )
+            self.timers.pop(message, None)
+            self.inflight.remove(message)
+            self.put_visible(message)
+
+    def _on_delay_expired(self, message: SqsMessage):
+        with self.mutex:
+            if message not in self.delayed:
+                return
+            LOG.debug(
+                "enqueueing delayed message %s into queue %s",
+                message.message["MessageId"],
+                self.arn,
+            )
+            self.timers.pop(message, None)
+            self.delayed.remove(message)
+            self.put_visible(message)
 
     def _assert_queue_name(self, name):
         if not re.match(r"^[a-zA-Z0-9_-]{1,80}$", name):
@@ -655,9 +1006,9 @@ class StandardQueue(SqsQueue):
             standard_message.delay_seconds = self.delay_seconds
 
         if standard_message.is_delayed:
-            self.delayed.add(standard_message)
+            self.add_delayed_message(standard_message)
         else:
-            self.visible.put_nowait(standard_message)
+            self.put_visible(standard_message)
 
         return standard_message
 
@@ -679,8 +1030,10 @@ class FifoQueue(SqsQueue):
 
     def update_delay_seconds(self, value: int):
         super(FifoQueue, self).update_delay_seconds(value)
-        for message in self.delayed:
-            message.delay_seconds = value
+        with self.mutex:
+            for message in list(self.delayed):
+                message.delay_seconds = value
+                self.add_delayed_message(message)
 
     def put(
         self,
@@ -743,9 +1096,9 @@ class FifoQueue(SqsQueue):
             message["MessageId"] = original_message.message["MessageId"]
         else:
             if fifo_message.is_delayed:
-                self.delayed.add(fifo_message)
+                self.add_delayed_message(fifo_message)
             else:
-                self.visible.put_nowait(fifo_message)
+                self.put_visible(fifo_message)
 
             if not original_message_group:
                 self.deduplication[message_group_id] = {}
@@ -783,57 +1136,6 @@ class FifoQueue(SqsQueue):
         return next(global_message_sequence())
 
 
-class QueueUpdateWorker:
-    """
-    Regularly re-queues inflight and delayed messages whose visibility timeout has expired or delay deadline has been
-    reached.
-    """
-
-    def __init__(self) -> None:
-        super().__init__()
-        self.scheduler = Scheduler()
-        self.thread: Optional[FuncThread] = None
-        self.mutex = threading.RLock()
-
-    def do_update_all_queues(self):
-        for region in SqsBackend.regions().keys():
-            backend = SqsBackend.get(region)
-            for queue in backend.queues.values():
-                try:
-                    queue.requeue_inflight_messages()
-                except Exception:
-                    LOG.exception("error re-queueing inflight messages")
-
-                try:
-                    queue.enqueue_delayed_messages()
-                except Exception:
-                    LOG.exception("error enqueueing delayed messages")
-
-    def start(self):
-        with self.mutex:
-            if self.thread:
-                return
-
-            self.scheduler = Scheduler()
-            self.scheduler.schedule(self.do_update_all_queues, period=1)
-
-            def _run(*_args):
-                self.scheduler.run()
-
-            self.thread = start_thread(_run)
-
-    def stop(self):
-        with self.mutex:
-            if self.scheduler:
-                self.scheduler.close()
-
-            if self.thread:
-                self.thread.stop()
-
-            self.thread = None
-            self.scheduler = None
-
-
 def check_attributes(message_attributes: MessageBodyAttributeMap):
     if not message_attributes:
         return
@@ -910,6 +1212,44 @@ class SqsBackend(RegionBackend):
                 del self.deleted[k]
 
 
+def create_async_receive_response(
+    context: RequestContext,
+    received: "Future[List[ReceivedMessage]]",
+    create_result: Callable[[List[ReceivedMessage]], ReceiveMessageResult],
+) -> Response:
+    """
+    Creates the response of a long poll which is served asynchronously. The headers of the response are sent right
+    away, and its body is an async iterable, which the ASGI server consumes on its event loop once the given future
+    of the received messages has been completed (i.e., no thread of the server is blocked while waiting).
+
+    :param context: the request context of the ReceiveMessage request
+    :param received: the future of the received messages
+    :param create_result: creates the result from the received messages
+    :return: the response
+    """
+    serializer = create_serializer(context.service)
+    response = serializer.serialize_to_response(
+        ReceiveMessageResult(), context.operation, context.request.headers
+    )
+    # the length of the body is not known before the messages have been received
+    response.headers.pop("Content-Length", None)
+
+    async def _serialize_result():
+        batch = await asyncio.wrap_future(received)
+        try:
+            result = create_result(batch)
+        except Exception as e:
+            LOG.exception("Error while receiving messages: %s", e)
+            result = ReceiveMessageResult()
+        yield serializer.serialize_to_response(
+            result, context.operation, context.request.headers
+        ).data
+
+    response.response = _serialize_result()
+    response.direct_passthrough = True
+    return response
+
+
 class SqsProvider(SqsApi, ServiceLifecycleHook):
     """
     LocalStack SQS Provider.
@@ -925,13 +1265,12 @@ class SqsProvider(SqsApi, ServiceLifecycleHook):
     def __init__(self) -> None:
         super().__init__()
         self._mutex = threading.RLock()
-        self._queue_update_worker = QueueUpdateWorker()
 
     def on_before_start(self):
-        self._queue_update_worker.start()
+        get_message_timer_wheel().start()
 
     def on_before_stop(self):
-        self._queue_update_worker.stop()
+        get_message_timer_wheel().close()
 
     def _require_queue(self, context: RequestContext, name: str) -> SqsQueue:
         """
@@ -1125,6 +1464,8 @@ class SqsProvider(SqsApi, ServiceLifecycleHook):
             queue = self._resolve_queue(context, queue_url=queue_url)
             del backend.queues[queue.name]
             backend.deleted[queue.name] = time.time()
+            # cancels the pending timers of the queue's messages
+            queue.clear()
 
     def get_queue_attributes(
         self, context: RequestContext, queue_url: String, attribute_names: AttributeNameList = None
@@ -1296,58 +1637,84 @@ class SqsProvider(SqsApi, ServiceLifecycleHook):
             wait_time_seconds = queue.wait_time_seconds
 
         num = max_number_of_messages or 1
-        block = True if wait_time_seconds else False
-        # collect messages
-        messages = []
+
+        def _create_result(batch: List[ReceivedMessage]) -> ReceiveMessageResult:
+            return self._create_receive_result(
+                context,
+                queue,
+                batch,
+                num,
+                visibility_timeout,
+                attribute_names,
+                message_attribute_names,
+            )
 
         # we chose to always return the maximum possible number of messages, even though AWS will typically return
         # fewer messages than requested on small queues. at some point we could maybe change this to randomly sample
         # between 1 and max_number_of_messages.
         # see https://docs.aws.amazon.com/AWSSimpleQueueService/latest/APIReference/API_ReceiveMessage.html
-        while num:
-            try:
-                standard_message = queue.get(
-                    block=block, timeout=wait_time_seconds, visibility_timeout=visibility_timeout
-                )
-                msg = standard_message.message
-            except Empty:
-                break
+        if wait_time_seconds and context.request.environ.get(ASYNC_RESPONSE_BODY):
+            # the server can serve the long poll asynchronously, without blocking a thread while waiting for messages
+            received = queue.receive_async(
+                num, wait_time_seconds=wait_time_seconds, visibility_timeout=visibility_timeout
+            )
+            if not received.done():
+                return create_async_receive_response(context, received, _create_result)
+            batch = received.result()
+        else:
+            batch = queue.receive(
+                num, wait_time_seconds=wait_time_seconds, visibility_timeout=visibility_timeout
+            )
 
-            # setting block to false guarantees that, if we've already waited before, we don't wait the full time
-            # again in the next iteration if max_number_of_messages is set but there are no more messages in the
-            # queue. see https://github.com/localstack/localstack/issues/5824
-            block = False
-
-            moved_to_dlq = False
-            if (
-                queue.attributes
-                and queue.attributes.get(QueueAttributeName.RedrivePolicy) is not None
-            ):
-                moved_to_dlq = self._dead_letter_check(queue, standard_message, context)
-            if moved_to_dlq:
-                continue
-
-            msg = copy.deepcopy(msg)
-            message_filter_attributes(msg, attribute_names)
-            message_filter_message_attributes(msg, message_attribute_names)
-
-            if msg.get("MessageAttributes"):
-                msg["MD5OfMessageAttributes"] = _create_message_attribute_hash(
-                    msg["MessageAttributes"]
-                )
-            else:
-                # delete the value that was computed when creating the message
-                msg.pop("MD5OfMessageAttributes")
+        # TODO: how does receiving behave if the queue was deleted in the meantime?
+        return _create_result(batch)
 
-            # add message to result
-            messages.append(msg)
-            num -= 1
+    def _create_receive_result(
+        self,
+        context: RequestContext,
+        queue: SqsQueue,
+        batch: List[ReceivedMessage],
+        num: int,
+        visibility_timeout: Optional[int],
+        attribute_names: AttributeNameList,
+        message_attribute_names: MessageAttributeNameList,
+    ) -> ReceiveMessageResult:
+        """
+        Creates the result of a receive from the received messages. Messages which have been moved to the DLQ are
+        replaced by other visible messages (if any), without waiting for them.
+        """
+        messages = []
+        while batch:
+            for received in batch:
+                moved_to_dlq = False
+                if (
+                    queue.attributes
+                    and queue.attributes.get(QueueAttributeName.RedrivePolicy) is not None
+                ):
+                    moved_to_dlq = self._dead_letter_check(
+                        queue, received.sqs_message, context, received.receipt_handle
+                    )
+                if moved_to_dlq:
+                    continue
+
+                # add message to result
+                messages.append(received.to_message(attribute_names, message_attribute_names))
+                num -= 1
+
+            if not num:
+                break
+            # only wait once: if messages were moved to the DLQ, we don't wait the full time again for the remaining
+            # ones. see https://github.com/localstack/localstack/issues/5824
+            batch = queue.receive(num, wait_time_seconds=0, visibility_timeout=visibility_timeout)
 
-        # TODO: how does receiving behave if the queue was deleted in the meantime?
         return ReceiveMessageResult(Messages=messages)
 
     def _dead_letter_check(
-        self, queue: SqsQueue, std_m: SqsMessage, context: RequestContext
+        self,
+        queue: SqsQueue,
+        std_m: SqsMessage,
+        context: RequestContext,
+        receipt_handle: str = None,
     ) -> bool:
         redrive_policy = json.loads(queue.attributes.get(QueueAttributeName.RedrivePolicy))
         # TODO: include the names of the dictionary sub - attributes in the autogenerated code?
@@ -1356,13 +1723,14 @@ class SqsProvider(SqsApi, ServiceLifecycleHook):
             dead_letter_target_arn = redrive_policy["deadLetterTargetArn"]
             dl_queue = self._require_queue_by_arn(context, dead_letter_target_arn)
             # TODO: this needs to be atomic?
-            dead_message = std_m.message
+            # the message content is shared with the source queue, the put must not modify it
+            dead_message = Message(std_m.message)
             dl_queue.put(
                 message=dead_message,
                 message_deduplication_id=std_m.message_deduplication_id,
                 message_group_id=std_m.message_group_id,
             )
-            queue.remove(std_m.message["ReceiptHandle"])
+            queue.remove(receipt_handle)
             return True
         else:
             return False
@@ -310,14 +310,18 @@ def connect_to_service(
             return BOTO_CLIENTS_CACHE[cache_key]
 
         # determine endpoint_url if it is not set explicitly
+        # (internal clients for this LocalStack instance can use an in-process transport)
+        in_process = False
         if not endpoint_url:
             if is_local_env(env):
                 endpoint_url = get_local_service_url(service_name)
                 verify = False
+                in_process = True
             backend_env_name = "%s_BACKEND" % service_name.upper()
             backend_url = os.environ.get(backend_env_name, "").strip()
             if backend_url:
                 endpoint_url = backend_url
+                in_process = False
 
         # configure S3 path/host style addressing
         if service_name == "s3":
@@ -352,6 +356,11 @@ def connect_to_service(
             event_system = new_client.meta.events
             event_system.register_first("before-sign.*.*", _add_internal_header)
 
+            if in_process:
+                from localstack.aws.transport import install_in_process_transport
+
+                install_in_process_transport(new_client)
+
         if cache:
             BOTO_CLIENTS_CACHE[cache_key] = new_client
 
@@ -1000,7 +1009,10 @@ def get_apigateway_path_for_resource(
 ):
     if resources is None:
         apigateway = connect_to_service(service_name="apigateway", region_name=region_name)
-        resources = apigateway.get_resources(restApiId=api_id, limit=100)["items"]
+        paginator = apigateway.get_paginator("get_resources")
+        resources = [
+            resource for page in paginator.paginate(restApiId=api_id) for resource in page["items"]
+        ]
     target_resource = list(filter(lambda res: res["id"] == resource_id, resources))[0]
     path_part = target_resource.get("pathPart", "")
     if path_suffix:
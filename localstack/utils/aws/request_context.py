@@ -1,6 +1,7 @@
 import logging
 import re
 import threading
+from contextlib import contextmanager
 from typing import Dict, Optional
 from urllib.parse import urlparse
 
@@ -9,6 +10,7 @@ from requests.models import Request
 from requests.structures import CaseInsensitiveDict
 
 from localstack import config
+from localstack.aws.accounts import get_aws_access_key_id, set_aws_access_key_id
 from localstack.constants import APPLICATION_JSON, APPLICATION_XML, HEADER_CONTENT_TYPE
 from localstack.utils.aws import aws_stack
 from localstack.utils.aws.aws_responses import (
@@ -102,6 +104,30 @@ class RequestContextManager:
         THREAD_LOCAL.request_context = None
 
 
+class RequestContextSnapshot:
+    """
+    The request context (i.e., region) and the AWS access key ID (i.e., account) of the calling thread, captured to
+    perform work on behalf of the request in another thread (e.g., in a background worker).
+    """
+
+    def __init__(self):
+        self.request_context = get_request_context()
+        self.access_key_id = get_aws_access_key_id()
+
+    @contextmanager
+    def apply(self):
+        """Sets the captured context for the scope of the block, and restores the previous context afterwards."""
+        previous_context = getattr(THREAD_LOCAL, "request_context", None)
+        previous_access_key_id = get_aws_access_key_id()
+        THREAD_LOCAL.request_context = self.request_context
+        set_aws_access_key_id(self.access_key_id)
+        try:
+            yield
+        finally:
+            THREAD_LOCAL.request_context = previous_context
+            set_aws_access_key_id(previous_access_key_id)
+
+
 def get_region_from_request_context():
     """look up region from request context"""
 
@@ -1,11 +1,10 @@
-import copy
 import json
 import re
+from functools import lru_cache
 from typing import Any, Dict
 
 import airspeed
 
-from localstack.utils.objects import recurse_object
 from localstack.utils.patch import patch
 
 
@@ -25,55 +24,107 @@ class VelocityUtil:
         self.quiet(*args, **kwargs)
 
 
-class VtlTemplate:
-    """Utility class for rendering Velocity templates"""
+# maximum number of compiled templates kept in the cache
+TEMPLATE_CACHE_SIZE = 256
 
-    def render_vtl(self, template, variables: Dict, as_json=False):
-        if variables is None:
-            variables = {}
+# placeholder which enables syntax like "test#${foo.bar}"
+EMPTY_PLACEHOLDER = " __pLaCe-HoLdEr__ "
 
-        if not template:
-            return template
 
-        # fix "#set" commands
-        template = re.sub(r"(^|\n)#\s+set(.*)", r"\1#set\2", template, re.MULTILINE)
+class ExtendedString(str):
+    """String with additional (Java-style) functions, which can be used in the templates"""
 
-        # enable syntax like "test#${foo.bar}"
-        empty_placeholder = " __pLaCe-HoLdEr__ "
-        template = re.sub(
-            r"([^\s]+)#\$({)?(.*)",
-            r"\1#%s$\2\3" % empty_placeholder,
-            template,
-            re.MULTILINE,
-        )
+    def trim(self, *args, **kwargs):
+        return ExtendedString(self.strip(*args, **kwargs))
 
-        # add extensions for common string functions below
+    def toLowerCase(self, *_, **__):
+        return ExtendedString(self.lower())
 
-        class ExtendedString(str):
-            def trim(self, *args, **kwargs):
-                return ExtendedString(self.strip(*args, **kwargs))
+    def toUpperCase(self, *_, **__):
+        return ExtendedString(self.upper())
 
-            def toLowerCase(self, *_, **__):
-                return ExtendedString(self.lower())
 
-            def toUpperCase(self, *_, **__):
-                return ExtendedString(self.upper())
+def wrap_template_variable(value):
+    """Adapts a template variable on access: strings are extended with the string functions above, and dicts and
+    lists are wrapped in (shallow) copies, which adapt their items on access in turn. Hence, templates can neither
+    modify the variables passed by the caller, nor do the variables have to be copied upfront."""
+    if isinstance(value, (ExtendedString, TemplateDict, TemplateList)):
+        return value
+    if isinstance(value, str):
+        return ExtendedString(value)
+    if isinstance(value, dict):
+        return TemplateDict(value)
+    if isinstance(value, list):
+        return TemplateList(value)
+    return value
 
-        def apply(obj, **_):
-            if isinstance(obj, dict):
-                for k, v in obj.items():
-                    if isinstance(v, str):
-                        obj[k] = ExtendedString(v)
-            return obj
 
-        # loop through the variables and enable certain additional util
-        # functions (e.g., string utils)
-        variables = copy.deepcopy(variables or {})
-        recurse_object(variables, apply)
+class TemplateDict(dict):
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        wrapped = wrap_template_variable(value)
+        if wrapped is not value:
+            dict.__setitem__(self, key, wrapped)
+        return wrapped
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+
+class TemplateList(list):
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TemplateList(list.__getitem__(self, index))
+        value = list.__getitem__(self, index)
+        wrapped = wrap_template_variable(value)
+        if wrapped is not value:
+            list.__setitem__(self, index, wrapped)
+        return wrapped
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(template: str) -> airspeed.Template:
+    """Returns the parsed template for the given template text. The compiled templates are cached by their text,
+    and can be rendered concurrently."""
+    # fix "#set" commands
+    template = re.sub(r"(^|\n)#\s+set(.*)", r"\1#set\2", template, re.MULTILINE)
 
-        # prepare and render template
-        t = airspeed.Template(template)
-        namespace = self.prepare_namespace(variables)
+    # enable syntax like "test#${foo.bar}"
+    template = re.sub(
+        r"([^\s]+)#\$({)?(.*)",
+        r"\1#%s$\2\3" % EMPTY_PLACEHOLDER,
+        template,
+        re.MULTILINE,
+    )
+
+    compiled = airspeed.Template(template)
+    compiled.ensure_compiled()
+    return compiled
+
+
+class VtlTemplate:
+    """Utility class for rendering Velocity templates"""
+
+    def render_vtl(self, template, variables: Dict, as_json=False):
+        if not template:
+            return template
+
+        compiled = compile_template(template)
+
+        # the variables are adapted lazily, which enables certain additional util
+        # functions (e.g., string utils)
+        variables = TemplateDict(variables or {})
+        namespace = TemplateDict(self.prepare_namespace(variables))
 
         # this steps prepares the namespace for object traversal,
         # e.g, foo.bar.trim().toLowerCase().replace
@@ -83,10 +134,10 @@ class VtlTemplate:
             for k, v in dict_pack.items():
                 namespace.update({k: v})
 
-        rendered_template = t.merge(namespace)
+        rendered_template = compiled.merge(namespace)
 
         # revert temporary changes from the fixes above
-        rendered_template = rendered_template.replace(empty_placeholder, "")
+        rendered_template = rendered_template.replace(EMPTY_PLACEHOLDER, "")
 
         if as_json:
             rendered_template = json.loads(rendered_template)
@@ -185,5 +236,10 @@ def dict_put_all(self, values):
 airspeed.__additional_methods__[dict]["put"] = dict_put
 airspeed.__additional_methods__[dict]["putAll"] = dict_put_all
 
+# the additional methods are looked up by the exact type of the objects
+airspeed.__additional_methods__[ExtendedString] = airspeed.__additional_methods__[str]
+airspeed.__additional_methods__[TemplateDict] = airspeed.__additional_methods__[dict]
+airspeed.__additional_methods__[TemplateList] = airspeed.__additional_methods__[list]
+
 
 # END of patches for airspeed
@@ -1,9 +1,12 @@
 import base64
+import contextlib
 import json
 import logging
 import re
+import threading
 import traceback
-from typing import Dict, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Collection, Dict, List, Optional, Set
 
 import botocore
 from moto.ec2.utils import generate_route_id
@@ -24,8 +27,9 @@ from localstack.services.cloudformation.service_models import (
     GenericBaseModel,
 )
 from localstack.utils.aws import aws_stack
+from localstack.utils.aws.request_context import RequestContextSnapshot
 from localstack.utils.cloudformation import template_preparer
-from localstack.utils.collections import merge_recursive
+from localstack.utils.collections import ensure_list, merge_recursive
 from localstack.utils.functions import prevent_stack_overflow, run_safe
 from localstack.utils.json import clone_safe, json_safe
 from localstack.utils.objects import get_all_subclasses, recurse_object
@@ -56,6 +60,12 @@ UPDATEABLE_RESOURCES = [
     "EC2::Instance",
 ]
 
+# maximum number of attempts to apply the change of a resource with unresolved dependencies
+MAX_DEPLOYMENT_ATTEMPTS = 30
+
+# variables in {'Fn::Sub': '...'} strings, excluding literals like "${!Literal}"
+REGEX_SUB_VARIABLE = re.compile(r"\$\{([^!}][^}]*)\}")
+
 # list of static attribute references to be replaced in {'Fn::Sub': '...'} strings
 STATIC_REFS = ["AWS::Region", "AWS::Partition", "AWS::StackName", "AWS::AccountId"]
 
@@ -71,6 +81,70 @@ class NoStackUpdates(Exception):
     pass
 
 
+class ResolutionContext:
+    """
+    Cache of the resolved references and resource details of a stack, which is used for the duration of a single
+    deployment. The entries of a resource are invalidated when the status of the resource changes.
+    """
+
+    def __init__(self):
+        # maps resource ID to the cached entries (by cache key) which depend on the resource
+        self._entries: Dict[str, Dict] = {}
+        self._mutex = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, resource_id: str, key, compute: Callable):
+        """Returns the cached value for the given resource ID and key, or computes and caches it (if not None)."""
+        with self._mutex:
+            entries = self._entries.get(resource_id) or {}
+            if key in entries:
+                self.hits += 1
+                return entries[key]
+            self.misses += 1
+        result = compute()
+        if result is not None:
+            with self._mutex:
+                self._entries.setdefault(resource_id, {})[key] = result
+        return result
+
+    def invalidate(self, resource_id: str):
+        with self._mutex:
+            self._entries.pop(resource_id, None)
+
+
+def get_resolution_context(stack) -> Optional[ResolutionContext]:
+    return getattr(stack, "resolution_context", None)
+
+
+class StackView:
+    """
+    A view of a stack (or TemplateDeployer) with a snapshot of the stack resources, used to execute the action of a
+    resource while the other resources of the stack are deployed concurrently. The snapshot contains copies of the
+    other resources, and the resource itself (which is updated in place by the action).
+    """
+
+    def __init__(self, stack, resource_id: str):
+        self._stack = stack
+        self.resources = {
+            other_id: resource if other_id == resource_id else _copy_resource(resource)
+            for other_id, resource in stack.resources.items()
+        }
+
+    def __getattr__(self, name):
+        return getattr(self._stack, name)
+
+
+def _copy_resource(resource):
+    if not isinstance(resource, dict):
+        return resource
+    result = dict(resource)
+    for key in ["Properties", KEY_RESOURCE_STATE]:
+        if isinstance(result.get(key), dict):
+            result[key] = dict(result[key])
+    return result
+
+
 def lambda_get_params():
     return lambda params, **kwargs: params
 
@@ -187,6 +261,17 @@ def describe_stack_resource(stack_name, logical_resource_id):
 
 
 def retrieve_resource_details(resource_id, resource_status, stack):
+    context = get_resolution_context(stack)
+    if context:
+        return context.get(
+            resource_id,
+            ("details", resource_status.get("PhysicalResourceId")),
+            lambda: _retrieve_resource_details(resource_id, resource_status, stack),
+        )
+    return _retrieve_resource_details(resource_id, resource_status, stack)
+
+
+def _retrieve_resource_details(resource_id, resource_status, stack):
     resources = stack.resources
     stack_name = stack.stack_name
 
@@ -415,7 +500,6 @@ def get_attr_from_model_instance(resource, attribute, resource_type, resource_id
 
 def resolve_ref(stack, ref, attribute):
     stack_name = stack.stack_name
-    resources = stack.resources
     if ref == "AWS::Region":
         return aws_stack.get_region()
     if ref == "AWS::Partition":
@@ -435,6 +519,16 @@ def resolve_ref(stack, ref, attribute):
     if ref == "AWS::URLSuffix":
         return AWS_URL_SUFFIX
 
+    context = get_resolution_context(stack)
+    if context and isinstance(ref, str) and isinstance(attribute, str):
+        return context.get(
+            ref, ("attribute", attribute), lambda: _resolve_resource_ref(stack, ref, attribute)
+        )
+    return _resolve_resource_ref(stack, ref, attribute)
+
+
+def _resolve_resource_ref(stack, ref, attribute):
+    resources = stack.resources
     is_ref_attribute = attribute in ["Ref", "PhysicalResourceId", "Arn"]
     if is_ref_attribute:
         # extract the Properties here, as we only want to recurse over the resource props...
@@ -612,16 +706,14 @@ def _resolve_refs_recursively(stack, value):
 
         if stripped_fn_lower == "importvalue":
             import_value_key = resolve_refs_recursively(stack, value[keys_list[0]])
-            stack_export = stack.exports_map.get(import_value_key) or {}
-            if not stack_export.get("Value"):
-                LOG.info(
-                    'Unable to find export "%s" in stack "%s", existing export names: %s',
-                    import_value_key,
-                    stack.stack_name,
-                    list(stack.exports_map.keys()),
+            context = get_resolution_context(stack)
+            if context:
+                return context.get(
+                    None,
+                    ("export", import_value_key),
+                    lambda: _import_value(stack, import_value_key),
                 )
-                return None
-            return stack_export["Value"]
+            return _import_value(stack, import_value_key)
 
         if stripped_fn_lower == "if":
             condition, option1, option2 = value[keys_list[0]]
@@ -690,6 +782,19 @@ def _resolve_refs_recursively(stack, value):
     return value
 
 
+def _import_value(stack, export_name):
+    stack_export = stack.exports_map.get(export_name) or {}
+    if not stack_export.get("Value"):
+        LOG.info(
+            'Unable to find export "%s" in stack "%s", existing export names: %s',
+            export_name,
+            stack.stack_name,
+            list(stack.exports_map.keys()),
+        )
+        return None
+    return stack_export["Value"]
+
+
 def resolve_placeholders_in_string(result, stack):
     resources = stack.resources
 
@@ -1189,6 +1294,42 @@ def add_default_resource_props(
 # -----------------------
 
 
+def get_resource_references(value, resource_ids: Collection[str]) -> Set[str]:
+    """Returns the logical IDs of the resources which are referenced in the given template fragment, via "Ref",
+    "Fn::GetAtt", or variables in "Fn::Sub" strings."""
+    result = set()
+
+    def _walk(obj):
+        if isinstance(obj, list):
+            for item in obj:
+                _walk(item)
+        if not isinstance(obj, dict):
+            return
+        for key, val in obj.items():
+            if key == "Ref" and isinstance(val, str):
+                result.add(val)
+            elif key == "Fn::GetAtt":
+                target = val[0] if isinstance(val, list) and val else val
+                if isinstance(target, str):
+                    result.add(target.split(".")[0])
+                _walk(val)
+            elif key == "Fn::Sub":
+                string, variables = (
+                    (val[0], val[1] if len(val) > 1 else {}) if isinstance(val, list) else (val, {})
+                )
+                if isinstance(string, str):
+                    for name in REGEX_SUB_VARIABLE.findall(string):
+                        name = name.split(".")[0]
+                        if not isinstance(variables, dict) or name not in variables:
+                            result.add(name)
+                _walk(variables)
+            else:
+                _walk(val)
+
+    _walk(value)
+    return {resource_id for resource_id in result if resource_id in resource_ids}
+
+
 class TemplateDeployer:
     def __init__(self, stack):
         self.stack = stack
@@ -1201,6 +1342,10 @@ class TemplateDeployer:
     def stack_name(self):
         return self.stack.stack_name
 
+    @property
+    def resolution_context(self):
+        return get_resolution_context(self.stack)
+
     # ------------------
     # MAIN ENTRY POINTS
     # ------------------
@@ -1316,21 +1461,23 @@ class TemplateDeployer:
         return result
 
     def get_resource_dependencies(self, resource):
-        result = {}
+        """Returns the resources which the given resource depends on, via references or "DependsOn"."""
         # Note: using the original, unmodified template here to preserve Ref's ...
-        raw_resources = self.stack.template_original["Resources"]
-        raw_resource = raw_resources[resource["LogicalResourceId"]]
-        dumped = json.dumps(json_safe(raw_resource))
-        for other_id, other in raw_resources.items():
-            if resource != other:
-                # TODO: traverse dict instead of doing string search!
-                search1 = '{"Ref": "%s"}' % other_id
-                search2 = '{"Fn::GetAtt": ["%s", ' % other_id
-                if search1 in dumped or search2 in dumped:
-                    result[other_id] = other
-                if other_id in resource.get("DependsOn", []):
-                    result[other_id] = other
-        return result
+        template = self.stack.template_original
+        raw_resources = template["Resources"]
+        resource_id = resource["LogicalResourceId"]
+        raw_resource = raw_resources.get(resource_id) or resource
+        dependencies = get_resource_references(raw_resource, raw_resources)
+        condition = raw_resource.get("Condition")
+        if isinstance(condition, str):
+            condition = (template.get("Conditions") or {}).get(condition)
+            dependencies.update(get_resource_references(condition, raw_resources))
+        for depends_on in (raw_resource.get("DependsOn"), resource.get("DependsOn")):
+            dependencies.update(
+                dep for dep in ensure_list(depends_on or []) if dep in raw_resources
+            )
+        dependencies.discard(resource_id)
+        return {dependency: raw_resources[dependency] for dependency in dependencies}
 
     # -----------------
     # DEPLOYMENT UTILS
@@ -1588,9 +1735,25 @@ class TemplateDeployer:
         return start_worker_thread(_run)
 
     def do_apply_changes_in_loop(self, changes, stack):
-        # apply changes in a retry loop, to resolve resource dependencies and converge to the target state
+        """
+        Applies the changes in the order of the dependency graph of the resources: the change of a resource is
+        applied once the changes of all resources it depends on are done (or, for removals, once all resources
+        depending on it are removed), and independent changes are applied concurrently.
+        """
+        stack.resolution_context = context = ResolutionContext()
+        try:
+            return self._do_apply_changes_in_loop(changes, stack)
+        finally:
+            stack.resolution_context = None
+            LOG.debug(
+                'Resolved references of stack "%s" with %s cache hits and %s misses',
+                stack.stack_name,
+                context.hits,
+                context.misses,
+            )
+
+    def _do_apply_changes_in_loop(self, changes, stack):
         changes_done = []
-        max_iters = 30
         new_resources = stack.resources
 
         # apply default props before running the loop
@@ -1602,64 +1765,72 @@ class TemplateDeployer:
                 existing_resources=new_resources,
             )
 
-        # start deployment loop
-        for i in range(max_iters):
-            j = 0
-            updated = False
-            while j < len(changes):
-                change = changes[j]
-                res_change = change["ResourceChange"]
-                action = res_change["Action"]
-                is_add_or_modify = action in ["Add", "Modify"]
-                resource_id = res_change["LogicalResourceId"]
-                try:
-                    if is_add_or_modify:
-                        resource = new_resources[resource_id]
-                        should_deploy = self.prepare_should_deploy_change(
-                            resource_id, change, stack, new_resources
-                        )
+        dependencies = self.get_change_dependencies(changes, new_resources)
+        pending = list(changes)
+        # number of attempts per change, and number of completed changes when the last attempt failed
+        attempts: Dict[int, int] = {}
+        retry_after: Dict[int, int] = {}
+        completed_ids = set()
+        running = {}
+        errors = []
+        mutex = threading.RLock()
+        # the workers deploy the resources with the region and account of the deployment
+        request_context = RequestContextSnapshot()
+
+        def _apply(change) -> bool:
+            with request_context.apply():
+                return self._apply_pending_change(change, stack, new_resources, mutex)
+
+        def _is_ready(change) -> bool:
+            index = id(change)
+            if retry_after.get(index, -1) >= len(completed_ids):
+                return False
+            return dependencies[index] <= completed_ids
+
+        with ThreadPoolExecutor(
+            max_workers=config.CFN_DEPLOYMENT_WORKERS, thread_name_prefix="cfn-deploy"
+        ) as executor:
+            while pending or running:
+                if not errors:
+                    for change in [change for change in pending if _is_ready(change)]:
+                        pending.remove(change)
+                        future = executor.submit(_apply, change)
+                        running[future] = change
+                if not running:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    change = running.pop(future)
+                    resource_id = change["ResourceChange"]["LogicalResourceId"]
+                    try:
+                        applied = future.result()
+                    except DependencyNotYetSatisfied as e:
                         LOG.debug(
-                            'Handling "%s" for resource "%s" (%s/%s) type "%s" in loop iteration %s (should_deploy=%s)',
-                            action,
+                            'Dependencies for "%s" not yet satisfied, retrying after the next change: %s',
                             resource_id,
-                            j + 1,
-                            len(changes),
-                            res_change["ResourceType"],
-                            i + 1,
-                            should_deploy,
-                        )
-                        if not should_deploy:
-                            del changes[j]
-                            stack_action = get_action_name_for_resource_change(action)
-                            stack.set_resource_status(resource_id, f"{stack_action}_COMPLETE")
-                            continue
-                        if not self.all_resource_dependencies_satisfied(resource):
-                            j += 1
-                            continue
-                    elif action == "Remove":
-                        should_remove = self.prepare_should_deploy_change(
-                            resource_id, change, stack, new_resources
+                            e,
                         )
-                        if not should_remove:
-                            del changes[j]
-                            continue
-                    self.apply_change(change, stack=stack)
-                    changes_done.append(change)
-                    del changes[j]
-                    updated = True
-                except DependencyNotYetSatisfied as e:
-                    LOG.debug(
-                        'Dependencies for "%s" not yet satisfied, retrying in next loop: %s',
-                        resource_id,
-                        e,
-                    )
-                    j += 1
-            if not changes:
-                break
-            if not updated:
-                raise Exception(
-                    "Resource deployment loop completed, pending resource changes: %s" % changes
-                )
+                        attempts[id(change)] = attempts.get(id(change), 0) + 1
+                        if attempts[id(change)] < MAX_DEPLOYMENT_ATTEMPTS:
+                            retry_after[id(change)] = len(completed_ids)
+                            pending.append(change)
+                        continue
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    completed_ids.add(resource_id)
+                    if applied:
+                        changes_done.append(change)
+
+        if errors:
+            raise errors[0]
+        if len(completed_ids) < len(changes):
+            pending = [
+                c for c in changes if c["ResourceChange"]["LogicalResourceId"] not in completed_ids
+            ]
+            raise Exception(
+                "Resource deployment loop completed, pending resource changes: %s" % pending
+            )
 
         # clean up references to deleted resources in stack
         deletes = [c for c in changes_done if c["ResourceChange"]["Action"] == "Remove"]
@@ -1668,6 +1839,65 @@ class TemplateDeployer:
 
         return changes_done
 
+    def get_change_dependencies(self, changes, new_resources) -> Dict[int, Set[str]]:
+        """Returns the IDs of the resources of the given changes which need to be completed before each change."""
+        changed = {
+            change["ResourceChange"]["LogicalResourceId"]: change["ResourceChange"]["Action"]
+            for change in changes
+        }
+        resource_dependencies = {}
+        for resource_id in changed:
+            resource = new_resources.get(resource_id) or {"LogicalResourceId": resource_id}
+            resource_dependencies[resource_id] = set(self.get_resource_dependencies(resource))
+
+        result = {}
+        for change in changes:
+            resource_id = change["ResourceChange"]["LogicalResourceId"]
+            if change["ResourceChange"]["Action"] == "Remove":
+                # resources are removed after all (removed) resources which depend on them
+                result[id(change)] = {
+                    other_id
+                    for other_id, action in changed.items()
+                    if action == "Remove" and resource_id in resource_dependencies[other_id]
+                }
+            else:
+                result[id(change)] = {
+                    dependency
+                    for dependency in resource_dependencies[resource_id]
+                    if changed.get(dependency) in ("Add", "Modify")
+                }
+        return result
+
+    def _apply_pending_change(self, change, stack, new_resources, mutex) -> bool:
+        """Applies the given change, and returns whether it has been applied (or skipped)."""
+        res_change = change["ResourceChange"]
+        action = res_change["Action"]
+        resource_id = res_change["LogicalResourceId"]
+        with mutex:
+            should_deploy = self.prepare_should_deploy_change(
+                resource_id, change, stack, new_resources
+            )
+        LOG.debug(
+            'Handling "%s" for resource "%s" type "%s" (should_deploy=%s)',
+            action,
+            resource_id,
+            res_change["ResourceType"],
+            should_deploy,
+        )
+        if not should_deploy:
+            if action in ["Add", "Modify"]:
+                stack_action = get_action_name_for_resource_change(action)
+                with mutex:
+                    stack.set_resource_status(resource_id, f"{stack_action}_COMPLETE")
+            return False
+        if action in ["Add", "Modify"]:
+            with mutex:
+                unsatisfied = self.get_unsatisfied_dependencies(new_resources[resource_id])
+            if unsatisfied:
+                raise DependencyNotYetSatisfied(resource_ids=list(unsatisfied))
+        self.apply_change(change, stack=stack, mutex=mutex)
+        return True
+
     def prepare_should_deploy_change(self, resource_id, change, stack, new_resources):
         resource = new_resources[resource_id]
         res_change = change["ResourceChange"]
@@ -1708,26 +1938,36 @@ class TemplateDeployer:
             return should_remove
         return True
 
-    def apply_change(self, change, stack):
+    def apply_change(self, change, stack, mutex=None):
         change_details = change["ResourceChange"]
         action = change_details["Action"]
         resource_id = change_details["LogicalResourceId"]
         resource = stack.resources[resource_id]
         is_deployed = change_details.pop("_deployed", None)
-        if not evaluate_resource_condition(stack, resource):
-            return
+        action_stack = self
+        with mutex or contextlib.nullcontext():
+            if not evaluate_resource_condition(stack, resource):
+                return
+            if mutex is not None:
+                # the other resources may be updated by other workers while the action is executed
+                action_stack = StackView(self, resource_id)
 
         # execute resource action
         result = None
         if action == "Add" or is_deployed is False:
-            result = deploy_resource(self, resource_id)
+            result = deploy_resource(action_stack, resource_id)
         elif action == "Remove":
-            result = delete_resource(self, resource_id)
+            result = delete_resource(action_stack, resource_id)
         elif action == "Modify":
-            result = update_resource(resource_id, stack=stack)
+            result = update_resource(resource_id, stack=action_stack)
 
         # update resource status and physical resource id
         stack_action = get_action_name_for_resource_change(action)
-        self.update_resource_details(resource_id, result, stack=stack, action=stack_action)
+        with mutex or contextlib.nullcontext():
+            context = get_resolution_context(stack)
+            if context:
+                # the cached details of the resource are outdated after executing the action
+                context.invalidate(resource_id)
+            self.update_resource_details(resource_id, result, stack=stack, action=stack_action)
 
         return result
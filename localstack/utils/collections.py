@@ -7,7 +7,21 @@ import logging
 import re
 import sys
 from collections.abc import Mapping
-from typing import Any, Callable, Dict, Iterator, List, Optional, Sized, Tuple, Type, TypeVar, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sized,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import cachetools
 
@@ -428,3 +442,61 @@ def select_from_typed_dict(typed_dict: Type[TypedDict], obj: Dict, filter: bool
     if filter:
         return {k: v for k, v in selection.items() if v}
     return selection
+
+
+_V = TypeVar("_V")
+
+
+class PrefixTrie(Generic[_V]):
+    """
+    A simple character trie which finds all stored prefixes of a given string.
+    Matches are returned in the order in which the prefixes have been inserted, which allows to use the trie as a
+    drop-in replacement for an (ordered) linear scan over a dict of prefixes using ``str.startswith``.
+    """
+
+    # key in a node which holds the (insertion index, value) tuple of the prefix ending in this node
+    _VALUE = None
+
+    def __init__(self, items: Iterable[Tuple[str, _V]] = None):
+        self._root: Dict = {}
+        self._size = 0
+        for prefix, value in items or []:
+            self.insert(prefix, value)
+
+    def insert(self, prefix: str, value: _V):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if self._VALUE not in node:
+            node[self._VALUE] = (self._size, value)
+            self._size += 1
+
+    def matches(self, string: str) -> List[_V]:
+        """
+        :param string: to find the matching prefixes for
+        :return: values of all prefixes of the given string (in insertion order)
+        """
+        result = []
+        node = self._root
+        if self._VALUE in node:
+            result.append(node[self._VALUE])
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                break
+            if self._VALUE in node:
+                result.append(node[self._VALUE])
+        if len(result) > 1:
+            result.sort(key=lambda match: match[0])
+        return [value for _, value in result]
+
+    def first_match(self, string: str) -> Optional[_V]:
+        """
+        :param string: to find the first inserted matching prefix for
+        :return: the value of the first inserted prefix of the given string, or None
+        """
+        matches = self.matches(string)
+        return matches[0] if matches else None
+
+    def __len__(self):
+        return self._size
@@ -1,9 +1,13 @@
+import logging
+import math
 import queue
 import threading
 import time
 from concurrent.futures import Executor
 from typing import Any, Callable, List, Mapping, Optional, Tuple, Union
 
+LOG = logging.getLogger(__name__)
+
 
 class ScheduledTask:
     """
@@ -198,3 +202,218 @@ class Scheduler:
                     # task deadline couldn't be set because it was cancelled
                     continue
                 q.put((task.deadline, task))
+
+
+class Timer:
+    """
+    A handle for a callback scheduled in a TimerWheel.
+    """
+
+    __slots__ = ("deadline", "callback", "args", "tick", "slot", "wheel")
+
+    def __init__(self, wheel: "TimerWheel", deadline: float, callback: Callable, args: Tuple):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.tick = None
+        self.slot = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.slot is not None
+
+    def cancel(self) -> bool:
+        return self.wheel.cancel(self)
+
+    def run(self):
+        self.callback(*self.args)
+
+
+class TimerWheel:
+    """
+    A hierarchical timing wheel that fires (potentially hundreds of thousands of) one-off timers when their deadline
+    has been reached. Scheduling and cancelling a timer are O(1) operations, which makes the wheel well suited for
+    timeouts that are frequently scheduled and cancelled again (e.g., visibility timeouts of SQS messages).
+
+    Each level of the wheel has ``slots`` buckets. A bucket of the first level spans ``resolution`` seconds, a bucket
+    of each following level spans the entire previous level. Once the time reaches a bucket of a higher level, its
+    timers are cascaded down into the lower levels. Timers are fired at the first tick after their deadline, i.e., they
+    never fire early and at most ``resolution`` seconds late.
+    """
+
+    def __init__(
+        self,
+        resolution: float = 0.01,
+        slots: int = 256,
+        levels: int = 4,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Creates a new TimerWheel. The wheel needs to be started to fire the timers.
+
+        :param resolution: the duration of one tick in seconds
+        :param slots: the number of buckets per level
+        :param levels: the number of levels
+        :param executor: an optional executor the timer callbacks are submitted to (otherwise they are executed in the
+            thread of the wheel, and should therefore return quickly)
+        """
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.executor = executor
+
+        self._wheels: List[List[set]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._overflow: set = set()
+        self._origin = time.time()
+        self._current_tick = 0
+        self._size = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __len__(self):
+        return self._size
+
+    def schedule(self, deadline: float, callback: Callable, *args) -> Timer:
+        """
+        Schedules the given callback to be called with the given arguments once the deadline has been reached.
+
+        :param deadline: the unix timestamp at which the callback should be called
+        :param callback: the callback to call
+        :param args: the arguments to pass to the callback
+        :return: a Timer which can be used to cancel the scheduled call
+        """
+        timer = Timer(self, deadline, callback, args)
+        with self._condition:
+            if not self._size:
+                # the wheel does not advance while it is empty, catch up with the current time
+                now_tick = self._tick_of(time.time(), rounding=math.floor)
+                self._current_tick = max(self._current_tick, now_tick)
+            # a timer can at the earliest be fired with the next tick
+            timer.tick = max(self._tick_of(deadline), self._current_tick + 1)
+            self._insert(timer)
+            self._size += 1
+            self._condition.notify()
+        return timer
+
+    def cancel(self, timer: Timer) -> bool:
+        """
+        Cancels the given timer.
+
+        :param timer: the timer to cancel
+        :return: True if the timer was cancelled, False if it already fired or was cancelled before
+        """
+        with self._condition:
+            if timer.slot is None:
+                return False
+            timer.slot.discard(timer)
+            timer.slot = None
+            self._size -= 1
+            return True
+
+    def start(self):
+        """Starts the thread that fires the timers (if it is not running yet)."""
+        with self._condition:
+            if self._thread:
+                return
+            self._closed = False
+            self._thread = threading.Thread(target=self.run, name="timer-wheel", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stops the thread that fires the timers. Scheduled timers are kept."""
+        with self._condition:
+            self._closed = True
+            self._thread = None
+            self._condition.notify_all()
+
+    def run(self):
+        condition = self._condition
+        while True:
+            with condition:
+                while not self._closed and not self._size:
+                    condition.wait()
+                if self._closed:
+                    return
+
+                expired = []
+                now_tick = self._tick_of(time.time(), rounding=math.floor)
+                while self._current_tick < now_tick and self._size > len(expired):
+                    expired.extend(self._advance())
+                if self._current_tick < now_tick:
+                    # there are no more timers, jump directly to the current tick
+                    self._current_tick = now_tick
+
+                for timer in expired:
+                    timer.slot = None
+                self._size -= len(expired)
+
+                if not expired:
+                    next_tick_time = self._origin + (self._current_tick + 1) * self.resolution
+                    condition.wait(max(0.0, next_tick_time - time.time()))
+                    continue
+
+            for timer in expired:
+                self._fire(timer)
+
+    def _fire(self, timer: Timer):
+        if self.executor:
+            self.executor.submit(self._run_timer, timer)
+        else:
+            self._run_timer(timer)
+
+    @staticmethod
+    def _run_timer(timer: Timer):
+        try:
+            timer.run()
+        except Exception:
+            LOG.exception("error while running timer callback %s", timer.callback)
+
+    def _tick_of(self, timestamp: float, rounding: Callable[[float], int] = math.ceil) -> int:
+        return rounding((timestamp - self._origin) / self.resolution)
+
+    def _insert(self, timer: Timer):
+        delta = timer.tick - self._current_tick
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots:
+                slot = self._wheels[level][(timer.tick // span) % self.slots]
+                break
+            span *= self.slots
+        else:
+            slot = self._overflow
+
+        slot.add(timer)
+        timer.slot = slot
+
+    def _advance(self) -> List[Timer]:
+        """
+        Advances the wheel by one tick, cascades the timers of the higher levels, and returns the expired timers.
+        """
+        tick = self._current_tick + 1
+        self._current_tick = tick
+
+        span = self.slots**self.levels
+        if tick % span == 0 and self._overflow:
+            timers, self._overflow = self._overflow, set()
+            for timer in timers:
+                self._insert(timer)
+
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots**level
+            if tick % span:
+                continue
+            index = (tick // span) % self.slots
+            timers = self._wheels[level][index]
+            if timers:
+                self._wheels[level][index] = set()
+                for timer in timers:
+                    self._insert(timer)
+
+        index = tick % self.slots
+        expired = self._wheels[0][index]
+        if not expired:
+            return []
+        self._wheels[0][index] = set()
+        return list(expired)
@@ -10,7 +10,6 @@ from boto3.dynamodb.conditions import Key
 from boto3.dynamodb.types import STRING
 
 from localstack.services.awslambda.lambda_utils import LAMBDA_RUNTIME_PYTHON36
-from localstack.services.dynamodbstreams.dynamodbstreams_api import get_kinesis_stream_name
 from localstack.testing.snapshots.transformer import SortingTransformer
 from localstack.utils import testutil
 from localstack.utils.aws import aws_stack
@@ -18,7 +17,6 @@ from localstack.utils.common import json_safe, long_uid, retry, short_uid
 from localstack.utils.testutil import check_expected_lambda_log_events_length
 
 from .awslambda.test_lambda import TEST_LAMBDA_PYTHON_ECHO
-from .test_kinesis import get_shard_iterator
 
 PARTITION_KEY = "id"
 
@@ -186,7 +184,6 @@ class TestDynamoDB:
     @pytest.mark.only_localstack
     def test_stream_spec_and_region_replacement(self, dynamodb):
         ddbstreams = aws_stack.create_external_boto_client("dynamodbstreams")
-        kinesis = aws_stack.create_external_boto_client("kinesis")
         table_name = f"ddb-{short_uid()}"
         aws_stack.create_dynamodb_table(
             table_name,
@@ -204,8 +201,6 @@ class TestDynamoDB:
         # assert stream has been created
         stream_tables = [s["TableName"] for s in ddbstreams.list_streams()["Streams"]]
         assert table_name in stream_tables
-        stream_name = get_kinesis_stream_name(table_name)
-        assert stream_name in kinesis.list_streams()["StreamNames"]
 
         # assert shard ID formats
         result = ddbstreams.describe_stream(StreamArn=table.latest_stream_arn)["StreamDescription"]
@@ -219,7 +214,6 @@ class TestDynamoDB:
         def _assert_stream_deleted():
             stream_tables = [s["TableName"] for s in ddbstreams.list_streams()["Streams"]]
             assert table_name not in stream_tables
-            assert stream_name not in kinesis.list_streams()["StreamNames"]
 
         # assert stream has been deleted
         retry(_assert_stream_deleted, sleep=0.4, retries=5)
@@ -535,13 +529,12 @@ class TestDynamoDB:
     @pytest.mark.only_localstack
     def test_binary_data_with_stream(
         self,
-        wait_for_stream_ready,
         dynamodb_create_table_with_parameters,
         dynamodb_client,
-        kinesis_client,
+        dynamodbstreams_client,
     ):
         table_name = f"table-{short_uid()}"
-        dynamodb_create_table_with_parameters(
+        table = dynamodb_create_table_with_parameters(
             TableName=table_name,
             KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
             AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
@@ -551,23 +544,27 @@ class TestDynamoDB:
                 "StreamViewType": "NEW_AND_OLD_IMAGES",
             },
         )
-        stream_name = get_kinesis_stream_name(table_name)
-        wait_for_stream_ready(stream_name)
+        stream_arn = table["TableDescription"]["LatestStreamArn"]
+        shard_id = dynamodbstreams_client.describe_stream(StreamArn=stream_arn)[
+            "StreamDescription"
+        ]["Shards"][0]["ShardId"]
+        iterator = dynamodbstreams_client.get_shard_iterator(
+            StreamArn=stream_arn, ShardId=shard_id, ShardIteratorType="TRIM_HORIZON"
+        )["ShardIterator"]
         response = dynamodb_client.put_item(
             TableName=table_name, Item={"id": {"S": "id1"}, "data": {"B": b"\x90"}}
         )
         assert response["ResponseMetadata"]["HTTPStatusCode"] == 200
 
-        iterator = get_shard_iterator(stream_name, kinesis_client)
-        response = kinesis_client.get_records(ShardIterator=iterator)
-        json_records = response.get("Records")
-        assert 1 == len(json_records)
-        assert "Data" in json_records[0]
+        def _assert_records():
+            records = dynamodbstreams_client.get_records(ShardIterator=iterator)["Records"]
+            assert 1 == len(records)
+            assert records[0]["dynamodb"]["NewImage"]["data"] == {"B": b"\x90"}
+
+        retry(_assert_records, retries=5, sleep=0.5)
 
     @pytest.mark.only_localstack
-    def test_dynamodb_stream_shard_iterator(
-        self, wait_for_stream_ready, dynamodb_create_table_with_parameters
-    ):
+    def test_dynamodb_stream_shard_iterator(self, dynamodb_create_table_with_parameters):
         ddbstreams = aws_stack.create_external_boto_client("dynamodbstreams")
 
         table_name = f"table_with_stream-{short_uid()}"
@@ -581,10 +578,6 @@ class TestDynamoDB:
             },
             ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
         )
-        stream_name = get_kinesis_stream_name(table_name)
-
-        wait_for_stream_ready(stream_name)
-
         stream_arn = table["TableDescription"]["LatestStreamArn"]
         result = ddbstreams.describe_stream(StreamArn=stream_arn)
 
@@ -1192,7 +1185,6 @@ class TestDynamoDB:
         dynamodbstreams_client,
         dynamodb_resource,
         dynamodb_create_table,
-        wait_for_stream_ready,
     ):
         table_name = f"test-ddb-table-{short_uid()}"
 
@@ -1202,10 +1194,6 @@ class TestDynamoDB:
             stream_view_type="NEW_AND_OLD_IMAGES",
         )
         table = dynamodb_resource.Table(table_name)
-        stream_name = get_kinesis_stream_name(table_name)
-
-        wait_for_stream_ready(stream_name)
-
         response = dynamodbstreams_client.describe_stream(StreamArn=table.latest_stream_arn)
         assert response["ResponseMetadata"]["HTTPStatusCode"] == 200
         assert len(response["StreamDescription"]["Shards"]) == 1
@@ -1294,7 +1282,7 @@ class TestDynamoDB:
 
     @pytest.mark.only_localstack
     def test_dynamodb_stream_to_lambda(
-        self, lambda_client, dynamodb_resource, dynamodb_create_table, wait_for_stream_ready
+        self, lambda_client, dynamodb_resource, dynamodb_create_table
     ):
         table_name = "ddb-table-%s" % short_uid()
         function_name = "func-%s" % short_uid()
@@ -1307,10 +1295,6 @@ class TestDynamoDB:
         )
         table = dynamodb_resource.Table(table_name)
         latest_stream_arn = table.latest_stream_arn
-        stream_name = get_kinesis_stream_name(table_name)
-
-        wait_for_stream_ready(stream_name)
-
         testutil.create_lambda_function(
             handler_file=TEST_LAMBDA_PYTHON_ECHO,
             func_name=function_name,
@@ -12,7 +12,7 @@ from botocore.exceptions import ClientError
 from localstack import config
 from localstack.services.apigateway.helpers import extract_query_string_params
 from localstack.services.awslambda.lambda_utils import LAMBDA_RUNTIME_PYTHON36
-from localstack.services.events.provider import _get_events_tmp_dir
+from localstack.services.events.archive import get_event_archive
 from localstack.services.generic_proxy import ProxyListener
 from localstack.services.infra import start_proxy
 from localstack.utils import testutil
@@ -21,7 +21,6 @@ from localstack.utils.aws.aws_responses import requests_response
 from localstack.utils.common import (
     get_free_tcp_port,
     get_service_protocol,
-    load_file,
     retry,
     short_uid,
     to_str,
@@ -99,9 +98,7 @@ class TestEvents:
         # clean up
         self.cleanup(rule_name=rule_name)
 
-    def test_events_written_to_disk_are_timestamp_prefixed_for_chronological_ordering(
-        self, events_client
-    ):
+    def test_archived_events_are_in_chronological_order(self, events_client):
         event_type = str(uuid.uuid4())
         event_details_to_publish = list(map(lambda n: f"event {n}", range(10)))
 
@@ -117,17 +114,13 @@ class TestEvents:
                 ]
             )
 
-        events_tmp_dir = _get_events_tmp_dir()
-        sorted_events_written_to_disk = map(
-            lambda filename: json.loads(str(load_file(os.path.join(events_tmp_dir, filename)))),
-            sorted(os.listdir(events_tmp_dir)),
-        )
-        sorted_events = list(
-            filter(
-                lambda event: event.get("DetailType") == event_type,
-                sorted_events_written_to_disk,
-            )
-        )
+        archive = get_event_archive()
+        assert archive.flush(timeout=10)
+        sorted_events = [
+            record["event"]
+            for record in archive.read()
+            if record["event"].get("DetailType") == event_type
+        ]
 
         assert (
             list(map(lambda event: json.loads(event["Detail"]), sorted_events))
@@ -121,7 +121,7 @@ def test_firehose_http(lambda_processor_enabled: bool):
             received_record_data == f"{msg_text}{'-processed' if lambda_processor_enabled else ''}"
         )
 
-    retry(_assert_record, retries=5, sleep=1)
+    retry(_assert_record, retries=10, sleep=1)
 
     # update stream destination
     destination_id = stream_description["Destinations"][0]["DestinationId"]
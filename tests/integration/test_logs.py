@@ -487,9 +487,12 @@ class TestCloudWatchLogs:
             logGroupName=logs_log_group, logStreamName=logs_log_stream, logEvents=events
         )
 
-        # list metrics
-        response = cloudwatch_client.list_metrics(Namespace=namespace_name)
-        assert len(response["Metrics"]) == 2
+        # list metrics (the metrics of the filters are published asynchronously)
+        def _check_metrics():
+            response = cloudwatch_client.list_metrics(Namespace=namespace_name)
+            assert len(response["Metrics"]) == 2
+
+        retry(_check_metrics, retries=10, sleep=1)
 
         # delete filters
         logs_client.delete_metric_filter(logGroupName=logs_log_group, filterName=basic_filter_name)
@@ -0,0 +1,103 @@
+"""
+Measures the throughput of selecting the rules of an event bus that match a put event, for buses
+with 10, 100, 1k, and 10k rules. Compares the evaluation of the compiled pattern of every rule on the
+bus with the RuleIndex, which only evaluates the patterns of the rules indexed by the source and
+detail-type of the event.
+
+Run with: python -m tests.performance.test_events_pattern_performance
+"""
+import json
+import random
+import time
+
+from moto.events.models import Rule
+
+from localstack.services.events.pattern import RuleIndex, compile_rule_pattern
+
+# number of events put for every bus size
+NUM_EVENTS = 1_000
+RULE_COUNTS = [10, 100, 1_000, 10_000]
+
+STATES = ["pending", "running", "stopping", "stopped"]
+
+
+def create_pattern(i: int) -> dict:
+    # a mix of the most common kinds of event patterns
+    kind = i % 4
+    if kind == 0:
+        return {"source": [f"app-{i}"]}
+    if kind == 1:
+        return {"source": [f"app-{i}"], "detail": {"state": [random.choice(STATES)]}}
+    if kind == 2:
+        return {"detail-type": [f"type-{i}"], "detail": {"amount": [{"numeric": [">", 100]}]}}
+    return {"source": [f"app-{i}"], "detail-type": [{"prefix": "type-"}]}
+
+
+def create_event(num_rules: int) -> dict:
+    i = random.randrange(num_rules)
+    return {
+        "version": "0",
+        "id": str(i),
+        "detail-type": f"type-{random.randrange(num_rules)}",
+        "source": f"app-{i}",
+        "account": "000000000000",
+        "region": "us-east-1",
+        "resources": [],
+        "detail": {"state": random.choice(STATES), "amount": random.randint(0, 200)},
+    }
+
+
+def match_all(rules, event):
+    # corresponds to a linear scan over the rules, with the patterns compiled when the rules are put
+    return [rule for rule, matcher in rules if matcher.matches(event)]
+
+
+def measure(num_rules: int):
+    random.seed(num_rules)
+    rules = {}
+    for i in range(num_rules):
+        name = f"rule-{i}"
+        rules[name] = Rule(
+            name,
+            "000000000000",
+            "us-east-1",
+            None,
+            json.dumps(create_pattern(i)),
+            None,
+            None,
+            "default",
+            None,
+        )
+    events = [create_event(num_rules) for _ in range(NUM_EVENTS)]
+
+    compiled = [(rule, compile_rule_pattern(rule)) for rule in rules.values()]
+    index = RuleIndex()
+    start = time.perf_counter()
+    index.sync(rules)
+    build_duration = time.perf_counter() - start
+
+    # the evaluation of every pattern is slow for large buses, only use a sample of the events
+    sample = events[: max(10, NUM_EVENTS * 100 // num_rules)]
+    start = time.perf_counter()
+    expected = [match_all(compiled, event) for event in sample]
+    scan_duration = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    results = [index.match("default", event) for event in events]
+    index_duration = (time.perf_counter() - start) / len(events)
+
+    mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+    print(
+        "%6s rules: index built in %.3fs | evaluate all: %8.0f events/s | indexed: %8.0f events/s "
+        "| %s mismatches"
+        % (num_rules, build_duration, 1 / scan_duration, 1 / index_duration, mismatches)
+    )
+
+
+def main():
+    for num_rules in RULE_COUNTS:
+        measure(num_rules)
+
+
+if __name__ == "__main__":
+    main()
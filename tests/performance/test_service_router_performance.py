@@ -0,0 +1,84 @@
+"""
+Compares the results and the latency of the compiled service router with the heuristic in
+``determine_aws_service_name`` across a corpus of requests for every operation of every service.
+
+Run with: python -m tests.performance.test_service_router_performance
+"""
+import time
+from collections import Counter
+
+from localstack.aws.protocol.service_router import (
+    CompiledServiceRouter,
+    determine_aws_service_name,
+    get_service_catalog,
+)
+from tests.unit.aws.test_service_router import _create_request
+
+# number of times the whole corpus is routed
+NUM_ROUNDS = 5
+
+
+def create_corpus():
+    catalog = get_service_catalog()
+    corpus = []
+    for service_name in catalog.service_names:
+        service = catalog.get(service_name)
+        for operation_name in service.operation_names:
+            try:
+                request = _create_request(service, service.operation_model(operation_name))
+            except Exception:
+                continue
+            # make sure the body is cached, such that both routers can access it
+            request.get_data()
+            corpus.append((service_name, request))
+    return corpus
+
+
+def measure(router, corpus, action):
+    start = time.perf_counter()
+    results = []
+    for _ in range(NUM_ROUNDS):
+        results = [router(request) for _, request in corpus]
+    duration = time.perf_counter() - start
+    num_requests = NUM_ROUNDS * len(corpus)
+    print(
+        "%s: routed %s requests in %.3f seconds (%.1f µs/request)"
+        % (action, num_requests, duration, duration / num_requests * 1_000_000)
+    )
+    return results
+
+
+def compare(corpus, name):
+    compiled_router = CompiledServiceRouter(get_service_catalog())
+    heuristic_results = measure(determine_aws_service_name, corpus, f"{name} heuristic")
+    compiled_results = measure(compiled_router, corpus, f"{name} compiled ")
+
+    mismatches = [
+        (service_name, heuristic, compiled)
+        for (service_name, _), heuristic, compiled in zip(
+            corpus, heuristic_results, compiled_results
+        )
+        if heuristic != compiled
+    ]
+    print(
+        "%s: %s mismatches between the heuristic and the compiled router" % (name, len(mismatches))
+    )
+    for service_name, heuristic, compiled in mismatches:
+        print("  %s: heuristic=%s compiled=%s" % (service_name, heuristic, compiled))
+
+
+def main():
+    corpus = create_corpus()
+    print("Created a corpus of %s requests" % len(corpus))
+    compare(corpus, "all services")
+
+    # most of the requests are usually addressed to a handful of services
+    hot_services = {"sqs", "sns", "dynamodb", "lambda", "s3"}
+    hot_corpus = [entry for entry in corpus if entry[0] in hot_services]
+    counts = Counter(service_name for service_name, _ in hot_corpus)
+    print("Hot corpus: %s" % dict(counts))
+    compare(hot_corpus * 10, "hot services")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measures the throughput of selecting the subscriptions of a topic that match a published message, for topics with 1,
+100, and 10k filtered subscriptions. Compares the per-publish evaluation of every filter policy (parsing the policy
+JSON for each message and subscription) with the compiled and indexed filter policies of the SubscriptionFilterIndex.
+
+Run with: python -m tests.performance.test_sns_filter_performance
+"""
+import json
+import random
+import time
+
+from localstack.services.sns.filter import SubscriptionFilterIndex
+from localstack.services.sns.provider import check_filter_policy
+
+# number of messages published for every topic size
+NUM_MESSAGES = 1_000
+SUBSCRIPTION_COUNTS = [1, 100, 10_000]
+
+COLORS = ["red", "green", "blue", "black", "white", "yellow", "purple", "orange"]
+
+
+def create_filter_policy(i: int) -> dict:
+    # a mix of the most common kinds of filter policies
+    kind = i % 4
+    if kind == 0:
+        return {"customer": [f"customer-{i}"]}
+    if kind == 1:
+        return {"customer": [f"customer-{i}"], "color": [random.choice(COLORS)]}
+    if kind == 2:
+        return {"store": [{"prefix": f"store-{i}-"}]}
+    low = random.randint(0, 10_000)
+    return {"price": [{"numeric": [">=", low, "<", low + 10]}]}
+
+
+def create_message_attributes(num_subscriptions: int) -> dict:
+    i = random.randrange(num_subscriptions)
+    return {
+        "customer": {"DataType": "String", "StringValue": f"customer-{i}"},
+        "color": {"DataType": "String", "StringValue": random.choice(COLORS)},
+        "store": {"DataType": "String", "StringValue": f"store-{i}-{random.randint(0, 100)}"},
+        "price": {"DataType": "Number", "StringValue": str(random.randint(0, 10_000))},
+    }
+
+
+def match_all(subscriptions, message_attributes):
+    return [
+        subscription
+        for subscription in subscriptions
+        if check_filter_policy(json.loads(subscription["FilterPolicy"]), message_attributes)
+    ]
+
+
+def measure(num_subscriptions: int):
+    random.seed(num_subscriptions)
+    subscriptions = [
+        {
+            "SubscriptionArn": f"arn:aws:sns:us-east-1:000000000000:topic:{i}",
+            "FilterPolicy": json.dumps(create_filter_policy(i)),
+        }
+        for i in range(num_subscriptions)
+    ]
+    messages = [create_message_attributes(num_subscriptions) for _ in range(NUM_MESSAGES)]
+
+    start = time.perf_counter()
+    index = SubscriptionFilterIndex(subscriptions)
+    build_duration = time.perf_counter() - start
+
+    # the evaluation of every filter policy is slow for large topics, only use a sample of the messages
+    sample = messages[: max(10, NUM_MESSAGES * 100 // num_subscriptions)]
+    start = time.perf_counter()
+    expected = [match_all(subscriptions, message) for message in sample]
+    scan_duration = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    results = [index.match(message) for message in messages]
+    index_duration = (time.perf_counter() - start) / len(messages)
+
+    mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+    print(
+        "%6s subscriptions: index built in %.3fs | evaluate all: %8.0f publishes/s | indexed: %8.0f publishes/s "
+        "| %s mismatches"
+        % (num_subscriptions, build_duration, 1 / scan_duration, 1 / index_duration, mismatches)
+    )
+
+
+def main():
+    for num_subscriptions in SUBSCRIPTION_COUNTS:
+        measure(num_subscriptions)
+
+
+if __name__ == "__main__":
+    main()
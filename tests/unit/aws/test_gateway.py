@@ -1,4 +1,6 @@
 import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import pytest
 import requests
@@ -9,6 +11,7 @@ from localstack.aws.chain import HandlerChain
 from localstack.aws.gateway import Gateway
 from localstack.aws.serving.asgi import AsgiGateway
 from localstack.http import Response
+from localstack.http.asgi import ASYNC_RESPONSE_BODY
 from localstack.http.hypercorn import HypercornServer
 from localstack.utils import net
 from localstack.utils.sync import poll_condition
@@ -18,11 +21,11 @@ from localstack.utils.sync import poll_condition
 def serve_gateway_hypercorn():
     _servers = []
 
-    def _create(gateway: Gateway) -> HypercornServer:
+    def _create(gateway: Gateway, **kwargs) -> HypercornServer:
         config = Config()
         config.bind = f"localhost:{net.get_free_tcp_port()}"
         loop = asyncio.new_event_loop()
-        srv = HypercornServer(AsgiGateway(gateway, event_loop=loop), config, loop=loop)
+        srv = HypercornServer(AsgiGateway(gateway, event_loop=loop, **kwargs), config, loop=loop)
         _servers.append(srv)
         srv.start()
         assert srv.wait_is_up(timeout=10), "gave up waiting for server to start up"
@@ -62,3 +65,32 @@ def test_gateway_served_through_hypercorn_preserves_client_headers(serve_gateway
     assert ["Some-Title-Case-Header", "value2"] in headers
     assert ["X-UPPER", "value3"] in headers
     assert ["KEEPS__underscores_-", "value4"] in headers
+
+
+def test_gateway_served_through_hypercorn_with_async_response_body(serve_gateway_hypercorn):
+    released = Future()
+    waiting = threading.Event()
+
+    async def _wait_for_release():
+        yield await asyncio.wrap_future(released)
+
+    def handler(chain: HandlerChain, context: RequestContext, response: Response):
+        if context.request.path == "/wait":
+            assert context.request.environ.get(ASYNC_RESPONSE_BODY)
+            response.update_from(Response(_wait_for_release(), direct_passthrough=True))
+            waiting.set()
+        else:
+            released.set_result(b"released")
+            response.data = b"ok"
+        chain.stop()
+
+    gateway = Gateway()
+    gateway.request_handlers.append(handler)
+
+    # the waiting response does not block the only thread of the server
+    server = serve_gateway_hypercorn(gateway=gateway, threads=1)
+    with ThreadPoolExecutor(1) as executor:
+        waiting_response = executor.submit(requests.get, f"{server.url}/wait", timeout=10)
+        assert waiting.wait(timeout=5)
+        assert requests.get(f"{server.url}/release", timeout=10).text == "ok"
+        assert waiting_response.result(timeout=10).text == "released"
@@ -8,7 +8,13 @@ from botocore.awsrequest import AWSRequest, create_request_object
 from botocore.config import Config
 from botocore.model import OperationModel, ServiceModel, Shape, StructureShape
 
-from localstack.aws.protocol.service_router import determine_aws_service_name, get_service_catalog
+from localstack.aws.protocol.service_router import (
+    CompiledServiceRouter,
+    PrefixTrie,
+    determine_aws_service_name,
+    get_service_catalog,
+    get_service_router,
+)
 from localstack.http import Request
 from localstack.utils.aws import aws_stack
 from localstack.utils.run import to_str
@@ -138,6 +144,22 @@ def _create_dummy_request_args(operation_model: OperationModel) -> Dict:
     return result
 
 
+def _create_request(service: ServiceModel, operation: OperationModel) -> Request:
+    """Creates a dummy (signed) request for the given service operation."""
+    client = _client(service.service_name)
+    request_context = {
+        "client_region": client.meta.region_name,
+        "client_config": client.meta.config,
+        "has_streaming_input": operation.has_streaming_input,
+        "auth_type": operation.auth_type,
+    }
+    request_args = _create_dummy_request_args(operation)
+    request_dict = client._convert_to_request_dict(request_args, operation, request_context)
+    request_object = create_request_object(request_dict)
+    client._request_signer.sign(operation.name, request_object)
+    return _botocore_request_to_localstack_request(request_object)
+
+
 def _generate_test_name(param: Any):
     """Simple helper function to generate readable test names."""
     if isinstance(param, ServiceModel):
@@ -157,19 +179,7 @@ def test_service_router_works_for_every_service(
 ):
     caplog.set_level("CRITICAL", "botocore")
 
-    # Create a dummy request for the service router
-    client = _client(service.service_name)
-    request_context = {
-        "client_region": client.meta.region_name,
-        "client_config": client.meta.config,
-        "has_streaming_input": operation.has_streaming_input,
-        "auth_type": operation.auth_type,
-    }
-    request_args = _create_dummy_request_args(operation)
-    request_dict = client._convert_to_request_dict(request_args, operation, request_context)
-    request_object = create_request_object(request_dict)
-    client._request_signer.sign(operation.name, request_object)
-    request: Request = _botocore_request_to_localstack_request(request_object)
+    request = _create_request(service, operation)
 
     # Execute the service router
     detected_service_name = determine_aws_service_name(request)
@@ -177,6 +187,9 @@ def test_service_router_works_for_every_service(
     # Make sure the detected service is the same as the one we generated the request for
     assert service.service_name == detected_service_name
 
+    # Make sure the compiled service router yields the same result
+    assert get_service_router().determine_service_name(request) == detected_service_name
+
 
 def test_endpoint_prefix_based_routing():
     # TODO could be generalized using endpoint resolvers and replacing "amazonaws.com" with "localhost.localstack.cloud"
@@ -193,3 +206,32 @@ def test_endpoint_prefix_based_routing():
         )
     )
     assert detected_service_name == "chime-sdk-identity"
+
+
+def test_compiled_endpoint_prefix_based_routing():
+    router = CompiledServiceRouter(get_service_catalog())
+
+    request = Request(method="GET", path="/", headers={"Host": "sqs.localhost.localstack.cloud"})
+    assert router.determine_service_name(request) == "sqs"
+    # the second lookup is served from the host cache
+    assert router.determine_service_name(request) == "sqs"
+    assert router._resolve_host.cache_info().hits == 1
+
+    request = Request(
+        method="POST",
+        path="/app-instances",
+        headers={"Host": "identity-chime.localhost.localstack.cloud"},
+    )
+    assert router.determine_service_name(request) == "chime-sdk-identity"
+
+
+def test_prefix_trie_returns_matches_in_insertion_order():
+    trie = PrefixTrie([("s3-control", 1), ("s3", 2), ("sqs", 3), ("", 4)])
+
+    assert trie.matches("s3-control.localhost") == [1, 2, 4]
+    assert trie.matches("sqs.localhost") == [3, 4]
+    assert trie.first_match("s3.localhost") == 2
+    assert trie.first_match("sns") == 4
+    assert len(trie) == 4
+
+    assert PrefixTrie([("/v2", "apigatewayv2")]).first_match("/restapis") is None
@@ -0,0 +1,127 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from localstack.aws import handlers
+from localstack.aws.api import RequestContext, handler
+from localstack.aws.api.sqs import QueueDoesNotExist
+from localstack.aws.gateway import Gateway
+from localstack.aws.handlers.service import ServiceRequestRouter
+from localstack.aws.proxy import AwsApiListener
+from localstack.aws.transport import GatewayHttpSession, install_in_process_transport, set_gateway
+from localstack.services.plugins import Service
+from localstack.utils.aws import aws_stack
+from localstack.utils.aws.request_context import THREAD_LOCAL
+
+
+class _SqsProvider:
+    def __init__(self):
+        self.invocations = []
+
+    @handler("ListQueues", expand=False)
+    def list_queues(self, context: RequestContext, request):
+        self.invocations.append((context, request))
+        return {"QueueUrls": [f"{context.request.host_url}000000000000/my-queue"]}
+
+    @handler("GetQueueUrl", expand=False)
+    def get_queue_url(self, context: RequestContext, request):
+        self.invocations.append((context, request))
+        raise QueueDoesNotExist()
+
+
+class _ServiceManager:
+    def __init__(self, service: Service):
+        self.service = service
+
+    def exists(self, name: str) -> bool:
+        return name == self.service.name()
+
+    def require(self, name: str) -> Service:
+        return self.service
+
+
+@pytest.fixture
+def provider():
+    return _SqsProvider()
+
+
+@pytest.fixture
+def gateway(provider):
+    listener = AwsApiListener("sqs", provider)
+    router = ServiceRequestRouter()
+    router.add_skeleton(listener.skeleton)
+
+    gateway = Gateway()
+    gateway.service_manager = _ServiceManager(Service("sqs", listener=listener))
+    gateway.request_handlers.extend(
+        [
+            handlers.parse_service_name,
+            handlers.add_region_from_header,
+            handlers.add_account_id,
+            handlers.parse_service_request,
+            router,
+        ]
+    )
+    gateway.exception_handlers.append(handlers.handle_service_exception)
+
+    set_gateway(gateway)
+    yield gateway
+    set_gateway(None)
+
+
+def _create_client():
+    return aws_stack.create_external_boto_client(
+        "sqs", endpoint_url="http://localhost:4566", region_name="us-east-1", cache=False
+    )
+
+
+def test_gateway_transport(gateway, provider):
+    client = install_in_process_transport(_create_client(), "gateway")
+    assert isinstance(client._endpoint.http_session, GatewayHttpSession)
+
+    response = client.list_queues()
+    assert response["QueueUrls"] == ["http://localhost:4566/000000000000/my-queue"]
+    assert response["ResponseMetadata"]["HTTPStatusCode"] == 200
+
+    # the request has been parsed by the gateway
+    context, request = provider.invocations[0]
+    assert context.region == "us-east-1"
+    assert request == {}
+
+    with pytest.raises(ClientError) as e:
+        client.get_queue_url(QueueName="does-not-exist")
+    assert e.value.response["Error"]["Code"] == "AWS.SimpleQueueService.NonExistentQueue"
+
+
+def test_dispatch_transport(gateway, provider):
+    client = install_in_process_transport(_create_client(), "dispatch")
+    # make sure the gateway is not used
+    gateway.request_handlers.clear()
+
+    response = client.list_queues(QueueNamePrefix="my-")
+    assert response["QueueUrls"] == ["http://localhost:4566/000000000000/my-queue"]
+
+    # the service request is passed to the provider without any serialization
+    context, request = provider.invocations[0]
+    assert request == {"QueueNamePrefix": "my-"}
+    assert context.operation.name == "ListQueues"
+    assert context.region == "us-east-1"
+
+    with pytest.raises(client.exceptions.QueueDoesNotExist):
+        client.get_queue_url(QueueName="does-not-exist")
+
+
+@pytest.mark.parametrize("transport", ["gateway", "dispatch"])
+def test_request_context_of_caller_is_preserved(gateway, provider, transport):
+    client = install_in_process_transport(_create_client(), transport)
+    request_context = object()
+    THREAD_LOCAL.request_context = request_context
+    try:
+        client.list_queues()
+        assert THREAD_LOCAL.request_context is request_context
+    finally:
+        THREAD_LOCAL.request_context = None
+
+
+def test_http_transport_without_gateway():
+    client = install_in_process_transport(_create_client(), "http")
+    assert not isinstance(client._endpoint.http_session, GatewayHttpSession)
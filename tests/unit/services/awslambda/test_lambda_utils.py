@@ -1,5 +1,6 @@
 from localstack.aws.api.lambda_ import Runtime
 from localstack.services.awslambda.lambda_utils import (
+    filter_stream_records,
     format_name_to_path,
     get_handler_file_from_name,
 )
@@ -38,3 +39,17 @@ class TestLambdaUtils:
         assert "main" == get_handler_file_from_name("main", Runtime.go1_x)
         assert "../handler.py" == get_handler_file_from_name("../handler.execute")
         assert "bootstrap" == get_handler_file_from_name("", Runtime.provided)
+
+    def test_filter_stream_records(self):
+        records = [{"eventName": "INSERT"}, {"eventName": "MODIFY"}, {"eventName": "REMOVE"}]
+        filters = [
+            {"Filters": [{"Pattern": '{"eventName": ["INSERT"]}'}]},
+            {
+                "Filters": [
+                    {"Pattern": '{"eventName": ["INSERT", "MODIFY"]}'},
+                    {"Pattern": '{"eventName": [{"prefix": "MOD"}]}'},
+                ]
+            },
+        ]
+        # records which match several filters are only returned once
+        assert filter_stream_records(records, filters) == records[:2]
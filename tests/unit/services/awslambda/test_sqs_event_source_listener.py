@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+
+import pytest
+
+from localstack.services.awslambda.event_source_listeners import sqs_event_source_listener
+from localstack.services.awslambda.event_source_listeners.sqs_event_source_listener import (
+    SQSEventSourceListener,
+    SqsMappingPoller,
+)
+from localstack.utils.sync import poll_condition
+
+QUEUE_ARN = "arn:aws:sqs:us-east-1:000000000000:my-queue"
+
+
+class _SqsClient:
+    def __init__(self, num_messages: int = 0):
+        self.messages = deque(
+            {"MessageId": str(i), "ReceiptHandle": str(i)} for i in range(num_messages)
+        )
+        self.calls = []
+        self.released = []
+        self.mutex = threading.Lock()
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages, WaitTimeSeconds, **kwargs):
+        with self.mutex:
+            self.calls.append((MaxNumberOfMessages, WaitTimeSeconds))
+            count = min(MaxNumberOfMessages, len(self.messages))
+            messages = [self.messages.popleft() for _ in range(count)]
+        if not messages and WaitTimeSeconds:
+            # simulate a (short) long poll
+            time.sleep(0.01)
+        return {"Messages": messages}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self.released.extend(Entries)
+
+
+class _Listener:
+    def __init__(self, block: threading.Event = None):
+        self.batches = []
+        self.block = block
+
+    def _process_messages_for_event_source(self, source, messages):
+        self.batches.append([message["MessageId"] for message in messages])
+        if self.block:
+            self.block.wait()
+
+
+def _create_poller(client: _SqsClient, listener=None, **mapping) -> SqsMappingPoller:
+    mapping = {"UUID": "uuid", "EventSourceArn": QUEUE_ARN, "BatchSize": 10, **mapping}
+    poller = SqsMappingPoller(listener or _Listener(), mapping)
+    poller.queue_url = "http://localhost:4566/000000000000/my-queue"
+    poller._get_client = lambda: client
+    poller.running = True
+    return poller
+
+
+class TestSqsMappingPoller:
+    def test_receive_batch_without_batching_window(self):
+        client = _SqsClient(num_messages=25)
+        poller = _create_poller(client, BatchSize=100)
+
+        assert len(poller.receive_batch()) == 25
+        # the first call is a long poll, the following calls only continue while there is a backlog
+        assert client.calls == [(10, 20), (10, 0), (10, 0)]
+
+    def test_receive_batch_with_batching_window(self, monkeypatch):
+        monkeypatch.setattr(sqs_event_source_listener, "SQS_LONG_POLL_SECONDS", 1)
+        client = _SqsClient(num_messages=3)
+        poller = _create_poller(client, BatchSize=100, MaximumBatchingWindowInSeconds=1)
+
+        start = time.time()
+        assert len(poller.receive_batch()) == 3
+        # the poller waits for more messages until the batching window has passed
+        assert 0.5 <= time.time() - start < 2
+        assert client.calls[:2] == [(10, 1), (10, 1)]
+        assert client.calls[-1] == (10, 0)
+
+    def test_receive_batch_respects_batch_size(self):
+        client = _SqsClient(num_messages=30)
+        poller = _create_poller(client, BatchSize=15)
+
+        assert len(poller.receive_batch()) == 15
+        assert client.calls == [(10, 20), (5, 0)]
+        assert len(poller.receive_batch()) == 15
+
+    def test_scale_with_backlog(self, monkeypatch):
+        monkeypatch.setattr(sqs_event_source_listener, "SQS_LONG_POLL_SECONDS", 1)
+        block = threading.Event()
+        client = _SqsClient(num_messages=100)
+        listener = _Listener(block)
+        poller = _create_poller(client, listener, ScalingConfig={"MaximumConcurrency": 3})
+        poller.running = False
+        try:
+            poller.start()
+            # every worker receives a full batch, and starts another worker up to the maximum concurrency
+            assert poll_condition(lambda: len(listener.batches) == 3, timeout=5)
+            assert poller.workers == 3
+
+            block.set()
+            assert poll_condition(lambda: len(listener.batches) == 10, timeout=5)
+            # the additional workers stop once the queue is drained
+            assert poll_condition(lambda: poller.workers == 1, timeout=5)
+            assert sorted(int(i) for batch in listener.batches for i in batch) == list(range(100))
+        finally:
+            poller.stop()
+            block.set()
+        assert poll_condition(lambda: poller.workers == 0, timeout=5)
+
+
+class TestSqsEventSourceListener:
+    @pytest.fixture
+    def listener(self, monkeypatch):
+        listener = SQSEventSourceListener()
+        monkeypatch.setattr(SQSEventSourceListener, "SQS_POLLERS", {})
+        monkeypatch.setattr(SqsMappingPoller, "start", lambda self: None)
+        return listener
+
+    def test_synchronize_pollers(self, listener, monkeypatch):
+        mappings = [
+            {"UUID": "1", "EventSourceArn": QUEUE_ARN, "State": "Enabled"},
+            {"UUID": "2", "EventSourceArn": QUEUE_ARN, "State": "Disabled"},
+        ]
+        monkeypatch.setattr(listener, "get_matching_event_sources", lambda: mappings)
+
+        listener.start()
+        assert list(listener.SQS_POLLERS) == ["1"]
+        poller = listener.SQS_POLLERS["1"]
+
+        # updates of the mapping do not restart the poller
+        mappings[0]["BatchSize"] = 100
+        mappings[1]["State"] = "Enabled"
+        listener.start()
+        assert sorted(listener.SQS_POLLERS) == ["1", "2"]
+        assert listener.SQS_POLLERS["1"] is poller
+
+        # deleted mappings are stopped
+        poller.running = True
+        mappings.pop(0)
+        listener.start()
+        assert list(listener.SQS_POLLERS) == ["2"]
+        assert not poller.running
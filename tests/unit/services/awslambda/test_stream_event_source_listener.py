@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from localstack.services.awslambda.event_source_listeners import stream_event_source_listener
+from localstack.services.awslambda.event_source_listeners.stream_event_source_listener import (
+    StreamEventSourceListener,
+)
+from localstack.utils.sync import poll_condition
+
+FUNCTION_ARN = "arn:aws:lambda:us-east-1:000000000000:function:test"
+STREAM_ARN = "arn:aws:kinesis:us-east-1:000000000000:stream/test"
+
+
+class _Listener(StreamEventSourceListener):
+    _POLL_INTERVAL_SEC = 0.01
+    _STREAM_LISTENER_THREADS = {}
+
+    def __init__(self):
+        self.records = []
+        self.batches = []
+        self.failing_keys = set()
+        self.mutex = threading.Lock()
+
+    def put(self, *keys):
+        with self.mutex:
+            for key in keys:
+                self.records.append({"key": key, "seq": len(self.records), "time": time.time()})
+
+    def _get_records(self, stream_client, shard_iterator, limit):
+        with self.mutex:
+            records = self.records[shard_iterator : shard_iterator + limit]
+        return {"Records": records, "NextShardIterator": shard_iterator + len(records)}
+
+    def _wait_for_records(self, shard_iterator, timeout=None):
+        time.sleep(0.01)
+
+    def _create_lambda_event_payload(self, stream_arn, records, shard_id=None):
+        return {"Records": records}
+
+    def _invoke_lambda(self, function_arn, payload, lock_discriminator, parallelization_factor):
+        records = payload["Records"]
+        with self.mutex:
+            self.batches.append([record["seq"] for record in records])
+        if any(record["key"] in self.failing_keys for record in records):
+            return False, 500
+        return True, 200
+
+    def _get_partition_key(self, record):
+        return record["key"]
+
+    def _get_arrival_time(self, record):
+        return record["time"]
+
+    def _get_starting_and_ending_sequence_numbers(self, first_record, last_record):
+        return str(first_record["seq"]), str(last_record["seq"])
+
+    def _get_first_and_last_arrival_time(self, first_record, last_record):
+        return str(first_record["time"]), str(last_record["time"])
+
+
+class TestStreamEventSourceListener:
+    @pytest.fixture
+    def listener(self, monkeypatch):
+        published = []
+        monkeypatch.setattr(
+            stream_event_source_listener,
+            "publish_lambda_metric",
+            lambda *args: published.append(args),
+        )
+        listener = _Listener()
+        listener.published = published
+        threads = []
+
+        def _start(**mapping):
+            source = {"UUID": "uuid", "FunctionArn": FUNCTION_ARN, "BatchSize": 10, **mapping}
+            lock_discriminator = f"uuid/{STREAM_ARN}/shard-{len(threads)}"
+            params = {
+                "source": source,
+                "stream_arn": STREAM_ARN,
+                "lock_discriminator": lock_discriminator,
+                "shard_id": "shard",
+                "stream_client": None,
+                "shard_iterator": 0,
+            }
+            thread = threading.Thread(
+                target=listener._listen_to_shard_and_invoke_lambda, args=(params,), daemon=True
+            )
+            listener._STREAM_LISTENER_THREADS[lock_discriminator] = thread
+            thread.start()
+            threads.append(thread)
+            return params
+
+        listener.start_listener = _start
+        yield listener
+
+        listener._STREAM_LISTENER_THREADS.clear()
+        for thread in threads:
+            thread.join(timeout=5)
+
+    def test_backlog_is_processed_in_full_batches(self, listener):
+        listener.put(*["a"] * 25)
+        listener.start_listener(BatchSize=10)
+
+        assert poll_condition(lambda: sum(map(len, listener.batches)) == 25, timeout=5)
+        assert [len(batch) for batch in listener.batches] == [10, 10, 5]
+        assert listener.published[0][0] == "IteratorAge"
+
+    def test_batching_window(self, listener):
+        listener.start_listener(BatchSize=100, MaximumBatchingWindowInSeconds=0.5)
+        for _ in range(5):
+            listener.put("a")
+            time.sleep(0.02)
+
+        assert poll_condition(lambda: listener.batches, timeout=5)
+        assert listener.batches == [[0, 1, 2, 3, 4]]
+
+    def test_parallelization_keeps_order_of_partition_keys(self, listener):
+        keys = ["a", "b", "c", "d"] * 5
+        listener.put(*keys)
+        listener.start_listener(BatchSize=20, ParallelizationFactor=4)
+
+        assert poll_condition(lambda: sum(map(len, listener.batches)) == 20, timeout=5)
+        assert len(listener.batches) > 1
+        for batch in listener.batches:
+            assert batch == sorted(batch)
+            # all records of a partition key are in the same batch
+            assert len({keys[seq] for seq in batch}) == len(batch) // 5
+
+    def test_only_failed_records_are_retried(self, listener):
+        listener.failing_keys = {"d"}
+        # "a" and "d" are in different batches with a ParallelizationFactor of 2
+        listener.put("a", "d")
+        listener.start_listener(BatchSize=10, ParallelizationFactor=2, MaximumRetryAttempts=2)
+
+        assert poll_condition(lambda: len(listener.batches) >= 3, timeout=5)
+        time.sleep(0.1)
+        assert sorted(listener.batches) == [[0], [1], [1]]
+
+    def test_mapping_updates_are_applied(self, listener):
+        params = listener.start_listener(BatchSize=2)
+        listener.put("a", "a", "a")
+        assert poll_condition(lambda: sum(map(len, listener.batches)) == 3, timeout=5)
+
+        params["source"] = {**params["source"], "BatchSize": 5}
+        listener.put(*["a"] * 5)
+        assert poll_condition(lambda: sum(map(len, listener.batches)) == 8, timeout=5)
+        assert listener.batches[-1] == [3, 4, 5, 6, 7]
@@ -1,13 +1,14 @@
 import json
 import os
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import boto3
 import pytest
+from moto.apigateway.models import apigateway_backends
 
 from localstack import config
-from localstack.constants import APPLICATION_JSON
+from localstack.constants import APPLICATION_JSON, TEST_AWS_ACCOUNT_ID
 from localstack.services.apigateway.helpers import (
     Resolver,
     apply_json_patch_safe,
@@ -15,12 +16,16 @@ from localstack.services.apigateway.helpers import (
     extract_path_params,
     extract_query_string_params,
     get_resource_for_path,
+    get_route_table,
+    get_target_resource_details,
+    invalidate_route_table,
 )
 from localstack.services.apigateway.integration import LambdaProxyIntegration
 from localstack.services.apigateway.invocations import (
     ApiInvocationContext,
     RequestValidator,
     apply_request_parameters,
+    invoke_rest_api,
 )
 from localstack.services.apigateway.templates import (
     RequestTemplates,
@@ -30,6 +35,7 @@ from localstack.services.apigateway.templates import (
 from localstack.utils.aws.aws_responses import requests_response
 from localstack.utils.common import clone
 from localstack.utils.files import load_file
+from localstack.utils.strings import short_uid
 
 
 def load_test_resource(file_name: str, file_path: str = None) -> str:
@@ -90,9 +96,28 @@ class ApiGatewayPathsTest(unittest.TestCase):
         path, details = get_resource_for_path("/foo/baz", path_args)
         self.assertEqual("/{param1}/{param2}", path)
 
+        # literal path segments take precedence level by level, from left to right
         path_args = {"/{param1}/{param2}/baz": {}, "/{param1}/bar/{param2}": {}}
         path, details = get_resource_for_path("/foo/bar/baz", path_args)
-        self.assertEqual("/{param1}/{param2}/baz", path)
+        self.assertEqual("/{param1}/bar/{param2}", path)
+
+        path_args = {"/{param1}/bar/{param2}": {}, "/{param1}/{param2}/baz": {}}
+        path, details = get_resource_for_path("/foo/bar/baz", path_args)
+        self.assertEqual("/{param1}/bar/{param2}", path)
+
+        # more specific branches which do not match the whole path are skipped
+        path_args = {"/foo/bar/{param1}": {}, "/foo/{param1}/baz/qux": {}}
+        path, details = get_resource_for_path("/foo/bar/baz/qux", path_args)
+        self.assertEqual("/foo/{param1}/baz/qux", path)
+
+        path_args = {"/foo/{proxy+}": {}, "/foo/{param1}/{param2}": {}, "/": {}}
+        path, details = get_resource_for_path("/foo/bar/baz", path_args)
+        self.assertEqual("/foo/{param1}/{param2}", path)
+        path, details = get_resource_for_path("/foo/bar", path_args)
+        self.assertEqual("/foo/{proxy+}", path)
+        path, details = get_resource_for_path("/", path_args)
+        self.assertEqual("/", path)
+        self.assertIsNone(get_resource_for_path("/foo", path_args))
 
         path_args = {"/{param1}/{param2}/baz": {}, "/{param1}/{param2}/{param2}": {}}
         path, details = get_resource_for_path("/foo/bar/baz", path_args)
@@ -106,6 +131,65 @@ class ApiGatewayPathsTest(unittest.TestCase):
         path, result = get_resource_for_path("/foo/bar/baz", path_args)
         self.assertEqual("/foo/{param1}/baz", path)
 
+    def test_route_table_is_cached_until_invalidated(self):
+        backend = apigateway_backends[TEST_AWS_ACCOUNT_ID][config.DEFAULT_REGION]
+        rest_api = backend.create_rest_api(f"api-{short_uid()}", "")
+        root_id = rest_api.get_resource_for_path("/").id
+        pets = backend.create_resource(rest_api.id, root_id, "pets")
+        # more resources than a single GetResources page
+        for i in range(150):
+            backend.create_resource(rest_api.id, pets.id, f"pet{i}")
+        ctx = ApiInvocationContext("GET", "/", b"", {})
+        ctx.api_id = rest_api.id
+        ctx.region_name = config.DEFAULT_REGION
+        ctx.account_id = TEST_AWS_ACCOUNT_ID
+        try:
+            ctx.path_with_query_string = "/pets/pet149"
+            path, resource = get_target_resource_details(ctx)
+            self.assertEqual("/pets/pet149", path)
+            self.assertEqual("pet149", resource["pathPart"])
+
+            route_table = get_route_table(rest_api.id, config.DEFAULT_REGION, TEST_AWS_ACCOUNT_ID)
+            self.assertIs(
+                route_table,
+                get_route_table(rest_api.id, config.DEFAULT_REGION, TEST_AWS_ACCOUNT_ID),
+            )
+
+            backend.create_resource(rest_api.id, pets.id, "{petId}")
+            invalidate_route_table(rest_api.id, config.DEFAULT_REGION, TEST_AWS_ACCOUNT_ID)
+            ctx.path_with_query_string = "/pets/123"
+            path, resource = get_target_resource_details(ctx)
+            self.assertEqual("/pets/{petId}", path)
+        finally:
+            backend.apis.pop(rest_api.id)
+            invalidate_route_table(rest_api.id, config.DEFAULT_REGION, TEST_AWS_ACCOUNT_ID)
+
+    def test_invoke_integration_without_integration_responses(self):
+        backend = apigateway_backends[TEST_AWS_ACCOUNT_ID][config.DEFAULT_REGION]
+        rest_api = backend.create_rest_api(f"api-{short_uid()}", "")
+        root_id = rest_api.get_resource_for_path("/").id
+        resource = backend.create_resource(rest_api.id, root_id, "mock")
+        backend.put_method(rest_api.id, resource.id, "GET", "NONE")
+        backend.put_integration(rest_api.id, resource.id, "GET", "MOCK", None)
+        ctx = ApiInvocationContext("GET", "/mock", b"", {})
+        ctx.api_id = rest_api.id
+        ctx.region_name = config.DEFAULT_REGION
+        ctx.account_id = TEST_AWS_ACCOUNT_ID
+        try:
+            _, resource_details = get_target_resource_details(ctx)
+            integration = resource_details["resourceMethods"]["GET"]["methodIntegration"]
+            # like in the GetResources response, the resource contains no null members
+            self.assertNotIn("integrationResponses", integration)
+            self.assertNotIn("requestTemplates", integration)
+
+            # the API has no authorizers
+            with patch("localstack.services.apigateway.invocations.authorize_invocation"):
+                response = invoke_rest_api(ctx)
+            self.assertEqual(200, response.status_code)
+        finally:
+            backend.apis.pop(rest_api.id)
+            invalidate_route_table(rest_api.id, config.DEFAULT_REGION, TEST_AWS_ACCOUNT_ID)
+
     def test_apply_request_parameters(self):
         integration = {
             "type": "HTTP_PROXY",
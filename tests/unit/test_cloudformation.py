@@ -1,6 +1,9 @@
 import re
+import threading
+import time
 from typing import Dict
 
+from localstack.aws.accounts import get_aws_access_key_id, set_aws_access_key_id
 from localstack.services.cloudformation.deployment_utils import (
     PLACEHOLDER_AWS_NO_VALUE,
     remove_none_values,
@@ -76,6 +79,177 @@ def test_remove_none_values():
     assert result == {"Properties": {"prop1": 123, "nested": {}, "list": [1, 2, 3]}}
 
 
+def test_get_resource_references():
+    resource_ids = ["Bucket", "Queue", "Topic", "Role"]
+    fragment = {
+        "Properties": {
+            "Name": {"Ref": "Bucket"},
+            "Arn": {"Fn::GetAtt": ["Queue", "Arn"]},
+            "Url": {"Fn::GetAtt": "Topic.TopicName"},
+            "Policy": {"Fn::Sub": "${!Role} ${AWS::Region} ${Var}"},
+            "Other": {"Ref": "AWS::StackName"},
+        }
+    }
+    result = template_deployer.get_resource_references(fragment, resource_ids)
+    assert result == {"Bucket", "Queue", "Topic"}
+
+    fragment = {"Fn::Sub": ["${Role.Arn} ${Bucket}", {"Bucket": {"Ref": "Queue"}}]}
+    result = template_deployer.get_resource_references(fragment, resource_ids)
+    assert result == {"Role", "Queue"}
+
+
+def test_get_resource_dependencies():
+    template = {
+        "Conditions": {"IsProd": {"Fn::Equals": [{"Ref": "Topic"}, "prod"]}},
+        "Resources": {
+            "Bucket": {"Type": "AWS::S3::Bucket"},
+            "Topic": {"Type": "AWS::SNS::Topic"},
+            "Queue": {
+                "Type": "AWS::SQS::Queue",
+                "Condition": "IsProd",
+                "DependsOn": "Bucket",
+                "Properties": {"QueueName": {"Fn::Sub": "${Queue}-queue"}},
+            },
+        },
+    }
+    stack = Stack({"StackName": "test"}, template=template)
+    deployer = template_deployer.TemplateDeployer(stack)
+
+    dependencies = deployer.get_resource_dependencies(stack.resources["Queue"])
+    assert set(dependencies) == {"Bucket", "Topic"}
+    assert deployer.get_resource_dependencies(stack.resources["Bucket"]) == {}
+
+
+class TestDeploymentLoop:
+    class _Deployer(template_deployer.TemplateDeployer):
+        def __init__(self, stack, duration=0.1):
+            super().__init__(stack)
+            self.duration = duration
+            self.events = []
+            self.running = 0
+            self.max_running = 0
+            self.access_key_ids = set()
+            self.mutex = threading.Lock()
+
+        def prepare_should_deploy_change(self, resource_id, change, stack, new_resources):
+            return True
+
+        def get_unsatisfied_dependencies(self, resource):
+            return {}
+
+        def apply_change(self, change, stack, mutex=None):
+            resource_id = change["ResourceChange"]["LogicalResourceId"]
+            with self.mutex:
+                self.events.append(("start", resource_id))
+                self.access_key_ids.add(get_aws_access_key_id())
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            time.sleep(self.duration)
+            with self.mutex:
+                self.running -= 1
+                self.events.append(("end", resource_id))
+
+    @staticmethod
+    def _deploy(resources, action="Add"):
+        for resource in resources.values():
+            resource.setdefault("Properties", {})
+        stack = Stack({"StackName": "test"}, template={"Resources": resources})
+        deployer = TestDeploymentLoop._Deployer(stack)
+        changes = [
+            deployer.get_change_config(action, resource) for resource in stack.resources.values()
+        ]
+        changes_done = deployer.do_apply_changes_in_loop(changes, stack)
+        assert len(changes_done) == len(changes)
+        return deployer
+
+    def test_independent_resources_are_deployed_concurrently(self):
+        resources = {f"Queue{i}": {"Type": "AWS::SQS::Queue"} for i in range(4)}
+        deployer = self._deploy(resources)
+        assert deployer.max_running == 4
+
+    def test_resources_are_deployed_in_dependency_order(self):
+        resources = {
+            "Role": {"Type": "AWS::IAM::Role"},
+            "Queue": {"Type": "AWS::SQS::Queue"},
+            "Function": {
+                "Type": "AWS::Lambda::Function",
+                "Properties": {"Role": {"Fn::GetAtt": ["Role", "Arn"]}},
+            },
+            "Mapping": {
+                "Type": "AWS::Lambda::EventSourceMapping",
+                "DependsOn": ["Queue"],
+                "Properties": {"FunctionName": {"Ref": "Function"}},
+            },
+        }
+        deployer = self._deploy(resources)
+        events = deployer.events
+        assert events.index(("end", "Role")) < events.index(("start", "Function"))
+        assert events.index(("end", "Function")) < events.index(("start", "Mapping"))
+        assert events.index(("end", "Queue")) < events.index(("start", "Mapping"))
+        assert deployer.max_running == 2
+
+    def test_resources_are_removed_in_reverse_dependency_order(self):
+        resources = {
+            "Role": {"Type": "AWS::IAM::Role"},
+            "Function": {
+                "Type": "AWS::Lambda::Function",
+                "Properties": {"Role": {"Fn::GetAtt": ["Role", "Arn"]}},
+            },
+        }
+        deployer = self._deploy(resources, action="Remove")
+        assert deployer.events.index(("end", "Function")) < deployer.events.index(("start", "Role"))
+
+    def test_resources_are_deployed_with_request_context(self):
+        resources = {f"Queue{i}": {"Type": "AWS::SQS::Queue"} for i in range(4)}
+        previous_access_key_id = get_aws_access_key_id()
+        set_aws_access_key_id("111111111111")
+        try:
+            deployer = self._deploy(resources)
+        finally:
+            set_aws_access_key_id(previous_access_key_id)
+        assert deployer.access_key_ids == {"111111111111"}
+
+    def test_stack_view(self):
+        resources = {
+            "Queue": {"Type": "AWS::SQS::Queue", "Properties": {}},
+            "Topic": {"Type": "AWS::SNS::Topic", "Properties": {"TopicName": "topic"}},
+        }
+        stack = Stack({"StackName": "test"}, template={"Resources": resources})
+        view = template_deployer.StackView(stack, "Queue")
+        assert view.stack_name == "test"
+
+        # the resource itself is updated in place, the other resources are copies
+        view.resources["Queue"]["PhysicalResourceId"] = "queue-url"
+        view.resources["Topic"]["Properties"]["TopicName"] = "other"
+        assert resources["Queue"]["PhysicalResourceId"] == "queue-url"
+        assert resources["Topic"]["Properties"]["TopicName"] == "topic"
+
+
+def test_resolution_context_caches_resource_details(monkeypatch):
+    calls = []
+
+    def _retrieve(resource_id, resource_status, stack):
+        calls.append(resource_id)
+        return {"QueueUrl": "http://queue"} if resource_id == "Queue" else None
+
+    monkeypatch.setattr(template_deployer, "_retrieve_resource_details", _retrieve)
+    template = {"Resources": {"Queue": {"Type": "AWS::SQS::Queue", "Properties": {}}}}
+    stack = Stack({"StackName": "test"}, template=template)
+    stack.resolution_context = context = template_deployer.ResolutionContext()
+
+    for _ in range(3):
+        assert template_deployer.retrieve_resource_details("Queue", {}, stack)
+        assert not template_deployer.retrieve_resource_details("Topic", {}, stack)
+    # details are cached, unless the resource is not deployed yet
+    assert calls == ["Queue", "Topic", "Topic", "Topic"]
+    assert (context.hits, context.misses) == (2, 4)
+
+    # changing the status of the resource invalidates its cached details
+    stack.set_resource_status("Queue", "UPDATE_COMPLETE")
+    template_deployer.retrieve_resource_details("Queue", {}, stack)
+    assert calls.count("Queue") == 2
+
+
 def _resolve_refs_in_template(template, stack_params: Dict = None):
     stack = Stack({"StackName": "test"})
     stack.stack_parameters()
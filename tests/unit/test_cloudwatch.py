@@ -1,9 +1,11 @@
+from datetime import timedelta
 from unittest.mock import ANY, Mock, call
 
 import pytest
 
 from localstack.services.cloudwatch import alarm_scheduler
 from localstack.services.cloudwatch.alarm_scheduler import COMPARISON_OPS
+from localstack.services.cloudwatch.metric_store import MetricSeries, MetricStore, get_metric_key
 from localstack.utils.patch import Patch, Patches
 
 
@@ -217,6 +219,102 @@ class TestAlarmScheduler:
             mock_metric_alarm_details, mock_collect_metric_data, 1, "ALARM"
         )
 
+    def test_collect_metric_data_with_single_query(self):
+        client = Mock()
+
+        def _get_metric_data(MetricDataQueries, StartTime, EndTime, ScanBy):
+            assert EndTime - StartTime == timedelta(seconds=5 * 60)
+            timestamps = [StartTime + timedelta(seconds=60), StartTime + timedelta(seconds=240)]
+            return {"MetricDataResults": [{"Timestamps": timestamps, "Values": [1.0, 4.0]}]}
+
+        client.get_metric_data.side_effect = _get_metric_data
+        alarm_details = {
+            "AlarmName": "test-alarm",
+            "MetricName": "m",
+            "Namespace": "ns",
+            "EvaluationPeriods": 3,
+            "Period": 60,
+            "Statistic": "Sum",
+        }
+
+        values = alarm_scheduler.collect_metric_data(alarm_details, client)
+
+        assert values == [None, 1.0, None, None, 4.0]
+        assert client.get_metric_data.call_count == 1
+
+
+class TestMetricStore:
+    def test_statistics_of_periods(self):
+        store = MetricStore()
+        dimensions = [{"Name": "b", "Value": "2"}, {"Name": "a", "Value": "1"}]
+        store.put_metric_data(
+            "ns",
+            [
+                {"MetricName": "m", "Dimensions": dimensions, "Timestamp": 1000, "Value": 1},
+                {"MetricName": "m", "Dimensions": dimensions, "Timestamp": 1010, "Value": 3},
+                {
+                    "MetricName": "m",
+                    "Dimensions": dimensions,
+                    "Timestamp": 1130,
+                    "Values": [2, 10],
+                    "Counts": [3, 1],
+                },
+                {
+                    "MetricName": "m",
+                    "Dimensions": dimensions,
+                    "Timestamp": 1140,
+                    "StatisticValues": {"SampleCount": 2, "Sum": 8, "Minimum": 1, "Maximum": 7},
+                },
+                # other dimension set
+                {"MetricName": "m", "Timestamp": 1000, "Value": 100},
+            ],
+        )
+        key = get_metric_key("ns", "m", list(reversed(dimensions)))
+        stats = ["Sum", "Average", "Minimum", "Maximum", "SampleCount", "p50"]
+
+        result = store.get_statistics(key, 1000, 1180, 60, stats)
+
+        assert [timestamp for timestamp, _ in result] == [1000, 1120]
+        assert result[0][1] == {
+            "Sum": 4,
+            "Average": 2,
+            "Minimum": 1,
+            "Maximum": 3,
+            "SampleCount": 2,
+            "p50": 1,
+        }
+        assert result[1][1]["Sum"] == 24
+        assert result[1][1]["SampleCount"] == 6
+        assert result[1][1]["Minimum"] == 1
+        assert result[1][1]["Maximum"] == 10
+        assert result[1][1]["p50"] == 2
+        assert store.get_metric_values(key, 1000, 1180, 60, "maximum") == [3, None, 10]
+
+    def test_out_of_order_datapoints(self):
+        series = MetricSeries()
+        for timestamp in [30, 10, 20, 10]:
+            series.add(timestamp, 1, timestamp, timestamp, timestamp)
+
+        assert list(series.times) == [10, 10, 20, 30]
+        assert series.get_statistics(0, 40, 20, ["Sum"]) == [(0, {"Sum": 20}), (20, {"Sum": 50})]
+
+    def test_downsampling(self):
+        series = MetricSeries()
+        now = 100 * 24 * 60 * 60
+        old = now - 4 * 60 * 60
+        for i in range(120):
+            # two datapoints per second for one minute, four hours ago
+            series.add(old + i / 2, 1, i, i, i)
+        series.add(now - 500 * 24 * 60 * 60, 1, 1, 1, 1)
+        series.add(now, 1, 1, 1, 1)
+
+        series.downsample(now)
+
+        # the expired datapoint is dropped, the old datapoints are merged into (at most two) minutes
+        assert len(series) <= 3
+        [(_, values)] = series.get_statistics(old - 60, old + 120, 180, ["Sum", "SampleCount"])
+        assert values == {"Sum": sum(range(120)), "SampleCount": 120}
+
 
 def run_and_assert_calculate_alarm_state(
     mock_metric_alarm_details, mock_collect_metric_data, expected_calls, expected_state
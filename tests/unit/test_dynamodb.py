@@ -1,6 +1,14 @@
+import pytest
+
+from localstack.services.dynamodb import provider, subscriptions
 from localstack.services.dynamodb.provider import DynamoDBProvider
+from localstack.services.dynamodb.subscriptions import (
+    TableSubscriptionRegistry,
+    invalidate_table_subscriptions,
+)
 from localstack.services.dynamodb.utils import ItemSet
 from localstack.utils.aws import aws_stack
+from localstack.utils.strings import short_uid
 
 
 def test_fix_region_in_headers():
@@ -40,3 +48,54 @@ def test_lookup_via_item_set():
             assert item_set.find_item(item) == item
         for item in items:
             assert not item_set.find_item({**item, "id": {"S": item["id"]["S"] + "-new"}})
+
+
+class TestTableSubscriptions:
+    @pytest.fixture
+    def fake_lambda_client(self, monkeypatch):
+        class _LambdaClient:
+            mappings = []
+            calls = 0
+
+            def list_event_source_mappings(self, EventSourceArn):
+                self.calls += 1
+                return {"EventSourceMappings": self.mappings}
+
+        client = _LambdaClient()
+        monkeypatch.setattr(provider, "TABLE_SUBSCRIPTIONS", TableSubscriptionRegistry())
+        monkeypatch.setattr(subscriptions, "TABLE_SUBSCRIPTIONS", provider.TABLE_SUBSCRIPTIONS)
+        monkeypatch.setattr(provider.aws_stack, "connect_to_service", lambda *args: client)
+        return client
+
+    def test_cached_until_invalidated(self, fake_lambda_client):
+        table_name = f"table-{short_uid()}"
+        table_arn = aws_stack.dynamodb_table_arn(table_name)
+
+        assert not provider.has_event_sources_or_streams_enabled(table_name)
+        # batch writes pass the table ARN instead of the table name
+        assert not provider.has_event_sources_or_streams_enabled(table_arn)
+        assert fake_lambda_client.calls == 1
+
+        # creating an event source mapping for the stream of the table invalidates the entry
+        fake_lambda_client.mappings = [{"EventSourceArn": f"{table_arn}/stream/latest"}]
+        invalidate_table_subscriptions(f"{table_arn}/stream/latest")
+        assert provider.has_event_sources_or_streams_enabled(table_name)
+        assert provider.has_event_sources_or_streams_enabled(table_name)
+        assert fake_lambda_client.calls == 2
+
+        # event sources of other services do not affect the entries
+        invalidate_table_subscriptions("arn:aws:sqs:us-east-1:000000000000:queue")
+        assert provider.has_event_sources_or_streams_enabled(table_name)
+        assert fake_lambda_client.calls == 2
+
+    def test_discard_result_computed_during_invalidation(self):
+        registry = TableSubscriptionRegistry()
+        table_arn = "arn:aws:dynamodb:us-east-1:000000000000:table/test"
+
+        def _compute():
+            registry.invalidate(table_arn)
+            return False
+
+        assert registry.get(table_arn, _compute) is False
+        assert registry.get(table_arn, lambda: True) is True
+        assert registry.get(table_arn, lambda: False) is True
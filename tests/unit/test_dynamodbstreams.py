@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from localstack.aws.api.dynamodbstreams import ExpiredIteratorException, ResourceNotFoundException
+from localstack.services.dynamodbstreams import dynamodbstreams_api
+from localstack.services.dynamodbstreams.dynamodbstreams_api import DynamoDBStreamsBackend
+from localstack.utils.aws import aws_stack
+from localstack.utils.strings import short_uid
+
+
+def _record(table_arn, key, old=None, new=None):
+    dynamodb = {"Keys": {"id": {"S": key}}, "StreamViewType": "NEW_AND_OLD_IMAGES"}
+    if old is not None:
+        dynamodb["OldImage"] = {"id": {"S": key}, "value": {"S": old}}
+    if new is not None:
+        dynamodb["NewImage"] = {"id": {"S": key}, "value": {"S": new}}
+    return {
+        "eventID": short_uid(),
+        "eventName": "MODIFY",
+        "eventSourceARN": table_arn,
+        "dynamodb": dynamodb,
+    }
+
+
+class TestDynamoDBStreamLog:
+    @pytest.fixture
+    def stream(self):
+        DynamoDBStreamsBackend.reset()
+        created = []
+
+        def _create(view_type="NEW_AND_OLD_IMAGES"):
+            table_name = f"table-{short_uid()}"
+            dynamodbstreams_api.add_dynamodb_stream(table_name, view_type=view_type)
+            created.append(table_name)
+            stream = DynamoDBStreamsBackend.get().ddb_streams[table_name]
+            shard_id = DynamoDBStreamsBackend.get().shards[table_name].shard_id
+            return aws_stack.dynamodb_table_arn(table_name), stream["StreamArn"], shard_id
+
+        yield _create
+
+        for table_name in created:
+            dynamodbstreams_api.delete_streams(aws_stack.dynamodb_table_arn(table_name))
+        DynamoDBStreamsBackend.reset()
+
+    def test_records_are_projected_to_view_type(self, stream):
+        table_arn, stream_arn, shard_id = stream("NEW_IMAGE")
+        record = _record(table_arn, "k1", old="a", new="b")
+        iterator = dynamodbstreams_api.get_shard_iterator(stream_arn, shard_id, "TRIM_HORIZON")
+
+        dynamodbstreams_api.forward_events([record])
+
+        records, _ = dynamodbstreams_api.get_records(iterator)
+        assert len(records) == 1
+        assert "OldImage" not in records[0]["dynamodb"]
+        assert records[0]["dynamodb"]["NewImage"] == record["dynamodb"]["NewImage"]
+        assert "eventSourceARN" not in records[0]
+        # the forwarded record is not modified
+        assert "OldImage" in record["dynamodb"]
+        assert "SequenceNumber" not in record["dynamodb"]
+        assert record["eventSourceARN"] == table_arn
+
+    def test_iterator_types(self, stream):
+        table_arn, stream_arn, shard_id = stream()
+        dynamodbstreams_api.forward_events([_record(table_arn, f"k{i}", new="v") for i in range(3)])
+        latest = dynamodbstreams_api.get_shard_iterator(stream_arn, shard_id, "LATEST")
+        dynamodbstreams_api.forward_events([_record(table_arn, "k3", new="v")])
+
+        records, next_iterator = dynamodbstreams_api.get_records(
+            dynamodbstreams_api.get_shard_iterator(stream_arn, shard_id, "TRIM_HORIZON"), limit=2
+        )
+        assert [r["dynamodb"]["Keys"]["id"]["S"] for r in records] == ["k0", "k1"]
+        sequence_numbers = [int(r["dynamodb"]["SequenceNumber"]) for r in records]
+        assert sequence_numbers == sorted(sequence_numbers)
+
+        records, _ = dynamodbstreams_api.get_records(next_iterator)
+        assert [r["dynamodb"]["Keys"]["id"]["S"] for r in records] == ["k2", "k3"]
+
+        records, _ = dynamodbstreams_api.get_records(latest)
+        assert [r["dynamodb"]["Keys"]["id"]["S"] for r in records] == ["k3"]
+
+        after = dynamodbstreams_api.get_shard_iterator(
+            stream_arn,
+            shard_id,
+            "AFTER_SEQUENCE_NUMBER",
+            records[0]["dynamodb"]["SequenceNumber"],
+        )
+        assert dynamodbstreams_api.get_records(after)[0] == []
+
+    def test_starting_sequence_number(self, stream):
+        table_arn, stream_arn, shard_id = stream()
+        shard = DynamoDBStreamsBackend.get().shards[table_arn.split("/")[-1]]
+        starting_sequence_number = shard.starting_sequence_number
+        dynamodbstreams_api.forward_events([_record(table_arn, "k1", new="v")])
+
+        iterator = dynamodbstreams_api.get_shard_iterator(
+            stream_arn, shard_id, "AT_SEQUENCE_NUMBER", starting_sequence_number
+        )
+        records, _ = dynamodbstreams_api.get_records(iterator)
+        assert len(records) == 1
+        assert int(records[0]["dynamodb"]["SequenceNumber"]) > int(starting_sequence_number)
+
+    def test_deleted_stream(self, stream):
+        table_arn, stream_arn, shard_id = stream()
+        iterator = dynamodbstreams_api.get_shard_iterator(stream_arn, shard_id, "TRIM_HORIZON")
+        dynamodbstreams_api.delete_streams(table_arn)
+
+        with pytest.raises(ExpiredIteratorException):
+            dynamodbstreams_api.get_records(iterator)
+        with pytest.raises(ResourceNotFoundException):
+            dynamodbstreams_api.get_shard_iterator(stream_arn, shard_id, "TRIM_HORIZON")
+
+    def test_wait_for_records(self, stream):
+        table_arn, stream_arn, shard_id = stream()
+        iterator = dynamodbstreams_api.get_shard_iterator(stream_arn, shard_id, "LATEST")
+        assert not dynamodbstreams_api.wait_for_records(iterator, timeout=0.01)
+
+        timer = threading.Timer(
+            0.1, dynamodbstreams_api.forward_events, args=([_record(table_arn, "k1", new="v")],)
+        )
+        timer.start()
+        try:
+            assert dynamodbstreams_api.wait_for_records(iterator, timeout=10)
+        finally:
+            timer.cancel()
@@ -0,0 +1,473 @@
+import json
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from moto.events.models import Rule
+
+from localstack.services.events import archive, dispatch, provider, scheduler
+from localstack.services.events.archive import SegmentLogEventArchive
+from localstack.services.events.dispatch import TARGET_GROUPS, EventDispatcher
+from localstack.services.events.pattern import EventPatternMatcher, RuleIndex
+from localstack.services.events.scheduler import (
+    CronSchedule,
+    JobScheduler,
+    RateSchedule,
+    compile_schedule,
+)
+from localstack.services.sns.delivery import DeliveryPool
+from localstack.utils.sync import poll_condition
+
+RULE_ARN = "arn:aws:events:us-east-1:000000000000:rule/test"
+QUEUE_ARN = "arn:aws:sqs:us-east-1:000000000000:queue"
+DLQ_ARN = "arn:aws:sqs:us-east-1:000000000000:dlq"
+STREAM_ARN = "arn:aws:kinesis:us-east-1:000000000000:stream/stream"
+FUNCTION_ARN = "arn:aws:lambda:us-east-1:000000000000:function:function"
+
+
+TEST_EVENT = {
+    "version": "0",
+    "id": "1",
+    "detail-type": "core.app.backend",
+    "source": "core.update-account-command",
+    "account": "000000000000",
+    "region": "us-east-1",
+    "resources": ["arn:aws:ec2:us-east-1:000000000000:instance/i-1"],
+    "detail": {
+        "state": "running",
+        "amount": 200,
+        "ip": "10.102.1.100",
+        "tags": ["a", "b"],
+        "nested": {"type": "1"},
+    },
+}
+
+
+def _rule(name: str, pattern: dict = None, event_bus_name: str = "default") -> Rule:
+    return Rule(
+        name,
+        "000000000000",
+        "us-east-1",
+        None,
+        json.dumps(pattern) if pattern else None,
+        None if pattern else "rate(1 minute)",
+        None,
+        event_bus_name,
+        None,
+    )
+
+
+class TestEventPatternMatcher:
+    @pytest.mark.parametrize(
+        "pattern,matches",
+        [
+            ({"source": ["core.update-account-command"]}, True),
+            ({"source": ["other"]}, False),
+            # pattern fields are matched in a case-agnostic way
+            ({"Source": ["core.update-account-command"]}, True),
+            ({"detail": {"state": ["running", "stopped"]}}, True),
+            ({"detail": {"nested": {"type": ["1"]}}}, True),
+            ({"detail": {"nested": {"type": ["2"]}}}, False),
+            ({"detail": json.dumps({"nested": {"type": ["1"]}})}, True),
+            ({"detail": {"tags": ["b", "c"]}}, True),
+            ({"detail": {"tags": ["c"]}}, False),
+            ({"detail": {"state": [{"prefix": "run"}]}}, True),
+            ({"detail": {"state": [{"prefix": "stop"}]}}, False),
+            ({"detail": {"state": [{"anything-but": "stopped"}]}}, True),
+            ({"detail": {"state": [{"anything-but": ["running", "stopped"]}]}}, False),
+            ({"detail": {"state": [{"anything-but": {"prefix": "run"}}]}}, False),
+            ({"detail": {"amount": [{"numeric": [">", 100, "<=", 200]}]}}, True),
+            ({"detail": {"amount": [{"numeric": [">", 200]}]}}, False),
+            # numeric conditions do not match strings
+            ({"detail": {"state": [{"numeric": [">", 0]}]}}, False),
+            ({"detail": {"ip": [{"cidr": "10.102.1.0/24"}]}}, True),
+            ({"detail": {"ip": [{"cidr": "10.102.2.0/24"}]}}, False),
+            ({"detail": {"state": [{"exists": True}]}}, True),
+            ({"detail": {"missing": [{"exists": True}]}}, False),
+            ({"detail": {"missing": [{"exists": False}]}}, True),
+            ({"detail": {"state": [{"exists": False}]}}, False),
+            ({"detail": {"state": ["stopped", {"prefix": "r"}]}}, True),
+            ({"detail": {"missing": ["running"]}}, False),
+            # nested patterns do not match scalar values
+            ({"detail": {"state": {"type": ["1"]}}}, False),
+        ],
+    )
+    def test_matches(self, pattern, matches):
+        assert EventPatternMatcher(pattern).matches(TEST_EVENT) == matches
+
+    def test_exact_values(self):
+        matcher = EventPatternMatcher(
+            {"source": ["a", "b"], "detail-type": [{"prefix": "c"}], "detail": {"source": ["d"]}}
+        )
+        assert matcher.get_exact_values("source") == {"a", "b"}
+        assert matcher.get_exact_values("detail-type") is None
+        assert matcher.get_exact_values("detail") is None
+
+
+class TestRuleIndex:
+    def test_match(self):
+        rules = {
+            rule.name: rule
+            for rule in [
+                _rule("by-source", {"source": ["core.update-account-command"]}),
+                _rule("by-detail-type", {"detail-type": ["core.app.backend"]}),
+                _rule("by-detail", {"detail": {"state": ["running"]}}),
+                _rule("no-match", {"source": ["other"]}),
+                # rules without a pattern match every event
+                _rule("scheduled"),
+                _rule("other-bus", {"source": ["core.update-account-command"]}, "other"),
+            ]
+        }
+        index = RuleIndex()
+        index.sync(rules)
+
+        matches = index.match("default", TEST_EVENT)
+        assert [rule.name for rule in matches] == [
+            "by-source",
+            "by-detail-type",
+            "by-detail",
+            "scheduled",
+        ]
+        assert [rule.name for rule in index.match("other", TEST_EVENT)] == ["other-bus"]
+        assert index.match("unknown", TEST_EVENT) == []
+        assert index.buses["default"].unindexed == {"by-detail", "scheduled"}
+
+    def test_sync_with_rules(self):
+        rules = {"rule": _rule("rule", {"source": ["core.update-account-command"]})}
+        index = RuleIndex()
+        index.sync(rules)
+        assert index.has_rules("default")
+        assert len(index.match("default", TEST_EVENT)) == 1
+
+        # the index is only synchronized with the rules after it has been invalidated
+        rules["rule"] = _rule("rule", {"source": ["other"]})
+        index.sync(rules)
+        assert len(index.match("default", TEST_EVENT)) == 1
+        index.invalidate()
+        index.sync(rules)
+        assert index.match("default", TEST_EVENT) == []
+        assert index.buses["default"].index["source"] == {"other": {"rule"}}
+
+        # rules which are deleted and added, without changing the number of rules
+        del rules["rule"]
+        rules["rule-2"] = _rule("rule-2", {"detail-type": ["core.app.backend"]})
+        index.invalidate()
+        index.sync(rules)
+        assert [rule.name for rule in index.match("default", TEST_EVENT)] == ["rule-2"]
+        assert set(index.rules) == {"rule-2"}
+        del rules["rule-2"]
+        index.invalidate()
+        index.sync(rules)
+        assert not index.has_rules("default")
+
+    def test_invalid_pattern(self):
+        rules = {"rule": _rule("rule", {"detail": {"amount": [{"numeric": [">"]}]}})}
+        index = RuleIndex()
+        index.sync(rules)
+        assert index.match("default", TEST_EVENT) == []
+
+
+class _Client:
+    def __init__(self):
+        self.batches = []
+        self.messages = []
+        self.records = []
+        self.failures = set()
+        self.mutex = threading.Lock()
+
+    def get_queue_url(self, QueueName):
+        return {"QueueUrl": f"http://localhost:4566/000000000000/{QueueName}"}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        with self.mutex:
+            self.batches.append(Entries)
+        failed = [entry for entry in Entries if json.loads(entry["MessageBody"]) in self.failures]
+        return {
+            "Successful": [{"Id": entry["Id"]} for entry in Entries if entry not in failed],
+            "Failed": [{"Id": entry["Id"], "Code": "InternalError"} for entry in failed],
+        }
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None):
+        with self.mutex:
+            self.messages.append((QueueUrl, json.loads(MessageBody), MessageAttributes))
+
+    def put_records(self, StreamName, Records):
+        with self.mutex:
+            self.records.append(Records)
+        return {
+            "Records": [
+                {"ErrorCode": "InternalFailure"} if json.loads(r["Data"]) in self.failures else {}
+                for r in Records
+            ]
+        }
+
+
+class TestEventDispatcher:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = _Client()
+        monkeypatch.setattr(dispatch.aws_stack, "connect_to_service", lambda *a, **kw: client)
+        monkeypatch.setattr(dispatch, "RETRY_BASE_DELAY", 0.01)
+        return client
+
+    @pytest.fixture
+    def dispatcher(self):
+        pool = DeliveryPool(
+            num_workers=2,
+            queue_size=100,
+            protocol_groups={group: group for group in TARGET_GROUPS.values()},
+            name="events-delivery",
+        )
+        dispatcher = EventDispatcher(pool)
+        dispatcher.start()
+        yield dispatcher
+        dispatcher.close()
+
+    @staticmethod
+    def _get_metrics(dispatcher, target_id):
+        metrics = dispatcher.get_metrics()["targets"]
+        return [m for m in metrics if m["target_id"] == target_id][0]
+
+    def test_batch_delivery_to_sqs(self, dispatcher, client):
+        target = {"Id": "sqs", "Arn": QUEUE_ARN}
+        with dispatcher.deferred():
+            for i in range(25):
+                dispatcher.dispatch(RULE_ARN, target, i, str(i))
+
+        assert poll_condition(lambda: self._get_metrics(dispatcher, "sqs")["delivered"] == 25, 5)
+        assert [len(batch) for batch in client.batches] == [10, 10, 5]
+        bodies = [json.loads(entry["MessageBody"]) for batch in client.batches for entry in batch]
+        assert bodies == list(range(25))
+        metrics = self._get_metrics(dispatcher, "sqs")
+        assert metrics["pending"] == 0
+        assert metrics["lag"] == 0
+
+    def test_retry_failed_entries(self, dispatcher, client, monkeypatch):
+        sent = []
+
+        def _send_event_to_target(target_arn, event, *args, **kwargs):
+            sent.append(event)
+            if len(sent) == 1:
+                raise Exception("failed")
+
+        monkeypatch.setattr(dispatch, "send_event_to_target", _send_event_to_target)
+        client.failures = {1}
+        stream_target = {"Id": "kinesis", "Arn": STREAM_ARN}
+        for i in range(3):
+            dispatcher.dispatch(RULE_ARN, stream_target, i, str(i))
+        function_target = {"Id": "lambda", "Arn": FUNCTION_ARN}
+        dispatcher.dispatch(RULE_ARN, function_target, "event", "1")
+
+        assert poll_condition(lambda: self._get_metrics(dispatcher, "lambda")["delivered"] == 1, 5)
+        assert poll_condition(lambda: self._get_metrics(dispatcher, "kinesis")["delivered"] == 3, 5)
+
+        # the failed record of the batch is retried individually
+        assert sent.count("event") == 2
+        assert sent.count(1) == 1
+        assert self._get_metrics(dispatcher, "kinesis")["retried"] == 1
+        assert self._get_metrics(dispatcher, "lambda")["retried"] == 1
+
+    def test_dead_letter_queue(self, dispatcher, client):
+        client.failures = {1}
+        target = {
+            "Id": "sqs-dlq",
+            "Arn": QUEUE_ARN,
+            "RetryPolicy": {"MaximumRetryAttempts": 0},
+            "DeadLetterConfig": {"Arn": DLQ_ARN},
+        }
+        for i in range(2):
+            dispatcher.dispatch(RULE_ARN, target, i, str(i))
+
+        assert poll_condition(lambda: self._get_metrics(dispatcher, "sqs-dlq")["failed"] == 1, 5)
+        metrics = self._get_metrics(dispatcher, "sqs-dlq")
+        assert metrics["delivered"] == 1
+        assert metrics["dead_lettered"] == 1
+        assert metrics["retried"] == 0
+
+        queue_url, body, attributes = client.messages[0]
+        assert queue_url.endswith("/dlq")
+        assert body == 1
+        assert attributes["RULE_ARN"]["StringValue"] == RULE_ARN
+        assert attributes["ERROR_CODE"]["StringValue"] == "InternalError"
+        assert attributes["EXHAUSTED_RETRY_CONDITION"]["StringValue"] == "MaximumRetryAttempts"
+
+    def test_remove_targets(self, dispatcher, client):
+        blocked = threading.Event()
+        client.send_message_batch = lambda *args, **kwargs: blocked.wait() and {}
+        targets = [{"Id": f"sqs-{i}", "Arn": QUEUE_ARN} for i in range(3)]
+        for target in targets:
+            dispatcher.dispatch(RULE_ARN, target, 0, "0")
+        dispatcher.dispatch("other-rule", targets[0], 0, "0")
+
+        # the metrics of targets with pending deliveries are kept until the deliveries have completed
+        dispatcher.remove_targets(RULE_ARN, ["sqs-0"])
+        assert len(dispatcher.metrics) == 4
+        blocked.set()
+        assert poll_condition(lambda: len(dispatcher.metrics) == 3, timeout=5)
+
+        dispatcher.remove_targets(RULE_ARN)
+        assert [key.rule_arn for key in dispatcher.metrics] == ["other-rule"]
+
+
+def _envelope(i: int) -> dict:
+    return {"uuid": str(i), "event": {"Source": "test", "Detail": json.dumps({"i": i})}}
+
+
+def test_put_events_with_full_delivery_queue(monkeypatch):
+    entries = [{"Source": f"source-{i}", "DetailType": "test", "Detail": "{}"} for i in range(3)]
+
+    def _put_event(handler, rule_index, event_envelope):
+        if event_envelope["event"]["Source"] == "source-1":
+            raise queue.Full()
+
+    monkeypatch.setattr(provider, "_put_event", _put_event)
+    monkeypatch.setattr(provider, "get_event_archive", lambda: SimpleNamespace(put=lambda _: None))
+    handler = SimpleNamespace(
+        _get_param=lambda name: entries,
+        response_headers={},
+        events_backend=SimpleNamespace(rules={}),
+    )
+
+    content, _ = provider.events_handler_put_events(handler)
+
+    # the entries whose events could not be queued for delivery are failed, to be retried by the client
+    content = json.loads(content)
+    assert content["FailedEntryCount"] == 1
+    assert "EventId" in content["Entries"][0] and "EventId" in content["Entries"][2]
+    assert content["Entries"][1]["ErrorCode"] == "InternalFailure"
+
+
+class TestSegmentLogEventArchive:
+    @pytest.fixture
+    def create_archive(self, tmp_path):
+        archives = []
+
+        def _create(**kwargs):
+            kwargs = {"segment_size": 1024 * 1024, "max_segments": 16, **kwargs}
+            event_archive = SegmentLogEventArchive(str(tmp_path), **kwargs)
+            archives.append(event_archive)
+            return event_archive
+
+        yield _create
+        for event_archive in archives:
+            event_archive.close()
+
+    def test_put_and_read(self, create_archive):
+        event_archive = create_archive()
+        event_archive.put([_envelope(i) for i in range(5)])
+        event_archive.put([_envelope(5)])
+        assert event_archive.flush(timeout=5)
+
+        records = list(event_archive.read())
+        assert [record["id"] for record in records] == [str(i) for i in range(6)]
+        assert records[0]["event"] == _envelope(0)["event"]
+        # the archive times are monotonic
+        times = [record["time"] for record in records]
+        assert times == sorted(times)
+
+    def test_read_time_range(self, create_archive, monkeypatch):
+        monkeypatch.setattr(archive, "INDEX_INTERVAL", 100)
+        event_archive = create_archive(segment_size=1000)
+        for i in range(100):
+            monkeypatch.setattr(archive, "time", SimpleNamespace(time=lambda: 1000.0 + i))
+            event_archive.put([_envelope(i)])
+            assert event_archive.flush(timeout=5)
+
+        assert len(event_archive.segments) > 1
+        assert all(len(segment.index) > 1 for segment in event_archive.segments[:-1])
+        records = list(event_archive.read(start_time=1010, end_time=1050))
+        assert [record["id"] for record in records] == [str(i) for i in range(10, 51)]
+        assert [r["id"] for r in event_archive.read(start_time=1098)] == ["98", "99"]
+        assert list(event_archive.read(start_time=2000)) == []
+
+    def test_rotation_and_reload(self, create_archive, tmp_path):
+        event_archive = create_archive(segment_size=200, max_segments=3)
+        for i in range(50):
+            event_archive.put([_envelope(i)])
+            assert event_archive.flush(timeout=5)
+
+        # only the most recent segments are kept
+        assert len(list(tmp_path.iterdir())) == 3
+        ids = [record["id"] for record in event_archive.read()]
+        assert ids[-1] == "49"
+        assert ids == [str(i) for i in range(50 - len(ids), 50)]
+        event_archive.close()
+
+        # an archive created for an existing directory indexes and appends to the existing segments
+        event_archive = create_archive(segment_size=200, max_segments=3)
+        assert [record["id"] for record in event_archive.read()] == ids
+        event_archive.put([_envelope(50)])
+        assert event_archive.flush(timeout=5)
+        assert [record["id"] for record in event_archive.read()][-1] == "50"
+
+
+class TestJobScheduler:
+    @pytest.mark.parametrize(
+        "expression,now,next_time",
+        [
+            ("rate(1 minute)", 1000, 1060),
+            ("rate(5 minutes)", 1000, 1300),
+            ("rate(2 hours)", 1000, 1000 + 2 * 3600),
+            ("rate(1 day)", 1000, 1000 + 86400),
+            # 1970-01-01T00:16:40Z
+            ("cron(0 20 * * ? *)", 1000, 20 * 3600),
+            ("cron(0/15 * * * ? *)", 1000, 1800),
+            ("*/5 * * * *", 1000, 1200),
+            ("cron(0 0 1 1 ? 1970)", 1000, None),
+        ],
+    )
+    def test_compile_schedule(self, expression, now, next_time):
+        assert compile_schedule(expression).get_next_time(now) == next_time
+
+    def test_compile_schedule_is_cached(self):
+        schedule = compile_schedule("rate(10 minutes)")
+        assert isinstance(schedule, RateSchedule)
+        assert compile_schedule("rate(10 minutes)") is schedule
+        assert isinstance(compile_schedule("cron(0 20 * * ? *)"), CronSchedule)
+        with pytest.raises(ValueError):
+            compile_schedule("rate(1 week)")
+
+    @pytest.fixture
+    def job_scheduler(self, monkeypatch):
+        monkeypatch.setattr(scheduler, "compile_schedule", lambda expression: RateSchedule(0.05))
+        job_scheduler = JobScheduler()
+        job_scheduler.start_loop()
+        yield job_scheduler
+        job_scheduler.close()
+
+    def test_run_jobs(self, job_scheduler):
+        runs = {"a": 0, "b": 0, "disabled": 0}
+
+        def _job(name):
+            def _run():
+                runs[name] += 1
+
+            return _run
+
+        job_a = job_scheduler.add_job(_job("a"), "rate(1 minute)")
+        job_b = job_scheduler.add_job(_job("b"), "rate(1 minute)")
+        job_scheduler.add_job(_job("disabled"), "rate(1 minute)", enabled=False)
+
+        assert poll_condition(lambda: runs["a"] >= 3 and runs["b"] >= 3, timeout=5)
+        job_scheduler.cancel_job(job_a)
+        job_scheduler.disable_job(job_b)
+        # wait for the runs which were already submitted before
+        time.sleep(0.1)
+        cancelled_runs = dict(runs)
+        time.sleep(0.2)
+        assert runs == cancelled_runs
+        assert runs["disabled"] == 0
+        assert job_a not in job_scheduler.jobs
+
+    def test_stop_closes_the_running_instance(self, monkeypatch):
+        monkeypatch.setattr(JobScheduler, "_instance", None)
+        job_scheduler = JobScheduler.start()
+        thread = job_scheduler.thread
+
+        JobScheduler.stop()
+
+        assert poll_condition(lambda: not thread.is_alive(), timeout=5)
+        assert JobScheduler.instance() is not job_scheduler
+        JobScheduler.stop()
@@ -0,0 +1,303 @@
+import base64
+import io
+import json
+import threading
+
+import pytest
+
+from localstack import config
+from localstack.aws.accounts import get_aws_access_key_id, set_aws_access_key_id
+from localstack.services.firehose import buffering, processing
+from localstack.services.firehose.buffering import BufferedDelivery
+from localstack.utils.sync import poll_condition
+
+
+def _record(data: str):
+    return {"Data": base64.b64encode(data.encode()).decode()}
+
+
+class TestBufferedDelivery:
+    @pytest.fixture
+    def buffers(self):
+        buffers = BufferedDelivery()
+        yield buffers
+        buffers.shutdown()
+
+    def test_records_are_delivered_in_bulk_after_interval(self, buffers, monkeypatch):
+        monkeypatch.setattr(config, "FIREHOSE_MAX_BUFFER_INTERVAL", 0.3)
+        delivered = []
+        deliver = lambda records, source_records: delivered.append(records)  # noqa: E731
+
+        for i in range(5):
+            buffers.put("stream", [_record(f"r{i}")], [], deliver)
+        buffers.put("other", [_record("o")], [], deliver)
+
+        assert poll_condition(lambda: len(delivered) == 2, timeout=5)
+        assert sorted(len(records) for records in delivered) == [1, 5]
+
+    def test_records_are_delivered_when_buffer_is_full(self, buffers):
+        delivered = []
+        hints = {"SizeInMBs": 1, "IntervalInSeconds": 300}
+        deliver = lambda records, source_records: delivered.append(records)  # noqa: E731
+        data = "a" * (512 * 1024)
+
+        buffers.put("stream", [_record(data)], [], deliver, hints)
+        buffers.put("stream", [_record(data)], [], deliver, hints)
+        assert poll_condition(lambda: delivered, timeout=5)
+        assert len(delivered) == 1 and len(delivered[0]) == 2
+        buffers.put("stream", [_record(data)], [], deliver, hints)
+
+        # the remaining records are delivered on flush
+        buffers.flush(lambda key: key == "stream")
+        assert [len(records) for records in delivered] == [2, 1]
+
+    def test_buffer_limits(self, monkeypatch):
+        monkeypatch.setattr(config, "FIREHOSE_MAX_BUFFER_INTERVAL", 900)
+        assert buffering.get_buffer_limits(None) == (5 * 1024 * 1024, 300)
+        hints = {"SizeInMBs": 2, "IntervalInSeconds": 60}
+        assert buffering.get_buffer_limits(hints) == (2 * 1024 * 1024, 60)
+
+    def test_records_are_delivered_with_request_context(self, buffers):
+        delivered = []
+
+        def _deliver(records, source_records):
+            delivered.append((get_aws_access_key_id(), len(records)))
+
+        previous_access_key_id = get_aws_access_key_id()
+        try:
+            for account_id in ["111111111111", "222222222222"]:
+                set_aws_access_key_id(account_id)
+                buffers.put(("stream", account_id), [_record("r")], [], _deliver)
+        finally:
+            set_aws_access_key_id(previous_access_key_id)
+
+        buffers.flush()
+        assert sorted(delivered) == [("111111111111", 1), ("222222222222", 1)]
+
+    def test_slow_delivery_does_not_block_other_buffers(self, buffers, monkeypatch):
+        monkeypatch.setattr(config, "FIREHOSE_MAX_BUFFER_INTERVAL", 0.1)
+        release = threading.Event()
+        delivered = []
+
+        def _deliver_slow(records, source_records):
+            release.wait(5)
+            delivered.append("slow")
+
+        buffers.put("slow", [_record("s")], [], _deliver_slow)
+        assert poll_condition(lambda: "slow" in buffers._deliveries, timeout=5)
+        buffers.put("fast", [_record("f")], [], lambda *args: delivered.append("fast"))
+
+        assert poll_condition(lambda: delivered == ["fast"], timeout=5)
+        buffers.flush(lambda key: key == "fast")
+        release.set()
+        buffers.flush(lambda key: key == "slow")
+        assert delivered == ["fast", "slow"]
+
+    def test_failed_delivery_is_retried(self, buffers, monkeypatch):
+        monkeypatch.setattr(buffering, "DELIVERY_RETRY_BACKOFF", 0)
+        attempts = []
+        backups = []
+
+        def _deliver(records, source_records):
+            attempts.append(len(records))
+            if len(attempts) < 2:
+                raise Exception("connection error")
+
+        buffers.put(
+            "stream", [_record("r")], [], _deliver, backup=lambda *args: backups.append(args)
+        )
+        buffers.flush()
+
+        assert attempts == [1, 1]
+        assert backups == []
+
+    def test_failed_delivery_is_backed_up_after_retries(self, buffers, monkeypatch):
+        monkeypatch.setattr(buffering, "DELIVERY_RETRY_BACKOFF", 0)
+        error = Exception("connection error")
+        backups = []
+
+        def _deliver(records, source_records):
+            raise error
+
+        records = [_record("r1"), _record("r2")]
+        buffers.put("stream", records, [], _deliver, backup=lambda *args: backups.append(args))
+        buffers.flush()
+
+        assert backups == [(records, buffering.DELIVERY_RETRIES + 1, error)]
+
+
+LAMBDA_ARN = "arn:aws:lambda:us-east-1:000000000000:function:processor"
+
+
+def _processor(**parameters):
+    parameters = {"LambdaArn": LAMBDA_ARN, **parameters}
+    return {
+        "Type": "Lambda",
+        "Parameters": [
+            {"ParameterName": name, "ParameterValue": value} for name, value in parameters.items()
+        ],
+    }
+
+
+class _LambdaClient:
+    def __init__(self, responses):
+        # results (and whether they are function errors) or exceptions of the invocations
+        self.responses = list(responses)
+        self.events = []
+
+    def invoke(self, FunctionName, Payload):
+        self.events.append(json.loads(Payload))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        result, function_error = response
+        response = {"Payload": io.BytesIO(json.dumps(result).encode())}
+        if function_error:
+            response["FunctionError"] = "Unhandled"
+        return response
+
+
+class TestRecordProcessing:
+    @pytest.fixture
+    def sleeps(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(processing.time, "sleep", sleeps.append)
+        return sleeps
+
+    @staticmethod
+    def _use_lambda_client(monkeypatch, *responses) -> _LambdaClient:
+        client = _LambdaClient(responses)
+        monkeypatch.setattr(
+            processing.aws_stack, "connect_to_service", lambda *args, **kwargs: client
+        )
+        return client
+
+    def test_get_processing_buffering_hints(self):
+        hints = processing.get_processing_buffering_hints([_processor()])
+        assert hints == {"SizeInMBs": 1, "IntervalInSeconds": 60}
+        processor = _processor(BufferSizeInMBs="3", BufferIntervalInSeconds="120")
+        hints = processing.get_processing_buffering_hints([processor])
+        assert hints == {"SizeInMBs": 3, "IntervalInSeconds": 120}
+
+    def test_invocations_are_retried_with_backoff(self, sleeps, monkeypatch):
+        output = {"records": [{"recordId": "0", "result": "Ok", "data": "cHJvY2Vzc2Vk"}]}
+        client = self._use_lambda_client(
+            monkeypatch,
+            Exception("connection error"),
+            ({"errorMessage": "failed"}, True),
+            (output, False),
+        )
+
+        processed, failed = processing.preprocess_records(
+            _processor(NumberOfRetries="2"), [_record("r")]
+        )
+
+        assert processed == output["records"]
+        assert failed == []
+        assert len(client.events) == 3
+        assert client.events[0]["records"][0]["recordId"] == "0"
+        assert sleeps == [0.5, 1.0]
+
+    def test_function_errors_fail_all_records_after_retries(self, sleeps, monkeypatch):
+        error = {"errorMessage": "failed"}
+        client = self._use_lambda_client(monkeypatch, (error, True), (error, True))
+        records = [_record("r1"), _record("r2")]
+
+        processed, failed = processing.preprocess_records(_processor(NumberOfRetries="1"), records)
+
+        assert processed == []
+        assert [failure["record"] for failure in failed] == records
+        assert {failure["error_code"] for failure in failed} == {"Lambda.InvokeFailed"}
+        assert {failure["attempts"] for failure in failed} == {2}
+        assert "Function error" in failed[0]["error_message"]
+        assert len(client.events) == 2
+        assert sleeps == [0.5]
+
+    def test_results_are_mapped_by_record_id(self, monkeypatch):
+        output = {
+            "records": [
+                {"recordId": "2", "result": "Ok", "data": "cHJvY2Vzc2Vk"},
+                {"recordId": "0", "result": "ProcessingFailed", "data": ""},
+                {"recordId": "1", "result": "Dropped", "data": ""},
+            ]
+        }
+        self._use_lambda_client(monkeypatch, (output, False))
+        records = [_record("r0"), _record("r1"), _record("r2")]
+
+        processed, failed = processing.preprocess_records(_processor(), records)
+
+        assert processed == [output["records"][0]]
+        assert len(failed) == 1
+        assert failed[0]["record"] == records[0]
+        assert failed[0]["error_code"] == "Lambda.ProcessingFailed"
+        assert failed[0]["attempts"] == 1
+
+    @pytest.fixture
+    def s3_objects(self, monkeypatch):
+        objects = {}
+
+        class _Object:
+            def __init__(self, bucket, key):
+                self.bucket = bucket
+                self.key = key
+
+            def put(self, Body):
+                objects[(self.bucket, self.key)] = Body
+
+        s3 = type("S3", (), {"Object": staticmethod(_Object)})
+        monkeypatch.setattr(processing, "connect_to_resource", lambda *args: s3)
+        return objects
+
+    def test_processing_failures_are_written_to_error_prefix(self, s3_objects):
+        objects = s3_objects
+        destination = {
+            "S3DestinationDescription": {
+                "BucketARN": "arn:aws:s3:::bucket",
+                "ErrorOutputPrefix": "errors/",
+            }
+        }
+        record = {**_record("r"), "ApproximateArrivalTimestamp": 1000}
+        failure = {
+            "record": record,
+            "attempts": 1,
+            "error_code": "Lambda.ProcessingFailed",
+            "error_message": "failed",
+        }
+
+        processing.put_processing_failures("stream", destination, _processor(), [failure, failure])
+
+        assert len(objects) == 1
+        (bucket, key), body = list(objects.items())[0]
+        assert bucket == "bucket"
+        assert key.startswith("errors/")
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        assert len(lines) == 2
+        assert lines[0]["rawData"] == record["Data"]
+        assert lines[0]["arrivalTimestamp"] == 1000
+        assert lines[0]["errorCode"] == "Lambda.ProcessingFailed"
+        assert lines[0]["errorMessage"] == "failed"
+        assert lines[0]["attemptsMade"] == 1
+        assert lines[0]["lambdaArn"] == LAMBDA_ARN
+
+    def test_failed_deliveries_are_backed_up_to_error_prefix(self, s3_objects):
+        s3_dest_desc = {"BucketARN": "arn:aws:s3:::backup"}
+        records = [_record("r1"), _record("r2")]
+
+        processing.put_delivery_failures(
+            "stream",
+            s3_dest_desc,
+            "HttpEndpoint",
+            "http-endpoint-failed",
+            records,
+            4,
+            Exception("timed out"),
+        )
+
+        (bucket, key), body = list(s3_objects.items())[0]
+        assert bucket == "backup"
+        assert key.startswith("http-endpoint-failed/")
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        assert [line["rawData"] for line in lines] == [record["Data"] for record in records]
+        assert lines[0]["errorCode"] == "HttpEndpoint.DeliveryFailed"
+        assert lines[0]["errorMessage"] == "timed out"
+        assert lines[0]["attemptsMade"] == 4
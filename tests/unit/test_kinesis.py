@@ -1,10 +1,26 @@
 import json
+import threading
+import time
 import unittest
 
+import pytest
 from requests.models import Response
 
 from localstack import config
+from localstack.aws.accounts import get_aws_account_id
+from localstack.aws.api import RequestContext
+from localstack.aws.api.kinesis import ExpiredIteratorException
+from localstack.services.kinesis import engine
+from localstack.services.kinesis.engine import (
+    KinesisEngineBackend,
+    ShardLog,
+    ShardRecord,
+    wait_for_records,
+)
 from localstack.services.kinesis.kinesis_listener import UPDATE_KINESIS
+from localstack.services.kinesis.provider import KinesisBackend
+from localstack.services.kinesis.provider_local import LocalKinesisProvider
+from localstack.utils.aws import aws_stack
 from localstack.utils.common import to_str
 
 TEST_DATA = '{"StreamName": "NotExistingStream"}'
@@ -77,3 +93,139 @@ class KinesisListenerTest(unittest.TestCase):
             self.assertEqual(2, resp_json["TargetShardCount"])
         else:
             self.assertTrue(True)
+
+
+class TestLocalKinesisProvider:
+    @pytest.fixture
+    def provider(self, monkeypatch):
+        monkeypatch.setattr(config, "KINESIS_ERROR_PROBABILITY", 0.0)
+        KinesisEngineBackend.reset()
+        KinesisBackend.reset()
+        yield LocalKinesisProvider()
+        KinesisEngineBackend.reset()
+        KinesisBackend.reset()
+
+    @pytest.fixture
+    def context(self):
+        context = RequestContext()
+        context.account_id = get_aws_account_id()
+        context.region = aws_stack.get_region()
+        return context
+
+    def test_put_and_get_records(self, provider, context):
+        provider.create_stream(context, "stream", shard_count=2)
+        records = [{"Data": b"data-%d" % i, "PartitionKey": f"key-{i}"} for i in range(20)]
+        result = provider.put_records(context, records, "stream")
+        assert result["FailedRecordCount"] == 0
+
+        shards = provider.list_shards(context, "stream")["Shards"]
+        assert [shard["ShardId"] for shard in shards] == [
+            "shardId-000000000000",
+            "shardId-000000000001",
+        ]
+        received = {}
+        for shard in shards:
+            iterator = provider.get_shard_iterator(
+                context, "stream", shard["ShardId"], "TRIM_HORIZON"
+            )["ShardIterator"]
+            shard_records = provider.get_records(context, iterator)["Records"]
+            sequence_numbers = [record["SequenceNumber"] for record in shard_records]
+            assert sequence_numbers == sorted(sequence_numbers)
+            for record in shard_records:
+                received[record["Data"]] = shard["ShardId"]
+
+        # each record is stored in the shard of its partition key, as returned by PutRecords
+        assert received == {
+            record["Data"]: entry["ShardId"] for record, entry in zip(records, result["Records"])
+        }
+
+    def test_shard_iterator_types(self, provider, context):
+        provider.create_stream(context, "stream")
+        shard_id = "shardId-000000000000"
+        sequence_numbers = [
+            provider.put_record(context, "stream", b"%d" % i, "key")["SequenceNumber"]
+            for i in range(5)
+        ]
+
+        def _get_data(iterator_type, **kwargs):
+            iterator = provider.get_shard_iterator(
+                context, "stream", shard_id, iterator_type, **kwargs
+            )["ShardIterator"]
+            return [record["Data"] for record in provider.get_records(context, iterator)["Records"]]
+
+        assert _get_data("TRIM_HORIZON") == [b"0", b"1", b"2", b"3", b"4"]
+        assert _get_data("LATEST") == []
+        assert _get_data("AT_SEQUENCE_NUMBER", starting_sequence_number=sequence_numbers[2]) == [
+            b"2",
+            b"3",
+            b"4",
+        ]
+        assert _get_data("AFTER_SEQUENCE_NUMBER", starting_sequence_number=sequence_numbers[2]) == [
+            b"3",
+            b"4",
+        ]
+        assert _get_data("AT_TIMESTAMP", timestamp=time.time() + 10) == []
+        assert len(_get_data("AT_TIMESTAMP", timestamp=time.time() - 10)) == 5
+
+        iterator = provider.get_shard_iterator(context, "stream", shard_id, "TRIM_HORIZON")
+        result = provider.get_records(context, iterator["ShardIterator"], limit=2)
+        assert [record["Data"] for record in result["Records"]] == [b"0", b"1"]
+        result = provider.get_records(context, result["NextShardIterator"])
+        assert [record["Data"] for record in result["Records"]] == [b"2", b"3", b"4"]
+
+    def test_wait_for_records(self, provider, context):
+        provider.create_stream(context, "stream")
+        iterator = provider.get_shard_iterator(context, "stream", "shardId-000000000000", "LATEST")[
+            "ShardIterator"
+        ]
+        assert not wait_for_records(iterator, timeout=0.01)
+
+        threading.Timer(0.1, provider.put_record, (context, "stream", b"data", "key")).start()
+        start = time.time()
+        assert wait_for_records(iterator, timeout=5)
+        assert time.time() - start < 4
+        assert provider.get_records(context, iterator)["Records"][0]["Data"] == b"data"
+
+        # deleting the stream wakes up the waiting readers
+        iterator = provider.get_records(context, iterator)["NextShardIterator"]
+        threading.Timer(0.1, provider.delete_stream, (context, "stream")).start()
+        assert wait_for_records(iterator, timeout=5)
+        with pytest.raises(ExpiredIteratorException):
+            provider.get_records(context, iterator)
+
+    def test_subscribe_to_shard(self, provider, context):
+        provider.create_stream(context, "stream")
+        stream_arn = provider.describe_stream(context, "stream")["StreamDescription"]["StreamARN"]
+        consumer = provider.register_stream_consumer(context, stream_arn, "consumer")["Consumer"]
+        provider.put_record(context, "stream", b"data", "key")
+
+        events = provider.subscribe_to_shard(
+            context,
+            consumer["ConsumerARN"],
+            "shardId-000000000000",
+            {"Type": "TRIM_HORIZON"},
+        )["EventStream"]
+        event = next(events)["SubscribeToShardEvent"]
+        assert [record["Data"] for record in event["Records"]] == [b"data"]
+
+        threading.Timer(0.1, provider.put_record, (context, "stream", b"data-2", "key")).start()
+        start = time.time()
+        event = next(events)["SubscribeToShardEvent"]
+        assert [record["Data"] for record in event["Records"]] == [b"data-2"]
+        assert time.time() - start < 4
+
+
+class TestShardLog:
+    def test_retention(self, monkeypatch):
+        monkeypatch.setattr(engine, "SEGMENT_SIZE", 10)
+        log = ShardLog()
+        log.append([ShardRecord(b"%d" % i, "key", float(i)) for i in range(35)])
+        assert len(log.segments) == 4
+
+        log.trim(before=20.5)
+        assert log.start_offset == 20
+        records, next_offset = log.read(0, 100)
+        assert [record.data for record in records] == [b"%d" % i for i in range(20, 35)]
+        assert next_offset == 35
+        assert log.get_offset_at(25.5) == 26
+        assert log.get_offset_at(100) == 35
@@ -1,3 +1,5 @@
+from localstack.aws.accounts import get_aws_access_key_id, set_aws_access_key_id
+from localstack.services.logs.metric_filters import MetricFilterPipeline
 from localstack.services.logs.provider import get_pattern_matcher
 
 
@@ -12,3 +14,87 @@ class TestCloudWatchLogs:
         assert_match("ERROR", {"message": "Failed"}, True)
         assert_match("", {"message": "FooBar"}, True)
         assert_match("[w1=Failed]", {"message": "Failed"}, True)
+
+
+class TestMetricFilterPipeline:
+    def test_metric_values_are_aggregated(self):
+        published = []
+        compiled = []
+
+        def _get_matcher(pattern):
+            compiled.append(pattern)
+            return lambda _pattern, event: "ERROR" in event["message"]
+
+        pipeline = MetricFilterPipeline(
+            _get_matcher, publish=lambda *args: published.append(args), flush_interval=60
+        )
+        metric_filters = [
+            {
+                "logGroupName": "group-1",
+                "filterPattern": "ERROR",
+                "metricTransformations": [
+                    {"metricNamespace": "ns", "metricName": "errors", "metricValue": "2"}
+                ],
+            },
+            {
+                "logGroupName": "group-2",
+                "filterPattern": "ERROR",
+                "metricTransformations": [{"metricNamespace": "ns", "metricName": "other"}],
+            },
+        ]
+        events = [
+            {"timestamp": 1000, "message": "ERROR 1"},
+            {"timestamp": 1500, "message": "ERROR 2"},
+            {"timestamp": 2000, "message": "INFO"},
+            {"timestamp": 3000, "message": "ERROR 3"},
+        ]
+
+        for _ in range(3):
+            pipeline.process("000000000000", "us-east-1", "group-1", metric_filters, events)
+        assert not published
+        pipeline.shutdown()
+
+        assert compiled == ["ERROR"]
+        assert len(published) == 1
+        region, namespace, metric_data = published[0]
+        assert (region, namespace) == ("us-east-1", "ns")
+        assert [datum["MetricName"] for datum in metric_data] == ["errors", "errors"]
+        assert [datum["Timestamp"].timestamp() for datum in metric_data] == [1, 3]
+        assert [(datum["Values"], datum["Counts"]) for datum in metric_data] == [
+            ([2.0], [6]),
+            ([2.0], [3]),
+        ]
+
+    def test_metric_values_are_published_per_account(self):
+        published = []
+
+        def _publish(region, namespace, metric_data):
+            published.append((get_aws_access_key_id(), region, len(metric_data)))
+
+        pipeline = MetricFilterPipeline(
+            lambda pattern: lambda _pattern, event: True, publish=_publish, flush_interval=60
+        )
+        metric_filters = [
+            {
+                "logGroupName": "group",
+                "filterPattern": "",
+                "metricTransformations": [{"metricNamespace": "ns", "metricName": "events"}],
+            }
+        ]
+        events = [{"timestamp": 1000, "message": "test"}]
+
+        previous_access_key_id = get_aws_access_key_id()
+        try:
+            for account_id in ["111111111111", "222222222222"]:
+                set_aws_access_key_id(account_id)
+                pipeline.process(account_id, "us-east-1", "group", metric_filters, events)
+            set_aws_access_key_id(None)
+            pipeline.shutdown()
+        finally:
+            set_aws_access_key_id(previous_access_key_id)
+
+        assert sorted(published) == [
+            ("111111111111", "us-east-1", 1),
+            ("222222222222", "us-east-1", 1),
+        ]
+        assert get_aws_access_key_id() == previous_access_key_id
@@ -1,16 +1,31 @@
+import inspect
 import json
+import queue
 import re
+import threading
 import uuid
 from base64 import b64encode
 
 import dateutil.parser
 import pytest
 
+from localstack.aws.accounts import get_aws_access_key_id, set_aws_access_key_id
+from localstack.services.sns import delivery, provider
+from localstack.services.sns.delivery import (
+    DeliveryBatcher,
+    DeliveryError,
+    DeliveryPool,
+    DeliveryTask,
+    RetryPolicy,
+)
+from localstack.services.sns.filter import SubscriptionFilterIndex
 from localstack.services.sns.provider import (
     check_filter_policy,
     create_sns_message_body,
     is_raw_message_delivery,
 )
+from localstack.utils.strings import short_uid
+from localstack.utils.sync import poll_condition
 
 
 @pytest.fixture
@@ -514,3 +529,458 @@ class TestSns:
 
         del subscriber["RawMessageDelivery"]
         assert not is_raw_message_delivery(subscriber)
+
+
+class TestSubscriptionFilterIndex:
+    @staticmethod
+    def _subscription(arn: str, filter_policy=None) -> dict:
+        return {
+            "SubscriptionArn": arn,
+            "TopicArn": "topic",
+            "FilterPolicy": json.dumps(filter_policy) if filter_policy is not None else None,
+        }
+
+    @staticmethod
+    def _match(index: SubscriptionFilterIndex, attributes: dict):
+        return [subscription["SubscriptionArn"] for subscription in index.match(attributes)]
+
+    def test_match(self):
+        index = SubscriptionFilterIndex(
+            [
+                self._subscription("no-policy"),
+                self._subscription("exact", {"color": ["red", "green"]}),
+                self._subscription("prefix", {"color": [{"prefix": "bl"}]}),
+                self._subscription("numeric", {"price": [{"numeric": [">", 0, "<=", 150]}]}),
+                self._subscription(
+                    "exact-and-numeric", {"color": ["red"], "price": [{"numeric": ["=", 100]}]}
+                ),
+                self._subscription("not-exists", {"color": [{"exists": False}]}),
+                self._subscription("anything-but", {"color": [{"anything-but": ["red"]}]}),
+                self._subscription("invalid", None),
+            ]
+        )
+        index.subscriptions["invalid"][1]["FilterPolicy"] = "{"
+        index.add(index.subscriptions["invalid"][1])
+
+        assert self._match(index, {}) == ["no-policy", "not-exists"]
+        assert self._match(index, {"color": {"Type": "String", "Value": "red"}}) == [
+            "no-policy",
+            "exact",
+        ]
+        assert self._match(index, {"color": {"Type": "String", "Value": "blue"}}) == [
+            "no-policy",
+            "prefix",
+            "anything-but",
+        ]
+        assert self._match(
+            index,
+            {
+                "color": {"Type": "String", "Value": "red"},
+                "price": {"Type": "Number", "Value": "100"},
+            },
+        ) == ["no-policy", "exact", "numeric", "exact-and-numeric"]
+        assert self._match(index, {"price": {"Type": "Number", "Value": "151"}}) == [
+            "no-policy",
+            "not-exists",
+        ]
+        assert self._match(
+            index, {"color": {"Type": "String.Array", "Value": '["black", "green"]'}}
+        ) == ["no-policy", "exact", "prefix", "anything-but"]
+
+    def test_update_and_remove(self):
+        subscription = self._subscription("sub", {"color": ["red"]})
+        index = SubscriptionFilterIndex([subscription])
+        red = {"color": {"Type": "String", "Value": "red"}}
+        blue = {"color": {"Type": "String", "Value": "blue"}}
+        assert self._match(index, red) == ["sub"]
+
+        subscription["FilterPolicy"] = json.dumps({"color": ["blue"]})
+        index.add(subscription)
+        assert self._match(index, red) == []
+        assert self._match(index, blue) == ["sub"]
+
+        index.remove("sub")
+        assert self._match(index, blue) == []
+        assert len(index) == 0
+
+    def test_index_of_topic_follows_removed_subscriptions(self):
+        sns_backend = provider.SNSBackend.get()
+        topic_arn = f"arn:aws:sns:us-east-1:000000000000:topic-{short_uid()}"
+        red = {"color": {"Type": "String", "Value": "red"}}
+        subscriptions = [
+            {**self._subscription("sub-1", {"color": ["red"]}), "Endpoint": "queue-1"},
+            {**self._subscription("sub-2", {"color": ["red"]}), "Endpoint": "queue-2"},
+        ]
+        sns_backend.sns_subscriptions[topic_arn] = subscriptions
+        try:
+            index = provider.get_subscription_filter_index(sns_backend, topic_arn)
+            assert self._match(index, red) == ["sub-1", "sub-2"]
+
+            # removing a subscription and adding another one keeps the size of the subscription list
+            provider.unsubscribe_sqs_queue("queue-1")
+            subscription = {**self._subscription("sub-3", {"color": ["blue"]}), "Endpoint": "q"}
+            subscriptions.append(subscription)
+            index.add(subscription)
+
+            index = provider.get_subscription_filter_index(sns_backend, topic_arn)
+            assert self._match(index, red) == ["sub-2"]
+        finally:
+            sns_backend.sns_subscriptions.pop(topic_arn, None)
+            sns_backend.subscription_filters.pop(topic_arn, None)
+
+    def test_index_is_equivalent_to_filter_policy_evaluation(self):
+        policies = [
+            {"a": ["x", "y"]},
+            {"a": [{"prefix": "x"}], "b": [{"numeric": [">=", 10]}]},
+            {"b": [{"numeric": ["<", 5]}, 7]},
+            {"b": [{"numeric": ["=", 7]}]},
+            {"a": [{"anything-but": ["x"]}]},
+            {"a": [{"exists": True}], "b": ["1"]},
+        ]
+        index = SubscriptionFilterIndex(
+            [self._subscription(str(i), policy) for i, policy in enumerate(policies)]
+        )
+
+        for a in [None, "x", "xyz", "y", "z"]:
+            for b in [None, "1", "4", "7", "10", "abc"]:
+                attributes = {}
+                if a is not None:
+                    attributes["a"] = {"Type": "String", "Value": a}
+                if b is not None:
+                    attributes["b"] = {"Type": "Number", "Value": b}
+
+                expected = [
+                    str(i)
+                    for i, policy in enumerate(policies)
+                    if check_filter_policy(policy, attributes)
+                ]
+                assert self._match(index, attributes) == expected, attributes
+
+
+class TestRetryPolicy:
+    def test_from_delivery_policy(self):
+        assert RetryPolicy.from_delivery_policy(None) is None
+        assert RetryPolicy.from_delivery_policy("{") is None
+        assert RetryPolicy.from_delivery_policy({"throttlePolicy": {}}) is None
+
+        policy = RetryPolicy.from_delivery_policy(
+            json.dumps({"healthyRetryPolicy": {"numRetries": 500, "minDelayTarget": 1}})
+        )
+        assert policy.num_retries == 100
+        assert policy.min_delay_target == 1
+        assert policy.max_delay_target == 20
+
+    def test_get_delay(self):
+        policy = RetryPolicy(
+            num_retries=10,
+            num_no_delay_retries=2,
+            num_min_delay_retries=1,
+            num_max_delay_retries=3,
+            min_delay_target=1,
+            max_delay_target=9,
+        )
+        delays = [policy.get_delay(retry) for retry in range(1, 11)]
+        assert delays == [0, 0, 1, 3, 5, 7, 9, 9, 9, 9]
+
+        policy.backoff_function = "exponential"
+        assert [policy.get_delay(retry) for retry in range(4, 8)] == [
+            1 + 8 / 15,
+            1 + 24 / 15,
+            1 + 56 / 15,
+            9,
+        ]
+
+
+@pytest.fixture
+def delivery_pool():
+    pool = DeliveryPool(num_workers=2, queue_size=10)
+    pool.start()
+    yield pool
+    pool.close()
+
+
+class TestDeliveryPool:
+    def test_deliver(self, delivery_pool):
+        delivered = queue.Queue()
+        for i in range(5):
+            delivery_pool.submit(DeliveryTask("sqs", delivered.put, (i,)))
+
+        assert sorted(delivered.get(timeout=5) for _ in range(5)) == [0, 1, 2, 3, 4]
+        metrics = delivery_pool.get_metrics()["sqs"]
+        assert metrics["submitted"] == 5
+        assert metrics["failed"] == 0
+        assert metrics["queue_depth"] == 0
+
+    def test_retry_and_failure(self, delivery_pool):
+        attempts = []
+        failures = queue.Queue()
+
+        def _deliver():
+            attempts.append(threading.current_thread().name)
+            raise DeliveryError("endpoint unavailable", dead_letter_message="message")
+
+        task = DeliveryTask(
+            "https",
+            _deliver,
+            retry_policy=RetryPolicy(num_retries=2, min_delay_target=0, max_delay_target=0.1),
+            on_failure=failures.put,
+        )
+        delivery_pool.submit(task)
+
+        error = failures.get(timeout=5)
+        assert error.dead_letter_message == "message"
+        assert len(attempts) == 3
+        assert all(name.startswith("sns-delivery-http-") for name in attempts)
+        metrics = delivery_pool.get_metrics()["http"]
+        assert metrics["retried"] == 2
+        assert metrics["failed"] == 1
+        assert metrics["in_flight"] == 0
+
+    def test_tasks_are_executed_with_request_context_of_publisher(self, delivery_pool):
+        delivered = queue.Queue()
+        previous_access_key_id = get_aws_access_key_id()
+        try:
+            for account_id in ["111111111111", "222222222222"]:
+                set_aws_access_key_id(account_id)
+                task = DeliveryTask("sqs", lambda: delivered.put(get_aws_access_key_id()))
+                delivery_pool.submit(task)
+        finally:
+            set_aws_access_key_id(previous_access_key_id)
+
+        assert sorted(delivered.get(timeout=5) for _ in range(2)) == [
+            "111111111111",
+            "222222222222",
+        ]
+
+    def test_unexpected_errors_are_not_retried(self, delivery_pool):
+        failures = queue.Queue()
+
+        def _deliver():
+            raise ValueError("unexpected")
+
+        task = DeliveryTask(
+            "http", _deliver, retry_policy=RetryPolicy(num_retries=3), on_failure=failures.put
+        )
+        delivery_pool.submit(task)
+
+        assert isinstance(failures.get(timeout=5), ValueError)
+        assert task.attempts == 1
+
+    def test_backpressure(self, delivery_pool, monkeypatch):
+        monkeypatch.setattr("localstack.services.sns.delivery.SUBMIT_TIMEOUT", 0.1)
+        blocked = threading.Event()
+        try:
+            # block both workers, and fill the queue
+            for _ in range(2):
+                delivery_pool.submit(DeliveryTask("lambda", blocked.wait))
+            assert poll_condition(
+                lambda: delivery_pool.get_metrics()["lambda"]["queue_depth"] == 0, timeout=5
+            )
+            for _ in range(10):
+                delivery_pool.submit(DeliveryTask("lambda", blocked.wait))
+            with pytest.raises(queue.Full):
+                delivery_pool.submit(DeliveryTask("lambda", blocked.wait))
+            # other protocols are not affected
+            delivery_pool.submit(DeliveryTask("sqs", blocked.wait))
+            assert delivery_pool.get_metrics()["lambda"]["queue_depth"] == 10
+        finally:
+            blocked.set()
+
+
+class TestDeliveryBatcher:
+    def test_batches_preserve_order(self, delivery_pool):
+        batches = queue.Queue()
+        started = threading.Event()
+        blocked = threading.Event()
+
+        def _deliver_batch(key, entries):
+            started.set()
+            blocked.wait()
+            batches.put((key, entries))
+
+        batcher = DeliveryBatcher("sqs", _deliver_batch, max_batch_size=3, pool=delivery_pool)
+        # the first flush task blocks until all other entries have been added
+        batcher.add("queue", 0)
+        assert started.wait(timeout=5)
+        for i in range(1, 8):
+            batcher.add("queue", i)
+        blocked.set()
+
+        result = [batches.get(timeout=5) for _ in range(4)]
+        assert result == [
+            ("queue", [0]),
+            ("queue", [1, 2, 3]),
+            ("queue", [4, 5, 6]),
+            ("queue", [7]),
+        ]
+        assert poll_condition(lambda: not batcher.batches, timeout=5)
+        assert batcher.get_metrics() == {"pending": 0, "batches": 4, "entries": 8}
+
+    def test_max_batch_bytes(self, delivery_pool):
+        batches = queue.Queue()
+        batcher = DeliveryBatcher(
+            "sqs",
+            lambda key, entries: batches.put(entries),
+            max_batch_bytes=10,
+            entry_size=len,
+            pool=delivery_pool,
+        )
+        with batcher.deferred():
+            for entry in ["aaaa", "bbbb", "cccc", "dddddddddddd", "e"]:
+                batcher.add("queue", entry)
+            assert batches.empty()
+
+        result = [batches.get(timeout=5) for _ in range(3)]
+        assert result == [["aaaa", "bbbb"], ["cccc"], ["dddddddddddd"]]
+        assert batches.get(timeout=5) == ["e"]
+
+    def test_deferred_batches_per_key(self, delivery_pool):
+        batches = queue.Queue()
+        batcher = DeliveryBatcher(
+            "sqs", lambda key, entries: batches.put((key, entries)), pool=delivery_pool
+        )
+        with batcher.deferred():
+            for i in range(12):
+                batcher.add(f"queue-{i % 2}", i)
+
+        result = sorted(batches.get(timeout=5) for _ in range(2))
+        assert result == [("queue-0", [0, 2, 4, 6, 8, 10]), ("queue-1", [1, 3, 5, 7, 9, 11])]
+
+    def test_flush_with_full_queue(self, delivery_pool):
+        blocked = threading.Event()
+        stack_depths = []
+
+        def _deliver_batch(key, entries):
+            if not stack_depths:
+                # fill the queue, the remaining entries cannot be handed over to new flush tasks
+                while delivery_pool.offer(DeliveryTask("sqs", blocked.wait)):
+                    pass
+            stack_depths.append(len(inspect.stack(0)))
+
+        batcher = DeliveryBatcher("sqs", _deliver_batch, max_batch_size=1, pool=delivery_pool)
+        try:
+            # block one of the workers, the other one executes the flush task
+            delivery_pool.submit(DeliveryTask("sqs", blocked.wait))
+            assert poll_condition(
+                lambda: delivery_pool.get_metrics()["sqs"]["queue_depth"] == 0, timeout=5
+            )
+            with batcher.deferred():
+                for i in range(50):
+                    batcher.add("queue", i)
+
+            assert poll_condition(lambda: len(stack_depths) == 50, timeout=5)
+            # the batches are delivered in a loop, not by recursive flush tasks
+            assert len(set(stack_depths)) == 1
+            assert poll_condition(lambda: not batcher.batches, timeout=5)
+        finally:
+            blocked.set()
+
+    def test_flush_without_capacity(self, delivery_pool, monkeypatch):
+        monkeypatch.setattr(delivery, "SUBMIT_TIMEOUT", 0.1)
+        blocked = threading.Event()
+        delivered = []
+        batcher = DeliveryBatcher(
+            "sqs", lambda key, entries: delivered.extend(entries), pool=delivery_pool
+        )
+        try:
+            # block the workers, and fill the queue
+            for _ in range(2):
+                delivery_pool.submit(DeliveryTask("sqs", blocked.wait))
+            assert poll_condition(
+                lambda: delivery_pool.get_metrics()["sqs"]["queue_depth"] == 0, timeout=5
+            )
+            while delivery_pool.offer(DeliveryTask("sqs", blocked.wait)):
+                pass
+
+            with batcher.deferred():
+                for i in range(30):
+                    batcher.add(f"queue-{i % 3}", i)
+            batcher.add("queue-3", 30)
+
+            # the batches which cannot be queued are delivered by the thread which added them
+            assert sorted(delivered) == list(range(31))
+            assert not batcher.batches
+            assert batcher.get_metrics()["pending"] == 0
+        finally:
+            blocked.set()
+
+
+class TestSqsDelivery:
+    @staticmethod
+    def _delivery(subscriber, message_id, **kwargs):
+        return provider.SqsDelivery(
+            subscriber=subscriber,
+            message_id=message_id,
+            message="message",
+            message_body=f"body-{message_id}",
+            message_attributes={},
+            message_system_attributes={},
+            message_group_id=kwargs.get("group_id"),
+            message_deduplication_id=kwargs.get("deduplication_id"),
+        )
+
+    def test_deliver_batch_with_failed_entries(self, subscriber, monkeypatch):
+        calls = []
+        dead_letters = []
+        delivery_logs = []
+
+        class _SqsClient:
+            def send_message_batch(self, QueueUrl, Entries):
+                calls.append((QueueUrl, Entries))
+                return {
+                    "Successful": [{"Id": "0"}, {"Id": "2"}],
+                    "Failed": [{"Id": "1", "Code": "InvalidMessageContents", "Message": "invalid"}],
+                }
+
+        monkeypatch.setattr(provider.aws_stack, "connect_to_service", lambda *_: _SqsClient())
+        monkeypatch.setattr(
+            provider,
+            "sns_error_to_dead_letter_queue",
+            lambda sub, body, error, **kwargs: dead_letters.append((body, error)),
+        )
+        monkeypatch.setattr(
+            provider,
+            "store_delivery_log",
+            lambda sub, success, message, message_id: delivery_logs.append((message_id, success)),
+        )
+        subscriber["Endpoint"] = "http://localhost:4566/000000000000/queue.fifo"
+
+        provider.deliver_to_sqs_queue(
+            "key",
+            [
+                self._delivery(subscriber, "1", group_id="g1", deduplication_id="d1"),
+                self._delivery(subscriber, "2", group_id="g1", deduplication_id="d2"),
+                self._delivery(subscriber, "3", group_id="g2", deduplication_id="d3"),
+            ],
+        )
+
+        queue_url, entries = calls[0]
+        assert queue_url == subscriber["Endpoint"]
+        assert [(e["Id"], e["MessageBody"], e["MessageGroupId"]) for e in entries] == [
+            ("0", "body-1", "g1"),
+            ("1", "body-2", "g1"),
+            ("2", "body-3", "g2"),
+        ]
+        assert dead_letters == [("body-2", "invalid")]
+        assert delivery_logs == [("1", True), ("2", False), ("3", True)]
+
+    def test_deliver_batch_to_missing_queue(self, subscriber, monkeypatch):
+        dead_letters = []
+
+        class _SqsClient:
+            def send_message_batch(self, QueueUrl, Entries):
+                raise Exception("AWS.SimpleQueueService.NonExistentQueue")
+
+        monkeypatch.setattr(provider.aws_stack, "connect_to_service", lambda *_: _SqsClient())
+        monkeypatch.setattr(
+            provider,
+            "sns_error_to_dead_letter_queue",
+            lambda sub, body, error, **kwargs: dead_letters.append(body),
+        )
+        monkeypatch.setattr(provider, "store_delivery_log", lambda *args: None)
+        subscriber["Endpoint"] = "http://localhost:4566/000000000000/queue"
+
+        provider.deliver_to_sqs_queue(
+            "key", [self._delivery(subscriber, "1"), self._delivery(subscriber, "2")]
+        )
+        assert dead_letters == ["body-1", "body-2"]
@@ -1,9 +1,18 @@
+import asyncio
+import threading
+import time
+
 import pytest
 
+from localstack.aws.api import RequestContext
 from localstack.aws.api.sqs import Message
+from localstack.aws.spec import load_service
+from localstack.http import Request
+from localstack.http.asgi import ASYNC_RESPONSE_BODY
 from localstack.services.sqs import provider
 from localstack.services.sqs.utils import get_message_attributes_md5
 from localstack.utils.common import convert_to_printable_chars
+from localstack.utils.sync import poll_condition
 
 
 def test_sqs_message_attrs_md5():
@@ -59,3 +68,244 @@ def test_except_check_message_size():
 def test_check_message_size():
     message_body = "a"
     provider.check_message_size(message_body, provider.DEFAULT_MAXIMUM_MESSAGE_SIZE)
+
+
+class TestMessagePriorityQueue:
+    @staticmethod
+    def _create_message(message_id: str, priority: float) -> provider.SqsMessage:
+        return provider.SqsMessage(priority, Message(MessageId=message_id, Body=message_id))
+
+    def test_remove(self):
+        queue = provider.MessagePriorityQueue()
+        messages = [self._create_message(str(i), i) for i in range(5)]
+        for message in reversed(messages):
+            queue.put_nowait(message)
+
+        assert queue.remove(messages[0])
+        assert queue.remove(messages[3])
+        assert not queue.remove(messages[3])
+        assert queue.qsize() == 3
+
+        assert [queue.get_nowait() for _ in range(3)] == [messages[1], messages[2], messages[4]]
+        assert queue.empty()
+
+    def test_put_replaces_existing_entry(self):
+        queue = provider.MessagePriorityQueue()
+        message = self._create_message("1", 1)
+        queue.put_nowait(message)
+        queue.put_nowait(message)
+        assert queue.qsize() == 1
+
+        queue.clear()
+        assert queue.empty()
+
+
+class TestReceivedMessage:
+    def test_receive_does_not_copy_message_content(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        message_attributes = {
+            "foo": {"DataType": "String", "StringValue": "bar"},
+            "baz": {"DataType": "Number", "StringValue": "1"},
+        }
+        queue.put(
+            Message(
+                MessageId="1",
+                Body="a" * 1024,
+                Attributes={"SenderId": "000000000000"},
+                MessageAttributes=message_attributes,
+                MD5OfMessageAttributes=provider._create_message_attribute_hash(message_attributes),
+            )
+        )
+
+        first = queue.get(block=False, visibility_timeout=0).to_message(["All"], ["All"])
+        second = queue.get(block=False, visibility_timeout=0).to_message(["All"], ["foo"])
+
+        assert first["Body"] is second["Body"]
+        assert first["MessageAttributes"] is message_attributes
+        assert first["MD5OfMessageAttributes"] == provider._create_message_attribute_hash(
+            message_attributes
+        )
+        assert first["Attributes"]["ApproximateReceiveCount"] == "1"
+        assert first["ReceiptHandle"] != second["ReceiptHandle"]
+
+        # the per-receive values are not written into the stored message
+        assert second["Attributes"]["ApproximateReceiveCount"] == "2"
+        assert "ApproximateReceiveCount" not in queue.visible.queue[0][-1].message["Attributes"]
+
+        # a subset of the message attributes has its own digest
+        assert second["MessageAttributes"] == {"foo": message_attributes["foo"]}
+        assert second["MD5OfMessageAttributes"] == provider._create_message_attribute_hash(
+            {"foo": message_attributes["foo"]}
+        )
+        assert len(message_attributes) == 2
+
+    def test_filter_all_attributes(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(
+            Message(
+                MessageId="1",
+                Body="foo",
+                MessageAttributes={"foo": {"DataType": "String", "StringValue": "bar"}},
+                MD5OfMessageAttributes="digest",
+            )
+        )
+
+        message = queue.get(block=False).to_message()
+        assert "Attributes" not in message
+        assert "MessageAttributes" not in message
+        assert "MD5OfMessageAttributes" not in message
+
+
+@pytest.fixture
+def timer_wheel():
+    wheel = provider.get_message_timer_wheel()
+    wheel.start()
+    yield wheel
+    wheel.close()
+
+
+@pytest.mark.usefixtures("timer_wheel")
+class TestSqsQueueTimers:
+    def test_visibility_timeout_requeues_message(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(Message(MessageId="1", Body="foo"))
+
+        received = queue.get(block=False, visibility_timeout=1)
+        assert queue.inflight
+        assert queue.visible.empty()
+
+        assert poll_condition(lambda: not queue.visible.empty(), timeout=3)
+        assert not queue.inflight
+        assert time.time() >= received.sqs_message.visibility_deadline
+
+    def test_delete_message_cancels_visibility_timer(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(Message(MessageId="1", Body="foo"))
+
+        received = queue.get(block=False)
+        assert received.sqs_message in queue.timers
+
+        queue.remove(received.receipt_handle)
+        assert not queue.timers
+        assert not queue.inflight
+        assert queue.visible.empty()
+
+    def test_delayed_message_is_released(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(Message(MessageId="1", Body="foo"), delay_seconds=1)
+        assert queue.delayed
+        assert queue.visible.empty()
+
+        assert poll_condition(lambda: not queue.visible.empty(), timeout=3)
+        assert not queue.delayed
+        assert not queue.timers
+
+    def test_clear_cancels_timers(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(Message(MessageId="1", Body="foo"), delay_seconds=1)
+        assert queue.timers
+
+        queue.clear()
+        assert not queue.timers
+        assert not queue.delayed
+
+
+@pytest.mark.usefixtures("timer_wheel")
+class TestLongPolling:
+    @staticmethod
+    def _put_later(queue: provider.SqsQueue, delay: float, *message_ids: str):
+        def _put():
+            time.sleep(delay)
+            for message_id in message_ids:
+                queue.put(Message(MessageId=message_id, Body=message_id))
+
+        threading.Thread(target=_put, daemon=True).start()
+
+    def test_receive_batch(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        for i in range(5):
+            queue.put(Message(MessageId=str(i), Body=str(i)))
+
+        received = queue.receive(3)
+        assert [r.sqs_message.message["MessageId"] for r in received] == ["0", "1", "2"]
+        assert len(queue.inflight) == 3
+
+        received = queue.receive(10)
+        assert [r.sqs_message.message["MessageId"] for r in received] == ["3", "4"]
+        assert queue.receive(10) == []
+
+    def test_receive_batch_with_zero_visibility_timeout_returns_each_message_once(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(Message(MessageId="1", Body="1"))
+
+        assert len(queue.receive(10, visibility_timeout=0)) == 1
+        assert len(queue.receive(10, visibility_timeout=0)) == 1
+
+    def test_long_poll_is_woken_up_by_put(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        self._put_later(queue, 0.2, "1")
+
+        start = time.time()
+        received = queue.receive(10, wait_time_seconds=10)
+        assert len(received) == 1
+        assert time.time() - start < 5
+
+    def test_long_poll_is_woken_up_by_delay_release(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        queue.put(Message(MessageId="1", Body="1"), delay_seconds=1)
+
+        start = time.time()
+        received = queue.receive(10, wait_time_seconds=10)
+        assert len(received) == 1
+        assert 0.9 < time.time() - start < 5
+
+    def test_long_poll_times_out(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+
+        start = time.time()
+        assert queue.receive(10, wait_time_seconds=0.2) == []
+        assert time.time() - start >= 0.2
+
+    def test_receive_async(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+
+        future = queue.receive_async(10, wait_time_seconds=10)
+        assert not future.done()
+        assert len(queue.waiters) == 1
+
+        queue.put(Message(MessageId="1", Body="1"))
+        assert future.done()
+        assert [r.sqs_message.message["MessageId"] for r in future.result()] == ["1"]
+        assert not queue.waiters
+
+    def test_receive_async_times_out(self):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+
+        future = queue.receive_async(10, wait_time_seconds=0.2)
+        assert future.result(timeout=5) == []
+        assert not queue.waiters
+
+    def test_receive_message_is_served_asynchronously(self, monkeypatch):
+        queue = provider.StandardQueue("test-queue", "us-east-1", "000000000000")
+        sqs_provider = provider.SqsProvider()
+        monkeypatch.setattr(sqs_provider, "_resolve_queue", lambda *args, **kwargs: queue)
+        context = RequestContext()
+        context.service = load_service("sqs")
+        context.operation = context.service.operation_model("ReceiveMessage")
+        context.request = Request("POST", "/")
+        context.request.environ[ASYNC_RESPONSE_BODY] = True
+
+        response = sqs_provider.receive_message(context, "test-queue", wait_time_seconds=10)
+
+        # the response is returned right away, its body is completed once a message is received
+        assert response.direct_passthrough
+        assert "Content-Length" not in response.headers
+        assert len(queue.waiters) == 1
+        self._put_later(queue, 0.2, "message-1")
+
+        async def _read_body():
+            return b"".join([data async for data in response.response])
+
+        body = asyncio.run(asyncio.wait_for(_read_body(), timeout=5))
+        assert b"<MessageId>message-1</MessageId>" in body
+        assert not queue.waiters
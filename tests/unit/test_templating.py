@@ -2,7 +2,8 @@ import json
 import re
 
 from localstack.services.apigateway.templates import ApiGatewayVtlTemplate
-from localstack.utils.aws.templating import render_velocity_template
+from localstack.utils.aws.templating import compile_template, render_velocity_template
+from localstack.utils.strings import short_uid
 
 # template used to transform incoming requests at the API Gateway (forward to Kinesis)
 APIGW_TEMPLATE_TRANSFORM_KINESIS = """{
@@ -143,6 +144,33 @@ class TestMessageTransformationBasic:
         result = re.sub(r"\s+", " ", result).strip()
         assert result == "loop1 loop3 end"
 
+    def test_variables_are_not_modified(self):
+        template = """
+        #set($context.foo = "bar")
+        $util.qr($context.map.put("key", "value"))
+        $util.qr($context.list.add("item"))
+        #foreach($item in $context.items)$item.name.toUpperCase() #end
+        """
+        variables = {"context": {"map": {}, "list": [], "items": [{"name": "a"}, {"name": "b"}]}}
+        result = render_velocity_template(template, {}, variables=variables)
+
+        assert result.strip() == "A B"
+        assert variables == {
+            "context": {"map": {}, "list": [], "items": [{"name": "a"}, {"name": "b"}]}
+        }
+        assert type(variables["context"]["items"][0]["name"]) is str
+
+    def test_compiled_templates_are_cached(self):
+        template = f"$context.value-{short_uid()}"
+        info = compile_template.cache_info()
+
+        for value in ["v1", "v2"]:
+            result = render_velocity_template(template, {"context": {"value": value}})
+            assert result == f"{value}-{template.split('-')[1]}"
+
+        assert compile_template.cache_info().misses == info.misses + 1
+        assert compile_template.cache_info().hits == info.hits + 1
+
 
 class TestMessageTransformationApiGateway:
     def test_construct_json_using_define(self):
@@ -5,7 +5,7 @@ from typing import Tuple
 
 import pytest
 
-from localstack.utils.scheduler import ScheduledTask, Scheduler
+from localstack.utils.scheduler import ScheduledTask, Scheduler, TimerWheel
 from localstack.utils.sync import poll_condition
 
 
@@ -182,3 +182,88 @@ class TestScheduler:
         thread.join(5)
 
         assert len(task.invocations) == 0
+
+
+class TestTimerWheel:
+    @pytest.fixture
+    def wheel(self):
+        wheel = TimerWheel(resolution=0.01, slots=8, levels=3)
+        wheel.start()
+        yield wheel
+        wheel.close()
+
+    def test_timers_fire_in_order_and_not_early(self, wheel):
+        invocations = []
+
+        def _callback(name, deadline):
+            invocations.append((name, time.time()))
+            assert time.time() >= deadline
+
+        start = time.time()
+        # spread the deadlines across all levels of the (small) wheel
+        for name, delay in [("c", 0.9), ("a", 0.05), ("b", 0.3)]:
+            wheel.schedule(start + delay, _callback, name, start + delay)
+
+        assert poll_condition(lambda: len(invocations) == 3, timeout=5)
+        assert [name for name, _ in invocations] == ["a", "b", "c"]
+        assert invocations[2][1] == pytest.approx(start + 0.9, abs=0.1)
+        assert len(wheel) == 0
+
+    def test_cancel(self, wheel):
+        task = DummyTask()
+
+        timer = wheel.schedule(time.time() + 0.1, task)
+        wheel.schedule(time.time() + 0.2, task, "second")
+        assert len(wheel) == 2
+
+        assert timer.cancel()
+        assert not timer.cancel()
+        assert not timer.is_active
+
+        assert poll_condition(lambda: len(task.invocations) >= 1, timeout=5)
+        time.sleep(0.1)
+        assert len(task.invocations) == 1
+        assert task.invocations[0][2] == ("second",)
+
+    def test_timers_beyond_the_wheel_span(self):
+        # a wheel spanning only 8 * 8 ticks, timers beyond that are kept in the overflow
+        wheel = TimerWheel(resolution=0.005, slots=8, levels=2)
+        task = DummyTask()
+        deadline = time.time() + 0.5
+        wheel.schedule(deadline, task)
+
+        wheel.start()
+        try:
+            assert poll_condition(lambda: len(task.invocations) >= 1, timeout=5)
+        finally:
+            wheel.close()
+        assert task.invocations[0][1] >= deadline
+
+    def test_overdue_timer_fires_with_next_tick(self, wheel, dispatcher):
+        wheel.executor = dispatcher
+        task = DummyTask()
+        wheel.schedule(time.time() - 10, task)
+
+        assert poll_condition(lambda: len(task.invocations) >= 1, timeout=1)
+
+    def test_timer_after_idle_period_fires_on_time(self, wheel):
+        task = DummyTask()
+        # simulate that the (empty) wheel has been idle for a day
+        wheel._origin -= 24 * 60 * 60
+
+        deadline = time.time() + 0.05
+        wheel.schedule(deadline, task)
+
+        assert poll_condition(lambda: len(task.invocations) >= 1, timeout=5)
+        assert task.invocations[0][1] == pytest.approx(deadline, abs=0.1)
+
+    def test_failing_callback_does_not_stop_the_wheel(self, wheel):
+        task = DummyTask()
+
+        def _fail():
+            raise ValueError("oh no")
+
+        wheel.schedule(time.time() + 0.01, _fail)
+        wheel.schedule(time.time() + 0.05, task)
+
+        assert poll_condition(lambda: len(task.invocations) >= 1, timeout=5)